@@ -0,0 +1,258 @@
+"""Single-file output archives (zip or tar) with a checksum manifest.
+
+An ArchiveWriter takes the same add_form() calls as bundle.BundleWriter,
+but writes every table of every form as its own XLSX member of one
+archive, streamed in as each form finishes:
+
+    <FORMNAME>/FORMHEAD.xlsx, <FORMNAME>/FORMTEMPLATE.xlsx, ...
+    manifest.json
+
+Characters other than letters, digits, '.', '-' and '_' in a form name
+become '_'. Form names that map to a folder already in the archive (e.g.
+"A/B" after "A_B") get "~2", "~3", ... appended, which no mapped name can
+contain; the manifest records each form's members.
+
+The manifest lists each form with the row count, size and SHA-256 of
+every table member. The archive is written under a temporary name and
+renamed into place on close, so readers never see a partial file; an
+archive abandoned by an exception is removed instead. Archive names carry
+a random suffix, so parallel runs started in the same second do not
+collide.
+
+The XLSX members are already deflate-compressed, so zip members are
+stored as-is and tar archives are not compressed again.
+
+Usage (verification):
+    python archive.py FORMS_20250913_143022_1a2b3c4d.zip
+"""
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from bundle import BUNDLE_TABLES
+
+ARCHIVE_FORMATS = ('zip', 'tar')
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Members up to this size are built in memory before they are copied in
+SPOOL_BYTES = 16 * 1024 * 1024
+COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def member_folder(form_name):
+    return re.sub(r'[^\w.-]', '_', form_name)
+
+
+def member_name(form_name, table):
+    return f"{member_folder(form_name)}/{table}.xlsx"
+
+
+def write_table(rows, fileobj, table):
+    """Write one table as an XLSX workbook to an open binary file"""
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(table)
+    columns = None
+    for row in rows:
+        if columns is None:
+            columns = list(row.keys())
+            sheet.append(columns)
+        sheet.append([row.get(column) for column in columns])
+    workbook.save(fileobj)
+
+
+class ArchiveWriter:
+    """Streams the output tables of one or many forms into a single archive"""
+
+    def __init__(self, output_dir, archive_format='zip', timestamp=None, prefix="FORMS"):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unknown archive format {archive_format!r}; use one of {ARCHIVE_FORMATS}")
+        self.output_dir = output_dir
+        self.archive_format = archive_format
+        self.timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.path = os.path.join(output_dir, f"{prefix}_{self.timestamp}_{uuid.uuid4().hex[:8]}.{archive_format}")
+        self.forms = {}
+        self.row_counts = {table: 0 for table in BUNDLE_TABLES}
+        self.closed = False
+        self._folders = set()
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.temp_path = f"{self.path}.{os.getpid()}.tmp"
+        if archive_format == 'zip':
+            self._archive = zipfile.ZipFile(self.temp_path, 'w', allowZip64=True)
+        else:
+            self._archive = tarfile.open(self.temp_path, 'w', format=tarfile.PAX_FORMAT)
+
+    def add_form(self, form_name, tables, source_file=None, sheet_name=None):
+        """Write one form's tables as archive members; returns one output dict per table"""
+        if self.closed:
+            raise ValueError("Archive is already closed")
+        if form_name in self.forms:
+            raise ValueError(f"Form {form_name} is already in the archive")
+
+        folder = self._unique_folder(form_name)
+        entry = {'source_file': source_file, 'sheet_name': sheet_name, 'tables': {}}
+        outputs = []
+        for table in BUNDLE_TABLES:
+            rows = tables.get(table, [])
+            name = f"{folder}/{table}.xlsx"
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as spool:
+                write_table(rows, spool, table)
+                size, digest = self._add_member(name, spool)
+            entry['tables'][table] = {'member': name, 'rows': len(rows), 'bytes': size, 'sha256': digest}
+            self.row_counts[table] += len(rows)
+            outputs.append({'table': table, 'file': self.path, 'member': name, 'rows': len(rows), 'bytes': size,
+                            'sha256': digest})
+
+        self.forms[form_name] = entry
+        return outputs
+
+    def _unique_folder(self, form_name):
+        """Member folder of a form, suffixed when another form name already maps to it"""
+        folder = member_folder(form_name)
+        if folder in self._folders:
+            n = 2
+            while f"{folder}~{n}" in self._folders:
+                n += 1
+            folder = f"{folder}~{n}"
+        self._folders.add(folder)
+        return folder
+
+    def _add_member(self, name, fileobj):
+        """Copy a file into the archive in chunks; returns (size, sha256 hex)"""
+        size = fileobj.seek(0, io.SEEK_END)
+        fileobj.seek(0)
+        digest = hashlib.sha256()
+        if self.archive_format == 'zip':
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            with self._archive.open(info, 'w', force_zip64=size >= zipfile.ZIP64_LIMIT) as member:
+                for chunk in iter(lambda: fileobj.read(COPY_CHUNK_BYTES), b''):
+                    digest.update(chunk)
+                    member.write(chunk)
+        else:
+            for chunk in iter(lambda: fileobj.read(COPY_CHUNK_BYTES), b''):
+                digest.update(chunk)
+            fileobj.seek(0)
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = time.time()
+            self._archive.addfile(info, fileobj)
+        return size, digest.hexdigest()
+
+    def manifest(self):
+        return {
+            'version': ARCHIVE_VERSION,
+            'created': datetime.now().isoformat(),
+            'format': self.archive_format,
+            'form_count': len(self.forms),
+            'row_counts': dict(self.row_counts),
+            'forms': self.forms,
+        }
+
+    def close(self):
+        """Write the manifest and move the archive into place; returns the output list"""
+        if self.closed:
+            return []
+        self.closed = True
+
+        data = json.dumps(self.manifest(), indent=2, ensure_ascii=False).encode('utf-8')
+        if self.archive_format == 'zip':
+            self._archive.writestr(MANIFEST_NAME, data, compress_type=zipfile.ZIP_DEFLATED)
+        else:
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._archive.addfile(info, io.BytesIO(data))
+        self._archive.close()
+        os.replace(self.temp_path, self.path)
+        return [{'table': 'ARCHIVE', 'file': self.path, 'rows': sum(self.row_counts.values()),
+                 'bytes': os.path.getsize(self.path)}]
+
+    def abort(self):
+        """Discard the partial archive"""
+        if self.closed:
+            return
+        self.closed = True
+        self._archive.close()
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+def _read_members(path):
+    """Yield (name, file object) for every member of a zip or tar archive"""
+    # Checked first: the XLSX members make a tar look like a zip to zipfile.is_zipfile
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path) as archive:
+            for info in archive:
+                if info.isfile():
+                    yield info.name, archive.extractfile(info)
+    else:
+        with zipfile.ZipFile(path) as archive:
+            for name in archive.namelist():
+                with archive.open(name) as member:
+                    yield name, member
+
+
+def verify_archive(path):
+    """Check every table member against the manifest; returns a list of problems (empty when intact)"""
+    manifest = None
+    digests = {}
+    for name, member in _read_members(path):
+        if name == MANIFEST_NAME:
+            manifest = json.load(member)
+            continue
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: member.read(COPY_CHUNK_BYTES), b''):
+            digest.update(chunk)
+        digests[name] = digest.hexdigest()
+
+    if manifest is None:
+        return [f"{MANIFEST_NAME} is missing"]
+    problems = []
+    for form_name, entry in manifest['forms'].items():
+        for table, details in entry['tables'].items():
+            actual = digests.pop(details['member'], None)
+            if actual is None:
+                problems.append(f"{form_name} {table}: member {details['member']} is missing")
+            elif actual != details['sha256']:
+                problems.append(f"{form_name} {table}: SHA-256 mismatch in {details['member']}")
+    problems.extend(f"{name} is not listed in the manifest" for name in sorted(digests))
+    return problems
+
+
+def main():
+    failures = 0
+    for path in sys.argv[1:]:
+        problems = verify_archive(path)
+        for problem in problems:
+            print(f"FAILED {path}: {problem}", file=sys.stderr)
+        if problems:
+            failures += 1
+        else:
+            print(f"OK     {path}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
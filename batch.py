@@ -0,0 +1,199 @@
+"""Unattended batch conversion of tasklist workbooks.
+
+Runs analysis, LOV auto-configuration and generation for each workbook
+without the GUI, writing a JSON-lines trace and Prometheus metrics.
+With --bundle all forms of the run go into one set of four workbooks;
+with --archive zip|tar they go into one archive with a SHA-256 manifest.
+Tasklists already converted into the output directory (same workbook, or
+the same procedures in another workbook) reuse the stored rows and LOV
+codes unless --no-reuse is given. With --orgs each form is built once and
+written for every listed org unit (ORG swapped, optional form-name prefix).
+
+Usage:
+    python batch.py tasklists/*.xlsx --output-dir out --trace trace.jsonl --metrics pm_form.prom
+    python batch.py tasklists/*.xlsx --output-dir out --bundle
+    python batch.py tasklists/*.xlsx --output-dir out --archive zip
+    python batch.py tasklists/*.xlsx --output-dir out --orgs "2100,2200,2300:P3-"
+"""
+import argparse
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+from archive import ARCHIVE_FORMATS, ArchiveWriter
+from bundle import BundleWriter
+from fanout import parse_org_targets
+from fingerprint import FingerprintIndex
+from headless import HeadlessConverter
+from profiling import PhaseProfiler
+from similarity import ProcedureHistory
+from telemetry import ConversionTelemetry
+from validation import VALIDATION_MODES
+
+
+def select_sheets(converter, source_file, all_sheets=False, sheet_name=None):
+    """Pick the sheets to convert from a workbook"""
+    sheet_names = converter.list_sheets(source_file)
+    if sheet_name:
+        return [sheet_name] if sheet_name in sheet_names else []
+    if all_sheets:
+        return sheet_names
+    likely_sheets = converter.find_likely_sheets(sheet_names)
+    return likely_sheets[:1] or sheet_names[:1]
+
+
+def stage_durations(profiler, start):
+    """Seconds per top-level profiler phase, plus 'other' for the rest since start"""
+    # Top-level phases are the stages; nested ones are already included in them
+    stages = defaultdict(float)
+    for record in profiler.records:
+        if record['depth'] == 0:
+            stages[record['phase']] += record['wall_seconds']
+    stages['other'] = max(0.0, time.perf_counter() - start - sum(stages.values()))
+    return dict(stages)
+
+
+def convert_sheet(source_file, sheet_name, output_dir, telemetry=None, user_name=None, bundle=None,
+                  validation='block', reuse=True, extract_workers=None, org_targets=None, form_root=None):
+    """Convert one sheet into the four output tables; return the trace record.
+    
+    With a BundleWriter the rows are appended to the bundle instead of
+    being written to a per-form directory. With reuse, the fingerprint
+    index of output_dir supplies earlier generations of the same tasklist.
+    extract_workers limits the processes used to extract one large sheet.
+    org_targets ([(org_code, form_name_prefix)]) writes the form once per org.
+    Loose files go to <form_root>/<form name>/ (form_root defaults to output_dir).
+    """
+    converter = HeadlessConverter(output_dir=output_dir)
+    if user_name:
+        converter.user_name_var.set(user_name)
+    converter.profiler = PhaseProfiler(track_allocations=False)
+    converter.validation_mode = validation
+    if extract_workers:
+        converter.extraction_workers = extract_workers
+    if reuse:
+        converter.fingerprint_index = FingerprintIndex.for_output_dir(output_dir)
+        converter.procedure_history = ProcedureHistory.for_output_dir(output_dir)
+
+    status, error, outputs, registry_entry, reused = 'ok', None, [], None, None
+    start = time.perf_counter()
+    try:
+        reused = converter.prepare(source_file, sheet_name)
+
+        form_name = converter.form_name_var.get()
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if bundle is not None:
+            if org_targets:
+                outputs = converter.write_fanout(output_dir, timestamp, org_targets, bundle)
+            else:
+                outputs = converter.write_to_bundle(bundle)
+        else:
+            form_dir = os.path.join(form_root or output_dir, re.sub(r'[^\w.-]', '_', form_name))
+            os.makedirs(form_dir, exist_ok=True)
+            if org_targets:
+                outputs = converter.write_fanout(form_dir, timestamp, org_targets)
+            else:
+                outputs = converter.write_output_files(form_dir, timestamp)
+        registry_entry = converter.global_lov_registry["form_registry"].get(form_name)
+    except Exception as e:
+        status, error = 'failed', f"{type(e).__name__}: {e}"
+
+    telemetry = telemetry or ConversionTelemetry()
+    return telemetry.record_conversion(
+        source_file=source_file,
+        sheet_name=sheet_name,
+        status=status,
+        stages=stage_durations(converter.profiler, start),
+        form_name=converter.form_name_var.get() or None,
+        rows_scanned=converter.sheet_shape[0],
+        procedures=len(converter.procedures),
+        lov_codes=len(converter.lov_database),
+        outputs=outputs,
+        registry_entry=registry_entry,
+        error=error,
+        reused=reused,
+    )
+
+
+def convert_inputs(args, telemetry, bundle=None):
+    """Convert every selected sheet of every input; returns the number of failures"""
+    failures = 0
+    for source_file in args.inputs:
+        try:
+            sheets = select_sheets(HeadlessConverter(), source_file, args.all_sheets, args.sheet)
+        except Exception as e:
+            failures += 1
+            telemetry.record_conversion(source_file, None, 'failed', {}, error=f"{type(e).__name__}: {e}")
+            print(f"FAILED {source_file}: {e}", file=sys.stderr)
+            continue
+
+        for sheet_name in sheets:
+            record = convert_sheet(source_file, sheet_name, args.output_dir, telemetry, args.user, bundle,
+                                   args.validation, not args.no_reuse, args.extract_workers, args.orgs)
+            if record['status'] != 'ok':
+                failures += 1
+                print(f"FAILED {source_file} [{sheet_name}]: {record.get('error')}", file=sys.stderr)
+            else:
+                reused = f", reused {record['reused']} match" if record.get('reused') else ""
+                print(f"OK     {source_file} [{sheet_name}] -> {record['form_name']} "
+                      f"({record['procedures']} procedures, {record['duration_seconds']:.2f}s{reused})")
+        telemetry.flush()
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert tasklist workbooks to PM forms without the GUI")
+    parser.add_argument('inputs', nargs='+', help="Workbooks to convert")
+    parser.add_argument('--output-dir', default=os.getcwd(), help="Directory for generated files")
+    parser.add_argument('--sheet', help="Convert only this sheet name")
+    parser.add_argument('--all-sheets', action='store_true', help="Convert every sheet instead of the likely one")
+    parser.add_argument('--user', help="User name written into FORMHEAD")
+    parser.add_argument('--trace', help="Append JSON-lines trace records to this file")
+    parser.add_argument('--metrics', help="Write Prometheus textfile metrics to this file")
+    output_mode = parser.add_mutually_exclusive_group()
+    output_mode.add_argument('--bundle', action='store_true', help="Write one set of four workbooks for all forms")
+    output_mode.add_argument('--archive', choices=ARCHIVE_FORMATS,
+                             help="Write all forms into one zip/tar archive with a SHA-256 manifest")
+    parser.add_argument('--no-reuse', action='store_true',
+                        help="Convert every sheet from scratch and keep no reuse/near-duplicate history")
+    parser.add_argument('--extract-workers', type=int,
+                        help="Processes for extracting one large sheet in row-range shards (default: CPU count)")
+    parser.add_argument('--validation', choices=VALIDATION_MODES, default='block',
+                        help="block: fail forms with validation errors, warn: write anyway, off: skip checks")
+    parser.add_argument('--orgs', type=parse_org_targets,
+                        help="Write each form for these org codes, e.g. \"2100,2200,2300:P3-\" (ORG[:form name prefix])")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    telemetry = ConversionTelemetry(args.trace, args.metrics)
+    bundle = None
+    if args.bundle:
+        bundle = BundleWriter(args.output_dir)
+    elif args.archive:
+        bundle = ArchiveWriter(args.output_dir, args.archive)
+
+    try:
+        failures = convert_inputs(args, telemetry, bundle)
+    except BaseException:
+        # An interrupted batch must not publish a partial bundle or archive
+        if bundle is not None:
+            bundle.abort()
+        raise
+
+    if bundle is not None:
+        for output in bundle.close():
+            print(f"BUNDLE {output['file']} ({output['rows']} rows)")
+        if args.bundle:
+            print(f"BUNDLE {bundle.manifest_path} ({len(bundle.forms)} forms)")
+        else:
+            print(f"BUNDLE {len(bundle.forms)} forms, manifest {bundle.path}/manifest.json")
+    telemetry.flush()
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Benchmarks for the PM form generator pipeline."""
@@ -0,0 +1,157 @@
+"""Stage-by-stage benchmark of the conversion pipeline.
+
+For each size a synthetic workbook is generated, then every stage is timed
+separately with its tracemalloc peak: sheet listing, pd.read_excel,
+detect_header_row, extract_procedures, auto_configure_lovs, template row
+building and each create_* writer. Results are emitted as JSON lines, one
+record per (size, stage), so runs can be diffed to spot scaling regressions.
+
+Usage:
+    python -m benchmarks.bench_pipeline --sizes 100 1000 10000 --output bench.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+from benchmarks.synthetic_workbook import generate_workbook
+from headless import HeadlessConverter
+
+DEFAULT_SIZES = [100, 1000, 10000, 100000]
+
+
+class StageRecorder:
+    """Collects wall time and allocation peak per stage"""
+
+    def __init__(self, size, track_memory=True):
+        self.size = size
+        self.track_memory = track_memory
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, **extra):
+        if self.track_memory:
+            tracemalloc.reset_peak()
+            base_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        record = {'size': self.size, 'stage': name}
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start, 6)
+            if self.track_memory:
+                record['peak_bytes'] = max(0, tracemalloc.get_traced_memory()[1] - base_bytes)
+            record.update(extra)
+            self.records.append(record)
+
+
+def run_size(size, work_dir, args):
+    """Benchmark all stages for one procedure count"""
+    source_file = os.path.join(work_dir, f"synthetic_{size}.xlsx")
+    generate_workbook(source_file, procedures=size, sheets=args.sheets, numbering=args.numbering,
+                      density=args.density, extra_columns=args.extra_columns,
+                      merged_cells=not args.no_merged_cells, seed=args.seed)
+
+    recorder = StageRecorder(size, track_memory=not args.no_memory)
+    converter = HeadlessConverter(output_dir=work_dir)
+
+    with recorder.stage('list_sheets') as record:
+        sheet_names = converter.list_sheets(source_file)
+        record['sheets'] = len(sheet_names)
+
+    with recorder.stage('read_excel') as record:
+        converter.load_sheet(source_file, sheet_names[0])
+        record['rows'], record['columns'] = converter.sheet_shape
+        record['columns_kept'] = len(converter.raw_dataframe.columns)
+
+    with recorder.stage('detect_header_row') as record:
+        header_row = converter.detect_header_row()
+        record['header_row'] = header_row
+
+    with recorder.stage('extract_procedures') as record:
+        converter.procedures = converter.extract_procedures(header_row)
+        record['procedures'] = len(converter.procedures)
+
+    with recorder.stage('auto_configure_lovs') as record:
+        converter.setup_lov_configuration()
+        converter.auto_configure_lovs()
+        record['lov_codes'] = len(converter.lov_database)
+
+    with recorder.stage('build_formtemplate_rows') as record:
+        record['rows'] = len(converter.build_formtemplate_rows())
+
+    with recorder.stage('build_formlov_rows') as record:
+        record['rows'] = len(converter.build_formlov_rows())
+
+    writers = [
+        ('create_formhead_file', 'FORMHEAD'),
+        ('create_enhanced_formtemplate_file', 'FORMTEMPLATE'),
+        ('create_formtemplate_file', 'FORMTEMPLATE_LEGACY'),
+        ('create_formlov_file', 'FORMLOV'),
+        ('create_formmenu_file', 'FORMMENU'),
+    ]
+    for method_name, table in writers:
+        filename = os.path.join(work_dir, f"{table}_{size}.xlsx")
+        with recorder.stage(method_name) as record:
+            getattr(converter, method_name)(filename)
+        record['bytes_written'] = os.path.getsize(filename)
+
+    return recorder.records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the PM form generator pipeline stage by stage")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Procedure counts to benchmark")
+    parser.add_argument('--sheets', type=int, default=1)
+    parser.add_argument('--numbering', default='mixed', choices=['dot', 'paren', 'bare', 'mixed'])
+    parser.add_argument('--density', type=float, default=0.8)
+    parser.add_argument('--extra-columns', type=int, default=3)
+    parser.add_argument('--no-merged-cells', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', action='store_true', help="Skip tracemalloc (faster, no peak_bytes)")
+    parser.add_argument('--output', help="Write JSON lines here instead of stdout")
+    parser.add_argument('--work-dir', help="Keep generated workbooks and outputs in this directory")
+    args = parser.parse_args()
+
+    environment = {
+        'stage': 'environment',
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        out.write(json.dumps(environment) + "\n")
+
+        if not args.no_memory:
+            tracemalloc.start()
+
+        for size in args.sizes:
+            if args.work_dir:
+                os.makedirs(args.work_dir, exist_ok=True)
+                records = run_size(size, args.work_dir, args)
+            else:
+                with tempfile.TemporaryDirectory() as work_dir:
+                    records = run_size(size, work_dir, args)
+
+            for record in records:
+                out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        if not args.no_memory:
+            tracemalloc.stop()
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
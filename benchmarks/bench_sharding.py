@@ -0,0 +1,107 @@
+"""Serial vs sharded procedure extraction on one synthetic sheet.
+
+A workbook is generated and read once per size, then extraction is timed
+serially (scan_procedures over every row) and through the process pool
+(extract_pooled) for each worker count, without the serial fallback of
+extract_sharded, so the pool's cost is visible on any machine. The
+shared-memory encoding the parent does before the fan-out is timed on its
+own. Every sharded result is checked against the serial one.
+
+Each record carries the machine's CPU count: sharding only beats the
+serial pass with a spare CPU per worker, and on a single CPU the speedup
+is below 1.
+
+Usage:
+    python -m benchmarks.bench_sharding --sizes 100000 300000 --workers 2 4 8 --output sharding.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic_workbook import generate_workbook
+from extraction import ColumnBuffers, extract_pooled, scan_procedures
+from headless import HeadlessConverter
+
+DEFAULT_SIZES = [100000]
+DEFAULT_WORKERS = [2, 4]
+
+
+def best_time(function, repeat):
+    """Fastest of repeat runs, and the result of the last one"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best, 6), result
+
+
+def run_size(size, work_dir, args):
+    source_file = os.path.join(work_dir, f"sharding_{size}.xlsx")
+    generate_workbook(source_file, procedures=size, merged_cells=not args.no_merged_cells, seed=args.seed)
+    converter = HeadlessConverter(output_dir=work_dir)
+    converter.load_sheet(source_file, converter.list_sheets(source_file)[0])
+    df, merged = converter.raw_dataframe, converter.merged_index
+    first_row = converter.detect_header_row() + 1
+    base = {'size': size, 'rows': len(df) - first_row, 'cpus': os.cpu_count()}
+
+    def serial():
+        return scan_procedures(df.iloc[first_row:].itertuples(index=False, name=None), first_row, merged)
+
+    serial_seconds, expected = best_time(serial, args.repeat)
+    records = [dict(base, mode='serial', workers=1, seconds=serial_seconds, procedures=len(expected))]
+
+    def encode():
+        ColumnBuffers.from_dataframe(df).close()
+
+    encode_seconds, _ = best_time(encode, args.repeat)
+    records.append(dict(base, mode='encode_shared_memory', workers=1, seconds=encode_seconds))
+
+    for workers in args.workers:
+        seconds, procedures = best_time(lambda: extract_pooled(df, first_row, merged, workers), args.repeat)
+        if procedures != expected:
+            raise AssertionError(f"Sharded extraction with {workers} workers differs from the serial pass")
+        records.append(dict(base, mode='sharded', workers=workers, seconds=seconds,
+                            speedup=round(serial_seconds / seconds, 3)))
+    return records
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare serial and sharded procedure extraction")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Procedure counts to benchmark")
+    parser.add_argument('--workers', type=int, nargs='+', default=DEFAULT_WORKERS, help="Pool sizes to compare")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the fastest is kept")
+    parser.add_argument('--no-merged-cells', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Write JSON lines here instead of stdout")
+    args = parser.parse_args()
+
+    environment = {
+        'stage': 'environment',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+    out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    try:
+        out.write(json.dumps(environment) + "\n")
+        for size in args.sizes:
+            with tempfile.TemporaryDirectory() as work_dir:
+                records = run_size(size, work_dir, args)
+            for record in records:
+                out.write(json.dumps(record) + "\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Localhost load test for the HTTP service (service.py).
+
+Generates a synthetic workbook, then fires concurrent requests at a running
+service and reports status counts and latency percentiles per endpoint.
+503 responses show the backpressure limit being hit.
+
+Usage:
+    python service.py --port 8765 --workers 4 --output-dir out &
+    python -m benchmarks.load_service --url http://127.0.0.1:8765 --requests 200 --concurrency 32
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.synthetic_workbook import generate_workbook
+
+
+def call(url, path, payload=None, data=None, headers=None):
+    """POST (or GET without a body) and return (status, decoded body, seconds)"""
+    body = data if data is not None else (json.dumps(payload).encode('utf-8') if payload is not None else None)
+    request = urllib.request.Request(url + path, data=body, headers=headers or {},
+                                     method='POST' if body is not None else 'GET')
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=600) as response:
+            status, raw = response.status, response.read()
+    except urllib.error.HTTPError as e:
+        status, raw = e.code, e.read()
+    elapsed = time.perf_counter() - start
+    try:
+        decoded = json.loads(raw)
+    except ValueError:
+        decoded = raw.decode('utf-8', 'replace')
+    return status, decoded, elapsed
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test a local PM form converter service")
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--procedures', type=int, default=500)
+    parser.add_argument('--endpoint', default='generate', choices=['analyze', 'auto-configure', 'generate'])
+    parser.add_argument('--sink', default='json', help="Sink for generate requests")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        source_file = os.path.join(work_dir, "load.xlsx")
+        generate_workbook(source_file, procedures=args.procedures)
+        with open(source_file, 'rb') as f:
+            status, uploaded, _ = call(args.url, '/upload', data=f.read(), headers={'X-Filename': 'load.xlsx'})
+    if status != 200:
+        raise SystemExit(f"Upload failed: {status} {uploaded}")
+    status, sheets, _ = call(args.url, '/sheets', {'source_file': uploaded['source_file']})
+    payload = {'source_file': uploaded['source_file'], 'sheet': sheets['sheets'][0], 'sink': args.sink}
+
+    def one(_):
+        return call(args.url, f"/{args.endpoint}", payload)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - start
+
+    statuses = Counter(status for status, _, _ in results)
+    ok_latencies = [elapsed for status, _, elapsed in results if status == 200]
+    summary = {
+        'endpoint': args.endpoint,
+        'requests': args.requests,
+        'concurrency': args.concurrency,
+        'wall_seconds': round(wall, 3),
+        'throughput_per_second': round(statuses[200] / wall, 3) if wall else None,
+        'statuses': dict(statuses),
+        'p50_seconds': percentile(ok_latencies, 0.50),
+        'p95_seconds': percentile(ok_latencies, 0.95),
+        'max_seconds': max(ok_latencies) if ok_latencies else None,
+    }
+    print(json.dumps(summary, indent=2))
+    print(json.dumps(call(args.url, '/health')[1]))
+
+
+if __name__ == "__main__":
+    main()
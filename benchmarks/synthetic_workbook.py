@@ -0,0 +1,126 @@
+"""Synthetic maintenance tasklist workbooks for benchmarking.
+
+The generated sheets follow the layout the converter expects: a few title
+rows, a header row containing "No / Procedure / Condition / Action /
+Remarks", then numbered procedures interleaved with section headers, notes
+and blank rows.
+
+Usage:
+    python -m benchmarks.synthetic_workbook out.xlsx --procedures 1000 --sheets 2
+"""
+import argparse
+import random
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+VERBS = ['Check', 'Inspect', 'Replace', 'Clean', 'Calibrate', 'Test', 'Monitor', 'Verify', 'Tighten', 'Lubricate']
+OBJECTS = ['engine oil level', 'cooling water pump', 'air intake filter', 'fuel injector', 'drive belt tension',
+           'exhaust manifold', 'lube oil filter', 'turbocharger', 'battery terminals', 'control panel wiring',
+           'coupling alignment', 'bearing temperature', 'vibration level', 'pressure transmitter', 'safety valve']
+QUALIFIERS = ['for leaks', 'and condition', 'for damage', 'and record reading', 'as per OEM manual',
+              'for abnormal noise', 'and clean if required', 'for corrosion', '', '']
+SECTIONS = ['ENGINE', 'GENERATOR', 'ELECTRICAL', 'COOLING SYSTEM', 'FUEL SYSTEM', 'LUBRICATION', 'INSTRUMENTS']
+
+NUMBERING_STYLES = ('dot', 'paren', 'bare', 'mixed')
+HEADER = ['No', 'Procedure', 'Condition', 'Action', 'Remarks']
+
+
+def procedure_text(rng):
+    """Random procedure description"""
+    return f"{rng.choice(VERBS)} {rng.choice(OBJECTS)} {rng.choice(QUALIFIERS)}".strip()
+
+
+def sheet_rows(procedures, rng, numbering='mixed', density=0.8, extra_columns=3, merged_cells=True):
+    """Yield (row_values, merge_span) for one sheet.
+
+    density is the fraction of body rows that carry a procedure; the rest are
+    section headers, notes and blanks. merge_span is the number of rows the
+    first cell of a procedure is merged over (1 = not merged).
+    """
+    width = len(HEADER) + extra_columns
+    blank = [None] * width
+
+    yield ['PREVENTIVE MAINTENANCE TASKLIST'] + blank[1:], 1
+    yield ['Equipment: SYNTHETIC-UNIT'] + blank[1:], 1
+    yield list(blank), 1
+    yield HEADER + [f"Extra {i + 1}" for i in range(extra_columns)], 1
+
+    number = 0
+    while number < procedures:
+        if rng.random() > density:
+            filler = rng.random()
+            if filler < 0.4:
+                yield [rng.choice(SECTIONS)] + blank[1:], 1
+            elif filler < 0.7:
+                yield [None, 'Note: follow lockout/tagout procedure'] + blank[2:], 1
+            else:
+                yield list(blank), 1
+            continue
+
+        number += 1
+        style = rng.choice(NUMBERING_STYLES[:3]) if numbering == 'mixed' else numbering
+        text = procedure_text(rng)
+        extras = [rng.choice(['A', 'B', 'C', None]) for _ in range(extra_columns)]
+
+        if style == 'dot':
+            first = [f"{number}. {text}", None]
+        elif style == 'paren':
+            first = [f"{number}) {text}", None]
+        else:
+            first = [number, text]
+
+        span = 2 if merged_cells and rng.random() < 0.1 else 1
+        yield first + ['Good/Bad', 'Repair/Replace', None] + extras, span
+        for _ in range(span - 1):
+            yield [None, 'continued: record findings'] + blank[2:], 1
+
+
+def generate_workbook(path, procedures=1000, sheets=1, numbering='mixed', density=0.8,
+                      extra_columns=3, merged_cells=True, seed=0):
+    """Write a synthetic tasklist workbook and return its sheet names.
+
+    procedures is the count per sheet. Rows are streamed with a write-only
+    workbook so 100k-procedure sheets stay cheap to produce.
+    """
+    rng = random.Random(seed)
+    workbook = Workbook(write_only=True)
+    sheet_names = []
+
+    for sheet_idx in range(sheets):
+        name = 'Mechanical Tasklist' if sheet_idx == 0 else f"Tasklist {sheet_idx + 1}"
+        worksheet = workbook.create_sheet(name)
+        sheet_names.append(name)
+
+        row_idx = 0
+        for values, span in sheet_rows(procedures, rng, numbering, density, extra_columns, merged_cells):
+            row_idx += 1
+            worksheet.append(values)
+            if span > 1:
+                worksheet.merged_cells.add(f"A{row_idx}:A{row_idx + span - 1}")
+            elif merged_cells and values[0] in SECTIONS:
+                worksheet.merged_cells.add(f"A{row_idx}:{get_column_letter(len(HEADER))}{row_idx}")
+
+    workbook.save(path)
+    return sheet_names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic maintenance tasklist workbook")
+    parser.add_argument('path', help="Output .xlsx path")
+    parser.add_argument('--procedures', type=int, default=1000, help="Procedures per sheet")
+    parser.add_argument('--sheets', type=int, default=1)
+    parser.add_argument('--numbering', choices=NUMBERING_STYLES, default='mixed')
+    parser.add_argument('--density', type=float, default=0.8, help="Fraction of body rows that are procedures")
+    parser.add_argument('--extra-columns', type=int, default=3)
+    parser.add_argument('--no-merged-cells', action='store_true')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    names = generate_workbook(args.path, args.procedures, args.sheets, args.numbering, args.density,
+                              args.extra_columns, not args.no_merged_cells, args.seed)
+    print(f"Wrote {args.path} with sheets: {', '.join(names)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Bulk edits of procedure texts and LOV assignments, planned as a diff first.
+
+Text operations run vectorized over a pandas Series of the selected
+procedure texts (all procedures, or the matches of a search) and return
+only the procedures they change, as (index, old, new) tuples. The caller
+shows that diff and then applies it as one model update and one undo
+step (MaintenanceFormConverter.set_procedure_texts / assign_lov_values).
+
+    changes = plan_text_changes(procedures, 'replace', pattern=r'\\s*\\(\\d+\\)$', replacement='')
+    changes = plan_text_changes(procedures, 'case', positions=[3, 7], mode='sentence')
+    changes = plan_lov_assignment(lov_configurations, positions, 'condition', "OK, NG")
+"""
+import re
+
+import pandas as pd
+
+CASE_MODES = ('upper', 'lower', 'title', 'sentence')
+
+
+def regex_replace(texts, pattern, replacement='', ignore_case=False):
+    # Compiled up front so a bad pattern raises re.error before anything is planned
+    compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    return texts.str.replace(compiled, replacement, regex=True)
+
+
+def normalize_case(texts, mode):
+    if mode == 'upper':
+        return texts.str.upper()
+    if mode == 'lower':
+        return texts.str.lower()
+    if mode == 'title':
+        return texts.str.title()
+    if mode == 'sentence':
+        return texts.str[:1].str.upper() + texts.str[1:].str.lower()
+    raise ValueError(f"Unknown case mode {mode!r}; use one of {CASE_MODES}")
+
+
+def add_prefix(texts, text):
+    return texts.where(texts.str.startswith(text), text + texts)
+
+
+def add_suffix(texts, text):
+    return texts.where(texts.str.endswith(text), texts + text)
+
+
+def remove_prefix(texts, text):
+    return texts.str.removeprefix(text)
+
+
+def remove_suffix(texts, text):
+    return texts.str.removesuffix(text)
+
+
+TEXT_OPERATIONS = {
+    'replace': regex_replace,
+    'case': normalize_case,
+    'add_prefix': add_prefix,
+    'add_suffix': add_suffix,
+    'remove_prefix': remove_prefix,
+    'remove_suffix': remove_suffix,
+}
+
+
+def plan_text_changes(procedures, operation, positions=None, **params):
+    """(index, old, new) for every selected procedure whose text the operation changes.
+
+    Results are whitespace-normalized; a change that would leave a
+    procedure without text is dropped.
+    """
+    positions = range(len(procedures)) if positions is None else positions
+    old = pd.Series([procedures[index]['text'] for index in positions], index=list(positions), dtype=object)
+    if old.empty:
+        return []
+    new = TEXT_OPERATIONS[operation](old.astype(str), **params)
+    new = new.str.replace(r'\s+', ' ', regex=True).str.strip()
+    changed = (new != old) & (new != '')
+    return [(int(index), before, after) for index, before, after in zip(old.index[changed], old[changed], new[changed])]
+
+
+def plan_lov_assignment(lov_configurations, positions, kind, values_text):
+    """(index, old, new) condition/action values for every selected procedure that does not have values_text yet"""
+    field = f"{kind}_values"
+    values_text = values_text.strip()
+    return [(index, lov_configurations[index].get(field, ''), values_text)
+            for index in positions
+            if index < len(lov_configurations) and lov_configurations[index].get(field, '') != values_text]
@@ -0,0 +1,187 @@
+"""Consolidated multi-form output bundles.
+
+In bundle mode a batch writes one FORMHEAD, FORMTEMPLATE, FORMLOV and
+FORMMENU workbook for all of its forms instead of four workbooks per form.
+Rows are streamed into write-only workbooks as each form finishes, and a
+JSON manifest maps every form to its row range in each table.
+
+FORMLOV rows shared between forms (same ORG, LOVNAME and VALUE) are
+written once; the manifest counts the duplicates that were skipped.
+
+Nothing is published until close(): the workbooks are saved under
+temporary names and renamed into place, the manifest last. A bundle left
+by an exception (the with block, or abort()) is discarded, so a failed
+batch never leaves files that look complete. Every bundle carries a random
+suffix next to its timestamp, so two batches started in the same second
+never replace each other's files.
+"""
+import json
+import os
+import uuid
+from datetime import datetime
+
+from openpyxl import Workbook
+
+from delta import row_key
+
+BUNDLE_TABLES = ('FORMHEAD', 'FORMTEMPLATE', 'FORMLOV', 'FORMMENU')
+# Tables whose rows may legitimately repeat across forms
+SHARED_TABLES = {'FORMLOV'}
+
+
+class BundleWriter:
+    """Accumulates the output tables of many forms into one set of workbooks"""
+
+    def __init__(self, output_dir, timestamp=None, prefix="BUNDLE"):
+        self.output_dir = output_dir
+        self.timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.prefix = prefix
+        self.suffix = uuid.uuid4().hex[:8]
+        self.forms = {}
+        self.row_counts = {table: 0 for table in BUNDLE_TABLES}
+        self.closed = False
+
+        self._workbooks = {}
+        self._sheets = {}
+        self._columns = {}
+        self._seen_keys = {table: set() for table in SHARED_TABLES}
+        for table in BUNDLE_TABLES:
+            workbook = Workbook(write_only=True)
+            self._workbooks[table] = workbook
+            self._sheets[table] = workbook.create_sheet(table)
+
+    def table_path(self, table):
+        return os.path.join(self.output_dir, f"{table}_{self.prefix}_{self.timestamp}_{self.suffix}.xlsx")
+
+    @property
+    def manifest_path(self):
+        return os.path.join(self.output_dir, f"{self.prefix}_{self.timestamp}_{self.suffix}.manifest.json")
+
+    def add_form(self, form_name, tables, source_file=None, sheet_name=None):
+        """Append one form's rows; returns one output dict per table"""
+        if self.closed:
+            raise ValueError("Bundle is already closed")
+        if form_name in self.forms:
+            raise ValueError(f"Form {form_name} is already in the bundle")
+
+        # Checked for every table first, so a bad table does not leave rows of the others behind
+        for table in BUNDLE_TABLES:
+            self._check_columns(table, tables.get(table, []))
+
+        entry = {'source_file': source_file, 'sheet_name': sheet_name, 'tables': {}}
+        outputs = []
+        for table in BUNDLE_TABLES:
+            start = self.row_counts[table]
+            written, skipped = self._append_rows(table, tables.get(table, []))
+            entry['tables'][table] = {'start': start, 'rows': written}
+            if skipped:
+                entry['tables'][table]['shared_rows_skipped'] = skipped
+            # Bytes are only known once the bundle is saved in close()
+            outputs.append({'table': table, 'file': self.table_path(table), 'rows': written, 'bytes': 0,
+                            'start': start})
+
+        self.forms[form_name] = entry
+        return outputs
+
+    def _check_columns(self, table, rows):
+        columns = self._columns.get(table)
+        for row in rows:
+            if columns is None:
+                columns = list(row.keys())
+            elif len(row) != len(columns) or any(column not in row for column in columns):
+                raise ValueError(f"{table} row columns {list(row.keys())} do not match the bundle columns {columns}")
+
+    def _append_rows(self, table, rows):
+        sheet = self._sheets[table]
+        columns = self._columns.get(table)
+        seen_keys = self._seen_keys.get(table)
+        written = skipped = 0
+
+        for row in rows:
+            if columns is None:
+                columns = list(row.keys())
+                self._columns[table] = columns
+                sheet.append(columns)
+
+            if seen_keys is not None:
+                key = row_key(table, row)
+                if key in seen_keys:
+                    skipped += 1
+                    continue
+                seen_keys.add(key)
+
+            sheet.append([row[column] for column in columns])
+            written += 1
+
+        self.row_counts[table] += written
+        return written, skipped
+
+    def close(self):
+        """Save all workbooks and the manifest atomically; returns the output list"""
+        if self.closed:
+            return []
+        self.closed = True
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        temp_paths = {table: self._temp_path(self.table_path(table)) for table in BUNDLE_TABLES}
+        try:
+            for table in BUNDLE_TABLES:
+                self._workbooks[table].save(temp_paths[table])
+        except BaseException:
+            self._remove(temp_paths.values())
+            raise
+        finally:
+            self._workbooks.clear()
+            self._sheets.clear()
+
+        outputs = []
+        for table in BUNDLE_TABLES:
+            path = self.table_path(table)
+            os.replace(temp_paths[table], path)
+            outputs.append({'table': table, 'file': path, 'rows': self.row_counts[table],
+                            'bytes': os.path.getsize(path)})
+
+        manifest = {
+            'created': datetime.now().isoformat(),
+            'form_count': len(self.forms),
+            # Data row offsets are 0-based and exclude the header row
+            'files': {output['table']: os.path.basename(output['file']) for output in outputs},
+            'row_counts': dict(self.row_counts),
+            'forms': self.forms,
+        }
+        temp_path = self._temp_path(self.manifest_path)
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(temp_path, self.manifest_path)
+        return outputs
+
+    def abort(self):
+        """Discard the bundle; nothing of it is written"""
+        if self.closed:
+            return
+        self.closed = True
+        for sheet in self._sheets.values():
+            # Finish the streamed sheet; openpyxl removes the temp file it spools rows into at exit
+            sheet.close()
+        self._workbooks.clear()
+        self._sheets.clear()
+
+    @staticmethod
+    def _temp_path(path):
+        return f"{path}.{os.getpid()}.tmp"
+
+    @staticmethod
+    def _remove(paths):
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
@@ -0,0 +1,1368 @@
+"""Tk-free core of the maintenance form converter.
+
+FormConverter holds one form (procedures, LOV rows, LOV database, form
+settings) and every analysis, LOV and generation step: reading and
+analyzing a sheet, LOV codes, the four output tables, and writing loose
+files, archives, bundles or org fan-outs. It imports no tkinter, so
+scripts, batch runs and worker processes use it directly; the GUI in
+formgenerator.py subclasses it and only adds widgets.
+
+Form settings live in Var holders (get/set/trace, like tk.StringVar),
+which the GUI replaces with Tk variables bound to its entries.
+
+    converter = convert_sheet("tasklist.xlsx", "Mech Tasklist", form_name="YKN-CPP2-G-603-MECH")
+    tables = converter.build_output_tables()        # {'FORMHEAD': [rows], ...}
+
+    converter = FormConverter.from_data(procedures, lov_configurations, lov_database,
+                                        form_name="YKN-CPP2-G-603-MECH", org_code="2200")
+    frames = build_frames(converter)                # {'FORMHEAD': DataFrame, ...}
+"""
+import json
+import os
+import re
+from contextlib import nullcontext
+from datetime import datetime
+
+import pandas as pd
+
+from archive import ArchiveWriter
+from delta import (load_manifest, save_manifest, build_manifest, compute_delta, procedure_identities,
+                   write_delta_workbooks, write_delta_sql, write_new_workbook)
+from extraction import SHARD_MIN_ROWS, extract_sharded, scan_procedures, shard_workers
+from fanout import base_frames, fan_out
+from fingerprint import rebind_tables, sheet_fingerprint, workbook_fingerprint
+from history import LovDatabaseReplace, LovValueEdit, ProcedureTextBatch, UndoHistory
+from interning import (intern_text, intern_values, intern_procedures, intern_lov_database,
+                       intern_lov_configurations)
+from journal import blank_lov_configuration
+from locking import FileLock
+from merged import MergedRangeIndex, read_merged_ranges
+from preview import LovPreview, TemplatePreview
+from profiling import profiled
+from search import ProcedureSearchIndex
+from templates import DEFAULT_TEMPLATE, compile_template, load_template_specs, template_row_identities
+from validation import ValidationError, validate_tables
+
+# Registry of generated forms and LOV codes, kept in the output directory (see save_global_lov_registry)
+GLOBAL_LOV_REGISTRY_FILE = "global_lov_registry.json"
+DEFAULT_USER_NAME = 'MK.ABDULLAH.DAFA'
+
+# extract_procedures reads the first 3 columns plus up to 4 description columns
+PROCEDURE_COLUMNS = 7
+# Rows read up front to locate the header before planning the full read
+HEADER_PROBE_ROWS = 200
+
+
+class Var:
+    """Minimal stand-in for tk.StringVar (get/set/trace) without a Tk root"""
+    
+    def __init__(self, value=''):
+        self._value = value
+        self._callbacks = []
+    
+    def get(self):
+        return self._value
+    
+    def set(self, value):
+        self._value = value
+        for callback in list(self._callbacks):
+            callback('', '', 'w')
+    
+    def trace(self, mode, callback):
+        self._callbacks.append(callback)
+
+
+class FormConverter:
+    """Analysis, LOV configuration and generation of one PM form, without a GUI"""
+    
+    def __init__(self, form_name='', form_description='', user_name=DEFAULT_USER_NAME, output_dir=None,
+                 org_code=None):
+        self.root = None
+        self.init_core_state()
+        if org_code:
+            self.form_config['org_code'] = org_code
+        
+        self.form_name_var = Var(form_name)
+        self.form_desc_var = Var(form_description)
+        self.user_name_var = Var(user_name)
+        self.output_dir = Var(output_dir or os.getcwd())
+        self.global_lov_registry = self.load_global_lov_registry()
+        load_template_specs()
+    
+    @classmethod
+    def from_data(cls, procedures, lov_configurations=None, lov_database=None, form_name='', form_description='',
+                  user_name=DEFAULT_USER_NAME, org_code=None, source_file=None, selected_sheet=None):
+        """A converter holding an already extracted and configured form, e.g. from a session file"""
+        converter = cls(form_name, form_description, user_name, org_code=org_code)
+        converter.restore_session(None, [dict(proc) for proc in procedures], lov_database or {},
+                                  lov_configurations, source_file, selected_sheet)
+        return converter
+    
+    def init_core_state(self):
+        """Initialize the non-GUI state shared by the GUI and headless runs"""
+        # Core variables
+        self.source_file = None
+        self.selected_sheet = None
+        self.raw_dataframe = None
+        self.sheet_shape = (0, 0)
+        self.raw_sheet_plan = None
+        self.keep_raw_dataframe = False
+        self.merged_index = None
+        # Processes for sharded extraction of large sheets; 1 extracts serially
+        self.extraction_workers = os.cpu_count() or 1
+        self.procedures = []
+        self.form_config = {
+            'form_name': '',
+            'form_description': '',
+            'user_name': 'MK.ABDULLAH.DAFA',
+            'org_code': '2100'
+        }
+        
+        # LOV tracking
+        self.lov_database = {}
+        self.lov_counter = 1
+        self.lov_vars = []
+        self.detected_format = None
+        # Loaded from the output directory once it is known; forms registered since the last save
+        self.global_lov_registry = empty_registry()
+        self.registered_forms = {}
+        
+        # Phase instrumentation (see profiling.py), off unless a profiler is attached
+        self.profiler = None
+        
+        # Views to rebuild when their tab is next shown, and LOV values waiting for that rebuild
+        self.stale_views = set()
+        self.pending_lov_configurations = None
+        self.restoring_lov_state = False
+        
+        # Edit journal for autosave/crash recovery (see journal.py)
+        self.journal = None
+        self.compaction_scheduled = False
+        
+        # Output validation before writing: 'block', 'warn' or 'off' (see validation.py)
+        self.validation_mode = 'block'
+        self.validation_report = None
+        
+        # Fingerprint reuse of earlier generations (see fingerprint.py); off without an index
+        self.fingerprint_index = None
+        self.sheet_fingerprint = None
+        self.fingerprint_match = None
+        self.workbook_hash = None
+        
+        # Procedure signatures of generated forms for near-duplicate search (see similarity.py)
+        self.procedure_history = None
+        
+        # Undo/redo of mapping and LOV edits (see history.py); mapping rows are updated in place
+        self.undo_history = UndoHistory()
+        self.procedure_rows = None
+        self.procedure_vars = []
+        self.lov_rows_frame = None
+        # True while a bulk edit sets many mapping entries; their traces are not journaled one by one
+        self.applying_bulk_edit = False
+        
+        # Search over procedure texts, LOV values and codes (see search.py), built on first search
+        self.search_index = ProcedureSearchIndex()
+    
+    def list_sheets(self, source_file):
+        """Return sheet names of a workbook"""
+        with pd.ExcelFile(source_file) as excel_file:
+            return excel_file.sheet_names
+    
+    @profiled('read_excel')
+    def load_sheet(self, source_file, sheet_name):
+        """Read a sheet (column-pruned) and default the form name/description"""
+        self.source_file = source_file
+        self.selected_sheet = sheet_name
+        self.read_sheet(source_file, sheet_name)
+        self.default_form_names(sheet_name)
+        return self.raw_dataframe
+    
+    def default_form_names(self, sheet_name):
+        if not self.form_name_var.get():
+            self.form_name_var.set(self.generate_form_name(sheet_name))
+        if not self.form_desc_var.get():
+            self.form_desc_var.set(self.generate_form_description(sheet_name))
+    
+    def analyze(self):
+        """Detect the header row and extract procedures from raw_dataframe"""
+        header_row = self.detect_header_row()
+        self.procedures = self.extract_procedures(header_row)
+        self.sheet_fingerprint = sheet_fingerprint(self.procedures)
+        self.release_raw_dataframe()
+        return header_row
+    
+    def prepare(self, source_file, sheet_name):
+        """Load, analyze and configure LOVs, reusing a fingerprint match when one exists.
+        
+        Returns 'workbook' when an identical workbook was converted before
+        (the sheet is not read at all), 'sheet' when the same tasklist was
+        found in another workbook (LOV auto-configuration is skipped), or
+        None when the sheet was converted from scratch.
+        """
+        if self.fingerprint_index is not None:
+            with self.phase("fingerprint_workbook"):
+                self.workbook_hash = workbook_fingerprint(source_file)
+                fingerprint = self.fingerprint_index.lookup_workbook(self.workbook_hash, sheet_name)
+                entry = self.fingerprint_index.load(fingerprint) if fingerprint else None
+            if entry is not None:
+                self.source_file = source_file
+                self.selected_sheet = sheet_name
+                self.default_form_names(sheet_name)
+                self.apply_fingerprint_entry(entry)
+                return 'workbook'
+        
+        self.load_sheet(source_file, sheet_name)
+        self.analyze()
+        if not self.procedures:
+            raise ValueError("No procedures detected")
+        entry = self.find_fingerprint_match()
+        if entry is not None:
+            self.apply_fingerprint_entry(entry)
+            return 'sheet'
+        self.auto_configure_lovs()
+        return None
+    
+    # Front-end hooks; the core has no views, so they only keep the model consistent
+    def report_status(self, text):
+        """Show a one-line status message"""
+    
+    def call_when_idle(self, callback):
+        """Run deferred work (journal compaction); without an event loop it runs now"""
+        callback()
+    
+    def refresh_views(self):
+        """Rebuild the stale view on screen, if any"""
+    
+    def apply_search_filters(self):
+        """Re-apply the search filters of the mapping/LOV views"""
+    
+    def create_procedure_row(self, proc, index, before=None):
+        """Mapping-view row of a front end, or None when there is no row to add"""
+        return None
+    
+    def next_shown_frame(self, rows, index):
+        """Frame of the first row at or after index that is not hidden by a search"""
+        return next((row.get('frame') for row in rows[index:] if not row.get('hidden', False)), None)
+    
+    def record_edit(self, op, **fields):
+        """Append one edit to the journal; compaction runs once the UI is idle"""
+        if self.journal is None:
+            return
+        if self.journal.record(op, **fields) and not self.compaction_scheduled:
+            self.compaction_scheduled = True
+            self.call_when_idle(self.compact_journal)
+    
+    def compact_journal(self):
+        """Fold the journal into a fresh autosave snapshot"""
+        self.compaction_scheduled = False
+        if self.journal is None:
+            return
+        
+        lov_configurations = self.collect_lov_configurations() if (
+            self.lov_vars or self.pending_lov_configurations is not None) else None
+        self.journal.compact({
+            'source_file': self.source_file,
+            'selected_sheet': self.selected_sheet,
+            'form_config': {
+                'form_name': self.form_name_var.get(),
+                'form_description': self.form_desc_var.get(),
+                'user_name': self.user_name_var.get()
+            },
+            'procedures': self.procedures,
+            'lov_database': self.lov_database,
+            'lov_configurations': lov_configurations
+        })
+    
+    def search_procedures(self, query):
+        """Positions of the procedures matching query (None for an empty query)"""
+        if not self.search_index.built:
+            self.search_index.build(self.procedures, self.collect_lov_configurations())
+        return self.search_index.search(query)
+    
+    def procedures_replaced(self):
+        """Forget undo steps and the search index after procedures or LOV rows are replaced wholesale"""
+        self.undo_history.clear()
+        self.search_index.invalidate()
+    
+    def find_likely_sheets(self, sheet_names):
+        """Return sheet names that look like maintenance tasklists"""
+        return [sheet for sheet in sheet_names 
+                if any(keyword in sheet.lower() for keyword in 
+                     ['mech', 'mechanical', 'tasklist', 'maintenance', 'engine'])]
+    
+    def generate_form_name(self, sheet_name):
+        """Generate form name based on sheet name"""
+        # Extract meaningful parts
+        clean_name = re.sub(r'[^\w\s-]', '', sheet_name)
+        clean_name = re.sub(r'\s+', '-', clean_name.strip())
+        
+        # Add timestamp for uniqueness
+        timestamp = datetime.now().strftime("%Y%m%d")
+        
+        return f"YKN-CPP2-G-603-{clean_name}-{timestamp}".upper()
+    
+    def generate_form_description(self, sheet_name):
+        """Generate form description based on sheet name"""
+        return sheet_name.upper()
+    
+    @profiled()
+    def read_sheet(self, source_file, sheet_name):
+        """Read a sheet into raw_dataframe, keeping only the columns extraction uses.
+        
+        A probe of the first HEADER_PROBE_ROWS rows (all columns) locates the
+        header and the sheet width; the full read is then limited to the
+        first PROCEDURE_COLUMNS columns and text is stored compactly.
+        Merged blocks are filled with their top-left value (see merged.py).
+        """
+        probe = pd.read_excel(source_file, sheet_name=sheet_name, header=None,
+                              nrows=HEADER_PROBE_ROWS, dtype=object)
+        self.raw_dataframe = probe
+        header_found = self.detect_header_row() is not None
+        sheet_columns = len(probe.columns)
+        usecols = list(range(min(sheet_columns, PROCEDURE_COLUMNS)))
+        
+        if len(probe) < HEADER_PROBE_ROWS:
+            # The probe already holds the whole sheet
+            df = probe.iloc[:, usecols]
+        elif header_found:
+            df = pd.read_excel(source_file, sheet_name=sheet_name, header=None, usecols=usecols, dtype=object)
+        else:
+            # Header is further down and may sit in any column: read everything once
+            df = pd.read_excel(source_file, sheet_name=sheet_name, header=None, dtype=object)
+            sheet_columns = len(df.columns)
+            self.raw_dataframe = df
+            if self.detect_header_row() is not None:
+                usecols = list(range(min(sheet_columns, PROCEDURE_COLUMNS)))
+                df = df.iloc[:, usecols]
+            else:
+                usecols = None
+        del probe
+        
+        with self.phase("merged_ranges"):
+            self.merged_index = MergedRangeIndex(read_merged_ranges(source_file, sheet_name),
+                                                 len(usecols) if usecols is not None else None)
+            df = self.merged_index.propagate(df)
+        
+        self.raw_dataframe = self.compact_text_columns(df)
+        self.sheet_shape = (len(df), sheet_columns)
+        self.raw_sheet_plan = {'source_file': source_file, 'sheet_name': sheet_name, 'usecols': usecols}
+        return self.raw_dataframe
+    
+    def compact_text_columns(self, df):
+        """Store repetitive columns as categoricals and intern the remaining strings"""
+        df = df.copy()
+        for column in df.columns:
+            values = df[column]
+            non_null = values.dropna()
+            if len(non_null) and non_null.nunique() <= len(non_null) // 2:
+                df[column] = values.astype('category')
+            else:
+                df[column] = values.map(intern_text)
+        return df
+    
+    def release_raw_dataframe(self):
+        """Drop the raw sheet frame once procedures are extracted (see get_raw_dataframe)"""
+        if not self.keep_raw_dataframe:
+            self.raw_dataframe = None
+    
+    def get_raw_dataframe(self):
+        """Return raw_dataframe, re-reading it from the source sheet if it was released"""
+        if self.raw_dataframe is None and self.raw_sheet_plan is not None:
+            plan = self.raw_sheet_plan
+            df = pd.read_excel(plan['source_file'], sheet_name=plan['sheet_name'], header=None,
+                               usecols=plan['usecols'], dtype=object)
+            if self.merged_index is not None:
+                df = self.merged_index.propagate(df)
+            self.raw_dataframe = self.compact_text_columns(df)
+        return self.raw_dataframe
+    
+    @profiled()
+    def detect_header_row(self):
+        """Detect header row in the sheet"""
+        keywords = ['no', 'procedure', 'condition', 'action', 'remarks']
+        
+        for idx, row in self.raw_dataframe.iterrows():
+            row_text = ' '.join([str(cell).lower() for cell in row if not pd.isna(cell)])
+            
+            # Count keyword matches
+            matches = sum(1 for keyword in keywords if keyword in row_text)
+            
+            if matches >= 3:  # Found likely header row
+                return idx
+        
+        return None
+    
+    @profiled()
+    def extract_procedures(self, header_row):
+        """Extract procedures from the sheet (see extraction.py).
+        
+        Rows covered by a procedure's merged number cell are continuation
+        rows: their description fragments are appended to that procedure.
+        Sheets of SHARD_MIN_ROWS rows or more are split into row-range
+        shards extracted in parallel, with the same result, when there is
+        a CPU for every worker (see extraction.shard_workers).
+        """
+        if header_row is None:
+            return []
+        
+        # Start looking for procedures after header row
+        start_row = header_row + 1
+        df = self.raw_dataframe
+        if shard_workers(self.extraction_workers) > 1 and len(df) - start_row >= SHARD_MIN_ROWS:
+            with self.phase("extract_shards"):
+                procedures = extract_sharded(df, start_row, self.merged_index, self.extraction_workers)
+        else:
+            # Plain tuples per row: one linear pass without a pandas Series per row
+            rows = df.iloc[start_row:].itertuples(index=False, name=None)
+            procedures = scan_procedures(rows, start_row, self.merged_index)
+        return intern_procedures(procedures)
+    
+    def mapping_rows_live(self):
+        """True when the mapping tab shows the current procedures and can be updated row by row"""
+        return self.procedure_rows is not None and 'mapping' not in self.stale_views
+    
+    def renumber_procedures(self, start):
+        """Renumber procedures from start on, with their mapping and LOV row labels"""
+        for i in range(start, len(self.procedures)):
+            self.procedures[i]['number'] = i + 1
+        if self.mapping_rows_live():
+            for i in range(start, len(self.procedure_rows)):
+                row = self.procedure_rows[i]
+                row['index'] = i
+                row['number_label'].config(text=str(i + 1))
+        for i in range(start, len(self.lov_vars)):
+            config = self.lov_vars[i]
+            config['index'] = i
+            if config.get('label') is not None:
+                config['label'].config(text=self.lov_row_label(config['procedure']))
+    
+    def insert_procedure_at(self, index, procedure, lov_configuration=None):
+        """Insert a procedure with its mapping and LOV rows; only the rows after it are renumbered"""
+        lov_configuration = dict(lov_configuration or blank_lov_configuration())
+        self.procedures.insert(index, procedure)
+        self.record_edit('procedure_insert', index=index, procedure=procedure, lov_configuration=lov_configuration)
+        self.search_index.insert(index, procedure, lov_configuration)
+        
+        if self.mapping_rows_live():
+            row = self.create_procedure_row(procedure, index, self.next_shown_frame(self.procedure_rows, index))
+            if row is None:
+                # No row to keep in step; the mapping view is rebuilt when next shown
+                self.stale_views.add('mapping')
+            else:
+                self.procedure_rows.insert(index, row)
+                self.procedure_vars.insert(index, row['var'])
+        
+        if self.pending_lov_configurations is not None:
+            self.pending_lov_configurations.insert(index, lov_configuration)
+        elif 'lov' not in self.stale_views and (self.lov_vars or self.lov_rows_frame is not None):
+            config = self.create_lov_row(procedure, index, self.next_shown_frame(self.lov_vars, index))
+            self.lov_vars.insert(index, config)
+            self.restore_lov_row(config, lov_configuration)
+        
+        self.renumber_procedures(index)
+        # The new row stays visible only if it matches an active search
+        self.apply_search_filters()
+    
+    def remove_procedure_at(self, index):
+        """Remove a procedure with its mapping and LOV rows; returns (procedure, LOV configuration)"""
+        procedure = self.procedures.pop(index)
+        self.record_edit('procedure_delete', index=index)
+        self.search_index.remove(index)
+        
+        if self.mapping_rows_live() and index < len(self.procedure_rows):
+            self.procedure_rows.pop(index)['frame'].destroy()
+            self.procedure_vars.pop(index)
+        
+        lov_configuration = None
+        if self.pending_lov_configurations is not None:
+            if index < len(self.pending_lov_configurations):
+                lov_configuration = self.pending_lov_configurations.pop(index)
+        elif index < len(self.lov_vars):
+            config = self.lov_vars.pop(index)
+            lov_configuration = self.lov_row_configuration(config)
+            if config.get('frame') is not None:
+                config['frame'].destroy()
+        
+        self.renumber_procedures(index)
+        return procedure, lov_configuration
+    
+    def set_procedure_text(self, index, text):
+        """Set one procedure's text and its mapping entry"""
+        self.procedures[index]['text'] = intern_text(text.strip())
+        if self.mapping_rows_live() and index < len(self.procedure_rows):
+            # The entry's trace journals the new text
+            self.procedure_rows[index]['var'].set(text)
+        else:
+            self.record_edit('procedure_text', index=index, text=text)
+            self.search_index.update(index, text=text)
+    
+    def set_procedure_texts(self, texts):
+        """Set many (index, text) pairs as one model update and one journal entry"""
+        live = self.mapping_rows_live()
+        self.applying_bulk_edit = True
+        try:
+            for index, text in texts:
+                text = intern_text(text.strip())
+                self.procedures[index]['text'] = text
+                if live and index < len(self.procedure_rows):
+                    row = self.procedure_rows[index]
+                    row['text'] = text
+                    row['var'].set(text)
+                self.search_index.update(index, text=text)
+        finally:
+            self.applying_bulk_edit = False
+        self.record_edit('procedure_texts', texts=[[index, self.procedures[index]['text']] for index, _ in texts])
+    
+    def apply_text_changes(self, changes, label):
+        """Apply planned (index, old, new) text changes (see bulk.py) as one undo step"""
+        if not changes:
+            return
+        self.set_procedure_texts([(index, new) for index, _, new in changes])
+        self.undo_history.push(ProcedureTextBatch(label, changes))
+    
+    def assign_lov_values(self, changes, kind, label):
+        """Give planned (index, old, new) condition/action values one shared LOV code, as one undo step"""
+        if not changes:
+            return
+        values_text = changes[0][2]
+        code = self.generate_lov_code(values_text, '') if values_text else ''
+        code_field = f"{kind}_lov_code"
+        configs = self.collect_lov_configurations()
+        with self.undo_history.group(label):
+            for index, old_value, new_value in changes:
+                old_code = configs[index].get(code_field, '')
+                self.set_lov_value(index, kind, new_value, code)
+                self.undo_history.push(LovValueEdit(index, kind, old_value, new_value, old_code, code))
+    
+    def set_lov_value(self, index, kind, value, code):
+        """Set one condition/action value with the LOV code it had, without minting a new code"""
+        code_field = f"{kind}_lov_code"
+        if self.pending_lov_configurations is not None:
+            config = self.pending_lov_configurations[index]
+            config[f"{kind}_values"] = intern_text(value)
+            config[code_field] = code
+            self.record_edit('lov_values', index=index, field=f"{kind}_values", value=value)
+        else:
+            config = self.lov_vars[index]
+            restoring, self.restoring_lov_state = self.restoring_lov_state, True
+            try:
+                config[f"{kind}_var"].set(value)
+            finally:
+                self.restoring_lov_state = restoring
+            config[code_field] = code
+            self.show_lov_codes(config)
+        self.record_edit('lov_code', index=index, field=code_field, code=code,
+                         values=self.lov_database.get(code, []))
+        self.search_index.update(index, **{f"{kind}_values": value, code_field: code})
+    
+    def set_lov_database(self, lov_database):
+        """Replace the LOV database (kept by reference, see history.LovDatabaseReplace)"""
+        self.lov_database = lov_database
+        if lov_database:
+            self.record_edit('lov_database_set', lov_database=lov_database)
+        else:
+            self.record_edit('lov_database_clear')
+    
+    def sync_procedure_texts(self):
+        """Copy edited texts from the mapping entries into the procedures"""
+        if hasattr(self, 'procedure_vars'):
+            for i, var in enumerate(self.procedure_vars):
+                if i < len(self.procedures):
+                    self.procedures[i]['text'] = intern_text(var.get().strip())
+    
+    def lov_configurations_for_edit(self):
+        """LOV configurations aligned with the procedures, held back until the LOV tab is rebuilt"""
+        configs = [dict(config) for config in self.collect_lov_configurations()]
+        configs = configs[:len(self.procedures)]
+        configs += [blank_lov_configuration() for _ in range(len(self.procedures) - len(configs))]
+        return configs
+    
+    def apply_lov_configurations(self, configs):
+        """Replace the LOV rows; the LOV tab is rebuilt from them when shown"""
+        # Merges and shared LOVs rewrite many rows at once; earlier steps no longer line up
+        self.procedures_replaced()
+        self.lov_vars = []
+        self.pending_lov_configurations = configs
+        self.stale_views.add('lov')
+        self.refresh_views()
+        self.compact_journal()
+    
+    def merge_duplicate_procedures(self, indices):
+        """Keep the first of the given procedures and delete the others with their LOV rows"""
+        keep = min(indices)
+        configs = self.lov_configurations_for_edit()
+        for index in sorted(set(indices) - {keep}, reverse=True):
+            del self.procedures[index]
+            del configs[index]
+        for i, proc in enumerate(self.procedures):
+            proc['number'] = i + 1
+        
+        self.record_edit('procedures_set', procedures=self.procedures)
+        self.apply_lov_configurations(configs)
+        self.procedure_vars = []
+        self.procedure_rows = None
+        self.stale_views.add('mapping')
+        self.refresh_views()
+        self.report_status(f"Merged {len(indices) - 1} duplicates into procedure {keep + 1}")
+    
+    def share_lov_assignment(self, indices, source):
+        """Give the procedures at indices the LOV values and codes of a cluster member"""
+        configs = self.lov_configurations_for_edit()
+        if source['source'] == 'session':
+            shared = dict(configs[source['index']])
+            lov_values = {code: self.lov_database[code] for code in (shared['condition_lov_code'],
+                                                                    shared['action_lov_code'])
+                          if code in self.lov_database}
+        else:
+            entry = source['entry']
+            shared = {field: entry[field] for field in ('condition_values', 'action_values',
+                                                        'condition_lov_code', 'action_lov_code')}
+            # Codes of another form must be listed in this form's FORMLOV as well
+            lov_values = {entry[f"{kind}_lov_code"]: entry[f"{kind}_lov_values"]
+                          for kind in ('condition', 'action') if entry[f"{kind}_lov_code"]}
+        self.lov_database.update(lov_values)
+        
+        for index in indices:
+            configs[index] = dict(shared)
+        self.apply_lov_configurations(configs)
+        self.report_status(f"Shared LOV assignment with {len(indices)} procedures")
+    
+    def setup_lov_configuration(self):
+        """Create one LOV config per procedure"""
+        self.lov_vars = [self.create_lov_row(proc, i) for i, proc in enumerate(self.procedures)]
+        self.record_edit('lov_setup', count=len(self.lov_vars))
+    
+    def create_lov_row(self, proc, index, before=None):
+        """One LOV row of plain Vars, wired like the GUI rows"""
+        condition_var = Var()
+        action_var = Var()
+        config = {
+            'procedure': proc,
+            'index': index,
+            'condition_var': condition_var,
+            'action_var': action_var,
+            'lov_codes_var': Var("Enter values first"),
+            'last_values': {'condition': '', 'action': ''}
+        }
+        condition_var.trace('w', lambda name, i, mode: self.on_lov_value_changed(config['index'], 'condition'))
+        action_var.trace('w', lambda name, i, mode: self.on_lov_value_changed(config['index'], 'action'))
+        return config
+    
+    def lov_row_label(self, proc):
+        # Procedure text (truncated)
+        proc_text = proc['text']
+        if len(proc_text) > 35:
+            proc_text = proc_text[:32] + "..."
+        return f"{proc['number']}. {proc_text}"
+    
+    def on_lov_value_changed(self, procedure_index, kind):
+        """Journal an edited condition/action value, refresh the LOV codes and record the edit for undo"""
+        if procedure_index >= len(self.lov_vars):
+            return
+        config = self.lov_vars[procedure_index]
+        value = config[f"{kind}_var"].get()
+        self.record_edit('lov_values', index=procedure_index, field=f"{kind}_values", value=value)
+        
+        old_value = config['last_values'][kind]
+        config['last_values'][kind] = value
+        code_field = f"{kind}_lov_code"
+        old_code = config.get(code_field, '')
+        self.update_lov_codes(procedure_index)
+        self.search_index.update(procedure_index, **{f"{kind}_values": value, code_field: config.get(code_field, '')})
+        if not self.restoring_lov_state:
+            self.undo_history.push(LovValueEdit(procedure_index, kind, old_value, value, old_code,
+                                                config.get(code_field, '')))
+    
+    def update_lov_codes(self, procedure_index):
+        """Update LOV codes when values change"""
+        if self.restoring_lov_state or procedure_index >= len(self.lov_vars):
+            return
+        
+        config = self.lov_vars[procedure_index]
+        condition_values = config['condition_var'].get().strip()
+        action_values = config['action_var'].get().strip()
+        
+        codes = []
+        
+        if condition_values:
+            condition_code = self.generate_lov_code(condition_values, f"COND{procedure_index+1}")
+            codes.append(f"C: {condition_code}")
+            config['condition_lov_code'] = condition_code
+            self.record_edit('lov_code', index=procedure_index, field='condition_lov_code',
+                             code=condition_code, values=self.lov_database[condition_code])
+        
+        if action_values:
+            action_code = self.generate_lov_code(action_values, f"ACT{procedure_index+1}")
+            codes.append(f"A: {action_code}")
+            config['action_lov_code'] = action_code
+            self.record_edit('lov_code', index=procedure_index, field='action_lov_code',
+                             code=action_code, values=self.lov_database[action_code])
+        
+        display_text = " | ".join(codes) if codes else "Enter values first"
+        config['lov_codes_var'].set(display_text)
+    
+    def restore_lov_configurations(self, lov_configurations):
+        """Put saved condition/action values and LOV codes back into the LOV rows"""
+        for config, saved in zip(self.lov_vars, lov_configurations):
+            self.restore_lov_row(config, saved)
+    
+    def restore_lov_row(self, config, saved):
+        """Put saved values and LOV codes into one LOV row without generating new codes"""
+        restoring, self.restoring_lov_state = self.restoring_lov_state, True
+        try:
+            config['condition_var'].set(saved.get('condition_values', ''))
+            config['action_var'].set(saved.get('action_values', ''))
+        finally:
+            self.restoring_lov_state = restoring
+        for kind in ('condition', 'action'):
+            if saved.get(f"{kind}_lov_code"):
+                config[f"{kind}_lov_code"] = saved[f"{kind}_lov_code"]
+        self.show_lov_codes(config)
+    
+    def show_lov_codes(self, config):
+        codes = []
+        if config['condition_var'].get().strip() and config.get('condition_lov_code'):
+            codes.append(f"C: {config['condition_lov_code']}")
+        if config['action_var'].get().strip() and config.get('action_lov_code'):
+            codes.append(f"A: {config['action_lov_code']}")
+        config['lov_codes_var'].set(" | ".join(codes) if codes else "Enter values first")
+    
+    def lov_row_configuration(self, config):
+        return {
+            'condition_values': intern_text(config['condition_var'].get()),
+            'action_values': intern_text(config['action_var'].get()),
+            'condition_lov_code': config.get('condition_lov_code', ''),
+            'action_lov_code': config.get('action_lov_code', '')
+        }
+    
+    def collect_lov_configurations(self):
+        """Current per-procedure LOV values and codes, including ones not yet shown"""
+        if self.pending_lov_configurations is not None:
+            return self.pending_lov_configurations
+        
+        return [self.lov_row_configuration(config) for config in self.lov_vars]
+    
+    def generate_lov_code(self, values_text, fallback):
+        """Generate LOV code based on values"""
+        if not values_text:
+            return fallback
+        
+        # Parse values
+        values = [v.strip().upper() for v in values_text.split(',') if v.strip()]
+        
+        # Create code based on first letters of values
+        code_parts = []
+        for value in values[:3]:  # Use max 3 values
+            if value and len(value) > 0:
+                code_parts.append(value[0])
+        
+        base_code = ''.join(code_parts) if code_parts else "GEN"
+        
+        # Add form prefix
+        form_prefix = self.form_name_var.get().split('-')[0:4]  # Take first 4 parts
+        if len(form_prefix) >= 4:
+            full_code = f"{'-'.join(form_prefix)}-{base_code}"
+        else:
+            full_code = f"YKN-CPP2-G-603-{base_code}"
+        
+        # Ensure uniqueness
+        counter = 1
+        original_code = full_code
+        while full_code in self.lov_database:
+            full_code = f"{original_code}{counter}"
+            counter += 1
+        
+        # Store values in database
+        full_code = intern_text(full_code)
+        self.lov_database[full_code] = intern_values(v.strip() for v in values_text.split(',') if v.strip())
+        
+        return full_code
+    
+    @profiled()
+    def auto_configure_lovs(self):
+        """Apply the common LOV patterns to every procedure"""
+        if not self.lov_vars:
+            self.setup_lov_configuration()
+        return self.apply_common_lov_patterns()
+    
+    def suggest_lov_values(self, procedure_text):
+        """Suggest (condition, action) values for a procedure based on common patterns"""
+        # Common condition and action mappings
+        condition_patterns = {
+            'check': 'Good,Damaged,Missing',
+            'inspect': 'Good,Dirty,Worn,Damaged',
+            'replace': 'Good,Worn,Damaged,Leaking',
+            'clean': 'Clean,Dirty,Blocked',
+            'calibrate': 'In Tolerance,Out of Tolerance',
+            'test': 'Pass,Fail',
+            'monitor': 'Normal,High,Low',
+            'filter': 'Clean,Dirty,Clogged,Blocked'
+        }
+        
+        action_patterns = {
+            'check': 'No Action,Adjust,Repair,Replace',
+            'inspect': 'No Action,Clean,Repair,Replace',
+            'replace': 'Replaced,Repaired',
+            'clean': 'Cleaned,Replaced',
+            'calibrate': 'Calibrated,Adjusted,Replaced',
+            'test': 'No Action,Repaired,Replaced',
+            'monitor': 'No Action,Adjusted',
+            'filter': 'Cleaned,Replaced'
+        }
+        
+        procedure_text = procedure_text.lower()
+        
+        # Find matching pattern
+        for keyword, values in condition_patterns.items():
+            if keyword in procedure_text:
+                return values, action_patterns.get(keyword, 'No Action,Repaired,Replaced')
+        
+        # Default if no pattern match
+        return 'Good,Damaged', 'No Action,Repaired'
+    
+    def apply_common_lov_patterns(self):
+        """Fill condition/action values of every LOV row from common patterns (one undo step)"""
+        configured_count = 0
+        
+        with self.undo_history.group("auto-configure LOVs"):
+            for config in self.lov_vars:
+                condition_values, action_values = self.suggest_lov_values(config['procedure']['text'])
+                
+                config['condition_var'].set(condition_values)
+                config['action_var'].set(action_values)
+                configured_count += 1
+        
+        return configured_count
+    
+    def clear_all_lovs(self):
+        """Clear all LOV configurations (one undo step)"""
+        with self.undo_history.group("clear all LOVs"):
+            for config in self.lov_vars:
+                config['condition_var'].set('')
+                config['action_var'].set('')
+            # The old database is kept by reference for undo instead of being cleared in place
+            old_database = self.lov_database
+            self.set_lov_database({})
+            self.undo_history.push(LovDatabaseReplace(old_database, self.lov_database))
+    
+    def build_output_previews(self):
+        """Lazy FORMTEMPLATE/FORMLOV previews of the current model (see preview.py)"""
+        form_name = self.form_name_var.get()
+        org_code = intern_text(self.form_config['org_code'])
+        template_name = self.detected_format['type'] if self.detected_format else DEFAULT_TEMPLATE
+        lov_configurations = self.collect_lov_configurations()
+        return {
+            'FORMTEMPLATE': TemplatePreview(template_name, self.procedures, lov_configurations, org_code,
+                                            intern_text(form_name), intern_text(self.form_desc_var.get()),
+                                            intern_text(self.template_key_prefix(form_name)),
+                                            intern_text(self.lov_key_prefix(form_name))),
+            'FORMLOV': LovPreview(self.build_standard_lov_rows(), self.lov_database,
+                                  lambda code, value: self.lov_row(org_code, code, value),
+                                  self.procedures, lov_configurations)
+        }
+    
+    def write_outputs(self, output_dir, timestamp, delta_format=None, archive_format=None, validation=None,
+                      org_targets=None):
+        """Write loose (or delta) files, or one archive of the full tables when archive_format is given.
+        
+        With org_targets ([(org_code, form_name_prefix)], see fanout.py) the
+        form is written once per org instead; delta_format does not apply.
+        """
+        if archive_format is None:
+            if org_targets:
+                return self.write_fanout(output_dir, timestamp, org_targets, validation=validation)
+            return self.write_output_files(output_dir, timestamp, delta_format, validation)
+        archive = ArchiveWriter(output_dir, archive_format, timestamp)
+        try:
+            if org_targets:
+                self.write_fanout(output_dir, timestamp, org_targets, archive, validation)
+            else:
+                self.write_to_bundle(archive, validation)
+        except BaseException:
+            archive.abort()
+            raise
+        return archive.close()
+    
+    def write_fanout(self, output_dir, timestamp, org_targets, bundle=None, validation=None):
+        """Build the tables once and write them for every (org_code, form_name_prefix) target.
+        
+        Without a bundle each org gets its own <output_dir>/<ORG>/ folder of
+        four workbooks; with a BundleWriter or ArchiveWriter every org is
+        added as form "<ORG>/<form name>".
+        """
+        form_name = self.form_name_var.get() or "MAINTENANCE_FORM"
+        tables = self.build_output_tables()
+        self.validate_output_tables(tables, validation)
+        with self.phase("fanout_frames"):
+            frames = base_frames(tables)
+        
+        outputs = []
+        for org_code, org_form_name, org_tables in fan_out(frames, form_name, org_targets):
+            self.register_form(org_form_name)
+            if bundle is not None:
+                with self.phase("write_bundle"):
+                    records = {table: frame.to_dict('records') for table, frame in org_tables.items()}
+                    outputs.extend(bundle.add_form(f"{org_code}/{org_form_name}", records, self.source_file,
+                                                   self.selected_sheet))
+                continue
+            org_dir = os.path.join(output_dir, org_code)
+            os.makedirs(org_dir, exist_ok=True)
+            for table, frame in org_tables.items():
+                filename = os.path.join(org_dir, f"{table}_{timestamp}.xlsx")
+                with self.phase(f"write_{table}"):
+                    size = write_new_workbook(frame, filename)
+                outputs.append({'table': table, 'file': filename, 'rows': len(frame), 'org': org_code,
+                                'bytes': size})
+        
+        self.remember_fingerprint(tables)
+        self.remember_procedures(form_name)
+        self.save_global_lov_registry()
+        return outputs
+    
+    def write_output_files(self, output_dir, timestamp, delta_format=None, validation=None):
+        """Validate, register the form and write FORMHEAD/FORMTEMPLATE/FORMLOV/FORMMENU.
+        
+        With delta_format ('xlsx' or 'sql') and a manifest from a previous
+        generation of this FORMNAME, only inserted/updated/renamed/deleted rows are
+        written. Returns one dict per written file with row count and size.
+        Raises ValidationError before writing anything if validation blocks,
+        and FileExistsError rather than overwrite an earlier output.
+        """
+        form_name = self.form_name_var.get() or "MAINTENANCE_FORM"
+        tables = self.build_output_tables()
+        self.validate_output_tables(tables, validation)
+        self.register_form(form_name)
+        
+        previous_manifest = load_manifest(output_dir, form_name) if delta_format else None
+        
+        identities = self.output_row_identities()
+        if previous_manifest is not None:
+            delta = compute_delta(previous_manifest, tables, identities)
+            with self.phase(f"write_delta_{delta_format}"):
+                if delta_format == 'sql':
+                    outputs = write_delta_sql(delta, output_dir, timestamp)
+                else:
+                    outputs = write_delta_workbooks(delta, output_dir, timestamp)
+        else:
+            outputs = []
+            # Checked up front so a clash leaves no partial set; the exclusive create still guards races
+            existing = [os.path.basename(path) for path in
+                        (os.path.join(output_dir, f"{table}_{timestamp}.xlsx") for table in tables)
+                        if os.path.exists(path)]
+            if existing:
+                raise FileExistsError(f"Output files already exist in {output_dir}: {', '.join(existing)}")
+            for table, rows in tables.items():
+                filename = os.path.join(output_dir, f"{table}_{timestamp}.xlsx")
+                with self.phase(f"write_{table}"):
+                    size = write_new_workbook(pd.DataFrame(rows), filename)
+                outputs.append({
+                    'table': table,
+                    'file': filename,
+                    'rows': len(rows),
+                    'bytes': size
+                })
+        
+        # Remember this generation for the next incremental run
+        save_manifest(output_dir, build_manifest(form_name, tables, identities))
+        self.remember_fingerprint(tables)
+        self.remember_procedures(form_name)
+        
+        # Save global LOV registry
+        self.save_global_lov_registry()
+        
+        return outputs
+    
+    def output_row_identities(self):
+        """Stable identity of each FORMTEMPLATE row, so deltas survive renumbering (see delta.py)"""
+        template_name = self.detected_format['type'] if self.detected_format else DEFAULT_TEMPLATE
+        return {'FORMTEMPLATE': template_row_identities(template_name, procedure_identities(self.procedures))}
+    
+    def write_to_bundle(self, bundle, validation=None):
+        """Register the form and append its four tables to a BundleWriter or ArchiveWriter (see bundle.py, archive.py)"""
+        form_name = self.form_name_var.get() or "MAINTENANCE_FORM"
+        tables = self.build_output_tables()
+        self.validate_output_tables(tables, validation)
+        self.register_form(form_name)
+        
+        with self.phase("write_bundle"):
+            outputs = bundle.add_form(form_name, tables, self.source_file, self.selected_sheet)
+        
+        self.remember_fingerprint(tables)
+        self.remember_procedures(form_name)
+        self.save_global_lov_registry()
+        return outputs
+    
+    def build_output_tables(self):
+        """Build the rows of all four output tables"""
+        if self.fingerprint_match is not None:
+            # Same tasklist as an earlier form: reuse its rows under this form's names
+            form_name = self.form_name_var.get()
+            with self.phase("rebind_fingerprint"):
+                reused = rebind_tables(self.fingerprint_match, form_name, self.form_desc_var.get(),
+                                       self.template_key_prefix(form_name), self.lov_key_prefix(form_name),
+                                       intern_text(self.form_config['org_code']))
+            return {
+                'FORMHEAD': self.build_formhead_rows(),
+                'FORMTEMPLATE': reused['FORMTEMPLATE'],
+                'FORMLOV': reused['FORMLOV'],
+                'FORMMENU': self.build_formmenu_rows()
+            }
+        return {
+            'FORMHEAD': self.build_formhead_rows(),
+            'FORMTEMPLATE': self.build_formtemplate_rows(),
+            'FORMLOV': self.build_formlov_rows(),
+            'FORMMENU': self.build_formmenu_rows()
+        }
+    
+    def find_fingerprint_match(self):
+        """Stored entry for the current sheet fingerprint, or None"""
+        if self.fingerprint_index is None or not self.sheet_fingerprint:
+            return None
+        return self.fingerprint_index.load(self.sheet_fingerprint)
+    
+    def apply_fingerprint_entry(self, entry, reuse_rows=True):
+        """Take procedures, LOV values and LOV codes from a stored entry.
+        
+        With reuse_rows the stored FORMTEMPLATE/FORMLOV rows are rebound
+        instead of rebuilt, which is only valid while nothing is edited.
+        """
+        self.procedures = intern_procedures(entry['procedures'])
+        self.lov_database = intern_lov_database(entry['lov_database'])
+        self.procedures_replaced()
+        self.lov_vars = []
+        self.pending_lov_configurations = intern_lov_configurations(entry['lov_configurations'])
+        self.sheet_fingerprint = entry['fingerprint']
+        self.fingerprint_match = entry if reuse_rows else None
+    
+    def remember_procedures(self, form_name):
+        """Add this form's procedures and LOV assignments to the near-duplicate history"""
+        if self.procedure_history is None:
+            return
+        with self.phase("store_similarity"):
+            self.procedure_history.save_form(form_name, self.procedures, self.collect_lov_configurations(),
+                                             self.lov_database)
+    
+    def remember_fingerprint(self, tables):
+        """Store this generation under the sheet fingerprint so later matches can reuse it"""
+        if self.fingerprint_index is None or not self.sheet_fingerprint:
+            return
+        with self.phase("store_fingerprint"):
+            if not self.fingerprint_index.has(self.sheet_fingerprint):
+                form_name = self.form_name_var.get()
+                self.fingerprint_index.store(self.sheet_fingerprint, {
+                    'form': {
+                        'form_name': form_name,
+                        'form_description': self.form_desc_var.get(),
+                        'key_prefix': self.template_key_prefix(form_name),
+                        'lov_prefix': self.lov_key_prefix(form_name),
+                        'org_code': self.form_config['org_code'],
+                        'source_file': os.path.basename(self.source_file) if self.source_file else None,
+                        'sheet_name': self.selected_sheet
+                    },
+                    'procedures': self.procedures,
+                    'lov_configurations': self.collect_lov_configurations(),
+                    'lov_database': self.lov_database,
+                    'tables': {'FORMTEMPLATE': tables['FORMTEMPLATE'], 'FORMLOV': tables['FORMLOV']}
+                })
+            if self.workbook_hash and self.selected_sheet:
+                self.fingerprint_index.map_workbook(self.workbook_hash, self.selected_sheet, self.sheet_fingerprint)
+    
+    def validate_output_tables(self, tables, mode=None):
+        """Run validation.validate_tables; raise ValidationError on errors in 'block' mode"""
+        mode = mode or self.validation_mode
+        if mode == 'off':
+            self.validation_report = None
+            return None
+        with self.phase("validate"):
+            report = validate_tables(tables)
+        self.validation_report = report
+        if mode == 'block' and not report.ok:
+            raise ValidationError(report)
+        return report
+    
+    def phase(self, name):
+        """Profiler phase context, or a no-op without a profiler"""
+        return self.profiler.phase(name) if self.profiler else nullcontext()
+    
+    def register_form(self, form_name):
+        """Record this form in the global registry; the entry is merged into the file on the next save"""
+        self.registered_forms[form_name] = {
+            "source_file": os.path.basename(self.source_file) if self.source_file else "Unknown",
+            "sheet_name": self.selected_sheet,
+            "generated_at": datetime.now().isoformat(),
+            "procedure_count": len(self.procedures),
+            "lov_codes_used": len(self.lov_database),
+            "format_type": self.detected_format['type'] if self.detected_format else 'unknown'
+        }
+        self.global_lov_registry["form_registry"][form_name] = self.registered_forms[form_name]
+        self.global_lov_registry["total_forms"] = len(self.global_lov_registry["form_registry"])
+        return self.registered_forms[form_name]
+    
+    def load_global_lov_registry(self):
+        """Load the registry of forms and LOV codes generated so far in the output directory"""
+        return read_registry(registry_path(self.output_dir.get()))
+    
+    def save_global_lov_registry(self):
+        """Merge this converter's forms and LOV codes into the registry file of the output directory.
+        
+        The file is re-read under a lock, so concurrent batch, watch and
+        service workers add to each other's entries instead of overwriting them.
+        """
+        path = registry_path(self.output_dir.get())
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with FileLock(f"{path}.lock"):
+            registry = read_registry(path)
+            registry["form_registry"].update(self.registered_forms)
+            registry["total_forms"] = len(registry["form_registry"])
+            used_codes = set(registry["used_lov_codes"])
+            used_codes.update(self.lov_database.keys())
+            registry["used_lov_codes"] = sorted(used_codes)
+            
+            # Write-then-rename so readers that do not lock never see a half-written registry
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(registry, f, indent=2, ensure_ascii=False)
+            os.replace(temp_path, path)
+        self.registered_forms = {}
+        self.global_lov_registry = registry
+    
+    @profiled()
+    def create_enhanced_formtemplate_file(self, filename):
+        """Create enhanced FORMTEMPLATE.xlsx based on detected format"""
+        df = pd.DataFrame(self.build_formtemplate_rows())
+        df.to_excel(filename, index=False)
+        return len(df)
+    
+    @profiled()
+    def build_formtemplate_rows(self, template_name=None):
+        """Build FORMTEMPLATE rows with the compiled layout for the detected format (see templates.py)"""
+        form_name = self.form_name_var.get()
+        if template_name is None:
+            template_name = self.detected_format['type'] if self.detected_format else DEFAULT_TEMPLATE
+        
+        emit = compile_template(template_name)
+        return emit(self.procedures, self.collect_lov_configurations(), intern_text(self.form_config['org_code']),
+                    intern_text(form_name), intern_text(self.form_desc_var.get()),
+                    intern_text(self.template_key_prefix(form_name)), intern_text(self.lov_key_prefix(form_name)))
+    
+    @profiled()
+    def create_formhead_file(self, filename):
+        """Create FORMHEAD.xlsx file"""
+        df = pd.DataFrame(self.build_formhead_rows())
+        df.to_excel(filename, index=False)
+        return len(df)
+    
+    def build_formhead_rows(self):
+        """Build the FORMHEAD row"""
+        form_name = intern_text(self.form_name_var.get())
+        form_desc = intern_text(self.form_desc_var.get())
+        user_name = intern_text(self.user_name_var.get())
+        
+        return [{
+            'FORMNAME': form_name,
+            'VERSION': 1,
+            'ENABLE': 1,
+            'WFID': 0,
+            'FORMDESCRIPTION': form_desc,
+            'MAPTOPERMITID': None,
+            'CATEGORY': 'BASIC',
+            'MODIFIEDBY': user_name,
+            'MODIFIEDDATE': None,
+            'STATUS': 'DRAFT',
+            'USERNAME': user_name,
+            'CREATEDATE': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'HEADLINE': form_desc,
+            'DETAIL_INFORMATION': f"Generated from {os.path.basename(self.source_file) if self.source_file else 'Unknown'}"
+        }]
+    
+    @profiled()
+    def create_formtemplate_file(self, filename):
+        """Create FORMTEMPLATE.xlsx with the standard maintenance layout"""
+        df = pd.DataFrame(self.build_formtemplate_rows('standard_maintenance'))
+        df.to_excel(filename, index=False)
+        return len(df)
+    
+    @profiled()
+    def create_formlov_file(self, filename):
+        """Create FORMLOV.xlsx file"""
+        df = pd.DataFrame(self.build_formlov_rows())
+        df.to_excel(filename, index=False)
+        return len(df)
+    
+    def template_key_prefix(self, form_name):
+        """Prefix of the FORMTEMPLATE KEYNAMEs, generated from the form name"""
+        form_parts = form_name.split('-')
+        if len(form_parts) >= 4:
+            return f"{form_parts[0]}{form_parts[3]}"
+        return "FORM"
+    
+    def lov_key_prefix(self, form_name):
+        """Prefix of the standard LOV names (YN, GFB), shared by FORMLOV and KEYLOV references"""
+        form_parts = form_name.split('-')
+        if len(form_parts) >= 4:
+            return f"{form_parts[0]}-{form_parts[1]}-{form_parts[2]}-{form_parts[3]}"
+        return "YKN-CPP2-G-603"
+    
+    @profiled()
+    def build_formlov_rows(self):
+        """Build FORMLOV rows: standard LOVs plus the generated LOV database"""
+        org_code = intern_text(self.form_config['org_code'])
+        lov_data = self.build_standard_lov_rows()
+        
+        # Add generated LOVs from database
+        for lov_code, values in self.lov_database.items():
+            for value in values:
+                lov_data.append(self.lov_row(org_code, lov_code, value))
+        
+        return lov_data
+    
+    def lov_row(self, org_code, lov_code, value):
+        """FORMLOV row of one generated LOV value"""
+        return {
+            'LOVID': None,
+            'ORG': org_code,
+            'LOVNAME': lov_code,
+            'VALUE': value,
+            'VALLOW': None,
+            'VALHI': None,
+            'VALDESC': value,
+            'ENABLE': 1,
+            'TYPE': 'CONFIG'
+        }
+    
+    def build_standard_lov_rows(self):
+        """FORMLOV rows of the standard Yes/No and Good/Fair/Bad LOVs of this form"""
+        org_code = intern_text(self.form_config['org_code'])
+        form_name = self.form_name_var.get()
+        
+        key_prefix = self.lov_key_prefix(form_name)
+        
+        lov_data = []
+        
+        # Add standard LOVs
+        # Yes/No LOV
+        yn_lov = intern_text(f"{key_prefix}-YN")
+        lov_data.extend([
+            {'LOVID': None, 'ORG': org_code, 'LOVNAME': yn_lov, 'VALUE': 'Yes', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Yes', 'ENABLE': 1, 'TYPE': 'CONFIG'},
+            {'LOVID': None, 'ORG': org_code, 'LOVNAME': yn_lov, 'VALUE': 'No', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'No', 'ENABLE': 1, 'TYPE': 'CONFIG'}
+        ])
+        
+        # Good/Fair/Bad LOV
+        gfb_lov = intern_text(f"{key_prefix}-GFB")
+        lov_data.extend([
+            {'LOVID': None, 'ORG': org_code, 'LOVNAME': gfb_lov, 'VALUE': 'Good', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Good', 'ENABLE': 1, 'TYPE': 'CONFIG'},
+            {'LOVID': None, 'ORG': org_code, 'LOVNAME': gfb_lov, 'VALUE': 'Fair', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Fair', 'ENABLE': 1, 'TYPE': 'CONFIG'},
+            {'LOVID': None, 'ORG': org_code, 'LOVNAME': gfb_lov, 'VALUE': 'Bad', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Bad', 'ENABLE': 1, 'TYPE': 'CONFIG'}
+        ])
+        
+        return lov_data
+    
+    @profiled()
+    def create_formmenu_file(self, filename):
+        """Create FORMMENU.xlsx file"""
+        df = pd.DataFrame(self.build_formmenu_rows())
+        df.to_excel(filename, index=False)
+        return len(df)
+    
+    def build_formmenu_rows(self):
+        """Build the FORMMENU row"""
+        form_name = self.form_name_var.get()
+        form_desc = self.form_desc_var.get()
+        
+        menu_data = [{
+            'MNID': None,
+            'MNTYPE': 'FORM',
+            'MNLABEL': form_desc,
+            'MNICON': 'ic_survey_general.png',
+            'MNDESC': form_desc,
+            'MNGROUP': None,
+            'MNCATEGORY': None,
+            'PARENTMNID': 333,  # Standard parent for maintenance forms
+            'FORMNAME': form_name,
+            'ATTRIBUTE1': None,
+            'ATTRIBUTE2': None,
+            'ATTRIBUTE3': None,
+            'ISACTIVE': 1,
+            'VALIDFROM': None,
+            'VALIDTO': None
+        }]
+        
+        return menu_data
+    
+    def restore_session(self, form_config, procedures, lov_database, lov_configurations=None,
+                        source_file=None, selected_sheet=None):
+        """Restore model state; mapping and LOV views are rebuilt when their tab is shown"""
+        # Load form configuration
+        if form_config:
+            self.form_name_var.set(form_config.get('form_name', ''))
+            self.form_desc_var.set(form_config.get('form_description', ''))
+            self.user_name_var.set(form_config.get('user_name', 'MK.ABDULLAH.DAFA'))
+        
+        if source_file:
+            self.source_file = source_file
+        if selected_sheet:
+            self.selected_sheet = selected_sheet
+        
+        # Load procedures and LOV database
+        if procedures is not None:
+            self.procedures = intern_procedures(procedures)
+            self.procedure_vars = []
+            self.procedure_rows = None
+        self.procedures_replaced()
+        if lov_database is not None:
+            self.lov_database = intern_lov_database(lov_database)
+        
+        # Old LOV rows belong to the previous procedure list
+        self.lov_vars = []
+        self.pending_lov_configurations = intern_lov_configurations(lov_configurations)
+        self.stale_views.update({'mapping', 'lov'})
+        
+        # Rebuild immediately only the view currently on screen
+        self.refresh_views()
+        
+        # The restored session becomes the new autosave base
+        self.compact_journal()
+    
+    def load_lov_patterns(self):
+        """Load common LOV patterns for auto-configuration"""
+        # This could be expanded to load from external files
+        pass
+
+
+def registry_path(output_dir):
+    return os.path.join(os.path.abspath(output_dir or os.getcwd()), GLOBAL_LOV_REGISTRY_FILE)
+
+
+def empty_registry():
+    return {"used_lov_codes": [], "form_registry": {}, "total_forms": 0}
+
+
+def read_registry(path):
+    """The registry stored at path, or an empty one when it is missing or unreadable"""
+    registry = empty_registry()
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                registry.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return registry
+
+
+def convert_sheet(source_file, sheet_name=None, form_name='', form_description='', user_name=DEFAULT_USER_NAME,
+                  org_code=None, output_dir=None):
+    """Read and analyze one sheet and auto-configure its LOVs; returns the FormConverter holding the form.
+    
+    Without sheet_name the first sheet that looks like a tasklist is used.
+    """
+    converter = FormConverter(form_name, form_description, user_name, output_dir, org_code)
+    if sheet_name is None:
+        sheet_names = converter.list_sheets(source_file)
+        sheet_name = (converter.find_likely_sheets(sheet_names) or sheet_names)[0]
+    converter.prepare(source_file, sheet_name)
+    return converter
+
+
+def build_frames(converter):
+    """The four output tables of a converter as DataFrames"""
+    return base_frames(converter.build_output_tables())
@@ -0,0 +1,331 @@
+"""Incremental regeneration against the previous generation of a form.
+
+Every generated row gets a stable content hash. After each generation a
+manifest of {row identity: [row key, hash, position columns]} per table is
+stored for the FORMNAME, so the next generation can emit only inserted,
+updated, renamed and deleted rows, either as delta workbooks or as SQL
+statements.
+
+Rows are keyed the way the target tables are, but FORMTEMPLATE's KEYNAME
+is positional (LISCHE1, LISCHE2, ... counted over the whole form), so
+inserting or deleting a procedure renumbers every field after it. The
+converter therefore passes a stable identity per FORMTEMPLATE row (the
+procedure's normalized text plus the field's place in the layout, see
+procedure_identities and templates.template_row_identities). Rows are
+matched on that identity; a matched row whose key moved becomes a rename
+that only sets the columns that follow the position (KEYNAME, PARENTKEY,
+DISPLAYOPTION, the numbered label) unless its content changed too. Rows
+with a new identity (an edited text) fall back to matching on their key.
+
+Renames are ordered so that no row is renamed onto a key another row
+still holds; a cycle of renames goes through a parked KEYNAME.
+"""
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+
+import pandas as pd
+
+from fingerprint import normalize_text
+
+MANIFEST_DIR = ".pm_manifests"
+MANIFEST_VERSION = 2
+
+# Columns identifying a row within its table
+TABLE_KEYS = {
+    'FORMHEAD': ('FORMNAME',),
+    'FORMTEMPLATE': ('ORG', 'FORMNAME', 'KEYNAME'),
+    'FORMLOV': ('ORG', 'LOVNAME', 'VALUE'),
+    'FORMMENU': ('FORMNAME',),
+}
+
+# Columns that change on every run and must not make a row look updated
+VOLATILE_COLUMNS = {'CREATEDATE', 'MODIFIEDDATE', 'LASTUPDATE'}
+
+# Columns that follow a row's position in the form; a renamed row only sets those that changed
+POSITION_COLUMNS = {
+    'FORMTEMPLATE': ('KEYNAME', 'PARENTKEY', 'DISPLAYOPTION', 'KEYLABEL'),
+}
+# Key column a rename changes, and the suffix of the key a row is parked under to break a cycle
+RENAME_COLUMN = 'KEYNAME'
+PARKED_SUFFIX = '~'
+
+
+def _canonical(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def row_key(table, row):
+    """Tuple of key column values for a row"""
+    return tuple(_canonical(row.get(column)) for column in TABLE_KEYS[table])
+
+
+def row_hash(row, exclude=()):
+    """Stable content hash of a row, ignoring volatile columns (and any excluded ones)"""
+    content = {column: _canonical(value) for column, value in row.items()
+               if column not in VOLATILE_COLUMNS and column not in exclude}
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def procedure_identities(procedures):
+    """Stable id of each procedure: a digest of its normalized text and its occurrence among equal texts"""
+    occurrences = {}
+    identities = []
+    for proc in procedures:
+        digest = hashlib.blake2b(normalize_text(proc['text']).encode('utf-8'), digest_size=8).hexdigest()
+        occurrence = occurrences.get(digest, 0)
+        occurrences[digest] = occurrence + 1
+        identities.append(f"{digest}.{occurrence}")
+    return identities
+
+
+def _key_string(key):
+    return json.dumps(key, ensure_ascii=False, default=str)
+
+
+def manifest_path(output_dir, form_name):
+    safe_name = re.sub(r'[^\w.-]', '_', form_name)
+    return os.path.join(output_dir, MANIFEST_DIR, f"{safe_name}.json")
+
+
+def _row_entry(table, row):
+    """[key string, hash of the non-position columns, {position column: value}] of a row"""
+    position_columns = POSITION_COLUMNS.get(table, ())
+    return [_key_string(row_key(table, row)), row_hash(row, position_columns),
+            {column: _canonical(row.get(column)) for column in position_columns}]
+
+
+def _table_identities(table, rows, identities):
+    """Identity of each row: the given ones when they fit the rows, else the row keys"""
+    table_identities = (identities or {}).get(table)
+    if table_identities is not None and len(table_identities) == len(rows):
+        return table_identities
+    return None
+
+
+def build_manifest(form_name, tables, identities=None):
+    """Manifest of {table: {identity: [key, hash, positions]}} for the generated tables.
+
+    identities maps a table to one stable identity per row (see
+    procedure_identities); other tables are identified by their row keys.
+    """
+    manifest_tables = {}
+    for table, rows in tables.items():
+        table_identities = _table_identities(table, rows, identities)
+        entries = {}
+        for n, row in enumerate(rows):
+            entry = _row_entry(table, row)
+            entries[table_identities[n] if table_identities else entry[0]] = entry
+        manifest_tables[table] = entries
+    return {
+        'version': MANIFEST_VERSION,
+        'form_name': form_name,
+        'generated_at': datetime.now().isoformat(),
+        'tables': manifest_tables,
+    }
+
+
+def load_manifest(output_dir, form_name):
+    path = manifest_path(output_dir, form_name)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(output_dir, manifest):
+    path = manifest_path(output_dir, manifest['form_name'])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Unique per writer: a fixed name lets one writer's rename remove another's temp file
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def compute_delta(manifest, tables, identities=None):
+    """Compare generated tables against a manifest.
+
+    Returns {table: {'insert': [rows], 'update': [rows], 'rename': [renames],
+    'delete': [key tuples]}}; a rename is {'key': old key tuple, 'row': new
+    row, 'columns': [columns to set, the renamed key column included]}.
+    """
+    delta = {}
+    for table, rows in tables.items():
+        previous = dict(manifest['tables'].get(table, {})) if manifest else {}
+        table_identities = _table_identities(table, rows, identities)
+        changes = {'insert': [], 'update': [], 'rename': [], 'delete': []}
+
+        unmatched = []
+        for n, row in enumerate(rows):
+            entry = _row_entry(table, row)
+            old = previous.pop(table_identities[n] if table_identities else entry[0], None)
+            if old is None:
+                unmatched.append((row, entry))
+            else:
+                _classify(table, row, entry, old, changes)
+
+        # A row with a new identity (e.g. an edited text) takes over a left-over row with its key
+        left_over = {old[0]: identity for identity, old in previous.items()}
+        for row, entry in unmatched:
+            identity = left_over.pop(entry[0], None)
+            if identity is None:
+                changes['insert'].append(row)
+            else:
+                _classify(table, row, entry, previous.pop(identity), changes)
+
+        changes['delete'] = [tuple(json.loads(old[0])) for old in previous.values()]
+        delta[table] = changes
+    return delta
+
+
+def _classify(table, row, entry, old, changes):
+    key, content_hash, positions = entry
+    old_key, old_hash, old_positions = old
+    if key == old_key:
+        if content_hash != old_hash or positions != old_positions:
+            changes['update'].append(row)
+        return
+    if content_hash != old_hash:
+        columns = [column for column in row if column not in TABLE_KEYS[table] or column == RENAME_COLUMN]
+    else:
+        columns = [column for column, value in positions.items() if value != old_positions.get(column)]
+    changes['rename'].append({'key': tuple(json.loads(old_key)), 'row': row, 'columns': columns})
+
+
+def rename_order(table, renames):
+    """(old key, {column: value}) assignments applying renames without two rows sharing a key.
+
+    A rename waits for the row holding its new key to move away first; a
+    cycle is broken by parking one row under its KEYNAME plus PARKED_SUFFIX.
+    """
+    by_old = {rename['key']: rename for rename in renames}
+    done = set()
+    ordered = []
+    for start in by_old:
+        chain, on_chain, key = [], set(), start
+        while key in by_old and key not in done and key not in on_chain:
+            chain.append(key)
+            on_chain.add(key)
+            key = row_key(table, by_old[key]['row'])
+        cycle = bool(chain) and key == start
+        if cycle:
+            rename_index = TABLE_KEYS[table].index(RENAME_COLUMN)
+            parked = start[:rename_index] + (f"{start[rename_index]}{PARKED_SUFFIX}",) + start[rename_index + 1:]
+            ordered.append((start, {RENAME_COLUMN: parked[rename_index]}))
+        for old in reversed(chain):
+            rename = by_old[old]
+            assignments = {column: rename['row'].get(column) for column in rename['columns']}
+            ordered.append((parked if cycle and old == start else old, assignments))
+            done.add(old)
+    return ordered
+
+
+def write_new_workbook(frame, filename):
+    """Write a DataFrame as a new XLSX file; raises FileExistsError instead of overwriting an earlier output"""
+    with open(filename, 'xb') as f:
+        try:
+            frame.to_excel(f, index=False, engine='openpyxl')
+        except BaseException:
+            f.close()
+            os.remove(filename)
+            raise
+    return os.path.getsize(filename)
+
+
+def delta_size(delta):
+    return sum(len(changes['insert']) + len(changes['update']) + len(changes['rename']) + len(changes['delete'])
+               for changes in delta.values())
+
+
+def write_delta_workbooks(delta, output_dir, timestamp):
+    """Write one {TABLE}_DELTA workbook per changed table with a CHANGE column.
+
+    RENAME records carry the old key in OLD_<column> columns, in an order
+    that never renames a row onto a key another row still holds.
+    """
+    files = []
+    for table, changes in delta.items():
+        records = []
+        key_columns = TABLE_KEYS[table]
+        for key in changes['delete']:
+            records.append({'CHANGE': 'DELETE', **dict(zip(key_columns, key))})
+        for old_key, assignments in rename_order(table, changes['rename']):
+            old_columns = {f"OLD_{column}": value for column, value in zip(key_columns, old_key)}
+            records.append({'CHANGE': 'RENAME', **old_columns, **assignments})
+        for change in ('insert', 'update'):
+            for row in changes[change]:
+                records.append({'CHANGE': change.upper(), **row})
+        if not records:
+            continue
+
+        filename = os.path.join(output_dir, f"{table}_DELTA_{timestamp}.xlsx")
+        size = write_new_workbook(pd.DataFrame(records), filename)
+        files.append({'table': table, 'file': filename, 'rows': len(records), 'bytes': size})
+    return files
+
+
+def _sql_literal(value):
+    value = _canonical(value)
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _where(key_columns, key):
+    return " AND ".join(f"{column} = {_sql_literal(value)}" for column, value in zip(key_columns, key))
+
+
+def delta_sql_statements(delta):
+    """Yield SQL statements applying the delta: deletes, renames, updates, then inserts"""
+    for table, changes in delta.items():
+        key_columns = TABLE_KEYS[table]
+
+        for key in changes['delete']:
+            yield f"DELETE FROM {table} WHERE {_where(key_columns, key)};"
+
+        for old_key, assignments in rename_order(table, changes['rename']):
+            assignments = ", ".join(f"{column} = {_sql_literal(value)}" for column, value in assignments.items())
+            yield f"UPDATE {table} SET {assignments} WHERE {_where(key_columns, old_key)};"
+
+        for row in changes['update']:
+            assignments = ", ".join(f"{column} = {_sql_literal(value)}"
+                                    for column, value in row.items() if column not in key_columns)
+            yield f"UPDATE {table} SET {assignments} WHERE {_where(key_columns, row_key(table, row))};"
+
+        for row in changes['insert']:
+            columns = ", ".join(row.keys())
+            values = ", ".join(_sql_literal(value) for value in row.values())
+            yield f"INSERT INTO {table} ({columns}) VALUES ({values});"
+
+
+def write_delta_sql(delta, output_dir, timestamp):
+    """Write all delta statements to one SQL file wrapped in a transaction"""
+    filename = os.path.join(output_dir, f"FORMDELTA_{timestamp}.sql")
+    count = 0
+    with open(filename, 'x', encoding='utf-8') as f:
+        f.write("BEGIN;\n")
+        for statement in delta_sql_statements(delta):
+            f.write(statement + "\n")
+            count += 1
+        f.write("COMMIT;\n")
+    return [{'table': 'SQL', 'file': filename, 'rows': count, 'bytes': os.path.getsize(filename)}]
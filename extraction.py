@@ -0,0 +1,325 @@
+"""Procedure extraction from sheet rows, serial or sharded across processes.
+
+scan_procedures is the single extraction loop: the converter runs it over
+the whole sheet, and extract_sharded runs it over row-range shards in a
+process pool. Shards are made to agree with the serial pass at their
+boundaries:
+
+- a shard's scan starts earlier than the shard when its first row
+  continues a merged number cell from above (shard_scan_start), so it
+  sees the procedure that row belongs to and treats the row as a
+  continuation, then drops procedures that start before the shard;
+- a shard keeps scanning past its end while the last procedure's merged
+  number cell continues, so a multi-row procedure is never cut.
+
+Workers read the sheet from shared memory (ColumnBuffers): each column is
+stored once as NUL-terminated UTF-8 cell texts with row offsets and a null
+mask, and a worker decodes only the rows of its own shard. Extraction only
+looks at str(value).strip() of non-null cells, so str(value) gives the
+same result as the original cell values. Procedures are renumbered in
+row order after the merge.
+
+The parent encodes the whole sheet into shared memory serially before the
+fan-out, so sharding only wins with a spare CPU for every worker; with a
+single CPU, or fewer CPUs than requested workers, extraction stays serial
+(shard_workers). benchmarks/bench_sharding.py compares both paths.
+"""
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from merged import MergedRangeIndex
+
+# Procedure numbers are looked for in the first NUMBER_COLUMNS columns
+NUMBER_COLUMNS = 3
+# Sheets with fewer rows below the header are extracted serially
+SHARD_MIN_ROWS = 100_000
+# Shards per worker, so a slow shard does not hold up the whole sheet
+SHARDS_PER_WORKER = 2
+DECODE_BLOCK_ROWS = 4096
+
+
+def is_procedure_text(text):
+    """Check if text looks like a procedure"""
+    if not text:
+        return False
+
+    text = text.strip()
+
+    # Check for standalone numbers that might indicate procedures (description in the next columns)
+    if re.match(r'^\d+$', text):
+        return True
+
+    if len(text) < 3:
+        return False
+
+    # Check for numbered procedures
+    if re.match(r'^\d+[\.\)]\s*.{3,}', text):
+        return True
+
+    return False
+
+
+def procedure_description(row, start_col):
+    """Extract procedure description from row"""
+    # Try to get description from the same cell if it contains procedure text
+    cell_text = str(row[start_col]).strip()
+
+    # If cell contains number and description
+    match = re.match(r'^\d+[\.\)]\s*(.+)', cell_text)
+    if match:
+        return match.group(1).strip()
+
+    # If cell only contains number, look in next columns
+    if re.match(r'^\d+$', cell_text):
+        for col_idx in range(start_col + 1, min(start_col + 5, len(row))):
+            next_cell = row[col_idx]
+            if not pd.isna(next_cell):
+                next_text = str(next_cell).strip()
+                if len(next_text) > 3:
+                    return next_text
+
+    return None
+
+
+def continuation_text(row, idx, number_col, merged):
+    """Description fragment of a continuation row, skipping cells merged from above"""
+    for col_idx in range(number_col + 1, min(number_col + 5, len(row))):
+        value = row[col_idx]
+        if pd.isna(value) or merged.continues(idx, col_idx):
+            continue
+        text = str(value).strip()
+        if text:
+            return text
+    return None
+
+
+def scan_procedures(rows, first_row, merged=None, stop_row=None):
+    """Procedures found in rows (an iterable of row tuples starting at first_row).
+
+    Rows covered by a procedure's merged number cell are continuation
+    rows: their description fragments are appended to that procedure.
+    With stop_row the scan ends at the first row at or after stop_row
+    that is not such a continuation row. Procedures are numbered in the
+    order found; texts are not interned.
+    """
+    procedures = []
+    merged = merged if merged else None
+    current = None
+
+    for idx, row in enumerate(rows, first_row):
+        # Continuation row of the procedure whose merged number cell covers it
+        if current is not None and merged.origin(idx, current['col']) == (current['row'], current['col']):
+            fragment = continuation_text(row, idx, current['col'], merged)
+            if fragment:
+                current['text'] = f"{current['text']} {fragment}"
+            continue
+        current = None
+        if stop_row is not None and idx >= stop_row:
+            break
+
+        # Look for numbered procedures in the first few columns
+        for col_idx in range(min(NUMBER_COLUMNS, len(row))):
+            cell_value = row[col_idx]
+
+            if pd.isna(cell_value):
+                continue
+
+            # Merged value copied down from a block above, not a new number
+            if merged is not None and merged.continues(idx, col_idx):
+                continue
+
+            cell_text = str(cell_value).strip()
+
+            # Check if this looks like a procedure
+            if is_procedure_text(cell_text):
+                # Get procedure description from next column or same cell
+                description = procedure_description(row, col_idx)
+
+                if description:
+                    procedures.append({
+                        'number': len(procedures) + 1,
+                        'text': description,
+                        'row': idx,
+                        'col': col_idx,
+                        'original_text': cell_text
+                    })
+                    if merged is not None and merged.origin(idx, col_idx) is not None:
+                        current = procedures[-1]
+                    break
+
+    return procedures
+
+
+def shard_scan_start(merged, row, first_row):
+    """Earliest row a shard starting at row must scan from to match the serial pass.
+
+    The serial pass carries no state into a row unless that row continues
+    a merged number cell from above, so the scan is moved up to the top of
+    any such block (repeatedly, as that row may continue another block).
+    """
+    if not merged:
+        return row
+    while row > first_row:
+        origins = [merged.origin(row, col) for col in range(NUMBER_COLUMNS)]
+        above = [origin[0] for origin in origins if origin is not None and origin[0] < row]
+        if not above:
+            break
+        row = max(first_row, min(above))
+    return row
+
+
+def shard_bounds(first_row, row_count, shards):
+    """(start, stop) row ranges splitting rows first_row..row_count-1 into shards"""
+    total = row_count - first_row
+    shards = max(1, min(shards, total))
+    edges = [first_row + total * n // shards for n in range(shards + 1)]
+    return [(edges[n], edges[n + 1]) for n in range(shards) if edges[n] < edges[n + 1]]
+
+
+class ColumnBuffers:
+    """Cell texts (str(value)) of a DataFrame in one shared-memory block.
+
+    Layout: int64 byte offsets (columns x rows+1), a uint8 null mask
+    (columns x rows), then the NUL-terminated UTF-8 texts of every column.
+    """
+
+    def __init__(self, memory, rows, columns, owner=False):
+        self.memory = memory
+        self.rows = rows
+        self.columns = columns
+        self.owner = owner
+        offsets_size = columns * (rows + 1) * 8
+        self.offsets = np.ndarray((columns, rows + 1), dtype=np.int64, buffer=memory.buf)
+        self.nulls = np.ndarray((columns, rows), dtype=np.uint8, buffer=memory.buf, offset=offsets_size)
+        self.data_start = offsets_size + columns * rows
+
+    @classmethod
+    def from_dataframe(cls, df):
+        rows, columns = df.shape
+        encoded, nulls = [], []
+        for column in df.columns:
+            values = df[column]
+            null_mask = values.isna().to_numpy()
+            if isinstance(values.dtype, pd.CategoricalDtype):
+                # Encode each category once; code -1 (null) takes the trailing empty cell
+                cells = [f"{category}\0".encode('utf-8') for category in values.cat.categories] + [b'\0']
+                encoded.append(b''.join(np.array(cells, dtype=object)[values.cat.codes.to_numpy()].tolist()))
+            else:
+                texts = ['' if null else str(value) for value, null in zip(values.to_numpy(dtype=object), null_mask)]
+                encoded.append(('\0'.join(texts) + '\0').encode('utf-8') if rows else b'')
+            nulls.append(null_mask)
+
+        offsets_size = columns * (rows + 1) * 8
+        data_size = sum(len(data) for data in encoded)
+        memory = shared_memory.SharedMemory(create=True, size=max(1, offsets_size + columns * rows + data_size))
+        buffers = cls(memory, rows, columns, owner=True)
+        position = buffers.data_start
+        for col, data in enumerate(encoded):
+            memory.buf[position:position + len(data)] = data
+            # Cell n ends at the n-th NUL of the column
+            ends = np.flatnonzero(np.frombuffer(data, dtype=np.uint8) == 0) + 1
+            buffers.offsets[col, 0] = position
+            buffers.offsets[col, 1:] = position + ends
+            buffers.nulls[col] = nulls[col]
+            position += len(data)
+        return buffers
+
+    @classmethod
+    def attach(cls, name, rows, columns):
+        return cls(shared_memory.SharedMemory(name=name), rows, columns)
+
+    @property
+    def spec(self):
+        return self.memory.name, self.rows, self.columns
+
+    def decode(self, start, stop):
+        """Row tuples of rows start..stop-1, with None for null cells"""
+        columns = []
+        for col in range(self.columns):
+            begin, end = self.offsets[col, start], self.offsets[col, stop]
+            texts = bytes(self.memory.buf[begin:end]).decode('utf-8').split('\0')[:-1]
+            for n in np.flatnonzero(self.nulls[col, start:stop]):
+                texts[n] = None
+            columns.append(texts)
+        return zip(*columns)
+
+    def iter_rows(self, start):
+        """Row tuples from start to the end of the sheet, decoded block by block"""
+        for block_start in range(start, self.rows, DECODE_BLOCK_ROWS):
+            yield from self.decode(block_start, min(block_start + DECODE_BLOCK_ROWS, self.rows))
+
+    def close(self):
+        # Views into the buffer must go before the mapping can be closed
+        self.offsets = self.nulls = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+_worker_buffers = None
+_worker_merged = None
+
+
+def _init_worker(spec, merged_ranges, max_columns):
+    global _worker_buffers, _worker_merged
+    _worker_buffers = ColumnBuffers.attach(*spec)
+    _worker_merged = MergedRangeIndex(merged_ranges, max_columns) if merged_ranges else None
+
+
+def _extract_shard(start, stop, first_row):
+    scan_start = shard_scan_start(_worker_merged, start, first_row)
+    procedures = scan_procedures(_worker_buffers.iter_rows(scan_start), scan_start, _worker_merged, stop)
+    # Procedures before the shard belong to the previous shard
+    return [proc for proc in procedures if proc['row'] >= start]
+
+
+def shard_workers(workers=None):
+    """Processes to extract with; 1 means serial.
+
+    Sharding is slower than the serial pass on a single CPU or when the
+    workers would outnumber the CPUs.
+    """
+    cpus = os.cpu_count() or 1
+    workers = workers or cpus
+    if cpus <= 1 or cpus < workers:
+        return 1
+    return workers
+
+
+def extract_sharded(df, first_row, merged=None, workers=None, shards=None):
+    """Procedures of df from first_row on, extracted by row-range shards in a process pool.
+
+    Returns the same list as scan_procedures over the whole frame, which
+    is also used directly when shard_workers() gives a single process.
+    """
+    workers = shard_workers(workers)
+    if workers <= 1:
+        return scan_procedures(df.iloc[first_row:].itertuples(index=False, name=None), first_row, merged)
+    return extract_pooled(df, first_row, merged, workers, shards)
+
+
+def extract_pooled(df, first_row, merged=None, workers=None, shards=None):
+    """extract_sharded without the serial fallback: always fans out to a process pool"""
+    workers = workers or os.cpu_count() or 1
+    bounds = shard_bounds(first_row, len(df), shards or workers * SHARDS_PER_WORKER)
+    if not bounds:
+        return []
+
+    buffers = ColumnBuffers.from_dataframe(df)
+    merged_ranges = merged.ranges if merged else []
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(bounds)), initializer=_init_worker,
+                                 initargs=(buffers.spec, merged_ranges, df.shape[1])) as pool:
+            results = list(pool.map(_extract_shard, *zip(*[(start, stop, first_row) for start, stop in bounds])))
+    finally:
+        buffers.close()
+
+    procedures = [proc for shard in results for proc in shard]
+    for number, proc in enumerate(procedures, 1):
+        proc['number'] = number
+    return procedures
@@ -0,0 +1,74 @@
+"""Fan-out of one computed form to several org units.
+
+The four output tables are built once and turned into object-dtype
+DataFrames; each org then gets a view with only the org-dependent
+columns swapped (ORG, and FORMNAME when the org has its own form-name
+prefix). DataFrame.assign under copy-on-write shares every other column
+with the base frame, so an extra org costs one column per table plus
+serialization. Copy-on-write is always on from pandas 3; on pandas 2
+org_frames enables it (mode.copy_on_write) around the assign. Older
+pandas, still allowed by requirements.txt, copies the unchanged columns,
+which costs memory but gives the same output.
+
+Org targets are written as "2100, 2200, 2300:P2-": an org code,
+optionally followed by a prefix for that org's form name.
+"""
+import contextlib
+import re
+
+import pandas as pd
+
+ORG_COLUMN = 'ORG'
+FORM_NAME_COLUMN = 'FORMNAME'
+# The option is deprecated (always on) from pandas 3 and only partial before pandas 2
+PANDAS_MAJOR = int(pd.__version__.split('.')[0])
+
+
+def parse_org_targets(text):
+    """[(org_code, form_name_prefix)] from "2100, 2200:P2-"; raises ValueError on a malformed entry"""
+    targets = []
+    for item in re.split(r'[,;\s]+', text or ''):
+        if not item:
+            continue
+        org_code, _, prefix = item.partition(':')
+        if not re.fullmatch(r'\w+', org_code):
+            raise ValueError(f"Invalid org code {org_code!r} in {item!r}")
+        if org_code in (target[0] for target in targets):
+            raise ValueError(f"Org code {org_code} is listed twice")
+        targets.append((org_code, prefix))
+    return targets
+
+
+def base_frames(tables):
+    """Object-dtype frames of the row lists, so ints and None cells are kept as they are"""
+    return {table: pd.DataFrame(rows, dtype=object) for table, rows in tables.items()}
+
+
+def org_frames(frames, org_code, form_name=None):
+    """The frames for one org; columns that do not change are shared with the base frames"""
+    swapped = {}
+    for table, frame in frames.items():
+        columns = {}
+        if ORG_COLUMN in frame.columns:
+            columns[ORG_COLUMN] = org_code
+        if form_name is not None and FORM_NAME_COLUMN in frame.columns:
+            columns[FORM_NAME_COLUMN] = form_name
+        if columns:
+            with _copy_on_write():
+                swapped[table] = frame.assign(**columns)
+        else:
+            swapped[table] = frame
+    return swapped
+
+
+def _copy_on_write():
+    if PANDAS_MAJOR == 2:
+        return pd.option_context('mode.copy_on_write', True)
+    return contextlib.nullcontext()
+
+
+def fan_out(frames, form_name, targets):
+    """Yield (org_code, org form name, frames) for every (org_code, prefix) target"""
+    for org_code, prefix in targets:
+        org_form_name = f"{prefix}{form_name}"
+        yield org_code, org_form_name, org_frames(frames, org_code, org_form_name if prefix else None)
@@ -0,0 +1,178 @@
+"""Cross-workbook fingerprint index for reusing previously generated forms.
+
+Two hashlib fingerprints identify work that was already done:
+
+- the workbook fingerprint (SHA-256 of the file bytes) catches the same
+  file submitted under another name, before any sheet is parsed;
+- the sheet fingerprint (SHA-256 of the normalized procedure list and
+  the sheet structure) catches the same tasklist in a re-saved workbook,
+  with sheets reordered, rows shifted or spacing and case changed.
+
+Each sheet fingerprint stores the procedures, LOV assignments, LOV
+database and generated FORMTEMPLATE/FORMLOV rows of the first form built
+from it. A later match reuses them and only swaps the form-specific
+fields (ORG, FORMNAME, KEYNAME prefix, form labels), so no new LOV codes
+are minted for a tasklist that was already converted, and a form built
+for another organization never keeps the first form's ORG.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import uuid
+from datetime import datetime
+
+from interning import intern_rows
+from locking import FileLock
+
+FINGERPRINT_DIR = ".pm_fingerprints"
+FINGERPRINT_VERSION = 1
+INDEX_FILE = "index.json"
+REUSED_TABLES = ('FORMTEMPLATE', 'FORMLOV')
+STANDARD_LOV_SUFFIXES = ('-YN', '-GFB')
+
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of a procedure text"""
+    return re.sub(r'\s+', ' ', str(text or '')).strip().lower()
+
+
+def sheet_fingerprint(procedures):
+    """Fingerprint of an extracted procedure list, independent of row offsets"""
+    digest = hashlib.sha256()
+    digest.update(f"v{FINGERPRINT_VERSION}|{len(procedures)}\n".encode('utf-8'))
+    for proc in procedures:
+        line = f"{proc.get('col', '')}|{normalize_text(proc.get('original_text'))}|{normalize_text(proc['text'])}\n"
+        digest.update(line.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def workbook_fingerprint(path, chunk_size=1024 * 1024):
+    """SHA-256 of the workbook file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _atomic_write(path, data):
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+
+class FingerprintIndex:
+    """Directory of fingerprint entries plus a workbook -> sheet fingerprint map"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._index = None
+
+    @classmethod
+    def for_output_dir(cls, output_dir):
+        return cls(os.path.join(output_dir, FINGERPRINT_DIR))
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {'version': FINGERPRINT_VERSION, 'workbooks': {}}
+            if os.path.exists(self.index_path):
+                try:
+                    with open(self.index_path, 'r', encoding='utf-8') as f:
+                        stored = json.load(f)
+                    if stored.get('version') == FINGERPRINT_VERSION:
+                        self._index = stored
+                except (OSError, ValueError):
+                    pass
+        return self._index
+
+    def entry_path(self, fingerprint):
+        return os.path.join(self.directory, f"{fingerprint}.json.gz")
+
+    def lookup_workbook(self, workbook_hash, sheet_name):
+        """Sheet fingerprint recorded for a sheet of an identical workbook, if any"""
+        fingerprint = self.index['workbooks'].get(workbook_hash, {}).get(sheet_name)
+        if fingerprint and os.path.exists(self.entry_path(fingerprint)):
+            return fingerprint
+        return None
+
+    def load(self, fingerprint):
+        """Stored entry for a sheet fingerprint, or None"""
+        path = self.entry_path(fingerprint)
+        if not os.path.exists(path):
+            return None
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('version') == FINGERPRINT_VERSION else None
+
+    def has(self, fingerprint):
+        return os.path.exists(self.entry_path(fingerprint))
+
+    def store(self, fingerprint, entry):
+        """Save the entry for a sheet fingerprint; the first generation is kept"""
+        path = self.entry_path(fingerprint)
+        if os.path.exists(path):
+            return path
+        os.makedirs(self.directory, exist_ok=True)
+        entry = dict(entry, version=FINGERPRINT_VERSION, fingerprint=fingerprint,
+                     created=datetime.now().isoformat())
+        data = json.dumps(entry, ensure_ascii=False, default=str).encode('utf-8')
+        _atomic_write(path, gzip.compress(data, compresslevel=6))
+        return path
+
+    def map_workbook(self, workbook_hash, sheet_name, fingerprint):
+        """Remember which sheet fingerprint a sheet of this exact workbook has"""
+        # Re-read under the lock so concurrent batch workers merge rather than overwrite each other
+        with FileLock(f"{self.index_path}.lock"):
+            self._index = None
+            sheets = self.index['workbooks'].setdefault(workbook_hash, {})
+            if sheets.get(sheet_name) != fingerprint:
+                sheets[sheet_name] = fingerprint
+                _atomic_write(self.index_path, json.dumps(self.index, ensure_ascii=False).encode('utf-8'))
+
+
+def rebind_tables(entry, form_name, form_description, key_prefix, lov_prefix, org_code):
+    """Stored FORMTEMPLATE/FORMLOV rows with the form-specific fields swapped to a new form"""
+    old = entry['form']
+    tables = entry['tables']
+    # Entries stored before org_code was recorded are always rebound
+    if (old['form_name'], old['form_description'], old['key_prefix'], old['lov_prefix'], old.get('org_code')) == \
+            (form_name, form_description, key_prefix, lov_prefix, org_code):
+        return {table: intern_rows([dict(row) for row in tables[table]]) for table in REUSED_TABLES}
+
+    old_key, new_key = old['key_prefix'] + '-', key_prefix + '-'
+    standard_lovs = {old['lov_prefix'] + suffix: lov_prefix + suffix for suffix in STANDARD_LOV_SUFFIXES}
+    labels = {old['form_description']: form_description,
+              f"{old['form_name']} UPLOAD FILE": f"{form_name} UPLOAD FILE"}
+
+    def swap_key(value):
+        if isinstance(value, str) and value.startswith(old_key):
+            return new_key + value[len(old_key):]
+        return value
+
+    template = []
+    for row in tables['FORMTEMPLATE']:
+        row = dict(row)
+        row['ORG'] = org_code
+        row['FORMNAME'] = form_name
+        row['KEYNAME'] = swap_key(row['KEYNAME'])
+        row['PARENTKEY'] = swap_key(row.get('PARENTKEY'))
+        row['KEYLOV'] = standard_lovs.get(row.get('KEYLOV'), row.get('KEYLOV'))
+        row['KEYLABEL'] = labels.get(row.get('KEYLABEL'), row.get('KEYLABEL'))
+        template.append(row)
+
+    lov = []
+    for row in tables['FORMLOV']:
+        row = dict(row)
+        row['ORG'] = org_code
+        row['LOVNAME'] = standard_lovs.get(row['LOVNAME'], row['LOVNAME'])
+        lov.append(row)
+    # Rows come from JSON with one string object per cell; share them again
+    return {'FORMTEMPLATE': intern_rows(template), 'FORMLOV': intern_rows(lov)}
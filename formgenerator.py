@@ -1,47 +1,92 @@
 import pandas as pd
 import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+from tkinter import filedialog, messagebox, simpledialog, ttk
 from tkinter.scrolledtext import ScrolledText
 import os
 import re
 from datetime import datetime
 import json
 import hashlib
+import multiprocessing
 from pathlib import Path
 
-class MaintenanceFormConverter:
+from core import FormConverter
+from profiling import PhaseProfiler, profiled, format_bytes, format_record
+from latency import EventLoopWatchdog, format_stall
+from snapshot import SessionSnapshot, write_snapshot, is_snapshot, SNAPSHOT_EXTENSION
+from journal import EditJournal, orphaned_journals
+from history import ProcedureTextEdit, ProcedureInsert, ProcedureRemove
+from validation import ValidationError
+from templates import DEFAULT_TEMPLATE, load_template_specs, template_row_count
+from preview import PREVIEW_PAGE_SIZE
+from bulk import CASE_MODES, plan_lov_assignment, plan_text_changes
+from archive import ARCHIVE_FORMATS
+from fanout import parse_org_targets
+from fingerprint import FingerprintIndex, sheet_fingerprint
+from similarity import DEFAULT_THRESHOLD, ProcedureHistory, session_clusters
+from interning import intern_text
+
+# Members listed per near-duplicate cluster; the cluster count shows the full size
+MAX_CLUSTER_MEMBERS_SHOWN = 50
+# Pause in typing before the mapping/LOV rows are filtered
+SEARCH_DELAY_MS = 150
+# Changed procedures listed in the bulk edit diff; the count always covers all of them
+BULK_PREVIEW_ROWS = 1000
+
+class MaintenanceFormConverter(FormConverter):
     def __init__(self, root):
         self.root = root
         self.root.title("Maintenance Form Converter v1.0 - Semi Automated")
         self.root.geometry("1400x900")
         
-        # Core variables
-        self.source_file = None
-        self.selected_sheet = None
-        self.raw_dataframe = None
-        self.procedures = []
-        self.form_config = {
-            'form_name': '',
-            'form_description': '',
-            'user_name': 'MK.ABDULLAH.DAFA',
-            'org_code': '2100'
-        }
-        
-        # LOV tracking
-        self.lov_database = {}
-        self.lov_counter = 1
+        self.init_core_state()
+        self.profiler = PhaseProfiler()
         
         # Output settings
         self.output_dir = tk.StringVar(value=os.getcwd())
+        self.global_lov_registry = self.load_global_lov_registry()
+        
+        # Mapping/LOV search boxes by view (see create_search_row)
+        self.search_vars = {}
+        self.search_status = {}
+        self.search_after_id = None
         
         self.create_interface()
+        self.profiler.add_listener(self.on_phase_finished)
+        self.root.bind_all('<Control-z>', self.undo_edit)
+        self.root.bind_all('<Control-y>', self.redo_edit)
+        self.root.bind_all('<Control-Shift-Z>', self.redo_edit)
         self.load_lov_patterns()
+        try:
+            load_template_specs()
+        except (OSError, ValueError) as e:
+            messagebox.showwarning("Template Specs", f"Could not load template_specs.json: {str(e)}")
+        
+        # Autosave every edit to an append-only journal
+        self.start_autosave()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Record the handlers that block the event loop
+        self.watchdog = EventLoopWatchdog(self.root, phase_source=self.profiler.current_phase)
+        self.watchdog.add_listener(self.on_ui_stall)
+        self.watchdog.start()
+    
+    def report_status(self, text):
+        self.status_bar.config(text=text)
+    
+    def call_when_idle(self, callback):
+        self.root.after_idle(callback)
+    
+    def refresh_views(self):
+        self.on_tab_changed()
     
     def create_interface(self):
         """Create the main interface"""
         # Create notebook for tabs
         notebook = ttk.Notebook(self.root)
         notebook.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        notebook.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.notebook = notebook
         
         # Tab 1: File Selection & Analysis
         self.create_analysis_tab(notebook)
@@ -58,6 +103,212 @@ class MaintenanceFormConverter:
         # Status bar
         self.status_bar = ttk.Label(self.root, text="Ready - Select Excel file to begin", relief=tk.SUNKEN)
         self.status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        
+        # Collapsible performance panel above the status bar
+        self.create_performance_panel()
+    
+    def create_performance_panel(self):
+        """Create collapsible panel listing per-phase timings"""
+        perf_frame = ttk.Frame(self.root)
+        perf_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10)
+        
+        toggle_row = ttk.Frame(perf_frame)
+        toggle_row.pack(fill=tk.X)
+        
+        self.perf_toggle_button = ttk.Button(toggle_row, text="▸ Performance", command=self.toggle_performance_panel)
+        self.perf_toggle_button.pack(side=tk.LEFT)
+        
+        self.profile_capture_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toggle_row, text="Capture cProfile + allocations", variable=self.profile_capture_var,
+                       command=self.toggle_profile_capture).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(toggle_row, text="Clear", command=self.clear_performance_records).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(toggle_row, text="Save Stall Report...", command=self.save_stall_report).pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.perf_body = ttk.Frame(perf_frame)
+        
+        columns = ('phase', 'wall', 'cpu', 'peak', 'finished')
+        self.perf_tree = ttk.Treeview(self.perf_body, columns=columns, show='headings', height=8)
+        for column, heading, width in [('phase', 'Phase', 320), ('wall', 'Wall (ms)', 100),
+                                       ('cpu', 'CPU (ms)', 100), ('peak', 'Alloc Peak', 110),
+                                       ('finished', 'Finished', 160)]:
+            self.perf_tree.heading(column, text=heading)
+            self.perf_tree.column(column, width=width, anchor=tk.W if column == 'phase' else tk.E)
+        
+        perf_scrollbar = ttk.Scrollbar(self.perf_body, orient="vertical", command=self.perf_tree.yview)
+        self.perf_tree.configure(yscrollcommand=perf_scrollbar.set)
+        self.perf_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        perf_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Worst event-loop stalls, longest first; double-click shows the stack
+        columns = ('lag', 'handler', 'phase', 'finished')
+        self.stall_tree = ttk.Treeview(self.perf_body, columns=columns, show='headings', height=8)
+        for column, heading, width in [('lag', 'Stall (ms)', 90), ('handler', 'Handler', 300),
+                                       ('phase', 'Phase', 180), ('finished', 'Finished', 160)]:
+            self.stall_tree.heading(column, text=heading)
+            self.stall_tree.column(column, width=width, anchor=tk.E if column == 'lag' else tk.W)
+        self.stall_tree.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(10, 0))
+        self.stall_tree.bind('<Double-1>', self.show_stall_stack)
+        self.stall_records = {}
+    
+    def toggle_performance_panel(self):
+        """Show or hide the performance panel"""
+        if self.perf_body.winfo_ismapped():
+            self.perf_body.pack_forget()
+            self.perf_toggle_button.config(text="▸ Performance")
+        else:
+            self.perf_body.pack(fill=tk.X, pady=(5, 5))
+            self.perf_toggle_button.config(text="▾ Performance")
+    
+    def toggle_profile_capture(self):
+        """Enable or disable cProfile capture for this session"""
+        if self.profile_capture_var.get():
+            capture_dir = self.profiler.enable_capture(self.output_dir.get())
+            self.status_bar.config(text=f"cProfile and allocation capture enabled - writing .prof files to {capture_dir}")
+        else:
+            self.profiler.disable_capture()
+            self.status_bar.config(text="cProfile and allocation capture disabled")
+    
+    def clear_performance_records(self):
+        """Clear recorded phase timings"""
+        self.profiler.clear()
+        self.perf_tree.delete(*self.perf_tree.get_children())
+        self.watchdog.clear()
+        self.show_stalls()
+    
+    def on_phase_finished(self, record):
+        """Show a finished phase in the performance panel and status bar"""
+        indent = "    " * record['depth']
+        self.perf_tree.insert('', 0, values=(
+            f"{indent}{record['phase']}",
+            f"{record['wall_seconds'] * 1000:.1f}",
+            f"{record['cpu_seconds'] * 1000:.1f}",
+            format_bytes(record['peak_bytes']),
+            record['finished_at']
+        ))
+        
+        # Only top-level phases update the status bar
+        if record['depth'] == 0:
+            status = self.status_bar.cget('text').split(' | ⏱ ')[0]
+            self.status_bar.config(text=f"{status} | ⏱ {format_record(record)}")
+    
+    def on_ui_stall(self, record):
+        """Refresh the stall list and report the stall in the status bar"""
+        self.show_stalls()
+        status = self.status_bar.cget('text').split(' | ⚠ ')[0]
+        self.status_bar.config(text=f"{status} | ⚠ {format_stall(record)}")
+    
+    def show_stalls(self):
+        """List the worst recorded stalls"""
+        self.stall_tree.delete(*self.stall_tree.get_children())
+        self.stall_records = {}
+        for record in self.watchdog.worst():
+            item = self.stall_tree.insert('', tk.END, values=(
+                f"{record['lag_ms']:.0f}",
+                record['handler'] or "(startup)",
+                record['phase'] or "",
+                record['finished_at']
+            ))
+            self.stall_records[item] = record
+    
+    def show_stall_stack(self, event=None):
+        """Show the main-thread stack captured for the selected stall"""
+        record = self.stall_records.get(self.stall_tree.focus())
+        if record is None:
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title(f"UI Stall - {record['lag_ms']:.0f} ms")
+        window.geometry("900x500")
+        
+        text = ScrolledText(window, wrap=tk.NONE, font=('Consolas', 9))
+        text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        text.insert(tk.END, f"{format_stall(record)}\n{record['samples']} stack samples\n\nHottest frames:\n")
+        for hot in record['hot_frames']:
+            text.insert(tk.END, f"  {hot['samples']:>4}  {hot['frame']}\n")
+        text.insert(tk.END, "\nStack when the stall crossed the threshold:\n")
+        text.insert(tk.END, "".join(record['stack']) or "  (no sample taken)\n")
+        text.config(state=tk.DISABLED)
+    
+    def save_stall_report(self):
+        """Write the worst stalls and their stacks to a JSON file"""
+        save_path = filedialog.asksaveasfilename(
+            title="Save Stall Report", defaultextension=".json",
+            initialfile=f"ui_stalls_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+            filetypes=[("JSON files", "*.json")]
+        )
+        if not save_path:
+            return
+        
+        try:
+            self.watchdog.write_report(save_path)
+            self.status_bar.config(text=f"Stall report saved - {self.watchdog.stall_count} stalls, "
+                                        f"worst {self.watchdog.max_lag * 1000:.0f} ms")
+        except OSError as e:
+            messagebox.showerror("Save Error", f"Failed to save stall report: {str(e)}")
+    
+    def start_autosave(self):
+        """Offer recovery of a crashed session, then start journaling edits.
+        
+        Only sessions of instances that are no longer running are offered
+        (see orphaned_journals); the journals of other open windows are left alone.
+        """
+        try:
+            journal = None
+            for orphan in orphaned_journals():
+                if journal is not None:
+                    # Another crashed session stays on disk for the next start
+                    orphan.release()
+                elif orphan.has_recoverable_session() and messagebox.askyesno(
+                        "Recover Session", "A previous session did not close cleanly.\n\n"
+                                           "Recover the unsaved procedures and LOV configuration?"):
+                    state = orphan.recover()
+                    self.restore_session(state['form_config'], state['procedures'], state['lov_database'],
+                                         state['lov_configurations'], state['source_file'], state['selected_sheet'])
+                    self.status_bar.config(text=f"Recovered session - {len(self.procedures)} procedures")
+                    
+                    orphan.open()
+                    journal = self.journal = orphan
+                    self.compact_journal()
+                else:
+                    orphan.discard()
+            
+            if journal is None:
+                journal = EditJournal.create()
+                journal.open()
+                self.journal = journal
+        except Exception as e:
+            self.journal = None
+            messagebox.showwarning("Autosave Disabled", f"Autosave could not be started: {str(e)}")
+        
+        for field, var in [('form_name', self.form_name_var), ('form_description', self.form_desc_var),
+                           ('user_name', self.user_name_var)]:
+            var.trace('w', lambda name, index, mode, field=field, var=var:
+                      self.record_edit('form_config', field=field, value=var.get()))
+    
+    def on_close(self):
+        """Discard autosave files on a clean exit"""
+        self.watchdog.stop()
+        if self.journal is not None:
+            self.journal.close(discard=True)
+        self.root.destroy()
+    
+    def on_tab_changed(self, event=None):
+        """Rebuild a stale mapping/LOV view when its tab is shown"""
+        tab_text = self.notebook.tab(self.notebook.select(), 'text')
+        
+        if tab_text.startswith("2.") and 'mapping' in self.stale_views:
+            self.stale_views.discard('mapping')
+            self.populate_procedure_mapping()
+        elif tab_text.startswith("3.") and 'lov' in self.stale_views:
+            self.stale_views.discard('lov')
+            self.setup_lov_configuration()
+            if self.pending_lov_configurations is not None:
+                self.restore_lov_configurations(self.pending_lov_configurations)
+                self.pending_lov_configurations = None
+                self.compact_journal()
+        elif tab_text.startswith("4.") and self.procedures:
+            self.update_summary_display()
+            self.refresh_output_preview()
     
     def create_analysis_tab(self, notebook):
         """Create file analysis tab"""
@@ -123,6 +374,7 @@ class MaintenanceFormConverter:
         # Instructions
         ttk.Label(mapping_frame, text="Review and modify detected procedures:", 
                  font=('TkDefaultFont', 10, 'bold')).pack(anchor=tk.W, pady=(0, 10))
+        self.create_search_row(mapping_frame, 'mapping')
         
         # Procedure list with editing capabilities
         self.procedure_frame = ttk.Frame(mapping_frame)
@@ -134,7 +386,13 @@ class MaintenanceFormConverter:
         
         ttk.Button(control_frame, text="Add Procedure", command=self.add_procedure).pack(side=tk.LEFT)
         ttk.Button(control_frame, text="Remove Selected", command=self.remove_procedure).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(control_frame, text="Find Near-Duplicates",
+                  command=self.show_duplicate_clusters).pack(side=tk.LEFT, padx=(10, 0))
         ttk.Button(control_frame, text="Auto-detect from Raw", command=self.auto_detect_procedures).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(control_frame, text="Bulk Edit...",
+                  command=lambda: self.show_bulk_edit('mapping')).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(control_frame, text="Undo", command=self.undo_edit).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(control_frame, text="Redo", command=self.redo_edit).pack(side=tk.LEFT, padx=(5, 0))
         ttk.Button(control_frame, text="Proceed to LOV Config", command=self.proceed_to_lov).pack(side=tk.RIGHT)
     
     def create_lov_tab(self, notebook):
@@ -152,6 +410,7 @@ class MaintenanceFormConverter:
                  foreground="blue").pack(anchor=tk.W)
         ttk.Label(instruction_frame, text="• LOV codes will be auto-generated based on content", 
                  foreground="blue").pack(anchor=tk.W)
+        self.create_search_row(lov_frame, 'lov')
         
         # LOV configuration area
         self.lov_config_frame = ttk.Frame(lov_frame)
@@ -165,9 +424,77 @@ class MaintenanceFormConverter:
                   command=self.auto_configure_lovs).pack(side=tk.LEFT)
         ttk.Button(lov_control_frame, text="Clear All", 
                   command=self.clear_all_lovs).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(lov_control_frame, text="Bulk Edit...",
+                  command=lambda: self.show_bulk_edit('lov')).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(lov_control_frame, text="Undo", command=self.undo_edit).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(lov_control_frame, text="Redo", command=self.redo_edit).pack(side=tk.LEFT, padx=(5, 0))
         ttk.Button(lov_control_frame, text="Generate Preview", 
                   command=self.generate_preview).pack(side=tk.RIGHT)
     
+    def create_search_row(self, parent, view):
+        """Search box that hides the mapping/LOV rows not matching the query"""
+        search_frame = ttk.Frame(parent)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT)
+        search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=search_var, width=40).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(search_frame, text="Clear", command=lambda: search_var.set('')).pack(side=tk.LEFT, padx=(5, 0))
+        status_label = ttk.Label(search_frame, text="", foreground="gray")
+        status_label.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.search_vars[view] = search_var
+        self.search_status[view] = status_label
+        search_var.trace('w', lambda name, index, mode: self.schedule_search())
+    
+    def schedule_search(self):
+        # Lookups take microseconds; the delay only batches the row re-packing while typing
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DELAY_MS, self.apply_search_filters)
+    
+    def apply_search_filters(self):
+        self.search_after_id = None
+        for view in self.search_vars:
+            self.apply_row_filter(view)
+    
+    def apply_row_filter(self, view):
+        """Show only the rows of a mapping/LOV view that match its search box, keeping their order"""
+        if view not in self.search_vars:
+            return
+        if view == 'mapping':
+            if not self.mapping_rows_live():
+                return
+            rows, rows_frame = self.procedure_rows, self.procedure_rows_frame
+        else:
+            if 'lov' in self.stale_views or self.lov_rows_frame is None:
+                return
+            rows, rows_frame = self.lov_vars, self.lov_rows_frame
+        
+        query = self.search_vars[view].get()
+        matches = self.search_procedures(query)
+        wanted = None if matches is None else set(matches)
+        
+        # Only rows whose visibility changes are touched; shown rows go after the previous shown row
+        previous = None
+        for i, row in enumerate(rows):
+            show = wanted is None or i in wanted
+            if show == row.get('hidden', False):
+                if show:
+                    if previous is not None:
+                        row['frame'].pack(fill=tk.X, pady=2, after=previous)
+                    else:
+                        packed = rows_frame.pack_slaves()
+                        row['frame'].pack(fill=tk.X, pady=2, before=packed[0] if packed else None)
+                else:
+                    row['frame'].pack_forget()
+                row['hidden'] = not show
+            if show:
+                previous = row['frame']
+        
+        shown = len(rows) if wanted is None else len(wanted)
+        self.search_status[view].config(text=f"{shown} of {len(rows)} shown" if query.strip() else "")
+    
     def create_output_tab(self, notebook):
         """Create output generation tab"""
         output_frame = ttk.Frame(notebook)
@@ -184,13 +511,50 @@ class MaintenanceFormConverter:
         ttk.Entry(dir_row, textvariable=self.output_dir, width=60).pack(side=tk.LEFT, padx=(10, 10))
         ttk.Button(dir_row, text="Browse", command=self.select_output_dir).pack(side=tk.LEFT)
         
+        # Incremental generation against the previous generation of this form
+        delta_row = ttk.Frame(dir_frame)
+        delta_row.pack(fill=tk.X, pady=(10, 0))
+        
+        self.incremental_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(delta_row, text="Incremental (only changed rows since last generation)",
+                       variable=self.incremental_var).pack(side=tk.LEFT)
+        self.delta_format_var = tk.StringVar(value='xlsx')
+        ttk.Radiobutton(delta_row, text="Delta workbooks", variable=self.delta_format_var,
+                       value='xlsx').pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Radiobutton(delta_row, text="SQL statements", variable=self.delta_format_var,
+                       value='sql').pack(side=tk.LEFT, padx=(10, 0))
+        
+        # One archive with all four tables and a checksum manifest instead of loose files
+        archive_row = ttk.Frame(dir_frame)
+        archive_row.pack(fill=tk.X, pady=(10, 0))
+        
+        self.archive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(archive_row, text="Single archive (all tables, manifest with SHA-256)",
+                       variable=self.archive_var).pack(side=tk.LEFT)
+        self.archive_format_var = tk.StringVar(value='zip')
+        for archive_format in ARCHIVE_FORMATS:
+            ttk.Radiobutton(archive_row, text=archive_format, variable=self.archive_format_var,
+                           value=archive_format).pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Same form for several org units; empty writes the form for the default org only
+        org_row = ttk.Frame(dir_frame)
+        org_row.pack(fill=tk.X, pady=(10, 0))
+        
+        ttk.Label(org_row, text="Org codes (fan-out):").pack(side=tk.LEFT)
+        self.org_codes_var = tk.StringVar()
+        ttk.Entry(org_row, textvariable=self.org_codes_var, width=40).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Label(org_row, text="e.g. 2100, 2200, 2300:P3-  (ORG[:form name prefix])",
+                 foreground="gray").pack(side=tk.LEFT, padx=(10, 0))
+        
         # Generation summary
         summary_frame = ttk.LabelFrame(output_frame, text="Generation Summary", padding=10)
         summary_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
         
-        self.summary_text = ScrolledText(summary_frame, height=15, font=('Consolas', 9))
+        self.summary_text = ScrolledText(summary_frame, height=8, font=('Consolas', 9))
         self.summary_text.pack(fill=tk.BOTH, expand=True)
         
+        self.create_output_preview(output_frame)
+        
         # Generation controls
         gen_frame = ttk.Frame(output_frame)
         gen_frame.pack(fill=tk.X)
@@ -203,6 +567,62 @@ class MaintenanceFormConverter:
         ttk.Button(gen_frame, text="Load Configuration", 
                   command=self.load_configuration).pack(side=tk.LEFT, padx=(10, 0))
     
+    def create_output_preview(self, output_frame):
+        """Paged table of the FORMTEMPLATE/FORMLOV rows that will be written"""
+        preview_frame = ttk.LabelFrame(output_frame, text="Output Preview", padding=10)
+        preview_frame.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        
+        filter_row = ttk.Frame(preview_frame)
+        filter_row.pack(fill=tk.X, pady=(0, 5))
+        
+        ttk.Label(filter_row, text="Table:").pack(side=tk.LEFT)
+        self.preview_table_var = tk.StringVar(value='FORMTEMPLATE')
+        table_combo = ttk.Combobox(filter_row, textvariable=self.preview_table_var, state='readonly', width=14,
+                                   values=['FORMTEMPLATE', 'FORMLOV'])
+        table_combo.pack(side=tk.LEFT, padx=(5, 15))
+        table_combo.bind('<<ComboboxSelected>>', lambda e: self.apply_preview_filter())
+        
+        ttk.Label(filter_row, text="KEYTYPE:").pack(side=tk.LEFT)
+        self.preview_keytype_var = tk.StringVar(value='All')
+        self.preview_keytype_combo = ttk.Combobox(filter_row, textvariable=self.preview_keytype_var,
+                                                  state='readonly', width=12, values=['All'])
+        self.preview_keytype_combo.pack(side=tk.LEFT, padx=(5, 15))
+        self.preview_keytype_combo.bind('<<ComboboxSelected>>', lambda e: self.apply_preview_filter())
+        
+        ttk.Label(filter_row, text="Procedure (number or text):").pack(side=tk.LEFT)
+        self.preview_procedure_var = tk.StringVar()
+        procedure_entry = ttk.Entry(filter_row, textvariable=self.preview_procedure_var, width=25)
+        procedure_entry.pack(side=tk.LEFT, padx=(5, 5))
+        procedure_entry.bind('<Return>', lambda e: self.apply_preview_filter())
+        ttk.Button(filter_row, text="Filter", command=self.apply_preview_filter).pack(side=tk.LEFT)
+        ttk.Button(filter_row, text="Refresh", command=self.refresh_output_preview).pack(side=tk.LEFT, padx=(5, 0))
+        
+        table_row = ttk.Frame(preview_frame)
+        table_row.pack(fill=tk.BOTH, expand=True)
+        self.preview_tree = ttk.Treeview(table_row, show='headings', height=12)
+        preview_yscroll = ttk.Scrollbar(table_row, orient="vertical", command=self.preview_tree.yview)
+        preview_xscroll = ttk.Scrollbar(preview_frame, orient="horizontal", command=self.preview_tree.xview)
+        self.preview_tree.configure(yscrollcommand=preview_yscroll.set, xscrollcommand=preview_xscroll.set)
+        self.preview_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        preview_yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        preview_xscroll.pack(fill=tk.X)
+        
+        page_row = ttk.Frame(preview_frame)
+        page_row.pack(fill=tk.X, pady=(5, 0))
+        ttk.Button(page_row, text="◀◀", width=4, command=lambda: self.show_preview_page(0)).pack(side=tk.LEFT)
+        ttk.Button(page_row, text="◀", width=4,
+                  command=lambda: self.show_preview_page(self.preview_page - 1)).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(page_row, text="▶", width=4,
+                  command=lambda: self.show_preview_page(self.preview_page + 1)).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(page_row, text="▶▶", width=4,
+                  command=lambda: self.show_preview_page(self.current_preview().page_count() - 1)
+                  if self.current_preview() else None).pack(side=tk.LEFT, padx=(5, 0))
+        self.preview_page_label = ttk.Label(page_row, text="No preview yet")
+        self.preview_page_label.pack(side=tk.LEFT, padx=(15, 0))
+        
+        self.output_previews = {}
+        self.preview_page = 0
+    
     def select_file(self):
         """Select Excel source file"""
         file_path = filedialog.askopenfilename(
@@ -223,9 +643,7 @@ class MaintenanceFormConverter:
             self.sheet_combo['values'] = excel_file.sheet_names
             
             # Auto-select likely maintenance sheet
-            likely_sheets = [sheet for sheet in excel_file.sheet_names 
-                           if any(keyword in sheet.lower() for keyword in 
-                                ['mech', 'mechanical', 'tasklist', 'maintenance', 'engine'])]
+            likely_sheets = self.find_likely_sheets(excel_file.sheet_names)
             
             if likely_sheets:
                 self.sheet_combo.set(likely_sheets[0])
@@ -257,21 +675,7 @@ class MaintenanceFormConverter:
             form_desc = self.generate_form_description(selected_sheet)
             self.form_desc_var.set(form_desc)
     
-    def generate_form_name(self, sheet_name):
-        """Generate form name based on sheet name"""
-        # Extract meaningful parts
-        clean_name = re.sub(r'[^\w\s-]', '', sheet_name)
-        clean_name = re.sub(r'\s+', '-', clean_name.strip())
-        
-        # Add timestamp for uniqueness
-        timestamp = datetime.now().strftime("%Y%m%d")
-        
-        return f"YKN-CPP2-G-603-{clean_name}-{timestamp}".upper()
-    
-    def generate_form_description(self, sheet_name):
-        """Generate form description based on sheet name"""
-        return sheet_name.upper()
-    
+    @profiled()
     def analyze_sheet(self):
         """Analyze selected sheet for procedures"""
         if not self.source_file or not self.sheet_combo.get():
@@ -283,15 +687,22 @@ class MaintenanceFormConverter:
         try:
             self.status_bar.config(text="Analyzing sheet structure...")
             
-            # Read sheet data
-            self.raw_dataframe = pd.read_excel(self.source_file, sheet_name=self.selected_sheet, header=None)
+            # Read only the columns procedure extraction needs
+            self.read_sheet(self.source_file, self.selected_sheet)
             
             # Detect structure and extract procedures
             header_row = self.detect_header_row()
             self.procedures = self.extract_procedures(header_row)
+            self.sheet_fingerprint = sheet_fingerprint(self.procedures)
+            self.fingerprint_match = None
+            self.procedures_replaced()
+            self.release_raw_dataframe()
+            self.record_edit('session_source', source_file=self.source_file, selected_sheet=self.selected_sheet)
+            self.record_edit('procedures_set', procedures=self.procedures)
             
             # Display analysis results
             self.display_analysis_results(header_row)
+            self.offer_fingerprint_reuse()
             
             self.status_bar.config(text=f"Analysis complete - Found {len(self.procedures)} procedures")
             
@@ -299,98 +710,6 @@ class MaintenanceFormConverter:
             messagebox.showerror("Analysis Error", f"Failed to analyze sheet: {str(e)}")
             self.status_bar.config(text="Analysis failed")
     
-    def detect_header_row(self):
-        """Detect header row in the sheet"""
-        keywords = ['no', 'procedure', 'condition', 'action', 'remarks']
-        
-        for idx, row in self.raw_dataframe.iterrows():
-            row_text = ' '.join([str(cell).lower() for cell in row if not pd.isna(cell)])
-            
-            # Count keyword matches
-            matches = sum(1 for keyword in keywords if keyword in row_text)
-            
-            if matches >= 3:  # Found likely header row
-                return idx
-        
-        return None
-    
-    def extract_procedures(self, header_row):
-        """Extract procedures from the sheet"""
-        procedures = []
-        
-        if header_row is None:
-            return procedures
-        
-        # Start looking for procedures after header row
-        start_row = header_row + 1
-        
-        for idx in range(start_row, len(self.raw_dataframe)):
-            row = self.raw_dataframe.iloc[idx]
-            
-            # Look for numbered procedures in the first few columns
-            for col_idx in range(min(3, len(row))):
-                cell_value = row.iloc[col_idx]
-                
-                if pd.isna(cell_value):
-                    continue
-                
-                cell_text = str(cell_value).strip()
-                
-                # Check if this looks like a procedure
-                if self.is_procedure_text(cell_text):
-                    # Get procedure description from next column or same cell
-                    description = self.extract_procedure_description(row, col_idx)
-                    
-                    if description:
-                        procedures.append({
-                            'number': len(procedures) + 1,
-                            'text': description,
-                            'row': idx,
-                            'col': col_idx,
-                            'original_text': cell_text
-                        })
-                        break
-        
-        return procedures
-    
-    def is_procedure_text(self, text):
-        """Check if text looks like a procedure"""
-        if not text or len(text.strip()) < 3:
-            return False
-        
-        text = text.strip()
-        
-        # Check for numbered procedures
-        if re.match(r'^\d+[\.\)]\s*.{3,}', text):
-            return True
-        
-        # Check for standalone numbers that might indicate procedures
-        if re.match(r'^\d+$', text):
-            return True
-        
-        return False
-    
-    def extract_procedure_description(self, row, start_col):
-        """Extract procedure description from row"""
-        # Try to get description from the same cell if it contains procedure text
-        cell_text = str(row.iloc[start_col]).strip()
-        
-        # If cell contains number and description
-        match = re.match(r'^\d+[\.\)]\s*(.+)', cell_text)
-        if match:
-            return match.group(1).strip()
-        
-        # If cell only contains number, look in next columns
-        if re.match(r'^\d+$', cell_text):
-            for col_idx in range(start_col + 1, min(start_col + 5, len(row))):
-                next_cell = row.iloc[col_idx]
-                if not pd.isna(next_cell):
-                    next_text = str(next_cell).strip()
-                    if len(next_text) > 3:
-                        return next_text
-        
-        return None
-    
     def display_analysis_results(self, header_row):
         """Display analysis results"""
         self.analysis_text.delete(1.0, tk.END)
@@ -400,7 +719,7 @@ class MaintenanceFormConverter:
         
         self.analysis_text.insert(tk.END, f"📁 File: {os.path.basename(self.source_file)}\n")
         self.analysis_text.insert(tk.END, f"📄 Sheet: {self.selected_sheet}\n")
-        self.analysis_text.insert(tk.END, f"📊 Sheet size: {len(self.raw_dataframe)} rows x {len(self.raw_dataframe.columns)} columns\n")
+        self.analysis_text.insert(tk.END, f"📊 Sheet size: {self.sheet_shape[0]} rows x {self.sheet_shape[1]} columns\n")
         
         if header_row is not None:
             self.analysis_text.insert(tk.END, f"📋 Header row detected: Row {header_row + 1}\n")
@@ -452,59 +771,324 @@ class MaintenanceFormConverter:
         canvas.configure(yscrollcommand=scrollbar.set)
         
         # Populate procedures
+        self.procedure_rows_frame = scrollable_frame
+        self.procedure_rows = []
         self.procedure_vars = []
         for i, proc in enumerate(self.procedures):
-            proc_frame = ttk.Frame(scrollable_frame)
-            proc_frame.pack(fill=tk.X, pady=2)
-            
-            # Number
-            ttk.Label(proc_frame, text=str(proc['number']), width=5).pack(side=tk.LEFT)
-            
-            # Editable procedure text
-            proc_var = tk.StringVar(value=proc['text'])
-            proc_entry = ttk.Entry(proc_frame, textvariable=proc_var, width=60)
-            proc_entry.pack(side=tk.LEFT, padx=(10, 0))
-            
-            self.procedure_vars.append(proc_var)
-            
-            # Delete button
-            ttk.Button(proc_frame, text="Delete", 
-                      command=lambda idx=i: self.delete_procedure(idx)).pack(side=tk.LEFT, padx=(10, 0))
+            row = self.create_procedure_row(proc, i)
+            self.procedure_rows.append(row)
+            self.procedure_vars.append(row['var'])
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
+        self.apply_row_filter('mapping')
+    
+    def create_procedure_row(self, proc, index, before=None):
+        """One mapping row; callbacks read row['index'] so rows can shift without being rebuilt"""
+        proc_frame = ttk.Frame(self.procedure_rows_frame)
+        proc_frame.pack(fill=tk.X, pady=2, before=before)
+        
+        # Number
+        number_label = ttk.Label(proc_frame, text=str(proc['number']), width=5)
+        number_label.pack(side=tk.LEFT)
+        
+        # Editable procedure text
+        proc_var = tk.StringVar(value=proc['text'])
+        proc_entry = ttk.Entry(proc_frame, textvariable=proc_var, width=60)
+        proc_entry.pack(side=tk.LEFT, padx=(10, 0))
+        proc_entry.bind('<FocusOut>', lambda e: self.undo_history.seal())
+        
+        row = {'frame': proc_frame, 'number_label': number_label, 'var': proc_var, 'index': index,
+               'text': proc['text']}
+        proc_var.trace('w', lambda name, i, mode, row=row: self.on_procedure_text_changed(row))
+        
+        # Delete button
+        ttk.Button(proc_frame, text="Delete", 
+                  command=lambda row=row: self.delete_procedure(row['index'])).pack(side=tk.LEFT, padx=(10, 0))
+        return row
+    
+    def on_procedure_text_changed(self, row):
+        """Journal an edited procedure text and record it for undo"""
+        if self.applying_bulk_edit:
+            return
+        text = row['var'].get()
+        self.record_edit('procedure_text', index=row['index'], text=text)
+        self.undo_history.push(ProcedureTextEdit(row['index'], row['text'], text))
+        self.search_index.update(row['index'], text=text)
+        row['text'] = text
     
     def add_procedure(self):
         """Add new procedure manually"""
         new_text = simpledialog.askstring("Add Procedure", "Enter procedure description:")
         if new_text:
-            self.procedures.append({
+            new_text = intern_text(new_text.strip())
+            procedure = {
                 'number': len(self.procedures) + 1,
-                'text': new_text.strip(),
+                'text': new_text,
                 'row': -1,  # Manual entry
                 'col': -1,
-                'original_text': new_text.strip()
-            })
-            self.populate_procedure_mapping()
+                'original_text': new_text
+            }
+            index = len(self.procedures)
+            self.insert_procedure_at(index, procedure)
+            self.undo_history.push(ProcedureInsert(index, procedure))
     
     def delete_procedure(self, index):
         """Delete procedure by index"""
         if 0 <= index < len(self.procedures):
-            del self.procedures[index]
-            # Renumber remaining procedures
-            for i, proc in enumerate(self.procedures):
-                proc['number'] = i + 1
-            self.populate_procedure_mapping()
+            procedure, lov_configuration = self.remove_procedure_at(index)
+            self.undo_history.push(ProcedureRemove(index, procedure, lov_configuration))
+    
+    def undo_edit(self, event=None):
+        """Revert the last procedure or LOV edit"""
+        label = self.undo_history.undo(self)
+        self.status_bar.config(text=f"Undid {label}" if label else "Nothing to undo")
+    
+    def redo_edit(self, event=None):
+        """Re-apply the last undone edit"""
+        label = self.undo_history.redo(self)
+        self.status_bar.config(text=f"Redid {label}" if label else "Nothing to redo")
     
     def remove_procedure(self):
         """Remove selected procedure (placeholder for now)"""
         messagebox.showinfo("Remove Procedure", "Select a procedure and click Delete button next to it")
     
+    def show_duplicate_clusters(self):
+        """Window listing near-duplicate procedures with merge and shared-LOV actions"""
+        if not self.procedures:
+            messagebox.showwarning("No Procedures", "Please analyze a sheet first")
+            return
+        
+        window = tk.Toplevel(self.root)
+        window.title("Near-Duplicate Procedures")
+        window.geometry("1000x600")
+        
+        options_row = ttk.Frame(window, padding=10)
+        options_row.pack(fill=tk.X)
+        ttk.Label(options_row, text="Similarity at least:").pack(side=tk.LEFT)
+        threshold_var = tk.DoubleVar(value=DEFAULT_THRESHOLD)
+        ttk.Spinbox(options_row, from_=0.3, to=1.0, increment=0.05, textvariable=threshold_var,
+                   width=6).pack(side=tk.LEFT, padx=(5, 0))
+        history_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(options_row, text="Include previously generated forms",
+                       variable=history_var).pack(side=tk.LEFT, padx=(10, 0))
+        
+        columns = ('source', 'text', 'lov')
+        tree = ttk.Treeview(window, columns=columns, show='tree headings')
+        tree.heading('#0', text="Cluster")
+        tree.column('#0', width=120)
+        for column, heading, width in [('source', 'Source', 260), ('text', 'Procedure', 420),
+                                       ('lov', 'LOV Codes', 200)]:
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        members_by_item = {}
+        history = {}
+        
+        def refresh():
+            self.sync_procedure_texts()
+            if history_var.get() and 'loaded' not in history:
+                history['loaded'] = ProcedureHistory.for_output_dir(self.output_dir.get()).load()
+            tree.delete(*tree.get_children())
+            members_by_item.clear()
+            
+            with self.phase("find_duplicates"):
+                clusters = session_clusters(self.procedures, history.get('loaded') if history_var.get() else None,
+                                            self.form_name_var.get(), threshold_var.get())
+            configs = self.collect_lov_configurations()
+            for n, members in enumerate(clusters, 1):
+                cluster_item = tree.insert('', tk.END, text=f"#{n} ({len(members)})", open=n <= 20)
+                members_by_item[cluster_item] = members
+                for member in members[:MAX_CLUSTER_MEMBERS_SHOWN]:
+                    if member['source'] == 'session':
+                        config = configs[member['index']] if member['index'] < len(configs) else {}
+                        source = f"This sheet #{member['procedure']['number']}"
+                        text = member['procedure']['text']
+                    else:
+                        config = member['entry']
+                        source = f"{member['entry']['form_name']} #{member['entry']['number']}"
+                        text = member['entry']['text']
+                    codes = " | ".join(code for code in (config.get('condition_lov_code'),
+                                                         config.get('action_lov_code')) if code)
+                    item = tree.insert(cluster_item, tk.END, values=(source, text, codes))
+                    members_by_item[item] = member
+            self.status_bar.config(text=f"Found {len(clusters)} near-duplicate clusters")
+        
+        def selected():
+            selection = tree.selection()
+            if not selection:
+                messagebox.showwarning("No Selection", "Select a cluster or one of its procedures", parent=window)
+                return None, None
+            item = selection[0]
+            cluster_item = tree.parent(item) or item
+            member = members_by_item[item] if tree.parent(item) else None
+            return members_by_item[cluster_item], member
+        
+        def merge():
+            members, _ = selected()
+            if members is None:
+                return
+            indices = [member['index'] for member in members if member['source'] == 'session']
+            if len(indices) < 2:
+                messagebox.showinfo("Merge", "This cluster has only one procedure from this sheet", parent=window)
+                return
+            self.merge_duplicate_procedures(indices)
+            refresh()
+        
+        def share_lov():
+            members, source = selected()
+            if members is None:
+                return
+            configs = self.collect_lov_configurations()
+            if source is None:
+                # Without a selected procedure, share the first LOV assignment in the cluster
+                for member in members:
+                    config = (configs[member['index']] if member['index'] < len(configs) else {}) \
+                        if member['source'] == 'session' else member['entry']
+                    if config.get('condition_lov_code') or config.get('action_lov_code'):
+                        source = member
+                        break
+            if source is None:
+                messagebox.showinfo("Share LOV", "No procedure in this cluster has LOV codes yet", parent=window)
+                return
+            targets = [member['index'] for member in members
+                       if member['source'] == 'session' and member is not source]
+            self.share_lov_assignment(targets, source)
+            refresh()
+        
+        button_row = ttk.Frame(window, padding=10)
+        button_row.pack(fill=tk.X)
+        ttk.Button(button_row, text="Refresh", command=refresh).pack(side=tk.LEFT)
+        ttk.Button(button_row, text="Merge Into First", command=merge).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(button_row, text="Share LOV of Selected", command=share_lov).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(button_row, text="Close", command=window.destroy).pack(side=tk.RIGHT)
+        
+        refresh()
+    
+    def show_bulk_edit(self, view):
+        """Window for find/replace, case, prefix/suffix and LOV assignment over all or the searched procedures"""
+        if not self.procedures:
+            messagebox.showwarning("No Procedures", "Please analyze a sheet first")
+            return
+        
+        operations = {
+            "Find and replace (regex)": 'replace',
+            "Change case": 'case',
+            "Add prefix": 'add_prefix',
+            "Add suffix": 'add_suffix',
+            "Remove prefix": 'remove_prefix',
+            "Remove suffix": 'remove_suffix',
+            "Assign condition values": 'condition',
+            "Assign action values": 'action',
+        }
+        
+        window = tk.Toplevel(self.root)
+        window.title("Bulk Edit Procedures")
+        window.geometry("1000x600")
+        
+        options = ttk.Frame(window, padding=10)
+        options.pack(fill=tk.X)
+        operation_var = tk.StringVar(value="Find and replace (regex)")
+        ttk.Label(options, text="Operation:").grid(row=0, column=0, sticky=tk.W)
+        ttk.Combobox(options, textvariable=operation_var, values=list(operations), state="readonly",
+                    width=28).grid(row=0, column=1, sticky=tk.W, padx=(5, 0))
+        
+        text_var = tk.StringVar()
+        replacement_var = tk.StringVar()
+        ignore_case_var = tk.BooleanVar(value=True)
+        case_var = tk.StringVar(value='sentence')
+        ttk.Label(options, text="Find / text / values:").grid(row=1, column=0, sticky=tk.W, pady=(5, 0))
+        ttk.Entry(options, textvariable=text_var, width=40).grid(row=1, column=1, sticky=tk.W, padx=(5, 0), pady=(5, 0))
+        ttk.Label(options, text="Replace with:").grid(row=1, column=2, sticky=tk.W, padx=(10, 0), pady=(5, 0))
+        ttk.Entry(options, textvariable=replacement_var, width=30).grid(row=1, column=3, sticky=tk.W, padx=(5, 0),
+                                                                      pady=(5, 0))
+        ttk.Checkbutton(options, text="Ignore case", variable=ignore_case_var).grid(row=2, column=1, sticky=tk.W)
+        ttk.Label(options, text="Case:").grid(row=2, column=2, sticky=tk.W, padx=(10, 0))
+        ttk.Combobox(options, textvariable=case_var, values=CASE_MODES, state="readonly",
+                    width=12).grid(row=2, column=3, sticky=tk.W, padx=(5, 0))
+        
+        query = self.search_vars[view].get().strip() if view in self.search_vars else ''
+        scope_var = tk.StringVar(value='search' if query else 'all')
+        ttk.Radiobutton(options, text="All procedures", variable=scope_var,
+                       value='all').grid(row=3, column=1, sticky=tk.W, pady=(5, 0))
+        ttk.Radiobutton(options, text=f"Search matches ({query or 'no search'})", variable=scope_var, value='search',
+                       state=tk.NORMAL if query else tk.DISABLED).grid(row=3, column=2, columnspan=2, sticky=tk.W,
+                                                                      pady=(5, 0))
+        
+        columns = ('number', 'before', 'after')
+        tree = ttk.Treeview(window, columns=columns, show='headings')
+        for column, heading, width in [('number', 'No.', 60), ('before', 'Before', 440), ('after', 'After', 440)]:
+            tree.heading(column, text=heading)
+            tree.column(column, width=width, anchor=tk.W)
+        tree.pack(fill=tk.BOTH, expand=True, padx=10)
+        summary_label = ttk.Label(window, text="", padding=(10, 5, 10, 0))
+        summary_label.pack(anchor=tk.W)
+        
+        def plan():
+            """(kind, changes) for the current options; kind is 'text', 'condition' or 'action'"""
+            self.sync_procedure_texts()
+            positions = self.search_procedures(query) if scope_var.get() == 'search' else None
+            operation = operations[operation_var.get()]
+            if operation in ('condition', 'action'):
+                configs = self.collect_lov_configurations()
+                if not configs:
+                    raise ValueError("Proceed to LOV configuration before assigning values")
+                return operation, plan_lov_assignment(configs, range(len(configs)) if positions is None else positions,
+                                                      operation, text_var.get())
+            if operation == 'replace':
+                params = {'pattern': text_var.get(), 'replacement': replacement_var.get(),
+                          'ignore_case': ignore_case_var.get()}
+            elif operation == 'case':
+                params = {'mode': case_var.get()}
+            else:
+                params = {'text': text_var.get()}
+            return 'text', plan_text_changes(self.procedures, operation, positions, **params)
+        
+        def preview():
+            tree.delete(*tree.get_children())
+            try:
+                kind, changes = plan()
+            except (re.error, ValueError) as e:
+                messagebox.showerror("Bulk Edit", str(e), parent=window)
+                return None
+            for index, old, new in changes[:BULK_PREVIEW_ROWS]:
+                tree.insert('', tk.END, values=(index + 1, old, new))
+            shown = f" (first {BULK_PREVIEW_ROWS} shown)" if len(changes) > BULK_PREVIEW_ROWS else ""
+            summary_label.config(text=f"{len(changes)} procedures will change{shown}")
+            return kind, changes
+        
+        def apply():
+            planned = preview()
+            if planned is None:
+                return
+            kind, changes = planned
+            if not changes:
+                return
+            label = f"bulk edit ({operation_var.get().lower()}, {len(changes)} procedures)"
+            with self.phase("bulk_edit"):
+                if kind == 'text':
+                    self.apply_text_changes(changes, label)
+                else:
+                    self.assign_lov_values(changes, kind, label)
+            self.status_bar.config(text=f"Bulk edit changed {len(changes)} procedures (Ctrl+Z to undo)")
+            preview()
+        
+        button_row = ttk.Frame(window, padding=10)
+        button_row.pack(fill=tk.X)
+        ttk.Button(button_row, text="Preview", command=preview).pack(side=tk.LEFT)
+        ttk.Button(button_row, text="Apply", command=apply).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(button_row, text="Close", command=window.destroy).pack(side=tk.RIGHT)
+    
     def auto_detect_procedures(self):
         """Re-run auto detection on raw data"""
-        if self.raw_dataframe is not None:
+        if self.get_raw_dataframe() is not None:
             header_row = self.detect_header_row()
             self.procedures = self.extract_procedures(header_row)
+            self.sheet_fingerprint = sheet_fingerprint(self.procedures)
+            self.release_raw_dataframe()
+            self.procedures_replaced()
+            self.record_edit('procedures_set', procedures=self.procedures)
             self.populate_procedure_mapping()
             messagebox.showinfo("Auto-detect", f"Found {len(self.procedures)} procedures")
         else:
@@ -513,10 +1097,7 @@ class MaintenanceFormConverter:
     def proceed_to_lov(self):
         """Update procedures from mapping and move to LOV configuration"""
         # Update procedure texts from the entry fields
-        if hasattr(self, 'procedure_vars'):
-            for i, var in enumerate(self.procedure_vars):
-                if i < len(self.procedures):
-                    self.procedures[i]['text'] = var.get().strip()
+        self.sync_procedure_texts()
         
         # Remove empty procedures
         self.procedures = [proc for proc in self.procedures if proc['text'].strip()]
@@ -529,9 +1110,12 @@ class MaintenanceFormConverter:
             messagebox.showwarning("No Procedures", "Please add at least one procedure")
             return
         
+        self.record_edit('procedures_set', procedures=self.procedures)
+        self.procedures_replaced()
         self.setup_lov_configuration()
         messagebox.showinfo("Ready for LOV", f"Ready to configure LOVs for {len(self.procedures)} procedures")
     
+    @profiled()
     def setup_lov_configuration(self):
         """Setup LOV configuration interface"""
         # Clear existing widgets
@@ -561,107 +1145,58 @@ class MaintenanceFormConverter:
         canvas.configure(yscrollcommand=scrollbar.set)
         
         # Create LOV configuration for each procedure
-        self.lov_vars = []
-        for i, proc in enumerate(self.procedures):
-            proc_frame = ttk.Frame(scrollable_frame)
-            proc_frame.pack(fill=tk.X, pady=2)
-            
-            # Procedure text (truncated)
-            proc_text = proc['text']
-            if len(proc_text) > 35:
-                proc_text = proc_text[:32] + "..."
-            
-            ttk.Label(proc_frame, text=f"{proc['number']}. {proc_text}", width=35).pack(side=tk.LEFT)
-            
-            # Condition values
-            condition_var = tk.StringVar()
-            condition_entry = ttk.Entry(proc_frame, textvariable=condition_var, width=25)
-            condition_entry.pack(side=tk.LEFT, padx=5)
-            
-            # Action values
-            action_var = tk.StringVar()
-            action_entry = ttk.Entry(proc_frame, textvariable=action_var, width=25)
-            action_entry.pack(side=tk.LEFT, padx=5)
-            
-            # LOV codes display
-            lov_codes_var = tk.StringVar(value="Enter values first")
-            lov_label = ttk.Label(proc_frame, textvariable=lov_codes_var, width=25, foreground="blue")
-            lov_label.pack(side=tk.LEFT, padx=5)
-            
-            # Store variables
-            lov_config = {
-                'procedure': proc,
-                'condition_var': condition_var,
-                'action_var': action_var,
-                'lov_codes_var': lov_codes_var
-            }
-            self.lov_vars.append(lov_config)
-            
-            # Bind events to auto-generate LOV codes
-            condition_var.trace('w', lambda name, index, mode, idx=i: self.update_lov_codes(idx))
-            action_var.trace('w', lambda name, index, mode, idx=i: self.update_lov_codes(idx))
+        self.lov_rows_frame = scrollable_frame
+        self.lov_vars = [self.create_lov_row(proc, i) for i, proc in enumerate(self.procedures)]
         
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
-    
-    def update_lov_codes(self, procedure_index):
-        """Update LOV codes when values change"""
-        if procedure_index >= len(self.lov_vars):
-            return
-        
-        config = self.lov_vars[procedure_index]
-        condition_values = config['condition_var'].get().strip()
-        action_values = config['action_var'].get().strip()
-        
-        codes = []
+        self.apply_row_filter('lov')
         
-        if condition_values:
-            condition_code = self.generate_lov_code(condition_values, f"COND{procedure_index+1}")
-            codes.append(f"C: {condition_code}")
-            config['condition_lov_code'] = condition_code
-        
-        if action_values:
-            action_code = self.generate_lov_code(action_values, f"ACT{procedure_index+1}")
-            codes.append(f"A: {action_code}")
-            config['action_lov_code'] = action_code
-        
-        display_text = " | ".join(codes) if codes else "Enter values first"
-        config['lov_codes_var'].set(display_text)
+        self.record_edit('lov_setup', count=len(self.lov_vars))
     
-    def generate_lov_code(self, values_text, fallback):
-        """Generate LOV code based on values"""
-        if not values_text:
-            return fallback
-        
-        # Parse values
-        values = [v.strip().upper() for v in values_text.split(',') if v.strip()]
-        
-        # Create code based on first letters of values
-        code_parts = []
-        for value in values[:3]:  # Use max 3 values
-            if value and len(value) > 0:
-                code_parts.append(value[0])
-        
-        base_code = ''.join(code_parts) if code_parts else "GEN"
-        
-        # Add form prefix
-        form_prefix = self.form_name_var.get().split('-')[0:4]  # Take first 4 parts
-        if len(form_prefix) >= 4:
-            full_code = f"{'-'.join(form_prefix)}-{base_code}"
-        else:
-            full_code = f"YKN-CPP2-G-603-{base_code}"
-        
-        # Ensure uniqueness
-        counter = 1
-        original_code = full_code
-        while full_code in self.lov_database:
-            full_code = f"{original_code}{counter}"
-            counter += 1
-        
-        # Store values in database
-        self.lov_database[full_code] = [v.strip() for v in values_text.split(',') if v.strip()]
+    def create_lov_row(self, proc, index, before=None):
+        """One LOV row; callbacks read config['index'] so rows can shift without being rebuilt"""
+        proc_frame = ttk.Frame(self.lov_rows_frame)
+        proc_frame.pack(fill=tk.X, pady=2, before=before)
+        
+        proc_label = ttk.Label(proc_frame, text=self.lov_row_label(proc), width=35)
+        proc_label.pack(side=tk.LEFT)
+        
+        # Condition values
+        condition_var = tk.StringVar()
+        condition_entry = ttk.Entry(proc_frame, textvariable=condition_var, width=25)
+        condition_entry.pack(side=tk.LEFT, padx=5)
+        
+        # Action values
+        action_var = tk.StringVar()
+        action_entry = ttk.Entry(proc_frame, textvariable=action_var, width=25)
+        action_entry.pack(side=tk.LEFT, padx=5)
+        for entry in (condition_entry, action_entry):
+            entry.bind('<FocusOut>', lambda e: self.undo_history.seal())
+        
+        # LOV codes display
+        lov_codes_var = tk.StringVar(value="Enter values first")
+        lov_label = ttk.Label(proc_frame, textvariable=lov_codes_var, width=25, foreground="blue")
+        lov_label.pack(side=tk.LEFT, padx=5)
+        
+        # Store variables
+        lov_config = {
+            'procedure': proc,
+            'index': index,
+            'frame': proc_frame,
+            'label': proc_label,
+            'condition_var': condition_var,
+            'action_var': action_var,
+            'lov_codes_var': lov_codes_var,
+            'last_values': {'condition': '', 'action': ''}
+        }
         
-        return full_code
+        # Bind events to auto-generate LOV codes
+        condition_var.trace('w', lambda name, i, mode, config=lov_config:
+                            self.on_lov_value_changed(config['index'], 'condition'))
+        action_var.trace('w', lambda name, i, mode, config=lov_config:
+                         self.on_lov_value_changed(config['index'], 'action'))
+        return lov_config
     
     def auto_configure_lovs(self):
         """Auto-configure LOVs based on common patterns"""
@@ -669,63 +1204,11 @@ class MaintenanceFormConverter:
             messagebox.showwarning("No Procedures", "Please configure procedures first")
             return
         
-        # Common condition and action mappings
-        condition_patterns = {
-            'check': 'Good,Damaged,Missing',
-            'inspect': 'Good,Dirty,Worn,Damaged',
-            'replace': 'Good,Worn,Damaged,Leaking',
-            'clean': 'Clean,Dirty,Blocked',
-            'calibrate': 'In Tolerance,Out of Tolerance',
-            'test': 'Pass,Fail',
-            'monitor': 'Normal,High,Low',
-            'filter': 'Clean,Dirty,Clogged,Blocked'
-        }
-        
-        action_patterns = {
-            'check': 'No Action,Adjust,Repair,Replace',
-            'inspect': 'No Action,Clean,Repair,Replace',
-            'replace': 'Replaced,Repaired',
-            'clean': 'Cleaned,Replaced',
-            'calibrate': 'Calibrated,Adjusted,Replaced',
-            'test': 'No Action,Repaired,Replaced',
-            'monitor': 'No Action,Adjusted',
-            'filter': 'Cleaned,Replaced'
-        }
-        
-        configured_count = 0
-        
-        for config in self.lov_vars:
-            procedure_text = config['procedure']['text'].lower()
-            
-            # Find matching pattern
-            condition_values = None
-            action_values = None
-            
-            for keyword, values in condition_patterns.items():
-                if keyword in procedure_text:
-                    condition_values = values
-                    action_values = action_patterns.get(keyword, 'No Action,Repaired,Replaced')
-                    break
-            
-            # Set default if no pattern match
-            if not condition_values:
-                condition_values = 'Good,Damaged'
-                action_values = 'No Action,Repaired'
-            
-            config['condition_var'].set(condition_values)
-            config['action_var'].set(action_values)
-            configured_count += 1
+        configured_count = self.apply_common_lov_patterns()
         
         messagebox.showinfo("Auto-configuration Complete", 
                           f"Configured LOVs for {configured_count} procedures")
     
-    def clear_all_lovs(self):
-        """Clear all LOV configurations"""
-        for config in self.lov_vars:
-            config['condition_var'].set('')
-            config['action_var'].set('')
-        self.lov_database.clear()
-    
     def generate_preview(self):
         """Generate and display preview"""
         if not self.procedures:
@@ -733,52 +1216,92 @@ class MaintenanceFormConverter:
             return
         
         self.update_summary_display()
+        self.refresh_output_preview()
+    
+    def refresh_output_preview(self):
+        """Rebuild the previews from the current procedures and LOVs and show the first page"""
+        with self.phase("preview_refresh"):
+            self.output_previews = self.build_output_previews()
+        self.apply_preview_filter()
+    
+    def current_preview(self):
+        return self.output_previews.get(self.preview_table_var.get())
+    
+    def apply_preview_filter(self):
+        preview = self.current_preview()
+        if preview is None:
+            return
+        keytypes = ['All'] + preview.keytypes
+        self.preview_keytype_combo.config(values=keytypes)
+        if self.preview_keytype_var.get() not in keytypes:
+            self.preview_keytype_var.set('All')
+        keytype = self.preview_keytype_var.get()
+        preview.filter(None if keytype == 'All' else keytype, self.preview_procedure_var.get())
+        
+        columns = list(preview.columns)
+        if tuple(self.preview_tree['columns']) != tuple(columns):
+            self.preview_tree.configure(columns=columns)
+            for column in columns:
+                self.preview_tree.heading(column, text=column)
+                width = 220 if column in ('KEYLABEL', 'LOVNAME', 'FORMNAME') else 110
+                self.preview_tree.column(column, width=width, minwidth=50, stretch=False, anchor=tk.W)
+        self.show_preview_page(0)
+    
+    def show_preview_page(self, page):
+        """Build and show only the rows of one page"""
+        preview = self.current_preview()
+        if preview is None:
+            return
+        page = max(0, min(page, preview.page_count() - 1))
+        self.preview_page = page
+        
+        with self.phase("preview_page"):
+            rows = preview.page(page)
+        self.preview_tree.delete(*self.preview_tree.get_children())
+        columns = preview.columns
+        for row in rows:
+            self.preview_tree.insert('', tk.END, values=['' if row.get(column) is None else row[column]
+                                                         for column in columns])
+        
+        first = page * PREVIEW_PAGE_SIZE
+        self.preview_page_label.config(
+            text=f"Page {page + 1}/{preview.page_count()} - rows {first + 1 if rows else 0}-{first + len(rows)} "
+                 f"of {len(preview.positions)} matching ({len(preview)} total)")
     
     def update_summary_display(self):
         """Update the summary display in output tab"""
-        self.summary_text.delete(1.0, tk.END)
-        
-        self.summary_text.insert(tk.END, "📋 GENERATION SUMMARY\n")
-        self.summary_text.insert(tk.END, "=" * 60 + "\n\n")
+        lines = ["📋 GENERATION SUMMARY", "=" * 60, ""]
         
         # Form configuration
-        self.summary_text.insert(tk.END, "📝 FORM CONFIGURATION:\n")
-        self.summary_text.insert(tk.END, f"   Form Name: {self.form_name_var.get()}\n")
-        self.summary_text.insert(tk.END, f"   Description: {self.form_desc_var.get()}\n")
-        self.summary_text.insert(tk.END, f"   User: {self.user_name_var.get()}\n")
-        self.summary_text.insert(tk.END, f"   Output Directory: {self.output_dir.get()}\n\n")
-        
-        # Procedures summary
-        self.summary_text.insert(tk.END, f"🔧 PROCEDURES ({len(self.procedures)}):\n")
-        for proc in self.procedures:
-            self.summary_text.insert(tk.END, f"   {proc['number']}. {proc['text'][:50]}{'...' if len(proc['text']) > 50 else ''}\n")
-        
-        # LOV summary
-        if hasattr(self, 'lov_vars') and self.lov_vars:
-            configured_lovs = sum(1 for config in self.lov_vars 
-                                if config['condition_var'].get() or config['action_var'].get())
-            
-            self.summary_text.insert(tk.END, f"\n📊 LOV CONFIGURATION:\n")
-            self.summary_text.insert(tk.END, f"   Configured: {configured_lovs}/{len(self.lov_vars)} procedures\n")
-            self.summary_text.insert(tk.END, f"   LOV Codes Generated: {len(self.lov_database)}\n\n")
-            
-            if self.lov_database:
-                self.summary_text.insert(tk.END, "🏷️  LOV CODES:\n")
-                for code, values in list(self.lov_database.items())[:10]:  # Show first 10
-                    self.summary_text.insert(tk.END, f"   {code}: {', '.join(values)}\n")
-                
-                if len(self.lov_database) > 10:
-                    self.summary_text.insert(tk.END, f"   ... and {len(self.lov_database) - 10} more LOV codes\n")
+        lines.append("📝 FORM CONFIGURATION:")
+        lines.append(f"   Form Name: {self.form_name_var.get()}")
+        lines.append(f"   Description: {self.form_desc_var.get()}")
+        lines.append(f"   User: {self.user_name_var.get()}")
+        lines.append(f"   Output Directory: {self.output_dir.get()}")
+        
+        # Procedures and LOV summary; the rows themselves are in the preview below
+        lov_configurations = self.collect_lov_configurations()
+        configured_lovs = sum(1 for config in lov_configurations
+                              if config['condition_values'] or config['action_values'])
+        lines.append(f"\n🔧 PROCEDURES: {len(self.procedures)}")
+        lines.append(f"📊 LOV CONFIGURATION: {configured_lovs}/{len(self.procedures)} procedures, "
+                     f"{len(self.lov_database)} LOV codes")
         
         # Files to be generated
-        self.summary_text.insert(tk.END, f"\n📁 FILES TO BE GENERATED:\n")
-        self.summary_text.insert(tk.END, f"   ✓ FORMHEAD.xlsx - Form metadata\n")
-        self.summary_text.insert(tk.END, f"   ✓ FORMTEMPLATE.xlsx - {len(self.procedures) * 9} template entries\n")
-        self.summary_text.insert(tk.END, f"   ✓ FORMLOV.xlsx - {len(self.lov_database)} LOV definitions\n")
-        self.summary_text.insert(tk.END, f"   ✓ FORMMENU.xlsx - Menu structure\n")
+        template_name = self.detected_format['type'] if self.detected_format else DEFAULT_TEMPLATE
+        template_rows = template_row_count(template_name, len(self.procedures))
+        lov_rows = len(self.build_standard_lov_rows()) + sum(len(values) for values in self.lov_database.values())
+        lines.append("\n📁 FILES TO BE GENERATED:")
+        lines.append("   ✓ FORMHEAD.xlsx - Form metadata")
+        lines.append(f"   ✓ FORMTEMPLATE.xlsx - {template_rows} template entries")
+        lines.append(f"   ✓ FORMLOV.xlsx - {lov_rows} rows for {len(self.lov_database)} LOV codes")
+        lines.append("   ✓ FORMMENU.xlsx - Menu structure")
         
         if configured_lovs < len(self.procedures):
-            self.summary_text.insert(tk.END, f"\n⚠️  WARNING: {len(self.procedures) - configured_lovs} procedures not configured with LOVs\n")
+            lines.append(f"\n⚠️  WARNING: {len(self.procedures) - configured_lovs} procedures not configured with LOVs")
+        
+        self.summary_text.delete(1.0, tk.END)
+        self.summary_text.insert(tk.END, "\n".join(lines) + "\n")
     
     def select_output_dir(self):
         """Select output directory"""
@@ -786,6 +1309,7 @@ class MaintenanceFormConverter:
         if directory:
             self.output_dir.set(directory)
     
+    @profiled()
     def generate_all_files(self):
         """Generate all output files with global LOV tracking"""
         if not self.procedures:
@@ -794,45 +1318,33 @@ class MaintenanceFormConverter:
         
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            form_name = self.form_name_var.get() or "MAINTENANCE_FORM"
             output_dir = self.output_dir.get()
             
-            # Update global registry with this form
-            self.global_lov_registry["form_registry"][form_name] = {
-                "source_file": os.path.basename(self.source_file) if self.source_file else "Unknown",
-                "sheet_name": self.selected_sheet,
-                "generated_at": datetime.now().isoformat(),
-                "procedure_count": len(self.procedures),
-                "lov_codes_used": len(self.lov_database),
-                "format_type": self.detected_format['type'] if self.detected_format else 'unknown'
-            }
-            self.global_lov_registry["total_forms"] = len(self.global_lov_registry["form_registry"])
-            
-            # Generate files
-            files_created = []
-            
-            # 1. FORMHEAD.xlsx
-            formhead_file = os.path.join(output_dir, f"FORMHEAD_{timestamp}.xlsx")
-            self.create_formhead_file(formhead_file)
-            files_created.append(formhead_file)
-            
-            # 2. FORMTEMPLATE.xlsx  
-            template_file = os.path.join(output_dir, f"FORMTEMPLATE_{timestamp}.xlsx")
-            self.create_enhanced_formtemplate_file(template_file)
-            files_created.append(template_file)
-            
-            # 3. FORMLOV.xlsx
-            lov_file = os.path.join(output_dir, f"FORMLOV_{timestamp}.xlsx")
-            self.create_enhanced_formlov_file(lov_file)
-            files_created.append(lov_file)
-            
-            # 4. FORMMENU.xlsx
-            menu_file = os.path.join(output_dir, f"FORMMENU_{timestamp}.xlsx")
-            self.create_formmenu_file(menu_file)
-            files_created.append(menu_file)
-            
-            # Save global LOV registry
-            self.save_global_lov_registry()
+            delta_format = self.delta_format_var.get() if self.incremental_var.get() else None
+            archive_format = self.archive_format_var.get() if self.archive_var.get() else None
+            org_targets = parse_org_targets(self.org_codes_var.get())
+            if org_targets:
+                delta_format = None
+            self.fingerprint_index = FingerprintIndex.for_output_dir(output_dir)
+            self.procedure_history = ProcedureHistory.for_output_dir(output_dir)
+            try:
+                outputs = self.write_outputs(output_dir, timestamp, delta_format, archive_format,
+                                             org_targets=org_targets)
+            except ValidationError as e:
+                if not messagebox.askyesno("Validation Failed",
+                                           f"The generated tables have problems:\n\n{e.report.summary()}\n\n"
+                                           "Write the files anyway?"):
+                    self.status_bar.config(text="Generation cancelled: validation errors")
+                    return
+                outputs = self.write_outputs(output_dir, timestamp, delta_format, archive_format, validation='warn',
+                                             org_targets=org_targets)
+            # Archive outputs name the same file once per table
+            files_created = list(dict.fromkeys(output['file'] for output in outputs))
+            
+            if delta_format and not files_created:
+                messagebox.showinfo("Generation Complete", "No rows changed since the last generation of this form")
+                self.status_bar.config(text="No changes to generate")
+                return
             
             # Show success message with uniqueness info
             total_lov_codes = len(self.global_lov_registry.get("used_lov_codes", []))
@@ -843,6 +1355,8 @@ class MaintenanceFormConverter:
             success_msg += f"\n• Generated {len(self.lov_database)} new LOV codes"
             success_msg += f"\n• Total LOV codes in global registry: {total_lov_codes}"
             success_msg += f"\n• Total forms processed: {self.global_lov_registry['total_forms']}"
+            if self.validation_report is not None and self.validation_report.issues:
+                success_msg += f"\n\nValidation:\n{self.validation_report.summary()}"
             
             messagebox.showinfo("Generation Complete", success_msg)
             self.status_bar.config(text=f"Generated {len(files_created)} files successfully")
@@ -850,800 +1364,98 @@ class MaintenanceFormConverter:
         except Exception as e:
             messagebox.showerror("Generation Error", f"Failed to generate files: {str(e)}")
     
-    def create_enhanced_formtemplate_file(self, filename):
-        """Create enhanced FORMTEMPLATE.xlsx based on detected format"""
-        form_name = self.form_name_var.get()
-        org_code = self.form_config['org_code']
-        format_type = self.detected_format['type'] if self.detected_format else 'standard_maintenance'
-        
-        template_data = []
-        display_option = 10
-        
-        # Generate key prefix from form name
-        form_parts = form_name.split('-')
-        if len(form_parts) >= 4:
-            key_prefix = f"{form_parts[0]}{form_parts[3]}"
-        else:
-            key_prefix = "FORM"
-        
-        # Add email field first
-        template_data.append({
-            'ORG': org_code,
-            'FORMNAME': form_name,
-            'KEYNAME': f"{key_prefix}-TEXSTR0",
-            'PARENTKEY': None,
-            'KEYTYPE': 'TEXTBOX',
-            'KEYDATATYPE': 'STRING',
-            'KEYLOV': None,
-            'KEYLABEL': 'Email (hanya bisa email pertamina)',
-            'KEYFORMULA': 'user.email',
-            'KEYHELP': None,
-            'KEYHINT': None,
-            'DISPLAYOPTION': 0,
-            'VERSION': 1,
-            'ENABLE': 1,
-            'LASTUPDATEBY': None,
-            'LASTUPDATE': None,
-            'REQUIRED': 1,
-            'SHOWONVALUE': None,
-            'EDITABLE': None,
-            'SHOWONEMPTY': 1,
-            'ADDCLASS': None,
-            'SHOWONREPORT': 1,
-            'CUSTOMLOV': None
-        })
-        
-        # Add main title label
-        template_data.append({
-            'ORG': org_code,
-            'FORMNAME': form_name,
-            'KEYNAME': f"{key_prefix}-LABSTR0",
-            'PARENTKEY': None,
-            'KEYTYPE': 'LABEL',
-            'KEYDATATYPE': 'STRING',
-            'KEYLOV': None,
-            'KEYLABEL': self.form_desc_var.get(),
-            'KEYFORMULA': None,
-            'KEYHELP': None,
-            'KEYHINT': None,
-            'DISPLAYOPTION': display_option,
-            'VERSION': 1,
-            'ENABLE': 1,
-            'LASTUPDATEBY': None,
-            'LASTUPDATE': None,
-            'REQUIRED': None,
-            'SHOWONVALUE': None,
-            'EDITABLE': None,
-            'SHOWONEMPTY': 1,
-            'ADDCLASS': None,
-            'SHOWONREPORT': 1,
-            'CUSTOMLOV': None
-        })
-        display_option += 10
-        
-        # Generate template entries based on format type
-        if format_type == 'parameter_service':
-            template_data.extend(self.generate_parameter_service_template(key_prefix, org_code, form_name, display_option))
-        elif format_type == 'startup_checks':
-            template_data.extend(self.generate_startup_checks_template(key_prefix, org_code, form_name, display_option))
-        else:  # Standard maintenance
-            template_data.extend(self.generate_standard_maintenance_template(key_prefix, org_code, form_name, display_option))
-        
-        df = pd.DataFrame(template_data)
-        df.to_excel(filename, index=False)
-    
-    def generate_parameter_service_template(self, key_prefix, org_code, form_name, display_option):
-        """Generate template for parameter service format"""
-        template_entries = []
-        str_counter = 1
-        
-        for i, proc in enumerate(self.procedures):
-            lov_config = self.lov_vars[i] if i < len(self.lov_vars) else None
-            
-            # Parameter label
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LABSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'LABEL', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': None, 'KEYLABEL': f"{proc['number']}. {proc['text']}",
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            
-            # Before Service value
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-TEXSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'TEXTBOX', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': None, 'KEYLABEL': 'Before Service',
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # After Service value
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-TEXSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'TEXTBOX', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': None, 'KEYLABEL': 'After Service',
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # Status/Condition
-            condition_lov = getattr(lov_config, 'condition_lov_code', f"{key_prefix}-PARAM{proc['number']}") if lov_config else f"{key_prefix}-PARAM{proc['number']}"
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LISSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'LIST', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': condition_lov, 'KEYLABEL': 'Status',
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # Remarks
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-TEXSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'TEXTBOX', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': None, 'KEYLABEL': 'Remarks',
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-        
-        return template_entries
-    
-    def generate_startup_checks_template(self, key_prefix, org_code, form_name, display_option):
-        """Generate template for startup checks format"""
-        template_entries = []
-        str_counter = 1
-        che_counter = 1
-        
-        for i, proc in enumerate(self.procedures):
-            lov_config = self.lov_vars[i] if i < len(self.lov_vars) else None
-            
-            # Procedure label
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LABSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'LABEL', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': None, 'KEYLABEL': f"{proc['number']}. {proc['text']}",
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            
-            # Condition checkbox
-            condition_lov = getattr(lov_config, 'condition_lov_code', f"{key_prefix}-CHK{proc['number']}") if lov_config else f"{key_prefix}-CHK{proc['number']}"
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LISCHE{che_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'LIST', 'KEYDATATYPE': 'CHECKBOX',
-                'KEYLOV': condition_lov, 'KEYLABEL': 'Condition',
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            che_counter += 1
-            
-            # Remarks
-            template_entries.append({
-                'ORG': org_code, 'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-TEXSTR{str_counter}",
-                'PARENTKEY': None, 'KEYTYPE': 'TEXTBOX', 'KEYDATATYPE': 'STRING',
-                'KEYLOV': None, 'KEYLABEL': 'Remarks',
-                'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1,
-                'LASTUPDATEBY': None, 'LASTUPDATE': None, 'REQUIRED': None,
-                'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
-                'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-        
-        return template_entries
-    
-    def generate_standard_maintenance_template(self, key_prefix, org_code, form_name, display_option):
-        """Generate template for standard maintenance format"""
-        # This is the original complex template with 9 entries per procedure
-        template_entries = []
-        str_counter = 1
-        che_counter = 1
-        hid_counter = 0
-        fil_counter = 0
-        
-        for i, proc in enumerate(self.procedures):
-            lov_config = self.lov_vars[i] if i < len(self.lov_vars) else None
-            condition_lov = getattr(lov_config, 'condition_lov_code', None) if lov_config else None
-            action_lov = getattr(lov_config, 'action_lov_code', None) if lov_config else None
-            
-            # All 9 entries as in the original template
-            entries = [
-                # 1. Procedure label
-                {'ORG': org_code, 'FORMNAME': form_name, 'KEYNAME': f"{key_prefix}-LABSTR{str_counter}",
-                 'PARENTKEY': None, 'KEYTYPE': 'LABEL', 'KEYDATATYPE': 'STRING', 'KEYLOV': None,
-                 'KEYLABEL': f"{proc['number']}. {proc['text']}", 'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                 'DISPLAYOPTION': display_option, 'VERSION': 1, 'ENABLE': 1, 'LASTUPDATEBY': None, 'LASTUPDATE': None,
-                 'REQUIRED': None, 'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1, 'ADDCLASS': None,
-                 'SHOWONREPORT': 1, 'CUSTOMLOV': None},
-                
-                # 2. Yes/No choice
-                {'ORG': org_code, 'FORMNAME': form_name, 'KEYNAME': f"{key_prefix}-LISSTR{str_counter}",
-                 'PARENTKEY': None, 'KEYTYPE': 'LIST', 'KEYDATATYPE': 'STRING', 'KEYLOV': f"{key_prefix}-YN",
-                 'KEYLABEL': 'Choose', 'KEYFORMULA': None, 'KEYHELP': None, 'KEYHINT': None,
-                 'DISPLAYOPTION': display_option + 10, 'VERSION': 1, 'ENABLE': 1, 'LASTUPDATEBY': None, 'LASTUPDATE': None,
-                 'REQUIRED': None, 'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1, 'ADDCLASS': None,
-                 'SHOWONREPORT': 1, 'CUSTOMLOV': None},
-                
-                # Continue with remaining 7 entries...
-                # (Due to space, I'm showing the pattern - the full implementation would include all 9 entries)
-            ]
-            
-            # Add all entries and update counters appropriately
-            template_entries.extend(entries)
-            display_option += 90  # 9 entries * 10
-            str_counter += 3
-            che_counter += 2
-            hid_counter += 1
-            fil_counter += 1
-        
-        return template_entries
-    
-    def create_formhead_file(self, filename):
-        """Create FORMHEAD.xlsx file"""
-        form_name = self.form_name_var.get()
-        form_desc = self.form_desc_var.get()
-        user_name = self.user_name_var.get()
-        
-        data = {
-            'FORMNAME': [form_name],
-            'VERSION': [1],
-            'ENABLE': [1],
-            'WFID': [0],
-            'FORMDESCRIPTION': [form_desc],
-            'MAPTOPERMITID': [None],
-            'CATEGORY': ['BASIC'],
-            'MODIFIEDBY': [user_name],
-            'MODIFIEDDATE': [None],
-            'STATUS': ['DRAFT'],
-            'USERNAME': [user_name],
-            'CREATEDATE': [datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
-            'HEADLINE': [form_desc],
-            'DETAIL_INFORMATION': [f"Generated from {os.path.basename(self.source_file)}"]
-        }
-        
-        df = pd.DataFrame(data)
-        df.to_excel(filename, index=False)
-    
-    def create_formtemplate_file(self, filename):
-        """Create FORMTEMPLATE.xlsx file"""
-        form_name = self.form_name_var.get()
-        org_code = self.form_config['org_code']
-        
-        template_data = []
-        display_option = 10  # Start from 10, increment by 10
-        
-        # Generate key prefix from form name
-        form_parts = form_name.split('-')
-        if len(form_parts) >= 4:
-            key_prefix = f"{form_parts[0]}{form_parts[3]}"  # e.g., YKNG603
-        else:
-            key_prefix = "FORM"
-        
-        # Add email field first
-        template_data.append({
-            'ORG': org_code,
-            'FORMNAME': form_name,
-            'KEYNAME': f"{key_prefix}-TEXSTR0",
-            'PARENTKEY': None,
-            'KEYTYPE': 'TEXTBOX',
-            'KEYDATATYPE': 'STRING',
-            'KEYLOV': None,
-            'KEYLABEL': 'Email (hanya bisa email pertamina)',
-            'KEYFORMULA': 'user.email',
-            'KEYHELP': None,
-            'KEYHINT': None,
-            'DISPLAYOPTION': 0,
-            'VERSION': 1,
-            'ENABLE': 1,
-            'LASTUPDATEBY': None,
-            'LASTUPDATE': None,
-            'REQUIRED': 1,
-            'SHOWONVALUE': None,
-            'EDITABLE': None,
-            'SHOWONEMPTY': 1,
-            'ADDCLASS': None,
-            'SHOWONREPORT': 1,
-            'CUSTOMLOV': None
-        })
-        
-        # Add main title label
-        template_data.append({
-            'ORG': org_code,
-            'FORMNAME': form_name,
-            'KEYNAME': f"{key_prefix}-LABSTR0",
-            'PARENTKEY': None,
-            'KEYTYPE': 'LABEL',
-            'KEYDATATYPE': 'STRING',
-            'KEYLOV': None,
-            'KEYLABEL': self.form_desc_var.get(),
-            'KEYFORMULA': None,
-            'KEYHELP': None,
-            'KEYHINT': None,
-            'DISPLAYOPTION': display_option,
-            'VERSION': 1,
-            'ENABLE': 1,
-            'LASTUPDATEBY': None,
-            'LASTUPDATE': None,
-            'REQUIRED': None,
-            'SHOWONVALUE': None,
-            'EDITABLE': None,
-            'SHOWONEMPTY': 1,
-            'ADDCLASS': None,
-            'SHOWONREPORT': 1,
-            'CUSTOMLOV': None
-        })
-        display_option += 10
-        
-        # Generate template entries for each procedure
-        str_counter = 1
-        che_counter = 1
-        hid_counter = 0
-        fil_counter = 0
-        
-        for i, proc in enumerate(self.procedures):
-            # Get LOV configuration for this procedure
-            lov_config = self.lov_vars[i] if i < len(self.lov_vars) else None
-            condition_lov = getattr(lov_config, 'condition_lov_code', None) if lov_config else None
-            action_lov = getattr(lov_config, 'action_lov_code', None) if lov_config else None
-            
-            # 1. Procedure label
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LABSTR{str_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'LABEL',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': None,
-                'KEYLABEL': f"{proc['number']}. {proc['text']}",
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            
-            # 2. Yes/No choice
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LISSTR{str_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'LIST',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': f"{key_prefix}-YN",  # Standard Yes/No LOV
-                'KEYLABEL': 'Choose',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # 3. Remarks textbox
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-TEXSTR{str_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'TEXTBOX',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': None,
-                'KEYLABEL': 'Remarks',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # 4. Condition found checkbox
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LISCHE{che_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'LIST',
-                'KEYDATATYPE': 'CHECKBOX',
-                'KEYLOV': condition_lov or f"{key_prefix}-COND{proc['number']}",
-                'KEYLABEL': 'Condition found',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            che_counter += 1
-            
-            # 5. Corrective action checkbox
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LISCHE{che_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'LIST',
-                'KEYDATATYPE': 'CHECKBOX',
-                'KEYLOV': action_lov or f"{key_prefix}-ACT{proc['number']}",
-                'KEYLABEL': 'Corrective Action',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            che_counter += 1
-            
-            # 6. As Left (Good, Fair, Bad)
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-LISSTR{str_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'LIST',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': f"{key_prefix}-GFB",  # Standard Good/Fair/Bad LOV
-                'KEYLABEL': 'As Left (Good, Fair, Bad)',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # 7. Second remarks textbox
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-TEXSTR{str_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'TEXTBOX',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': None,
-                'KEYLABEL': 'Remarks',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            str_counter += 1
-            
-            # 8. Hidden field for file upload
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-HIDSTR{hid_counter}",
-                'PARENTKEY': f"{key_prefix}-FILSTR{fil_counter}",
-                'KEYTYPE': 'HIDDEN',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': None,
-                'KEYLABEL': f"{form_name} UPLOAD FILE",
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            hid_counter += 1
-            
-            # 9. File upload
-            template_data.append({
-                'ORG': org_code,
-                'FORMNAME': form_name,
-                'KEYNAME': f"{key_prefix}-FILSTR{fil_counter}",
-                'PARENTKEY': None,
-                'KEYTYPE': 'FILE',
-                'KEYDATATYPE': 'STRING',
-                'KEYLOV': None,
-                'KEYLABEL': 'Silahkan Upload file Pendukung Anda',
-                'KEYFORMULA': None,
-                'KEYHELP': None,
-                'KEYHINT': None,
-                'DISPLAYOPTION': display_option,
-                'VERSION': 1,
-                'ENABLE': 1,
-                'LASTUPDATEBY': None,
-                'LASTUPDATE': None,
-                'REQUIRED': None,
-                'SHOWONVALUE': None,
-                'EDITABLE': None,
-                'SHOWONEMPTY': 1,
-                'ADDCLASS': None,
-                'SHOWONREPORT': 1,
-                'CUSTOMLOV': None
-            })
-            display_option += 10
-            fil_counter += 1
-        
-        df = pd.DataFrame(template_data)
-        df.to_excel(filename, index=False)
-    
-    def create_formlov_file(self, filename):
-        """Create FORMLOV.xlsx file"""
-        org_code = self.form_config['org_code']
-        form_name = self.form_name_var.get()
-        
-        # Generate key prefix from form name
-        form_parts = form_name.split('-')
-        if len(form_parts) >= 4:
-            key_prefix = f"{form_parts[0]}-{form_parts[1]}-{form_parts[2]}-{form_parts[3]}"
-        else:
-            key_prefix = "YKN-CPP2-G-603"
-        
-        lov_data = []
-        
-        # Add standard LOVs
-        # Yes/No LOV
-        yn_lov = f"{key_prefix}-YN"
-        lov_data.extend([
-            {'LOVID': None, 'ORG': org_code, 'LOVNAME': yn_lov, 'VALUE': 'Yes', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Yes', 'ENABLE': 1, 'TYPE': 'CONFIG'},
-            {'LOVID': None, 'ORG': org_code, 'LOVNAME': yn_lov, 'VALUE': 'No', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'No', 'ENABLE': 1, 'TYPE': 'CONFIG'}
-        ])
-        
-        # Good/Fair/Bad LOV
-        gfb_lov = f"{key_prefix}-GFB"
-        lov_data.extend([
-            {'LOVID': None, 'ORG': org_code, 'LOVNAME': gfb_lov, 'VALUE': 'Good', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Good', 'ENABLE': 1, 'TYPE': 'CONFIG'},
-            {'LOVID': None, 'ORG': org_code, 'LOVNAME': gfb_lov, 'VALUE': 'Fair', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Fair', 'ENABLE': 1, 'TYPE': 'CONFIG'},
-            {'LOVID': None, 'ORG': org_code, 'LOVNAME': gfb_lov, 'VALUE': 'Bad', 'VALLOW': None, 'VALHI': None, 'VALDESC': 'Bad', 'ENABLE': 1, 'TYPE': 'CONFIG'}
-        ])
-        
-        # Add generated LOVs from database
-        for lov_code, values in self.lov_database.items():
-            for value in values:
-                lov_data.append({
-                    'LOVID': None,
-                    'ORG': org_code,
-                    'LOVNAME': lov_code,
-                    'VALUE': value,
-                    'VALLOW': None,
-                    'VALHI': None,
-                    'VALDESC': value,
-                    'ENABLE': 1,
-                    'TYPE': 'CONFIG'
-                })
-        
-        df = pd.DataFrame(lov_data)
-        df.to_excel(filename, index=False)
-    
-    def create_formmenu_file(self, filename):
-        """Create FORMMENU.xlsx file"""
-        form_name = self.form_name_var.get()
-        form_desc = self.form_desc_var.get()
-        
-        menu_data = [{
-            'MNID': None,
-            'MNTYPE': 'FORM',
-            'MNLABEL': form_desc,
-            'MNICON': 'ic_survey_general.png',
-            'MNDESC': form_desc,
-            'MNGROUP': None,
-            'MNCATEGORY': None,
-            'PARENTMNID': 333,  # Standard parent for maintenance forms
-            'FORMNAME': form_name,
-            'ATTRIBUTE1': None,
-            'ATTRIBUTE2': None,
-            'ATTRIBUTE3': None,
-            'ISACTIVE': 1,
-            'VALIDFROM': None,
-            'VALIDTO': None
-        }]
-        
-        df = pd.DataFrame(menu_data)
-        df.to_excel(filename, index=False)
+    def offer_fingerprint_reuse(self):
+        """Ask to reuse the LOV assignments of an earlier form built from the same tasklist"""
+        self.fingerprint_index = FingerprintIndex.for_output_dir(self.output_dir.get())
+        entry = self.find_fingerprint_match()
+        if entry is None:
+            return
+        if not messagebox.askyesno("Known Tasklist",
+                                   f"This tasklist was already converted as {entry['form']['form_name']} "
+                                   f"({entry['created'][:10]}).\n\n"
+                                   "Reuse its procedures, LOV values and LOV codes?"):
+            return
+        self.apply_fingerprint_entry(entry, reuse_rows=False)
+        self.procedure_vars = []
+        self.procedure_rows = None
+        self.stale_views.update({'mapping', 'lov'})
+        self.on_tab_changed()
+        self.compact_journal()
+        self.status_bar.config(text=f"Reused LOV assignments of {entry['form']['form_name']}")
     
     def save_configuration(self):
-        """Save current configuration to JSON file"""
+        """Save current configuration to a session snapshot (or JSON by extension)"""
         try:
-            config_data = {
-                'source_file': self.source_file,
-                'selected_sheet': self.selected_sheet,
-                'form_config': {
-                    'form_name': self.form_name_var.get(),
-                    'form_description': self.form_desc_var.get(),
-                    'user_name': self.user_name_var.get()
-                },
-                'procedures': self.procedures,
-                'lov_database': self.lov_database,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # Add LOV configurations
-            if hasattr(self, 'lov_vars'):
-                config_data['lov_configurations'] = []
-                for config in self.lov_vars:
-                    config_data['lov_configurations'].append({
-                        'condition_values': config['condition_var'].get(),
-                        'action_values': config['action_var'].get(),
-                        'condition_lov_code': getattr(config, 'condition_lov_code', ''),
-                        'action_lov_code': getattr(config, 'action_lov_code', '')
-                    })
-            
             save_path = filedialog.asksaveasfilename(
                 title="Save Configuration",
-                defaultextension=".json",
-                filetypes=[("JSON files", "*.json")]
+                defaultextension=SNAPSHOT_EXTENSION,
+                filetypes=[("Session snapshot", f"*{SNAPSHOT_EXTENSION}"), ("JSON files", "*.json")]
             )
             
-            if save_path:
+            if not save_path:
+                return
+            
+            form_config = {
+                'form_name': self.form_name_var.get(),
+                'form_description': self.form_desc_var.get(),
+                'user_name': self.user_name_var.get()
+            }
+            lov_configurations = self.collect_lov_configurations() if (
+                self.lov_vars or self.pending_lov_configurations is not None) else None
+            
+            if save_path.lower().endswith('.json'):
+                config_data = {
+                    'source_file': self.source_file,
+                    'selected_sheet': self.selected_sheet,
+                    'form_config': form_config,
+                    'procedures': self.procedures,
+                    'lov_database': self.lov_database,
+                    'timestamp': datetime.now().isoformat()
+                }
+                if lov_configurations is not None:
+                    config_data['lov_configurations'] = lov_configurations
+                
                 with open(save_path, 'w', encoding='utf-8') as f:
                     json.dump(config_data, f, indent=2, ensure_ascii=False)
-                messagebox.showinfo("Configuration Saved", f"Configuration saved to:\n{save_path}")
+            else:
+                write_snapshot(save_path, self.source_file, self.selected_sheet, form_config,
+                               self.procedures, self.lov_database, lov_configurations)
+            
+            messagebox.showinfo("Configuration Saved", f"Configuration saved to:\n{save_path}")
         
         except Exception as e:
             messagebox.showerror("Save Error", f"Failed to save configuration: {str(e)}")
     
     def load_configuration(self):
-        """Load configuration from JSON file"""
+        """Load configuration from a session snapshot or legacy JSON file"""
         try:
             load_path = filedialog.askopenfilename(
                 title="Load Configuration",
-                filetypes=[("JSON files", "*.json")]
+                filetypes=[("Configuration files", f"*{SNAPSHOT_EXTENSION} *.json"),
+                           ("Session snapshot", f"*{SNAPSHOT_EXTENSION}"), ("JSON files", "*.json")]
             )
             
             if not load_path:
                 return
             
-            with open(load_path, 'r', encoding='utf-8') as f:
-                config_data = json.load(f)
-            
-            # Load form configuration
-            if 'form_config' in config_data:
-                form_config = config_data['form_config']
-                self.form_name_var.set(form_config.get('form_name', ''))
-                self.form_desc_var.set(form_config.get('form_description', ''))
-                self.user_name_var.set(form_config.get('user_name', 'MK.ABDULLAH.DAFA'))
-            
-            # Load procedures
-            if 'procedures' in config_data:
-                self.procedures = config_data['procedures']
-                self.populate_procedure_mapping()
-            
-            # Load LOV database
-            if 'lov_database' in config_data:
-                self.lov_database = config_data['lov_database']
-            
+            if is_snapshot(load_path):
+                snapshot = SessionSnapshot.open(load_path)
+                self.restore_session(snapshot.form_config, snapshot.procedures, snapshot.lov_database,
+                                     snapshot.lov_configurations, snapshot.header.get('source_file'),
+                                     snapshot.header.get('selected_sheet'))
+            else:
+                with open(load_path, 'r', encoding='utf-8') as f:
+                    config_data = json.load(f)
+                self.restore_session(config_data.get('form_config'), config_data.get('procedures'),
+                                     config_data.get('lov_database'), config_data.get('lov_configurations'),
+                                     config_data.get('source_file'), config_data.get('selected_sheet'))
+            
+            self.status_bar.config(text=f"Configuration loaded - {len(self.procedures)} procedures, "
+                                        f"{len(self.lov_database)} LOV codes")
             messagebox.showinfo("Configuration Loaded", f"Configuration loaded from:\n{load_path}")
             
         except Exception as e:
             messagebox.showerror("Load Error", f"Failed to load configuration: {str(e)}")
-    
-    def load_lov_patterns(self):
-        """Load common LOV patterns for auto-configuration"""
-        # This could be expanded to load from external files
-        pass
 
 def main():
     """Main application entry point"""
@@ -1659,4 +1471,5 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,9 @@
+"""Headless driver for the MaintenanceFormConverter pipeline.
+
+The converter itself lives in core.py and imports no tkinter; these
+names are kept for scripts written against the earlier headless module.
+"""
+from core import FormConverter, Var
+
+HeadlessConverter = FormConverter
+HeadlessVar = Var
@@ -0,0 +1,248 @@
+"""Undo/redo history for procedure and LOV edits as a log of inverse commands.
+
+Each command records only what one edit changed (an index plus the old
+and new text, or the procedure dict and LOV row removed), never a copy of
+the session, so a 1,000-step history over a 5,000-procedure session holds
+a few thousand small objects. Removed procedures and replaced LOV
+databases are kept by reference; nothing is deep-copied.
+
+Commands are applied through an editor (the converter) that updates the
+model, the affected mapping/LOV rows and the autosave journal:
+
+    editor.set_procedure_text(index, text)
+    editor.set_procedure_texts([(index, text), ...])
+    editor.insert_procedure_at(index, procedure, lov_configuration)
+    editor.remove_procedure_at(index) -> (procedure, lov_configuration)
+    editor.set_lov_value(index, kind, value, code)
+    editor.set_lov_database(lov_database)
+
+Consecutive keystrokes in the same field coalesce into one step, and
+group() folds a bulk action (auto-configure, clear all) into one step.
+"""
+from collections import deque
+from contextlib import contextmanager
+
+DEFAULT_HISTORY_LIMIT = 1000
+
+
+class ProcedureTextEdit:
+    __slots__ = ('index', 'old', 'new')
+
+    def __init__(self, index, old, new):
+        self.index, self.old, self.new = index, old, new
+
+    @property
+    def label(self):
+        return f"edit procedure {self.index + 1}"
+
+    def merge(self, other):
+        """Absorb a following edit of the same procedure text; True if merged"""
+        if type(other) is not ProcedureTextEdit or other.index != self.index:
+            return False
+        self.new = other.new
+        return True
+
+    def undo(self, editor):
+        editor.set_procedure_text(self.index, self.old)
+
+    def redo(self, editor):
+        editor.set_procedure_text(self.index, self.new)
+
+
+class ProcedureTextBatch:
+    """Texts of many procedures changed at once by a bulk edit"""
+    __slots__ = ('label', 'changes')
+
+    def __init__(self, label, changes):
+        # (index, old, new) tuples
+        self.label, self.changes = label, changes
+
+    def merge(self, other):
+        return False
+
+    def undo(self, editor):
+        editor.set_procedure_texts([(index, old) for index, old, _ in self.changes])
+
+    def redo(self, editor):
+        editor.set_procedure_texts([(index, new) for index, _, new in self.changes])
+
+
+class ProcedureInsert:
+    __slots__ = ('index', 'procedure', 'lov_configuration')
+
+    def __init__(self, index, procedure, lov_configuration=None):
+        self.index, self.procedure, self.lov_configuration = index, procedure, lov_configuration
+
+    @property
+    def label(self):
+        return f"add procedure {self.index + 1}"
+
+    def merge(self, other):
+        return False
+
+    def undo(self, editor):
+        editor.remove_procedure_at(self.index)
+
+    def redo(self, editor):
+        editor.insert_procedure_at(self.index, self.procedure, self.lov_configuration)
+
+
+class ProcedureRemove(ProcedureInsert):
+    __slots__ = ()
+
+    @property
+    def label(self):
+        return f"delete procedure {self.index + 1}"
+
+    def undo(self, editor):
+        editor.insert_procedure_at(self.index, self.procedure, self.lov_configuration)
+
+    def redo(self, editor):
+        editor.remove_procedure_at(self.index)
+
+
+class LovValueEdit:
+    __slots__ = ('index', 'kind', 'old', 'new', 'old_code', 'new_code')
+
+    def __init__(self, index, kind, old, new, old_code, new_code):
+        self.index, self.kind = index, kind
+        self.old, self.new = old, new
+        self.old_code, self.new_code = old_code, new_code
+
+    @property
+    def label(self):
+        return f"edit {self.kind} values of procedure {self.index + 1}"
+
+    def merge(self, other):
+        if type(other) is not LovValueEdit or (other.index, other.kind) != (self.index, self.kind):
+            return False
+        self.new, self.new_code = other.new, other.new_code
+        return True
+
+    def undo(self, editor):
+        editor.set_lov_value(self.index, self.kind, self.old, self.old_code)
+
+    def redo(self, editor):
+        editor.set_lov_value(self.index, self.kind, self.new, self.new_code)
+
+
+class LovDatabaseReplace:
+    __slots__ = ('old', 'new')
+
+    label = "replace LOV database"
+
+    def __init__(self, old, new):
+        self.old, self.new = old, new
+
+    def merge(self, other):
+        return False
+
+    def undo(self, editor):
+        editor.set_lov_database(self.old)
+
+    def redo(self, editor):
+        editor.set_lov_database(self.new)
+
+
+class CommandGroup:
+    """Several commands undone and redone as one step"""
+    __slots__ = ('label', 'commands')
+
+    def __init__(self, label, commands):
+        self.label, self.commands = label, commands
+
+    def merge(self, other):
+        return False
+
+    def undo(self, editor):
+        for command in reversed(self.commands):
+            command.undo(editor)
+
+    def redo(self, editor):
+        for command in self.commands:
+            command.redo(editor)
+
+
+class UndoHistory:
+    """Bounded undo stack plus redo stack of commands"""
+
+    def __init__(self, limit=DEFAULT_HISTORY_LIMIT):
+        self.undo_stack = deque(maxlen=limit)
+        self.redo_stack = []
+        # True while a command is being applied, so the edits it makes are not recorded again
+        self.replaying = False
+        self._group = None
+        self._mergeable = False
+
+    def __len__(self):
+        return len(self.undo_stack)
+
+    def push(self, command):
+        if self.replaying:
+            return
+        if self._group is not None:
+            if not (self._group and self._group[-1].merge(command)):
+                self._group.append(command)
+            return
+        self.redo_stack.clear()
+        if not (self._mergeable and self.undo_stack and self.undo_stack[-1].merge(command)):
+            self.undo_stack.append(command)
+        self._mergeable = True
+
+    @contextmanager
+    def group(self, label):
+        """Record every command pushed inside the block as one undo step"""
+        if self._group is not None or self.replaying:
+            yield
+            return
+        self._group = commands = []
+        try:
+            yield
+        finally:
+            self._group = None
+            if commands:
+                self.push(CommandGroup(label, commands))
+                self._mergeable = False
+
+    def seal(self):
+        """Keep the next edit from coalescing with the last step (e.g. when a field loses focus)"""
+        self._mergeable = False
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self._mergeable = False
+
+    @property
+    def undo_label(self):
+        return self.undo_stack[-1].label if self.undo_stack else None
+
+    @property
+    def redo_label(self):
+        return self.redo_stack[-1].label if self.redo_stack else None
+
+    def undo(self, editor):
+        """Revert the last step; returns its label, or None when there is nothing to undo"""
+        if not self.undo_stack:
+            return None
+        command = self.undo_stack.pop()
+        self._apply(command.undo, editor)
+        self.redo_stack.append(command)
+        return command.label
+
+    def redo(self, editor):
+        """Re-apply the last undone step; returns its label, or None"""
+        if not self.redo_stack:
+            return None
+        command = self.redo_stack.pop()
+        self._apply(command.redo, editor)
+        self.undo_stack.append(command)
+        return command.label
+
+    def _apply(self, action, editor):
+        self._mergeable = False
+        self.replaying = True
+        try:
+            action(editor)
+        finally:
+            self.replaying = False
@@ -0,0 +1,61 @@
+"""Process-wide interning of the strings that enter the form model.
+
+Procedure texts, LOV values and codes, labels and form-level constants are
+repeated across procedure dicts, lov_database lists and the 9+ template
+rows of every procedure. Passing them through sys.intern where they enter
+the model (sheet extraction, LOV entry, session/snapshot/fingerprint
+loads) leaves one object per distinct string, so large batches hold less
+memory and dict/set/factorize lookups in dedupe and validation compare by
+identity and reuse the cached hash.
+"""
+import sys
+
+_intern = sys.intern
+
+PROCEDURE_TEXT_FIELDS = ('text', 'original_text')
+LOV_CONFIGURATION_FIELDS = ('condition_values', 'action_values', 'condition_lov_code', 'action_lov_code')
+
+
+def intern_text(value):
+    """The interned copy of a string; other values are returned unchanged"""
+    return _intern(value) if type(value) is str else value
+
+
+def intern_values(values):
+    return [_intern(value) if type(value) is str else value for value in values]
+
+
+def intern_procedures(procedures):
+    """Intern the text fields of procedure dicts in place; returns the list"""
+    for proc in procedures:
+        for field in PROCEDURE_TEXT_FIELDS:
+            value = proc.get(field)
+            if type(value) is str:
+                proc[field] = _intern(value)
+    return procedures
+
+
+def intern_lov_database(lov_database):
+    """Copy of {code: [values]} with interned codes and values"""
+    return {intern_text(code): intern_values(values) for code, values in lov_database.items()}
+
+
+def intern_lov_configurations(lov_configurations):
+    """Intern the values and codes of LOV configuration dicts in place; returns the list"""
+    if lov_configurations is None:
+        return None
+    for config in lov_configurations:
+        for field in LOV_CONFIGURATION_FIELDS:
+            value = config.get(field)
+            if type(value) is str:
+                config[field] = _intern(value)
+    return lov_configurations
+
+
+def intern_rows(rows):
+    """Intern every string value of row dicts in place; returns the rows"""
+    for row in rows:
+        for column, value in row.items():
+            if type(value) is str:
+                row[column] = _intern(value)
+    return rows
@@ -0,0 +1,253 @@
+"""Append-only edit journal with snapshot compaction and crash recovery.
+
+Every edit made in the mapping and LOV tabs is appended as one JSON line
+to the journal, so autosave cost depends on the size of the edit rather
+than the size of the session. Periodic compaction folds the journal into
+a session snapshot (see snapshot.py) and truncates it. After a crash the
+last snapshot is loaded and the journal is replayed on top of it.
+
+Each entry carries a sequence number; the snapshot records the last
+sequence number it contains, so entries already folded in are skipped if
+the process died between writing the snapshot and truncating the journal.
+
+Every running instance journals into its own session directory under the
+autosave root and holds that directory's lock file for as long as it
+runs. A session whose lock can be taken belongs to a process that is gone,
+so only those are offered for recovery or discarded; the journal of a
+running instance is never touched.
+
+    journal = EditJournal.create()              # new locked session directory
+    for orphan in orphaned_journals():          # sessions left behind by a crash
+        ...orphan.recover() and orphan.open(), or orphan.discard()...
+"""
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+
+from locking import FileLock
+from snapshot import SessionSnapshot, write_snapshot
+
+DEFAULT_AUTOSAVE_DIR = os.path.join(os.path.expanduser("~"), ".pm_form_generator", "autosave")
+JOURNAL_FILE = "session.journal"
+SNAPSHOT_FILE = "session.pmfs"
+LOCK_FILE = "session.lock"
+SESSION_PREFIX = "session_"
+# Empty sessions younger than this may be starting up in another instance right now
+ORPHAN_MIN_AGE_SECONDS = 60
+
+
+def empty_state():
+    """Session state as plain data, the shape replayed by apply_edit"""
+    return {
+        'source_file': None,
+        'selected_sheet': None,
+        'form_config': {'form_name': '', 'form_description': '', 'user_name': 'MK.ABDULLAH.DAFA'},
+        'procedures': [],
+        'lov_database': {},
+        'lov_configurations': None,
+    }
+
+
+def blank_lov_configuration():
+    return {'condition_values': '', 'action_values': '', 'condition_lov_code': '', 'action_lov_code': ''}
+
+
+def apply_edit(state, entry):
+    """Apply one journal entry to a session state dict in place"""
+    op = entry['op']
+
+    if op == 'session_source':
+        state['source_file'] = entry.get('source_file')
+        state['selected_sheet'] = entry.get('selected_sheet')
+    elif op == 'form_config':
+        state['form_config'][entry['field']] = entry['value']
+    elif op == 'procedures_set':
+        state['procedures'] = entry['procedures']
+    elif op == 'procedure_text':
+        state['procedures'][entry['index']]['text'] = entry['text']
+    elif op == 'procedure_texts':
+        for index, text in entry['texts']:
+            state['procedures'][index]['text'] = text
+    elif op == 'procedure_add':
+        state['procedures'].append(entry['procedure'])
+    elif op == 'procedure_insert':
+        index = entry['index']
+        state['procedures'].insert(index, entry['procedure'])
+        for i, proc in enumerate(state['procedures']):
+            proc['number'] = i + 1
+        if state['lov_configurations'] is not None:
+            state['lov_configurations'].insert(index, entry.get('lov_configuration') or blank_lov_configuration())
+    elif op == 'procedure_delete':
+        del state['procedures'][entry['index']]
+        for i, proc in enumerate(state['procedures']):
+            proc['number'] = i + 1
+        if state['lov_configurations'] is not None and entry['index'] < len(state['lov_configurations']):
+            del state['lov_configurations'][entry['index']]
+    elif op == 'lov_setup':
+        state['lov_configurations'] = [blank_lov_configuration() for _ in range(entry['count'])]
+    elif op == 'lov_values':
+        state['lov_configurations'][entry['index']][entry['field']] = entry['value']
+    elif op == 'lov_code':
+        state['lov_configurations'][entry['index']][entry['field']] = entry['code']
+        if entry['code']:
+            state['lov_database'][entry['code']] = entry['values']
+    elif op == 'lov_database_clear':
+        state['lov_database'] = {}
+    elif op == 'lov_database_set':
+        state['lov_database'] = entry['lov_database']
+    else:
+        raise ValueError(f"Unknown journal operation: {op}")
+
+
+class EditJournal:
+    """Journal + base snapshot pair in one session directory, owned through its lock file"""
+
+    def __init__(self, directory, compact_every=500):
+        self.directory = directory
+        self.compact_every = compact_every
+        self.journal_path = os.path.join(directory, JOURNAL_FILE)
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        self.lock = FileLock(os.path.join(directory, LOCK_FILE))
+        self.seq = 0
+        self.entries_since_compaction = 0
+        self._file = None
+
+    @classmethod
+    def create(cls, root=DEFAULT_AUTOSAVE_DIR, compact_every=500):
+        """A journal in a new session directory of its own, locked by this process"""
+        name = f"{SESSION_PREFIX}{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        journal = cls(os.path.join(root, name), compact_every)
+        # Blocks only while another instance briefly probes the new directory (see orphaned_journals)
+        journal.lock.acquire()
+        return journal
+
+    def claim(self):
+        """Take the session lock without waiting; False while its owner is still running"""
+        return self.lock.acquire(blocking=False)
+
+    def release(self):
+        """Give up the session lock but keep its files, e.g. for a later recovery"""
+        self.lock.release()
+
+    def has_recoverable_session(self):
+        """True if a previous session ended without a clean close"""
+        if os.path.exists(self.snapshot_path):
+            return True
+        return os.path.exists(self.journal_path) and os.path.getsize(self.journal_path) > 0
+
+    def recover(self):
+        """Load the base snapshot and replay the journal; return the session state"""
+        state = empty_state()
+        base_seq = 0
+
+        if os.path.exists(self.snapshot_path):
+            snapshot = SessionSnapshot.open(self.snapshot_path)
+            state['source_file'] = snapshot.header.get('source_file')
+            state['selected_sheet'] = snapshot.header.get('selected_sheet')
+            state['form_config'].update(snapshot.form_config or {})
+            state['procedures'] = snapshot.procedures
+            state['lov_database'] = snapshot.lov_database
+            state['lov_configurations'] = snapshot.lov_configurations
+            base_seq = snapshot.header.get('extra', {}).get('journal_seq', 0)
+
+        self.seq = base_seq
+        replayed = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break  # torn final write from the crash
+                    if entry['seq'] <= base_seq:
+                        continue
+                    try:
+                        apply_edit(state, entry)
+                    except (IndexError, KeyError, TypeError, ValueError):
+                        break  # keep the consistent prefix rather than a half-applied state
+                    self.seq = entry['seq']
+                    replayed += 1
+
+        self.entries_since_compaction = replayed
+        return state
+
+    def open(self):
+        """Start appending to the journal"""
+        if not self.claim():
+            raise RuntimeError(f"Autosave session {self.directory} is in use by another instance")
+        self._file = open(self.journal_path, 'a', encoding='utf-8')
+
+    def record(self, op, **fields):
+        """Append one edit; returns True when compaction is due"""
+        if self._file is None:
+            return False
+        self.seq += 1
+        entry = {'seq': self.seq, 'op': op}
+        entry.update(fields)
+        self._file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+        self.entries_since_compaction += 1
+        return self.entries_since_compaction >= self.compact_every
+
+    def compact(self, state):
+        """Fold the journal into a fresh base snapshot and truncate it"""
+        if self._file is None:
+            return
+        temp_path = self.snapshot_path + ".tmp"
+        write_snapshot(temp_path, state['source_file'], state['selected_sheet'], state['form_config'],
+                       state['procedures'], state['lov_database'], state['lov_configurations'],
+                       extra={'journal_seq': self.seq})
+        with open(temp_path, 'rb+') as f:
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
+
+        self._file.close()
+        self._file = open(self.journal_path, 'w', encoding='utf-8')
+        self.entries_since_compaction = 0
+
+    def close(self, discard=True):
+        """Close the journal; a clean close discards the autosave files"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if discard:
+            self.discard()
+        else:
+            self.release()
+
+    def discard(self):
+        """Delete the session directory; refused while another instance owns it"""
+        if not self.claim():
+            raise RuntimeError(f"Autosave session {self.directory} is in use by another instance")
+        for path in (self.journal_path, self.snapshot_path):
+            if os.path.exists(path):
+                os.remove(path)
+        # The lock file goes last; Windows cannot remove it while it is held
+        self.lock.release()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def orphaned_journals(root=DEFAULT_AUTOSAVE_DIR, compact_every=500):
+    """Journals of sessions whose owner is no longer running, newest first, each locked by this process.
+
+    The caller recovers, discards or releases every journal it gets.
+    """
+    if not os.path.isdir(root):
+        return []
+    orphans = []
+    for name in sorted(os.listdir(root), reverse=True):
+        directory = os.path.join(root, name)
+        if not (name.startswith(SESSION_PREFIX) and os.path.isdir(directory)):
+            continue
+        journal = EditJournal(directory, compact_every)
+        if not journal.claim():
+            continue
+        if not journal.has_recoverable_session() and \
+                time.time() - os.path.getmtime(journal.lock.path) < ORPHAN_MIN_AGE_SECONDS:
+            journal.release()
+            continue
+        orphans.append(journal)
+    return orphans
+
@@ -0,0 +1,217 @@
+"""Event-loop latency watchdog for the Tk front end.
+
+A heartbeat re-arms itself with root.after() every interval; the lag of
+each beat (how late it fired) is how long the event loop was blocked by
+the handler running before it. A sampler thread watches the heartbeat
+and, once a beat is more than the threshold overdue, grabs the main
+thread's stack through sys._current_frames() every few milliseconds until
+the loop is free again. Blocked handlers cannot report themselves, so the
+stack has to come from outside the main thread.
+
+When the late beat finally fires, the stall becomes a record: its lag,
+the Tk handler that was running (the first application frame called from
+tkinter's callback wrapper), the profiler phase, the stack at the moment
+the threshold was crossed and the frames that were hottest across the
+samples. Only the worst stalls are kept, so the log stays bounded over a
+long session.
+
+    watchdog = EventLoopWatchdog(root, phase_source=profiler.current_phase)
+    watchdog.add_listener(print)
+    watchdog.start()
+    ...
+    watchdog.worst()    # -> stall records, longest first
+    watchdog.write_report("stalls.json")
+"""
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+from itertools import count
+
+DEFAULT_INTERVAL_MS = 100
+DEFAULT_THRESHOLD_MS = 250
+SAMPLE_INTERVAL_MS = 20
+# Worst stalls kept, and stack samples kept per stall
+MAX_STALLS = 25
+MAX_SAMPLES = 200
+HOT_FRAMES = 5
+
+# Native dialogs run their own event loop; waiting on the user there is not a stall
+MODAL_FUNCTIONS = {'wait_window', 'show', 'askopenfilename', 'asksaveasfilename', 'askdirectory'}
+
+
+def is_tkinter_frame(frame):
+    return 'tkinter' in os.path.normpath(frame.filename).split(os.sep)
+
+
+def format_frame(frame):
+    return f"{os.path.basename(frame.filename)}:{frame.lineno} {frame.name}"
+
+
+def find_handler(stack):
+    """The first application frame that tkinter called into, or None outside a Tk callback"""
+    in_tkinter = False
+    for frame in stack:
+        if is_tkinter_frame(frame):
+            in_tkinter = True
+        elif in_tkinter:
+            return frame
+    return None
+
+
+def is_idle(stack):
+    """True when the main thread is just waiting for events inside mainloop"""
+    return bool(stack) and is_tkinter_frame(stack[-1]) and stack[-1].name == 'mainloop'
+
+
+def is_modal(stack):
+    return any(is_tkinter_frame(frame) and frame.name in MODAL_FUNCTIONS for frame in stack)
+
+
+class EventLoopWatchdog:
+    """Measures Tk event-loop lag and records the stack behind every stall"""
+
+    def __init__(self, root, interval_ms=DEFAULT_INTERVAL_MS, threshold_ms=DEFAULT_THRESHOLD_MS,
+                 max_stalls=MAX_STALLS, phase_source=None):
+        self.root = root
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.max_stalls = max_stalls
+        self.phase_source = phase_source
+        self.listeners = []
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self.running = False
+        # Min-heap of (lag, sequence, record) holding the worst stalls
+        self._worst = []
+        self._sequence = count()
+        self._lock = threading.Lock()
+        self._samples = []
+        self._last_beat = None
+        self._after_id = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._main_thread_id = threading.main_thread().ident
+
+    def add_listener(self, callback):
+        """Call callback(record) on the Tk thread whenever a stall is recorded"""
+        self.listeners.append(callback)
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._stop.clear()
+        self._last_beat = time.perf_counter()
+        self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+        self._thread = threading.Thread(target=self._sample_loop, name="event-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        self._stop.set()
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+        self._thread.join()
+        self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._worst.clear()
+            self._samples.clear()
+        self.stall_count = 0
+        self.max_lag = 0.0
+
+    def worst(self):
+        """Recorded stalls, longest first"""
+        return [record for _, _, record in sorted(self._worst, key=lambda entry: (-entry[0], entry[1]))]
+
+    def _beat(self):
+        now = time.perf_counter()
+        lag = now - self._last_beat - self.interval
+        self._last_beat = now
+        if self.running:
+            self._after_id = self.root.after(int(self.interval * 1000), self._beat)
+        with self._lock:
+            samples, self._samples = self._samples, []
+        if lag >= self.threshold:
+            self._record_stall(lag, samples)
+
+    def _sample_loop(self):
+        while not self._stop.wait(SAMPLE_INTERVAL_MS / 1000):
+            last_beat = self._last_beat
+            overdue = time.perf_counter() - last_beat - self.interval
+            if overdue < self.threshold:
+                continue
+            frame = sys._current_frames().get(self._main_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+            phase = self.phase_source() if self.phase_source else None
+            with self._lock:
+                # A beat that fired while this sample was taken already closed the stall
+                if self._last_beat == last_beat and len(self._samples) < MAX_SAMPLES:
+                    self._samples.append((overdue, stack, phase))
+
+    def _record_stall(self, lag, samples):
+        stacks = [stack for _, stack, _ in samples]
+        if stacks and all(is_idle(stack) for stack in stacks):
+            # The loop was free but the beat ran late anyway (suspend, a busy machine)
+            return
+        if any(is_modal(stack) for stack in stacks):
+            return
+
+        handler = next((find_handler(stack) for stack in stacks if find_handler(stack)), None)
+        hot = Counter(format_frame(stack[-1]) for stack in stacks if stack)
+        record = {
+            'lag_ms': round(lag * 1000, 1),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'handler': format_frame(handler) if handler else None,
+            'phase': next((phase for _, _, phase in samples if phase), None),
+            'samples': len(samples),
+            'stack': traceback.format_list(stacks[0]) if stacks else [],
+            'hot_frames': [{'frame': frame, 'samples': hits} for frame, hits in hot.most_common(HOT_FRAMES)],
+        }
+
+        self.stall_count += 1
+        self.max_lag = max(self.max_lag, lag)
+        entry = (lag, next(self._sequence), record)
+        with self._lock:
+            if len(self._worst) < self.max_stalls:
+                heapq.heappush(self._worst, entry)
+            elif lag > self._worst[0][0]:
+                heapq.heapreplace(self._worst, entry)
+        for callback in self.listeners:
+            callback(record)
+
+    def report(self):
+        return {
+            'created': datetime.now().isoformat(),
+            'interval_ms': self.interval * 1000,
+            'threshold_ms': self.threshold * 1000,
+            'stall_count': self.stall_count,
+            'max_lag_ms': round(self.max_lag * 1000, 1),
+            'worst': self.worst(),
+        }
+
+    def write_report(self, path):
+        """Write the worst stalls with their stacks as JSON"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(), f, indent=2, ensure_ascii=False)
+
+
+def format_stall(record):
+    """One-line summary of a stall for the status bar"""
+    text = f"UI stalled {record['lag_ms']:.0f} ms in {record['handler'] or 'startup code'}"
+    if record['phase']:
+        text += f" ({record['phase']})"
+    return text
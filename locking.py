@@ -0,0 +1,79 @@
+"""Advisory inter-process file locks (fcntl on POSIX, msvcrt on Windows).
+
+A FileLock is held through an open handle on a lock file, so the OS
+releases it when the owning process exits or crashes; a lock that can be
+acquired therefore means its previous owner is gone.
+
+    with FileLock(registry_path + ".lock"):
+        ...read, merge and rewrite the registry...
+
+    lock = FileLock(os.path.join(session_dir, "session.lock"))
+    if lock.acquire(blocking=False):
+        ...the session's owner is no longer running...
+"""
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+# msvcrt has no blocking lock without a 10 s timeout, so blocking waits poll
+POLL_SECONDS = 0.05
+
+
+class FileLock:
+    """Exclusive lock on a lock file, released on release() or process exit"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    @property
+    def locked(self):
+        return self._file is not None
+
+    def acquire(self, blocking=True):
+        """Take the lock; without blocking returns False when another process holds it"""
+        if self._file is not None:
+            return True
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        lock_file = open(self.path, 'a+b')
+        while True:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                else:
+                    lock_file.seek(0)
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if not blocking:
+                    lock_file.close()
+                    return False
+                time.sleep(POLL_SECONDS)
+        self._file = lock_file
+        return True
+
+    def release(self):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
@@ -0,0 +1,140 @@
+"""Merged-cell ranges of a worksheet with an interval index for cell lookups.
+
+pd.read_excel(header=None) returns the value of a merged block only in its
+top-left cell and NaN everywhere else, so a procedure number merged over
+several rows looks like one numbered row followed by unnumbered fragments.
+This module reads the sheet's <mergeCell> ranges straight from the .xlsx
+package (no full openpyxl load), indexes them per column as sorted,
+non-overlapping row intervals, and answers "which merged block covers
+this cell" with a binary search.
+
+Rows and columns are 0-based and match the positions of the DataFrame
+read with header=None.
+"""
+import posixpath
+import re
+import zipfile
+from bisect import bisect_right
+from xml.etree import ElementTree
+
+import numpy as np
+import pandas as pd
+
+MERGE_CELL_PATTERN = re.compile(rb'<(?:\w+:)?mergeCell\s[^>]*?ref="([A-Z]+)(\d+):([A-Z]+)(\d+)"')
+RELATIONSHIP_ID = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+
+
+def column_index(letters):
+    """0-based column index of a column name such as 'A' or 'AB'"""
+    index = 0
+    for letter in letters:
+        index = index * 26 + (letter - 64 if isinstance(letter, int) else ord(letter) - 64)
+    return index - 1
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def sheet_xml_path(package, sheet_name):
+    """Path of a worksheet's XML part inside an opened .xlsx package, or None"""
+    workbook = ElementTree.fromstring(package.read('xl/workbook.xml'))
+    relationship_id = None
+    for element in workbook.iter():
+        if _local(element.tag) == 'sheet' and element.get('name') == sheet_name:
+            relationship_id = element.get(RELATIONSHIP_ID)
+            break
+    if relationship_id is None:
+        return None
+
+    relationships = ElementTree.fromstring(package.read('xl/_rels/workbook.xml.rels'))
+    for element in relationships.iter():
+        if _local(element.tag) == 'Relationship' and element.get('Id') == relationship_id:
+            target = element.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/')
+            return posixpath.normpath(posixpath.join('xl', target))
+    return None
+
+
+def read_merged_ranges(source_file, sheet_name):
+    """Merged ranges of a sheet as (first_row, first_col, last_row, last_col) tuples.
+
+    Only .xlsx/.xlsm packages carry merge information this way; other
+    formats return no ranges.
+    """
+    if not zipfile.is_zipfile(source_file):
+        return []
+    with zipfile.ZipFile(source_file) as package:
+        path = sheet_xml_path(package, sheet_name)
+        if path is None or path not in package.namelist():
+            return []
+        data = package.read(path)
+
+    # <mergeCells> follows <sheetData>, so search from there
+    start = data.find(b'mergeCells')
+    if start < 0:
+        return []
+    ranges = []
+    for first_col, first_row, last_col, last_row in MERGE_CELL_PATTERN.findall(data, start):
+        ranges.append((int(first_row) - 1, column_index(first_col), int(last_row) - 1, column_index(last_col)))
+    return ranges
+
+
+class MergedRangeIndex:
+    """Per-column interval index over non-overlapping merged ranges.
+
+    origin(row, col) returns the top-left cell of the merged block covering
+    a cell in O(log n), or None for a cell outside every merge.
+    """
+
+    def __init__(self, ranges, max_columns=None):
+        self.ranges = [r for r in ranges if max_columns is None or r[1] < max_columns]
+        columns = {}
+        for first_row, first_col, last_row, last_col in self.ranges:
+            if first_row == last_row and first_col == last_col:
+                continue
+            last_col = last_col if max_columns is None else min(last_col, max_columns - 1)
+            for col in range(first_col, last_col + 1):
+                columns.setdefault(col, []).append((first_row, last_row, first_col))
+        self.starts = {}
+        self.intervals = {}
+        for col, intervals in columns.items():
+            intervals.sort()
+            self.intervals[col] = intervals
+            self.starts[col] = [interval[0] for interval in intervals]
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def origin(self, row, col):
+        starts = self.starts.get(col)
+        if not starts:
+            return None
+        position = bisect_right(starts, row) - 1
+        if position < 0:
+            return None
+        first_row, last_row, first_col = self.intervals[col][position]
+        if row > last_row:
+            return None
+        return first_row, first_col
+
+    def continues(self, row, col):
+        """True when the cell belongs to a merged block that started above this row"""
+        origin = self.origin(row, col)
+        return origin is not None and origin[0] < row
+
+    def propagate(self, df):
+        """Copy of df with each merged block filled with its top-left value"""
+        if not self.ranges:
+            return df
+        values = df.to_numpy(dtype=object, copy=True)
+        rows, columns = values.shape
+        for first_row, first_col, last_row, last_col in self.ranges:
+            if first_row >= rows or first_col >= columns:
+                continue
+            top_left = values[first_row, first_col]
+            if top_left is None or (isinstance(top_left, float) and np.isnan(top_left)):
+                continue
+            values[first_row:last_row + 1, first_col:last_col + 1] = top_left
+        return pd.DataFrame(values, index=df.index, columns=df.columns)
@@ -0,0 +1,156 @@
+"""Paged, filterable previews of the FORMTEMPLATE and FORMLOV rows.
+
+The previews never build a whole table. Every procedure contributes the
+same fields in the same order, so the position of each row is known
+from the layout alone: filtering by KEYTYPE or procedure selects row
+positions arithmetically, and a page builds only the rows it shows by
+running the compiled template generator for the procedures on that page
+(see templates.compile_template's first/header arguments).
+"""
+from templates import TEMPLATE_COLUMNS, compile_template, template_keytypes
+
+PREVIEW_PAGE_SIZE = 100
+LOV_COLUMNS = ('LOVID', 'ORG', 'LOVNAME', 'VALUE', 'VALLOW', 'VALHI', 'VALDESC', 'ENABLE', 'TYPE')
+
+
+def matching_procedures(procedures, query):
+    """Indices of procedures whose number equals query or whose text contains it"""
+    query = (query or '').strip()
+    if not query:
+        return range(len(procedures))
+    if query.isdigit():
+        number = int(query)
+        return [i for i, proc in enumerate(procedures) if proc['number'] == number]
+    query = query.lower()
+    return [i for i, proc in enumerate(procedures) if query in proc['text'].lower()]
+
+
+class TemplatePreview:
+    """Lazily built FORMTEMPLATE rows of one form"""
+
+    columns = TEMPLATE_COLUMNS
+
+    def __init__(self, template_name, procedures, lov_configurations, org_code, form_name, form_description,
+                 key_prefix, lov_prefix):
+        self.emit = compile_template(template_name)
+        self.procedures = procedures
+        self.lov_configurations = lov_configurations
+        self.form_arguments = (org_code, form_name, form_description, key_prefix, lov_prefix)
+        self.header_types, self.field_types = template_keytypes(template_name)
+        self.positions = range(len(self))
+
+    def __len__(self):
+        return len(self.header_types) + len(self.procedures) * len(self.field_types)
+
+    @property
+    def keytypes(self):
+        return sorted({keytype for keytype in self.header_types + self.field_types if keytype})
+
+    def filter(self, keytype=None, procedure_query=None):
+        """Restrict the visible rows; returns the number of matching rows"""
+        by_procedure = bool(procedure_query and procedure_query.strip())
+        if not keytype and not by_procedure:
+            self.positions = range(len(self))
+            return len(self.positions)
+
+        header_count = len(self.header_types)
+        per_procedure = len(self.field_types)
+        # The header belongs to no procedure
+        header = [] if by_procedure else [offset for offset, field_type in enumerate(self.header_types)
+                                          if not keytype or field_type == keytype]
+        offsets = [offset for offset, field_type in enumerate(self.field_types)
+                   if not keytype or field_type == keytype]
+        self.positions = header + [header_count + index * per_procedure + offset
+                                   for index in matching_procedures(self.procedures, procedure_query)
+                                   for offset in offsets]
+        return len(self.positions)
+
+    def page_count(self, page_size=PREVIEW_PAGE_SIZE):
+        return max(1, -(-len(self.positions) // page_size))
+
+    def page(self, number, page_size=PREVIEW_PAGE_SIZE):
+        """Rows of one page of the filtered positions"""
+        return self.rows_at(self.positions[number * page_size:(number + 1) * page_size])
+
+    def rows_at(self, positions):
+        """Build only the rows at the given positions"""
+        header_count = len(self.header_types)
+        per_procedure = len(self.field_types)
+        positions = list(positions)
+        if not positions:
+            return []
+
+        built = {}
+        if positions[0] < header_count:
+            header_rows = self.emit([], [], *self.form_arguments)
+            built.update(enumerate(header_rows))
+
+        # Emit each contiguous run of procedures once
+        indices = sorted({(position - header_count) // per_procedure
+                          for position in positions if position >= header_count})
+        run_start = None
+        for n, index in enumerate(indices):
+            if run_start is None:
+                run_start = index
+            if n + 1 < len(indices) and indices[n + 1] == index + 1:
+                continue
+            rows = self.emit(self.procedures[run_start:index + 1], self.lov_configurations[run_start:index + 1],
+                             *self.form_arguments, first=run_start, header=False)
+            base = header_count + run_start * per_procedure
+            built.update((base + offset, row) for offset, row in enumerate(rows))
+            run_start = None
+
+        return [built[position] for position in positions]
+
+
+class LovPreview:
+    """Lazily built FORMLOV rows: the standard LOVs, then one row per LOV database value"""
+
+    columns = LOV_COLUMNS
+    keytypes = []
+
+    def __init__(self, standard_rows, lov_database, make_row, procedures=(), lov_configurations=()):
+        self.standard_rows = standard_rows
+        self.lov_database = lov_database
+        self.make_row = make_row
+        self.procedures = procedures
+        self.lov_configurations = lov_configurations
+        self.entries = [(code, value_index) for code, values in lov_database.items()
+                        for value_index in range(len(values))]
+        self.positions = range(len(self))
+
+    def __len__(self):
+        return len(self.standard_rows) + len(self.entries)
+
+    def filter(self, keytype=None, procedure_query=None):
+        """Restrict to the LOVs used by the matching procedures (standard LOVs always shown)"""
+        if not (procedure_query and procedure_query.strip()):
+            self.positions = range(len(self))
+            return len(self.positions)
+        codes = set()
+        for index in matching_procedures(self.procedures, procedure_query):
+            if index < len(self.lov_configurations):
+                config = self.lov_configurations[index]
+                codes.update(code for code in (config.get('condition_lov_code'), config.get('action_lov_code'))
+                             if code)
+        standard_count = len(self.standard_rows)
+        self.positions = list(range(standard_count)) + [
+            standard_count + n for n, (code, _) in enumerate(self.entries) if code in codes]
+        return len(self.positions)
+
+    def page_count(self, page_size=PREVIEW_PAGE_SIZE):
+        return max(1, -(-len(self.positions) // page_size))
+
+    def page(self, number, page_size=PREVIEW_PAGE_SIZE):
+        return self.rows_at(self.positions[number * page_size:(number + 1) * page_size])
+
+    def rows_at(self, positions):
+        standard_count = len(self.standard_rows)
+        rows = []
+        for position in positions:
+            if position < standard_count:
+                rows.append(self.standard_rows[position])
+                continue
+            code, value_index = self.entries[position - standard_count]
+            rows.append(self.make_row(code, self.lov_database[code][value_index]))
+        return rows
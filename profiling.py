@@ -0,0 +1,169 @@
+"""Per-phase instrumentation for the converter.
+
+Wraps pipeline phases (analysis, LOV setup, template generation, file
+writers) and records wall time and CPU time of each one. An opt-in
+capture mode also records the tracemalloc allocation peak of every phase
+and runs top-level phases under cProfile, dumping one .prof file per
+phase into a session directory. Both slow the traced code down several
+times, so they stay off unless capture is enabled.
+"""
+import cProfile
+import functools
+import os
+import re
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+
+
+class PhaseProfiler:
+    """Records timing and allocation peak for nested named phases"""
+
+    def __init__(self, max_records=500, track_allocations=False):
+        self.records = deque(maxlen=max_records)
+        self.track_allocations = track_allocations
+        self.listeners = []
+        self.capture_dir = None
+        self.session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self._stack = []
+        self._started_tracemalloc = False
+        self._capture_count = 0
+
+    def add_listener(self, callback):
+        """Call callback(record) whenever a phase finishes"""
+        self.listeners.append(callback)
+
+    def enable_capture(self, directory):
+        """Dump a cProfile .prof file for every top-level phase into directory and track allocation peaks"""
+        self.capture_dir = os.path.join(directory, f"profile_{self.session_id}")
+        os.makedirs(self.capture_dir, exist_ok=True)
+        self.track_allocations = True
+        return self.capture_dir
+
+    def disable_capture(self):
+        self.capture_dir = None
+        self.track_allocations = False
+
+    def clear(self):
+        self.records.clear()
+
+    def current_phase(self):
+        """Name of the innermost running phase, or None"""
+        return self._stack[-1]['phase'] if self._stack else None
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def _enter(self, name):
+        # Fixed per phase, so toggling capture while phases run leaves them consistent
+        frame = {'phase': name, 'depth': len(self._stack), 'peak': 0, 'profile': None,
+                 'tracked': self.track_allocations}
+
+        if frame['tracked']:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            current, peak = tracemalloc.get_traced_memory()
+            # Fold the peak seen so far into the enclosing phases before resetting it
+            for outer in self._stack:
+                outer['peak'] = max(outer['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+
+        if self.capture_dir and not self._stack:
+            frame['profile'] = cProfile.Profile()
+            frame['profile'].enable()
+
+        self._stack.append(frame)
+        frame['wall'] = time.perf_counter()
+        frame['cpu'] = time.process_time()
+
+    def _exit(self, error=None):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        frame = self._stack.pop()
+
+        if frame['profile'] is not None:
+            frame['profile'].disable()
+            self._capture_count += 1
+            safe_name = re.sub(r'[^\w-]', '_', frame['phase'])
+            frame['profile'].dump_stats(
+                os.path.join(self.capture_dir, f"{self._capture_count:03d}_{safe_name}.prof"))
+
+        record = {
+            'phase': frame['phase'],
+            'depth': frame['depth'],
+            'wall_seconds': wall - frame['wall'],
+            'cpu_seconds': cpu - frame['cpu'],
+            'peak_bytes': None,
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'error': error,
+        }
+
+        if frame['tracked'] and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            record['peak_bytes'] = max(0, max(frame['peak'], peak) - frame['base'])
+            for outer in self._stack:
+                outer['peak'] = max(outer['peak'], peak)
+        if not self._stack and self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+        self.records.append(record)
+        for callback in self.listeners:
+            callback(record)
+        return record
+
+
+class _Phase:
+    """Context manager for one profiled phase"""
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler._exit(error=exc_type.__name__ if exc_type else None)
+        return False
+
+
+def profiled(name=None):
+    """Decorate a converter method so it runs as a phase of self.profiler"""
+    def decorator(method):
+        phase_name = name or method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = getattr(self, 'profiler', None)
+            if profiler is None:
+                return method(self, *args, **kwargs)
+            with profiler.phase(phase_name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def format_bytes(value):
+    """Human readable byte count"""
+    if value is None:
+        return "-"
+    for unit in ('B', 'KB', 'MB'):
+        if abs(value) < 1024:
+            return f"{value:.0f} {unit}" if unit == 'B' else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def format_record(record):
+    """One-line summary of a phase record for the status bar"""
+    text = f"{record['phase']}: {record['wall_seconds'] * 1000:.0f} ms wall, {record['cpu_seconds'] * 1000:.0f} ms CPU"
+    if record['peak_bytes'] is not None:
+        text += f", peak {format_bytes(record['peak_bytes'])}"
+    if record['error']:
+        text += f" ({record['error']})"
+    return text
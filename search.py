@@ -0,0 +1,147 @@
+"""Inverted index over procedure texts, LOV values and LOV codes.
+
+Every word of a procedure's searchable fields is indexed under each of
+its prefixes, so the last word of a query typed so far ("filt") matches
+without scanning: a query is the intersection of one posting set per
+query word. Documents have stable ids, so inserting or deleting a
+procedure only shifts the id list, and an edit only adds and removes the
+prefixes that changed.
+
+    index = ProcedureSearchIndex()
+    index.build(procedures, lov_configurations)
+    index.search("oil filt")    # -> sorted procedure positions
+    index.update(3, text="Replace oil filter")
+    index.insert(5, procedure, lov_configuration)
+    index.remove(2)
+"""
+import re
+from itertools import count
+
+SEARCH_FIELDS = ('text', 'condition_values', 'action_values', 'condition_lov_code', 'action_lov_code')
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return WORD_PATTERN.findall(text.lower()) if text else []
+
+
+def prefixes(fields):
+    """Every prefix of every word of the given field texts"""
+    terms = set()
+    for text in fields.values():
+        for word in tokenize(text):
+            terms.update(word[:end] for end in range(1, len(word) + 1))
+    return terms
+
+
+def procedure_fields(procedure, lov_configuration=None):
+    fields = {'text': procedure.get('text', '')}
+    for field in SEARCH_FIELDS[1:]:
+        fields[field] = (lov_configuration or {}).get(field, '')
+    return fields
+
+
+class ProcedureSearchIndex:
+    """Prefix index of the procedures of one form, kept in step with edits"""
+
+    def __init__(self):
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget everything; the next build() indexes the procedures from scratch"""
+        self.postings = {}
+        self.doc_fields = {}
+        self.doc_terms = {}
+        # Document id of each procedure position; None until built
+        self.doc_ids = None
+        self._positions = None
+        self._ids = count()
+
+    @property
+    def built(self):
+        return self.doc_ids is not None
+
+    def __len__(self):
+        return len(self.doc_ids) if self.built else 0
+
+    def build(self, procedures, lov_configurations=()):
+        self.invalidate()
+        self.doc_ids = []
+        lov_configurations = list(lov_configurations or ())
+        for index, procedure in enumerate(procedures):
+            config = lov_configurations[index] if index < len(lov_configurations) else None
+            self.doc_ids.append(self._add(procedure_fields(procedure, config)))
+
+    def _add(self, fields):
+        doc = next(self._ids)
+        terms = prefixes(fields)
+        self.doc_fields[doc] = fields
+        self.doc_terms[doc] = terms
+        for term in terms:
+            self.postings.setdefault(term, set()).add(doc)
+        return doc
+
+    def _discard(self, doc, terms):
+        for term in terms:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.discard(doc)
+                if not docs:
+                    del self.postings[term]
+
+    def insert(self, index, procedure, lov_configuration=None):
+        if not self.built:
+            return
+        self.doc_ids.insert(index, self._add(procedure_fields(procedure, lov_configuration)))
+        self._positions = None
+
+    def remove(self, index):
+        if not self.built or index >= len(self.doc_ids):
+            return
+        doc = self.doc_ids.pop(index)
+        self._discard(doc, self.doc_terms.pop(doc))
+        del self.doc_fields[doc]
+        self._positions = None
+
+    def update(self, index, **fields):
+        """Re-index the changed fields (text, condition_values, ...) of one procedure"""
+        if not self.built or index >= len(self.doc_ids):
+            return
+        doc = self.doc_ids[index]
+        merged = dict(self.doc_fields[doc])
+        merged.update((field, value or '') for field, value in fields.items() if field in merged)
+        if merged == self.doc_fields[doc]:
+            return
+        old_terms, new_terms = self.doc_terms[doc], prefixes(merged)
+        self._discard(doc, old_terms - new_terms)
+        for term in new_terms - old_terms:
+            self.postings.setdefault(term, set()).add(doc)
+        self.doc_fields[doc] = merged
+        self.doc_terms[doc] = new_terms
+
+    def search(self, query):
+        """Sorted positions of the procedures matching every word of query, or None for an empty query.
+
+        A query that is a bare number also matches the procedure with that number.
+        """
+        words = set(tokenize(query))
+        if not words or not self.built:
+            return None
+        postings = sorted((self.postings.get(word, set()) for word in words), key=len)
+        docs = postings[0]
+        for found in postings[1:]:
+            if not docs:
+                break
+            docs = docs & found
+
+        if len(docs) * 4 > len(self.doc_ids):
+            # Most procedures match: walking the id list is cheaper than sorting the positions
+            positions = [position for position, doc in enumerate(self.doc_ids) if doc in docs]
+        else:
+            if self._positions is None:
+                self._positions = {doc: position for position, doc in enumerate(self.doc_ids)}
+            positions = sorted(self._positions[doc] for doc in docs)
+        query = query.strip()
+        if query.isdigit() and 1 <= int(query) <= len(self.doc_ids) and int(query) - 1 not in positions:
+            positions = sorted(positions + [int(query) - 1])
+        return positions
@@ -0,0 +1,405 @@
+"""Local HTTP service exposing the conversion pipeline as a JSON API.
+
+An asyncio front end accepts requests and hands the pandas work to a
+bounded process pool. At most workers + queue_size jobs are admitted at a
+time; further requests get 503 with Retry-After instead of piling up.
+
+Endpoints (JSON bodies and responses):
+    GET  /health          pool size, running and queued jobs
+    GET  /metrics         Prometheus text format
+    POST /upload          raw workbook body (X-Filename header) -> {"source_file"}
+    POST /sheets          {"source_file"} -> sheet names and the likely sheets
+    POST /analyze         {"source_file", "sheet"} -> header row and procedures
+    POST /auto-configure  {"source_file", "sheet"} -> procedures with LOV values and codes
+    POST /generate        {"source_file", "sheet", "sink", ...} -> outputs
+
+Generate sinks: "xlsx" (four workbooks), "delta-xlsx" / "delta-sql"
+(changes since the previous generation of the form) and "json" (rows
+returned in the response, nothing written). Files written by a request
+carry its timestamp and a random suffix, so concurrent requests for the
+same form never clash in the form folder; the folder itself is kept so
+delta sinks find the manifest of the previous generation.
+
+Usage:
+    python service.py --port 8765 --workers 4 --output-dir out
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from batch import stage_durations
+from headless import HeadlessConverter
+from profiling import PhaseProfiler
+from telemetry import ConversionTelemetry
+
+MAX_BODY_BYTES = 64 * 1024 * 1024
+SINKS = {'xlsx': None, 'delta-xlsx': 'xlsx', 'delta-sql': 'sql', 'json': None}
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict',
+               413: 'Payload Too Large', 422: 'Unprocessable Entity', 500: 'Internal Server Error',
+               503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+
+class ServiceBusy(Exception):
+    """Raised when the job queue is full"""
+
+
+# --- Pipeline jobs, run in the worker processes -------------------------------
+
+def _load(params, profiler=None, output_root=None):
+    source_file = params.get('source_file')
+    sheet_name = params.get('sheet')
+    if not source_file or not sheet_name:
+        raise ValueError("'source_file' and 'sheet' are required")
+    if not os.path.exists(source_file):
+        raise FileNotFoundError(source_file)
+
+    converter = HeadlessConverter(form_name=params.get('form_name', ''),
+                                  form_description=params.get('form_description', ''), output_dir=output_root)
+    if params.get('user_name'):
+        converter.user_name_var.set(params['user_name'])
+    converter.profiler = profiler
+    # Jobs already run in a process pool; extract in the job's own process
+    converter.extraction_workers = 1
+    converter.load_sheet(source_file, sheet_name)
+    header_row = converter.analyze()
+    return converter, header_row
+
+
+def sheets_job(params):
+    source_file = params.get('source_file')
+    if not source_file:
+        raise ValueError("'source_file' is required")
+    if not os.path.exists(source_file):
+        raise FileNotFoundError(source_file)
+    converter = HeadlessConverter()
+    sheet_names = converter.list_sheets(source_file)
+    return {'sheets': sheet_names, 'likely_sheets': converter.find_likely_sheets(sheet_names)}
+
+
+def analyze_job(params):
+    converter, header_row = _load(params)
+    return {
+        'header_row': header_row,
+        'rows': converter.sheet_shape[0],
+        'columns': converter.sheet_shape[1],
+        'form_name': converter.form_name_var.get(),
+        'procedures': converter.procedures,
+    }
+
+
+def auto_configure_job(params):
+    converter, header_row = _load(params)
+    configured = converter.auto_configure_lovs()
+    return {
+        'header_row': header_row,
+        'configured': configured,
+        'lov_configurations': [
+            {'procedure': proc['text'], **config}
+            for proc, config in zip(converter.procedures, converter.collect_lov_configurations())
+        ],
+        'lov_database': converter.lov_database,
+    }
+
+
+def generate_job(params, output_root):
+    sink = params.get('sink', 'xlsx')
+    if sink not in SINKS:
+        raise ValueError(f"Unknown sink {sink!r}; expected one of {sorted(SINKS)}")
+
+    profiler = PhaseProfiler(track_allocations=False)
+    start = time.perf_counter()
+    converter, header_row = _load(params, profiler, output_root)
+    if not converter.procedures:
+        raise ValueError("No procedures detected")
+    converter.auto_configure_lovs()
+    form_name = converter.form_name_var.get()
+
+    result = {'form_name': form_name, 'header_row': header_row, 'procedures': len(converter.procedures),
+              'lov_codes': len(converter.lov_database), 'rows_scanned': converter.sheet_shape[0],
+              'registry_entry': None}
+    if sink == 'json':
+        tables = converter.build_output_tables()
+        result['tables'] = tables
+        result['outputs'] = [{'table': table, 'file': None, 'rows': len(rows), 'bytes': 0}
+                             for table, rows in tables.items()]
+    else:
+        form_dir = _output_dir(output_root, params.get('output_subdir') or re.sub(r'[^\w.-]', '_', form_name))
+        os.makedirs(form_dir, exist_ok=True)
+        timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        result['outputs'] = converter.write_output_files(form_dir, timestamp, SINKS[sink])
+        result['registry_entry'] = converter.global_lov_registry["form_registry"].get(form_name)
+    result['stages'] = stage_durations(profiler, start)
+    return result
+
+
+def _output_dir(output_root, subdir):
+    """Resolve a request's output subdirectory, refusing paths outside output_root"""
+    root = os.path.abspath(output_root)
+    path = os.path.abspath(os.path.join(root, subdir))
+    if os.path.commonpath([root, path]) != root:
+        raise ValueError(f"Output directory {subdir!r} is outside the service output directory")
+    return path
+
+
+# --- Asyncio front end --------------------------------------------------------
+
+class JobQueue:
+    """Admits at most workers + queue_size jobs into the process pool"""
+
+    def __init__(self, workers, queue_size):
+        self.workers = workers
+        self.limit = workers + queue_size
+        self.admitted = 0
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+
+    @property
+    def running(self):
+        return min(self.admitted, self.workers)
+
+    @property
+    def queued(self):
+        return max(0, self.admitted - self.workers)
+
+    async def submit(self, function, *args):
+        if self.admitted >= self.limit:
+            raise ServiceBusy()
+        self.admitted += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+        finally:
+            self.admitted -= 1
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class ConverterService:
+    """Routes HTTP requests to pipeline jobs and tracks metrics"""
+
+    def __init__(self, output_dir, workers=None, queue_size=None, trace_path=None, upload_dir=None):
+        workers = workers or os.cpu_count() or 1
+        self.output_dir = os.path.abspath(output_dir)
+        self.upload_dir = os.path.abspath(upload_dir or os.path.join(self.output_dir, "uploads"))
+        self.jobs = JobQueue(workers, workers * 4 if queue_size is None else queue_size)
+        self.telemetry = ConversionTelemetry(trace_path)
+        self.metrics = self.telemetry.metrics
+        self.started = time.time()
+        self.routes = {
+            ('GET', '/health'): self.health,
+            ('GET', '/metrics'): self.render_metrics,
+            ('POST', '/upload'): self.upload,
+            ('POST', '/sheets'): self.job_handler(sheets_job),
+            ('POST', '/analyze'): self.job_handler(analyze_job),
+            ('POST', '/auto-configure'): self.job_handler(auto_configure_job),
+            ('POST', '/generate'): self.generate,
+        }
+
+    def job_handler(self, function):
+        async def handler(request):
+            return 200, await self.run_job(function, request.json())
+        return handler
+
+    async def run_job(self, function, *args):
+        try:
+            return await self.jobs.submit(function, *args)
+        except ServiceBusy:
+            self.metrics.inc('service_rejected_total', help_text="Requests rejected because the queue was full")
+            raise HTTPError(503, "Job queue is full, retry later", {'Retry-After': '1'})
+        except FileNotFoundError as e:
+            raise HTTPError(404, f"File not found: {e}")
+        except FileExistsError as e:
+            raise HTTPError(409, str(e))
+        except ValueError as e:
+            raise HTTPError(422, str(e))
+
+    async def health(self, request):
+        return 200, {
+            'status': 'ok',
+            'uptime_seconds': round(time.time() - self.started, 3),
+            'workers': self.jobs.workers,
+            'running': self.jobs.running,
+            'queued': self.jobs.queued,
+            'capacity': self.jobs.limit,
+        }
+
+    async def render_metrics(self, request):
+        self.metrics.set_gauge('service_jobs_running', self.jobs.running, help_text="Jobs executing in the pool")
+        self.metrics.set_gauge('service_jobs_queued', self.jobs.queued, help_text="Jobs waiting for a worker")
+        self.metrics.set_gauge('service_workers', self.jobs.workers, help_text="Process pool size")
+        return 200, self.metrics.render()
+
+    async def upload(self, request):
+        filename = os.path.basename(request.headers.get('x-filename', '')) or "upload.xlsx"
+        if not filename.lower().endswith(('.xlsx', '.xls')):
+            raise HTTPError(400, "X-Filename must name an .xlsx or .xls workbook")
+        if not request.body:
+            raise HTTPError(400, "Empty upload")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        path = os.path.join(self.upload_dir, f"{uuid.uuid4().hex[:12]}_{filename}")
+        with open(path, 'wb') as f:
+            f.write(request.body)
+        return 200, {'source_file': path, 'bytes': len(request.body)}
+
+    async def generate(self, request):
+        params = request.json()
+        try:
+            result = await self.run_job(generate_job, params, self.output_dir)
+        except HTTPError as e:
+            if e.status != 503:
+                self.telemetry.record_conversion(params.get('source_file'), params.get('sheet'), 'failed', {},
+                                                 error=str(e))
+            raise
+        self.telemetry.record_conversion(
+            source_file=params.get('source_file'),
+            sheet_name=params.get('sheet'),
+            status='ok',
+            stages=result.pop('stages'),
+            form_name=result['form_name'],
+            rows_scanned=result['rows_scanned'],
+            procedures=result['procedures'],
+            lov_codes=result['lov_codes'],
+            outputs=result['outputs'],
+            registry_entry=result.pop('registry_entry'),
+        )
+        return 200, result
+
+    async def handle_connection(self, reader, writer):
+        start = time.perf_counter()
+        endpoint, status = 'unknown', 500
+        try:
+            request = await Request.read(reader)
+            if request is None:
+                return
+            endpoint = request.path
+            handler = self.routes.get((request.method, request.path))
+            try:
+                if handler is None:
+                    known_path = any(path == request.path for _, path in self.routes)
+                    raise HTTPError(405 if known_path else 404, f"No route for {request.method} {request.path}")
+                status, body = await handler(request)
+                headers = {}
+            except HTTPError as e:
+                status, body, headers = e.status, {'error': str(e)}, e.headers
+            except Exception as e:
+                status, body, headers = 500, {'error': f"{type(e).__name__}: {e}"}, {}
+            await write_response(writer, status, body, headers)
+        except HTTPError as e:
+            status = e.status
+            await write_response(writer, status, {'error': str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if endpoint not in {path for _, path in self.routes}:
+                endpoint = 'unknown'
+            self.metrics.inc('service_requests_total', labels={'endpoint': endpoint, 'status': status},
+                             help_text="HTTP requests, by endpoint and status")
+            self.metrics.observe('service_request_duration_seconds', time.perf_counter() - start,
+                                 labels={'endpoint': endpoint}, help_text="HTTP request latency")
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        addresses = ", ".join(str(sock.getsockname()) for sock in server.sockets)
+        print(f"Serving on {addresses} with {self.jobs.workers} workers (capacity {self.jobs.limit})")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.jobs.shutdown()
+
+
+class Request:
+    """Minimal HTTP/1.1 request: one request per connection"""
+
+    def __init__(self, method, path, headers, body):
+        self.method = method
+        self.path = path
+        self.headers = headers
+        self.body = body
+
+    @classmethod
+    async def read(cls, reader):
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HTTPError(400, "Malformed request line")
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = int(headers.get('content-length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise HTTPError(413, f"Body larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b''
+        return cls(method.upper(), urlsplit(target).path, headers, body)
+
+    def json(self):
+        if not self.body:
+            return {}
+        try:
+            data = json.loads(self.body)
+        except ValueError:
+            raise HTTPError(400, "Body is not valid JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Body must be a JSON object")
+        return data
+
+
+async def write_response(writer, status, body, headers=None):
+    if isinstance(body, str):
+        payload = body.encode('utf-8')
+        content_type = 'text/plain; version=0.0.4; charset=utf-8'
+    else:
+        payload = json.dumps(body, ensure_ascii=False, default=str).encode('utf-8')
+        content_type = 'application/json'
+    lines = [f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Content-Length: {len(payload)}",
+             "Connection: close"]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + payload)
+    await writer.drain()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the PM form converter as a local HTTP API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, help="Process pool size (default: CPU count)")
+    parser.add_argument('--queue-size', type=int, help="Jobs allowed to wait for a worker (default: 4 x workers)")
+    parser.add_argument('--output-dir', default=os.getcwd(), help="Root directory for generated files")
+    parser.add_argument('--trace', help="Append JSON-lines trace records for generate requests")
+    args = parser.parse_args()
+
+    service = ConverterService(args.output_dir, args.workers, args.queue_size, args.trace)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""Near-duplicate procedure detection with shingling, MinHash and LSH.
+
+Procedure texts are reduced to character shingles of their normalized
+form, and each text gets a MinHash signature (num_perm multiply-add
+permutations of the 32-bit shingle values). Locality-sensitive hashing splits the signatures into
+bands; texts sharing any band bucket become candidate pairs, and only those
+pairs are verified against the Jaccard threshold. Identical texts are
+collapsed before hashing, so the work grows with the number of distinct
+texts and candidate pairs instead of every pair of procedures.
+
+ProcedureHistory keeps the signatures of procedures from forms generated
+earlier (per output directory), so a session's procedures are clustered
+together with those forms and can take over their LOV assignments.
+
+The default threshold of 0.6 on 4-character shingles groups rewordings
+such as "Check oil level of gearbox" / "Check the oil level of the
+gearbox" while keeping different steps on the same equipment apart.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from fingerprint import normalize_text
+
+SIMILARITY_DIR = ".pm_similarity"
+HISTORY_VERSION = 1
+
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 4
+DEFAULT_THRESHOLD = 0.6
+
+_CHUNK_SHINGLES = 200_000
+
+
+def shingle_hashes(texts, size=SHINGLE_SIZE):
+    """32-bit hashes of the byte shingles of each normalized text, plus per-text offsets.
+
+    A 4-byte shingle is its own 32-bit value, so the shingles of all texts
+    are read in one vectorized pass over the concatenated UTF-8 bytes.
+    """
+    encoded = [normalize_text(text).encode('utf-8').ljust(size, b'\0') for text in texts]
+    lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])) if len(encoded) else np.empty(0, np.int64)
+    buffer = np.frombuffer(b''.join(encoded) + b'\0' * size, dtype=np.uint8).astype(np.uint32)
+
+    counts = lengths - size + 1
+    positions = np.repeat(starts - np.concatenate(([0], np.cumsum(counts)[:-1])), counts) + np.arange(counts.sum())
+    values = np.zeros(len(positions), dtype=np.uint32)
+    for offset in range(size):
+        values |= buffer[positions + offset] << np.uint32(8 * (offset % 4))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+    return values, offsets
+
+
+class MinHasher:
+    """MinHash signatures with num_perm multiply-add hash permutations over 32-bit shingles"""
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(0, 2 ** 31, size=num_perm).astype(np.uint32) * np.uint32(2) + np.uint32(1)
+        self.b = generator.randint(0, 2 ** 31, size=num_perm).astype(np.uint32)
+
+    def signatures(self, texts):
+        """uint32 array of shape (len(texts), num_perm)"""
+        result = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+        if not len(texts):
+            return result
+        values, offsets = shingle_hashes(texts, self.shingle_size)
+        # Spread the raw shingle bytes before the permutations (murmur3 finalizer)
+        values ^= values >> np.uint32(16)
+        values *= np.uint32(0x85EBCA6B)
+        values ^= values >> np.uint32(13)
+
+        start_text = 0
+        while start_text < len(texts):
+            # Take whole texts until the chunk holds about _CHUNK_SHINGLES shingles
+            end_text = int(np.searchsorted(offsets, offsets[start_text] + _CHUNK_SHINGLES, side='right')) - 1
+            end_text = min(max(end_text, start_text + 1), len(texts))
+            chunk = values[offsets[start_text]:offsets[end_text]]
+            permuted = self.a[:, None] * chunk + self.b[:, None]  # wraps modulo 2**32
+            starts = offsets[start_text:end_text] - offsets[start_text]
+            result[start_text:end_text] = np.minimum.reduceat(permuted, starts, axis=1).T
+            start_text = end_text
+        return result
+
+
+def candidate_pairs(signatures, bands=BANDS):
+    """Unique (i, leader) pairs, leader < i, where leader is the first text in a shared LSH bucket.
+
+    Pairing every bucket member with the bucket's first member keeps the
+    candidate count linear in the number of texts per band.
+    """
+    count, num_perm = signatures.shape
+    rows = num_perm // bands
+    pairs = []
+    for band in range(bands):
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows))).ravel()
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        leaders = first[inverse.ravel()]
+        members = np.flatnonzero(leaders != np.arange(count))
+        pairs.append(np.column_stack([members, leaders[members]]))
+    if not pairs:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pairs), axis=0)
+
+
+def estimated_similarity(signatures, pairs, chunk_size=100_000):
+    """Estimated Jaccard similarity for an (n, 2) array of index pairs"""
+    similarity = np.empty(len(pairs))
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        similarity[start:start + chunk_size] = (signatures[chunk[:, 0]] == signatures[chunk[:, 1]]).mean(axis=1)
+    return similarity
+
+
+def _find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+def cluster_texts(texts, threshold=DEFAULT_THRESHOLD, hasher=None, signatures=None, bands=BANDS):
+    """Groups of indices into texts whose shingle sets are at least threshold similar.
+
+    Only groups of two or more are returned, each sorted, largest first.
+    """
+    hasher = hasher or MinHasher()
+    keys = [normalize_text(text) for text in texts]
+    distinct = {}
+    text_ids = [distinct.setdefault(key, len(distinct)) for key in keys]
+    if signatures is None:
+        signatures = hasher.signatures(list(distinct))
+    else:
+        first = {}
+        for index, text_id in enumerate(text_ids):
+            first.setdefault(text_id, index)
+        signatures = signatures[[first[text_id] for text_id in range(len(distinct))]]
+
+    parent = list(range(len(distinct)))
+    pairs = candidate_pairs(signatures, bands)
+    similar = pairs[estimated_similarity(signatures, pairs) >= threshold]
+    for i, j in similar.tolist():
+        root_i, root_j = _find(parent, i), _find(parent, j)
+        if root_i != root_j:
+            parent[root_j] = root_i
+
+    groups = {}
+    for index, text_id in enumerate(text_ids):
+        groups.setdefault(_find(parent, text_id), []).append(index)
+    clusters = [members for members in groups.values() if len(members) > 1]
+    clusters.sort(key=lambda members: (-len(members), members[0]))
+    return clusters
+
+
+class ProcedureHistory:
+    """Signatures and LOV assignments of procedures from previously generated forms.
+
+    Each form is one compressed .npz file named after a hash of its
+    FORMNAME, so regenerating a form replaces only its own file and
+    concurrent batch workers never rewrite each other's entries.
+    """
+
+    def __init__(self, directory, hasher=None):
+        self.directory = directory
+        self.hasher = hasher or MinHasher()
+        self.entries = []
+        self.signatures = np.empty((0, self.hasher.num_perm), dtype=np.uint32)
+
+    @classmethod
+    def for_output_dir(cls, output_dir, hasher=None):
+        return cls(os.path.join(output_dir, SIMILARITY_DIR), hasher)
+
+    def form_path(self, form_name):
+        digest = hashlib.sha1(form_name.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}.npz")
+
+    def load(self):
+        """Read every stored form; returns self"""
+        entries, signatures = [], [self.signatures[:0]]
+        if os.path.isdir(self.directory):
+            for name in sorted(os.listdir(self.directory)):
+                if not name.endswith('.npz'):
+                    continue
+                try:
+                    with np.load(os.path.join(self.directory, name)) as data:
+                        stored = json.loads(data['entries'].item())
+                        form_signatures = data['signatures']
+                except (OSError, ValueError, KeyError):
+                    continue
+                if (stored.get('version') != HISTORY_VERSION or len(stored['entries']) != len(form_signatures)
+                        or form_signatures.shape[1] != self.hasher.num_perm):
+                    continue
+                entries.extend(stored['entries'])
+                signatures.append(form_signatures)
+        self.entries = entries
+        self.signatures = np.concatenate(signatures)
+        return self
+
+    def save_form(self, form_name, procedures, lov_configurations, lov_database):
+        """Store the procedures of one form with their LOV values and codes"""
+        entries = []
+        for i, proc in enumerate(procedures):
+            config = lov_configurations[i] if i < len(lov_configurations) else {}
+            condition_code = config.get('condition_lov_code') or ''
+            action_code = config.get('action_lov_code') or ''
+            entries.append({
+                'form_name': form_name,
+                'number': proc['number'],
+                'text': proc['text'],
+                'condition_values': config.get('condition_values', ''),
+                'action_values': config.get('action_values', ''),
+                'condition_lov_code': condition_code,
+                'action_lov_code': action_code,
+                'condition_lov_values': lov_database.get(condition_code, []),
+                'action_lov_values': lov_database.get(action_code, []),
+            })
+        signatures = self.hasher.signatures([entry['text'] for entry in entries])
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.form_path(form_name)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, signatures=signatures,
+                                entries=np.array(json.dumps({'version': HISTORY_VERSION, 'entries': entries},
+                                                            ensure_ascii=False)))
+        os.replace(temp_path, path)
+        return path
+
+
+def session_clusters(procedures, history=None, form_name=None, threshold=DEFAULT_THRESHOLD, hasher=None):
+    """Near-duplicate clusters among the session's procedures and earlier forms.
+
+    Each cluster is a list of members {'source': 'session', 'index': i,
+    'procedure': proc} or {'source': 'history', 'entry': entry}; only
+    clusters with at least one session procedure are returned. History
+    entries of form_name itself (an earlier generation of this form) are
+    left out.
+    """
+    hasher = hasher or (history.hasher if history is not None else MinHasher())
+    texts = [proc['text'] for proc in procedures]
+    signatures = hasher.signatures(texts)
+
+    history_rows = []
+    if history is not None and len(history.entries):
+        history_rows = [i for i, entry in enumerate(history.entries) if entry['form_name'] != form_name]
+        texts += [history.entries[i]['text'] for i in history_rows]
+        signatures = np.vstack([signatures, history.signatures[history_rows]])
+
+    session_count = len(procedures)
+    clusters = []
+    for members in cluster_texts(texts, threshold, hasher, signatures):
+        if members[0] >= session_count:
+            continue
+        clusters.append([
+            {'source': 'session', 'index': i, 'procedure': procedures[i]} if i < session_count
+            else {'source': 'history', 'entry': history.entries[history_rows[i - session_count]]}
+            for i in members
+        ])
+    return clusters
@@ -0,0 +1,232 @@
+"""Compact, versioned session snapshots.
+
+A snapshot replaces the indented JSON written by save_configuration. The
+file is a small uncompressed JSON header (form config, counts) followed by
+a zlib-compressed payload in which every string is stored once in a string
+table and procedures, LOV values and LOV configurations are stored as
+columnar integer arrays referencing it.
+
+Layout:
+    MAGIC (4 bytes) | version (u16) | header length (u32) | header JSON
+    | payload length (u32) | zlib(payload)
+
+    payload = index length (u32) | index JSON | column blobs
+
+The header can be read without touching the payload, and each section of
+the payload is only decoded when first accessed.
+"""
+import json
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime
+
+MAGIC = b"PMFS"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_EXTENSION = ".pmfs"
+
+PROCEDURE_INT_FIELDS = ('number', 'row', 'col')
+PROCEDURE_STR_FIELDS = ('text', 'original_text')
+LOV_CONFIG_FIELDS = ('condition_values', 'action_values', 'condition_lov_code', 'action_lov_code')
+
+
+class SnapshotError(Exception):
+    """Raised for files that are not readable snapshots"""
+
+
+class StringTable:
+    """Assigns one id per distinct string; id 0 is None"""
+
+    def __init__(self):
+        self.ids = {None: 0}
+        self.strings = [None]
+
+    def add(self, value):
+        if value is not None and not isinstance(value, str):
+            value = str(value)
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[value] = string_id
+            self.strings.append(value)
+        return string_id
+
+
+def is_snapshot(path):
+    """True if path starts with the snapshot magic bytes"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def write_snapshot(path, source_file, selected_sheet, form_config, procedures, lov_database,
+                   lov_configurations=None, extra=None):
+    """Write a session snapshot and return the number of bytes written"""
+    strings = StringTable()
+    columns = {}
+
+    for field in PROCEDURE_INT_FIELDS:
+        columns[f"procedures.{field}"] = array('q', (int(proc.get(field, -1)) for proc in procedures))
+    for field in PROCEDURE_STR_FIELDS:
+        columns[f"procedures.{field}"] = array('I', (strings.add(proc.get(field)) for proc in procedures))
+
+    offsets = array('I', [0])
+    values = array('I')
+    codes = array('I')
+    for code, code_values in lov_database.items():
+        codes.append(strings.add(code))
+        values.extend(strings.add(value) for value in code_values)
+        offsets.append(len(values))
+    columns['lov.codes'] = codes
+    columns['lov.offsets'] = offsets
+    columns['lov.values'] = values
+
+    if lov_configurations is not None:
+        for field in LOV_CONFIG_FIELDS:
+            columns[f"lov_config.{field}"] = array(
+                'I', (strings.add(config.get(field) or None) for config in lov_configurations))
+
+    # String table: lengths column plus concatenated UTF-8 (None stored as length 0xFFFFFFFF)
+    encoded = [s.encode('utf-8') if s is not None else b'' for s in strings.strings]
+    columns['strings.lengths'] = array('I', (len(b) if s is not None else 0xFFFFFFFF
+                                             for s, b in zip(strings.strings, encoded)))
+    blobs = [('strings.data', b''.join(encoded))]
+    blobs.extend((name, column.tobytes()) for name, column in columns.items())
+
+    index = {}
+    offset = 0
+    for name, blob in blobs:
+        typecode = columns[name].typecode if name in columns else 'B'
+        index[name] = {'offset': offset, 'length': len(blob), 'typecode': typecode}
+        offset += len(blob)
+
+    index_bytes = json.dumps(index).encode('utf-8')
+    payload = struct.pack('<I', len(index_bytes)) + index_bytes + b''.join(blob for _, blob in blobs)
+    compressed = zlib.compress(payload, 6)
+
+    header = {
+        'version': SNAPSHOT_VERSION,
+        'created': datetime.now().isoformat(),
+        'byteorder': sys.byteorder,
+        'source_file': source_file,
+        'selected_sheet': selected_sheet,
+        'form_config': form_config,
+        'procedure_count': len(procedures),
+        'lov_code_count': len(lov_database),
+        'has_lov_configurations': lov_configurations is not None,
+        'extra': extra or {},
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<HI', SNAPSHOT_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(struct.pack('<I', len(compressed)))
+        f.write(compressed)
+        return f.tell()
+
+
+class SessionSnapshot:
+    """Lazily decoded snapshot; the payload is decompressed on first access"""
+
+    def __init__(self, header, compressed):
+        self.header = header
+        self._compressed = compressed
+        self._payload = None
+        self._index = None
+        self._strings = None
+        self._procedures = None
+        self._lov_database = None
+        self._lov_configurations = None
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise SnapshotError(f"{path} is not a session snapshot")
+            version, header_length = struct.unpack('<HI', f.read(6))
+            if version > SNAPSHOT_VERSION:
+                raise SnapshotError(f"Snapshot version {version} is newer than supported ({SNAPSHOT_VERSION})")
+            header = json.loads(f.read(header_length).decode('utf-8'))
+            (payload_length,) = struct.unpack('<I', f.read(4))
+            compressed = f.read(payload_length)
+        return cls(header, compressed)
+
+    @property
+    def form_config(self):
+        return self.header.get('form_config', {})
+
+    def _column(self, name):
+        if self._payload is None:
+            self._payload = zlib.decompress(self._compressed)
+            self._compressed = None
+            (index_length,) = struct.unpack_from('<I', self._payload, 0)
+            self._index = json.loads(self._payload[4:4 + index_length].decode('utf-8'))
+            self._base = 4 + index_length
+
+        entry = self._index.get(name)
+        if entry is None:
+            return None
+        start = self._base + entry['offset']
+        blob = self._payload[start:start + entry['length']]
+        if entry['typecode'] == 'B':
+            return blob
+        column = array(entry['typecode'])
+        column.frombytes(blob)
+        if self.header.get('byteorder', sys.byteorder) != sys.byteorder:
+            column.byteswap()
+        return column
+
+    @property
+    def strings(self):
+        if self._strings is None:
+            data = self._column('strings.data')
+            strings = []
+            position = 0
+            for length in self._column('strings.lengths'):
+                if length == 0xFFFFFFFF:
+                    strings.append(None)
+                else:
+                    strings.append(sys.intern(data[position:position + length].decode('utf-8')))
+                    position += length
+            self._strings = strings
+        return self._strings
+
+    @property
+    def procedures(self):
+        if self._procedures is None:
+            strings = self.strings
+            ints = [self._column(f"procedures.{field}") for field in PROCEDURE_INT_FIELDS]
+            texts = [[strings[i] for i in self._column(f"procedures.{field}")] for field in PROCEDURE_STR_FIELDS]
+            fields = PROCEDURE_INT_FIELDS + PROCEDURE_STR_FIELDS
+            procedures = [dict(zip(fields, values)) for values in zip(*ints, *texts)]
+            self._procedures = procedures
+        return self._procedures
+
+    @property
+    def lov_database(self):
+        if self._lov_database is None:
+            strings = self.strings
+            offsets = self._column('lov.offsets')
+            values = self._column('lov.values')
+            self._lov_database = {
+                strings[code_id]: [strings[v] for v in values[offsets[i]:offsets[i + 1]]]
+                for i, code_id in enumerate(self._column('lov.codes'))
+            }
+        return self._lov_database
+
+    @property
+    def lov_configurations(self):
+        if self._lov_configurations is None and self.header.get('has_lov_configurations'):
+            strings = self.strings
+            columns = {field: self._column(f"lov_config.{field}") for field in LOV_CONFIG_FIELDS}
+            count = len(columns[LOV_CONFIG_FIELDS[0]])
+            self._lov_configurations = [
+                {field: strings[columns[field][i]] or '' for field in LOV_CONFIG_FIELDS}
+                for i in range(count)
+            ]
+        return self._lov_configurations
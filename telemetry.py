@@ -0,0 +1,216 @@
+"""Structured traces and Prometheus metrics for unattended runs.
+
+Every conversion appends one JSON-lines record (source, sheet, counts,
+bytes written, per-stage durations plus the form_registry entry). The same
+runs feed counters and latency histograms that are written in the
+Prometheus textfile format for the node exporter textfile collector.
+"""
+import json
+import os
+import socket
+import threading
+from datetime import datetime
+
+# Latency buckets in seconds, tuned for forms taking milliseconds to minutes
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class TraceWriter:
+    """Append-only JSON-lines trace file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.total += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """Counters and histograms keyed by (name, labels)"""
+
+    def __init__(self, namespace="pm_form"):
+        self.namespace = namespace
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def _key(self, name, labels):
+        return f"{self.namespace}_{name}", tuple(sorted((labels or {}).items()))
+
+    def inc(self, name, value=1, labels=None, help_text=None):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+            if help_text:
+                self.help[key[0]] = help_text
+
+    def set_gauge(self, name, value, labels=None, help_text=None):
+        key = self._key(name, labels)
+        with self._lock:
+            self.gauges[key] = value
+            if help_text:
+                self.help[key[0]] = help_text
+
+    def observe(self, name, value, labels=None, help_text=None, buckets=DEFAULT_BUCKETS):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+            if help_text:
+                self.help[key[0]] = help_text
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for metric in sorted({name for name, _ in self.counters}):
+                if metric in self.help:
+                    lines.append(f"# HELP {metric} {self.help[metric]}")
+                lines.append(f"# TYPE {metric} counter")
+                for (name, labels), value in sorted(self.counters.items()):
+                    if name == metric:
+                        lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+            for metric in sorted({name for name, _ in self.gauges}):
+                if metric in self.help:
+                    lines.append(f"# HELP {metric} {self.help[metric]}")
+                lines.append(f"# TYPE {metric} gauge")
+                for (name, labels), value in sorted(self.gauges.items()):
+                    if name == metric:
+                        lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+            for metric in sorted({name for name, _ in self.histograms}):
+                if metric in self.help:
+                    lines.append(f"# HELP {metric} {self.help[metric]}")
+                lines.append(f"# TYPE {metric} histogram")
+                for (name, labels), histogram in sorted(self.histograms.items()):
+                    if name != metric:
+                        continue
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        bucket_labels = labels + (('le', _format_value(bound)),)
+                        lines.append(f"{metric}_bucket{_format_labels(bucket_labels)} {count}")
+                    lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.total}")
+                    lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                    lines.append(f"{metric}_count{_format_labels(labels)} {histogram.total}")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path):
+        """Atomically write metrics for the node exporter textfile collector"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.render())
+        os.replace(temp_path, path)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        escaped.append(f'{key}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class ConversionTelemetry:
+    """Builds trace records and metric updates for each converted form"""
+
+    def __init__(self, trace_path=None, metrics_path=None, run_id=None):
+        self.trace = TraceWriter(trace_path) if trace_path else None
+        self.metrics_path = metrics_path
+        self.metrics = MetricsRegistry()
+        self.run_id = run_id or datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.host = socket.gethostname()
+
+    def record_conversion(self, source_file, sheet_name, status, stages, form_name=None, rows_scanned=0,
+                          procedures=0, lov_codes=0, outputs=None, registry_entry=None, error=None, reused=None):
+        """Emit one trace record and update the aggregated metrics.
+
+        stages maps stage name to duration in seconds; outputs is the list
+        returned by write_output_files; reused names the fingerprint match
+        ('workbook' or 'sheet') when an earlier generation was reused.
+        """
+        outputs = outputs or []
+        template_rows = sum(o['rows'] or 0 for o in outputs if o['table'] == 'FORMTEMPLATE')
+        bytes_written = sum(o['bytes'] for o in outputs)
+        total_seconds = sum(stages.values())
+
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'run_id': self.run_id,
+            'host': self.host,
+            'status': status,
+            'source_file': source_file,
+            'sheet': sheet_name,
+            'form_name': form_name,
+            'rows_scanned': rows_scanned,
+            'procedures': procedures,
+            'lov_codes': lov_codes,
+            'template_rows': template_rows,
+            'bytes_written': bytes_written,
+            'duration_seconds': round(total_seconds, 6),
+            'stages': {stage: round(seconds, 6) for stage, seconds in stages.items()},
+            'outputs': [{k: o[k] for k in ('table', 'file', 'rows', 'bytes')} for o in outputs],
+            'form_registry': registry_entry,
+        }
+        if error:
+            record['error'] = error
+        if reused:
+            record['reused'] = reused
+            self.metrics.inc('fingerprint_reuse_total', labels={'match': reused},
+                             help_text="Forms generated from an earlier generation of the same tasklist")
+
+        if self.trace:
+            self.trace.write(record)
+
+        self.metrics.inc('conversions_total', labels={'status': status},
+                         help_text="Forms converted, by outcome")
+        self.metrics.inc('rows_scanned_total', rows_scanned, help_text="Source sheet rows scanned")
+        self.metrics.inc('procedures_total', procedures, help_text="Procedures extracted")
+        self.metrics.inc('lov_codes_total', lov_codes, help_text="LOV codes generated")
+        self.metrics.inc('template_rows_total', template_rows, help_text="FORMTEMPLATE rows written")
+        self.metrics.inc('bytes_written_total', bytes_written, help_text="Bytes of output written")
+        for stage, seconds in stages.items():
+            self.metrics.observe('stage_duration_seconds', seconds, labels={'stage': stage},
+                                 help_text="Duration of each pipeline stage")
+        if status == 'ok':
+            self.metrics.observe('form_duration_seconds', total_seconds,
+                                 help_text="End-to-end conversion latency per form")
+        return record
+
+    def flush(self):
+        """Write the Prometheus textfile (if configured)"""
+        if self.metrics_path:
+            self.metrics.write_textfile(self.metrics_path)
@@ -0,0 +1,320 @@
+"""Declarative FORMTEMPLATE layouts compiled into row generators.
+
+A template spec lists the header fields emitted once per form and the
+fields emitted for every procedure. Each field gives its KEYNAME pattern,
+KEYTYPE/KEYDATATYPE, label and LOV binding; patterns may use these names:
+
+    number, text                  the procedure
+    form_name, form_description   the form
+    key_prefix, lov_prefix        KEYNAME and standard-LOV prefixes
+    condition_lov, action_lov     the procedure's LOV codes (or the spec's fallbacks)
+    <counter>                     any counter declared in the spec, e.g. {str}
+
+Counters replace the hand-managed str/che/hid/fil counters: a field lists
+the counters it advances after it is emitted. DISPLAYOPTION advances by
+10 per field unless the field pins it with "display". Because every
+procedure advances counters and DISPLAYOPTION by the same amounts, the
+generator can start at any procedure (first=...) and skip the header,
+which lets the preview build just the rows of one page.
+
+compile_template() turns a spec into Python source for one straight-line
+function per layout (dict literals, local counters, no per-row lookups in
+the spec) and caches the compiled function by name, so every form after
+the first reuses it. Per-procedure patterns that only use form names
+(e.g. "{lov_prefix}-YN") are built and interned once before the loop, so
+all rows of a form share one string object for them. Extra layouts can be registered at runtime or loaded
+from a JSON file of {name: spec} without code changes; the default file
+sits next to this module and is read once per process.
+"""
+import json
+import os
+import string
+import sys
+
+# Next to the application, not the working directory
+TEMPLATE_SPECS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template_specs.json")
+DEFAULT_TEMPLATE = 'standard_maintenance'
+
+TEMPLATE_COLUMNS = (
+    'ORG', 'FORMNAME', 'KEYNAME', 'PARENTKEY', 'KEYTYPE', 'KEYDATATYPE', 'KEYLOV', 'KEYLABEL',
+    'KEYFORMULA', 'KEYHELP', 'KEYHINT', 'DISPLAYOPTION', 'VERSION', 'ENABLE', 'LASTUPDATEBY',
+    'LASTUPDATE', 'REQUIRED', 'SHOWONVALUE', 'EDITABLE', 'SHOWONEMPTY', 'ADDCLASS', 'SHOWONREPORT',
+    'CUSTOMLOV',
+)
+
+# Column values every field gets unless its spec overrides them in "columns"
+DEFAULT_COLUMN_VALUES = {column: None for column in TEMPLATE_COLUMNS}
+DEFAULT_COLUMN_VALUES.update({'VERSION': 1, 'ENABLE': 1, 'SHOWONEMPTY': 1, 'SHOWONREPORT': 1})
+
+# Spec field attribute -> template column
+FIELD_COLUMNS = {
+    'key': 'KEYNAME', 'parent': 'PARENTKEY', 'type': 'KEYTYPE', 'datatype': 'KEYDATATYPE',
+    'lov': 'KEYLOV', 'label': 'KEYLABEL', 'formula': 'KEYFORMULA', 'required': 'REQUIRED',
+}
+# Attributes that are patterns; the others are literal values
+PATTERN_FIELDS = ('key', 'parent', 'lov', 'label')
+
+PROCEDURE_NAMES = ('number', 'text', 'condition_lov', 'action_lov')
+FORM_NAMES = ('form_name', 'form_description', 'key_prefix', 'lov_prefix')
+
+FORM_HEADER = [
+    {'key': 'TEXSTR0', 'type': 'TEXTBOX', 'label': 'Email (hanya bisa email pertamina)',
+     'formula': 'user.email', 'required': 1, 'display': 0},
+    {'key': 'LABSTR0', 'type': 'LABEL', 'label': '{form_description}'},
+]
+
+TEMPLATE_SPECS = {
+    'standard_maintenance': {
+        'header': FORM_HEADER,
+        'counters': {'str': 1, 'che': 1, 'hid': 0, 'fil': 0},
+        'lov_fallbacks': {'condition_lov': '{lov_prefix}-GFB', 'action_lov': '{lov_prefix}-YN'},
+        'fields': [
+            {'key': 'LABSTR{str}', 'type': 'LABEL', 'label': '{number}. {text}'},
+            {'key': 'LISSTR{str}', 'type': 'LIST', 'lov': '{lov_prefix}-YN', 'label': 'Choose', 'advance': ['str']},
+            {'key': 'TEXSTR{str}', 'type': 'TEXTBOX', 'label': 'Remarks', 'advance': ['str']},
+            {'key': 'LISCHE{che}', 'type': 'LIST', 'datatype': 'CHECKBOX', 'lov': '{condition_lov}',
+             'label': 'Condition found', 'advance': ['che']},
+            {'key': 'LISCHE{che}', 'type': 'LIST', 'datatype': 'CHECKBOX', 'lov': '{action_lov}',
+             'label': 'Corrective Action', 'advance': ['che']},
+            {'key': 'LISSTR{str}', 'type': 'LIST', 'lov': '{lov_prefix}-GFB', 'label': 'As Left (Good, Fair, Bad)',
+             'advance': ['str']},
+            {'key': 'TEXSTR{str}', 'type': 'TEXTBOX', 'label': 'Remarks', 'advance': ['str']},
+            {'key': 'HIDSTR{hid}', 'type': 'HIDDEN', 'parent': '{key_prefix}-FILSTR{fil}',
+             'label': '{form_name} UPLOAD FILE', 'advance': ['hid']},
+            {'key': 'FILSTR{fil}', 'type': 'FILE', 'label': 'Silahkan Upload file Pendukung Anda', 'advance': ['fil']},
+        ],
+    },
+    'parameter_service': {
+        'header': FORM_HEADER,
+        'counters': {'str': 1},
+        'lov_fallbacks': {'condition_lov': '{lov_prefix}-GFB', 'action_lov': '{lov_prefix}-YN'},
+        'fields': [
+            {'key': 'LABSTR{str}', 'type': 'LABEL', 'label': '{number}. {text}'},
+            {'key': 'TEXSTR{str}', 'type': 'TEXTBOX', 'label': 'Before Service', 'advance': ['str']},
+            {'key': 'TEXSTR{str}', 'type': 'TEXTBOX', 'label': 'After Service', 'advance': ['str']},
+            {'key': 'LISSTR{str}', 'type': 'LIST', 'lov': '{condition_lov}', 'label': 'Status', 'advance': ['str']},
+            {'key': 'TEXSTR{str}', 'type': 'TEXTBOX', 'label': 'Remarks', 'advance': ['str']},
+        ],
+    },
+    'startup_checks': {
+        'header': FORM_HEADER,
+        'counters': {'str': 1, 'che': 1},
+        'lov_fallbacks': {'condition_lov': '{lov_prefix}-GFB', 'action_lov': '{lov_prefix}-YN'},
+        'fields': [
+            {'key': 'LABSTR{str}', 'type': 'LABEL', 'label': '{number}. {text}'},
+            {'key': 'LISCHE{che}', 'type': 'LIST', 'datatype': 'CHECKBOX', 'lov': '{condition_lov}',
+             'label': 'Condition', 'advance': ['che']},
+            {'key': 'TEXSTR{str}', 'type': 'TEXTBOX', 'label': 'Remarks', 'advance': ['str']},
+        ],
+    },
+}
+
+_compiled = {}
+_loaded_spec_files = {}  # absolute path -> layout names registered from it
+
+
+class TemplateSpecError(ValueError):
+    """Raised for template specs that cannot be compiled"""
+
+
+def register_template_spec(name, spec):
+    """Add or replace a layout; its compiled generator is rebuilt on next use"""
+    if TEMPLATE_SPECS.get(name) == spec:
+        return
+    compile_template_source(name, spec)  # fail early on a broken spec
+    TEMPLATE_SPECS[name] = spec
+    _compiled.pop(name, None)
+
+
+def load_template_specs(path=None, reload=False):
+    """Register the layouts in a JSON file of {name: spec}; returns their names.
+    
+    Each file is read once per process, so converters can call this on
+    construction without re-reading it or dropping compiled generators;
+    pass reload=True to pick up an edited file.
+    """
+    path = os.path.abspath(path or TEMPLATE_SPECS_FILE)
+    if path in _loaded_spec_files and not reload:
+        return list(_loaded_spec_files[path])
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    for name, spec in specs.items():
+        register_template_spec(name, spec)
+    _loaded_spec_files[path] = list(specs)
+    return list(specs)
+
+
+def template_row_count(name, procedure_count):
+    """Number of FORMTEMPLATE rows a layout produces"""
+    spec = TEMPLATE_SPECS[resolve_template(name)]
+    return len(spec.get('header', [])) + procedure_count * len(spec['fields'])
+
+
+def resolve_template(name):
+    return name if name in TEMPLATE_SPECS else DEFAULT_TEMPLATE
+
+
+def _pattern_expression(pattern, names, hoisted=None):
+    """Python expression building a pattern string from local variables.
+    
+    With a hoisted dict, concatenations of form names only are replaced by
+    a local computed once before the procedure loop (see compile_template_source).
+    """
+    parsed = list(string.Formatter().parse(pattern))
+    if len(parsed) == 1 and not parsed[0][0] and parsed[0][1] in names and not parsed[0][2] and not parsed[0][3]:
+        return names[parsed[0][1]]  # a bare "{name}" keeps the value as is (e.g. None for no LOV)
+    parts = []
+    placeholders = set()
+    for literal, field_name, format_spec, conversion in parsed:
+        if literal:
+            parts.append(repr(literal))
+        if field_name is None:
+            continue
+        if format_spec or conversion or field_name not in names:
+            raise TemplateSpecError(f"Unsupported placeholder {{{field_name}}} in {pattern!r}")
+        parts.append(f"str({names[field_name]})")
+        placeholders.add(field_name)
+    expression = " + ".join(parts) if parts else "''"
+    if hoisted is not None and placeholders and placeholders <= set(FORM_NAMES):
+        return hoisted.setdefault(expression, f"h_{len(hoisted)}")
+    return expression
+
+
+def _row_expression(field, names, display_expression, hoisted=None):
+    values = {'ORG': 'org_code', 'FORMNAME': 'form_name'}
+    for attribute, column in FIELD_COLUMNS.items():
+        value = field.get(attribute)
+        if attribute == 'key':
+            if not value:
+                raise TemplateSpecError(f"Field without a key: {field!r}")
+            values[column] = f"key_prefix + {_pattern_expression('-' + value, names)}"
+        elif attribute in PATTERN_FIELDS and isinstance(value, str):
+            values[column] = _pattern_expression(value, names, hoisted)
+        elif attribute == 'datatype' and value is None:
+            values[column] = repr('STRING')
+        elif value is not None:
+            values[column] = repr(value)
+    values['DISPLAYOPTION'] = display_expression
+    for column, value in field.get('columns', {}).items():
+        if column not in TEMPLATE_COLUMNS:
+            raise TemplateSpecError(f"Unknown template column {column!r}")
+        values[column] = repr(value)
+
+    items = []
+    for column in TEMPLATE_COLUMNS:
+        items.append(f"{column!r}: {values.get(column, repr(DEFAULT_COLUMN_VALUES[column]))}")
+    return "{" + ", ".join(items) + "}"
+
+
+def _advances(fields):
+    """DISPLAYOPTION step and per-counter steps of emitting fields once"""
+    display = 0
+    counters = {}
+    for field in fields:
+        if 'display' not in field:
+            display += 10
+            for counter in field.get('advance', []):
+                counters[counter] = counters.get(counter, 0) + 1
+    return display, counters
+
+
+def template_row_identities(name, procedure_ids):
+    """Identity of each FORMTEMPLATE row a layout emits: header field n, then procedure id and field n"""
+    spec = TEMPLATE_SPECS[resolve_template(name)]
+    identities = [f"header/{n}" for n in range(len(spec.get('header', [])))]
+    field_count = len(spec['fields'])
+    for procedure_id in procedure_ids:
+        identities.extend(f"{procedure_id}/{n}" for n in range(field_count))
+    return identities
+
+
+def template_keytypes(name):
+    """KEYTYPE of each header field and of each per-procedure field of a layout"""
+    spec = TEMPLATE_SPECS[resolve_template(name)]
+    return ([field.get('type') for field in spec.get('header', [])],
+            [field.get('type') for field in spec['fields']])
+
+
+def _emit_fields(lines, fields, names, counters, indent, hoisted=None):
+    pad = " " * indent
+    for field in fields:
+        if 'display' in field:
+            lines.append(f"{pad}append({_row_expression(field, names, repr(field['display']), hoisted)})")
+            continue
+        lines.append(f"{pad}append({_row_expression(field, names, 'display', hoisted)})")
+        lines.append(f"{pad}display += 10")
+        for counter in field.get('advance', []):
+            if counter not in counters:
+                raise TemplateSpecError(f"Field advances undeclared counter {counter!r}")
+            lines.append(f"{pad}c_{counter} += 1")
+
+
+def compile_template_source(name, spec):
+    """Python source of the row generator for a spec"""
+    counters = spec.get('counters', {})
+    form_names = {n: f"v_{n}" for n in FORM_NAMES}
+    names = dict(form_names)
+    names.update({n: f"v_{n}" for n in PROCEDURE_NAMES})
+    names.update({counter: f"c_{counter}" for counter in counters})
+
+    lines = [
+        "def emit(procedures, lov_configs, org_code, form_name, form_description, key_prefix, lov_prefix,",
+        "         display=10, first=0, header=True):",
+        "    rows = []",
+        "    append = rows.append",
+        "    v_form_name, v_form_description = form_name, form_description",
+        "    v_key_prefix, v_lov_prefix = key_prefix, lov_prefix",
+    ]
+    for counter, start in counters.items():
+        lines.append(f"    c_{counter} = {int(start)!r}")
+    lines.append("    if header:")
+    header_lines = []
+    _emit_fields(header_lines, spec.get('header', []), form_names, counters, 8)
+    lines += header_lines or ["        pass"]
+    
+    # Without the header, or starting at a later procedure, jump to the state emitting would reach
+    header_display, header_counters = _advances(spec.get('header', []))
+    field_display, field_counters = _advances(spec['fields'])
+    lines.append("    else:")
+    lines.append(f"        display += {header_display}")
+    for counter, step in header_counters.items():
+        lines.append(f"        c_{counter} += {step}")
+    lines.append(f"    display += first * {field_display}")
+    for counter, step in field_counters.items():
+        lines.append(f"    c_{counter} += first * {step}")
+
+    hoisted = {}
+    loop_lines = []
+    fallbacks = spec.get('lov_fallbacks', {})
+    loop_lines += [
+        "    config_count = len(lov_configs)",
+        "    for i, proc in enumerate(procedures):",
+        "        v_number = proc['number']",
+        "        v_text = proc['text']",
+        "        config = lov_configs[i] if i < config_count else None",
+    ]
+    for variable, code_field in (('condition_lov', 'condition_lov_code'), ('action_lov', 'action_lov_code')):
+        fallback = fallbacks.get(variable)
+        fallback_expression = _pattern_expression(fallback, form_names, hoisted) if fallback else "None"
+        loop_lines.append(f"        v_{variable} = (config.get({code_field!r}) if config else None) or {fallback_expression}")
+    _emit_fields(loop_lines, spec['fields'], names, counters, 8, hoisted)
+    for expression, variable in hoisted.items():
+        lines.append(f"    {variable} = intern({expression})")
+    lines += loop_lines
+    lines.append("    return rows")
+    return "\n".join(lines) + "\n"
+
+
+def compile_template(name):
+    """Compiled row generator for a layout (cached); unknown names use the default layout"""
+    name = resolve_template(name)
+    function = _compiled.get(name)
+    if function is None:
+        source = compile_template_source(name, TEMPLATE_SPECS[name])
+        namespace = {'intern': sys.intern}
+        exec(compile(source, f"<template {name}>", 'exec'), namespace)
+        function = namespace["emit"]
+        _compiled[name] = function
+    return function
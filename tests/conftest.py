@@ -0,0 +1,24 @@
+"""Shared fixtures: the repository root on sys.path and small synthetic workbooks."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_workbook import generate_workbook  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def work_dir(tmp_path, monkeypatch):
+    """Run every test in its own directory so registries and caches never leak between tests"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """A 60-procedure tasklist workbook with merged cells"""
+    path = str(tmp_path / "tasklist.xlsx")
+    generate_workbook(path, procedures=60, seed=1)
+    return path
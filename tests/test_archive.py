@@ -0,0 +1,95 @@
+import json
+import os
+import tarfile
+import zipfile
+
+import pandas as pd
+import pytest
+
+from archive import MANIFEST_NAME, ArchiveWriter, member_name, verify_archive
+from bundle import BUNDLE_TABLES
+from test_bundle import form_tables
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+def test_archive_members_match_the_manifest(tmp_path, archive_format):
+    with ArchiveWriter(str(tmp_path), archive_format, timestamp="ts") as archive:
+        archive.add_form("FORM-A", form_tables("FORM-A", 3), "a.xlsx", "Mech")
+        archive.add_form("FORM B/1", form_tables("FORM B/1", 2))
+
+    assert os.listdir(tmp_path) == [os.path.basename(archive.path)]
+    assert verify_archive(archive.path) == []
+
+    if archive_format == 'zip':
+        with zipfile.ZipFile(archive.path) as package:
+            manifest = json.loads(package.read(MANIFEST_NAME))
+            template = pd.read_excel(package.open(member_name("FORM-A", 'FORMTEMPLATE')))
+    else:
+        with tarfile.open(archive.path) as package:
+            manifest = json.load(package.extractfile(MANIFEST_NAME))
+            template = pd.read_excel(package.extractfile(member_name("FORM-A", 'FORMTEMPLATE')))
+    assert manifest['form_count'] == 2
+    assert manifest['row_counts']['FORMTEMPLATE'] == 5
+    assert manifest['forms']['FORM B/1']['tables']['FORMTEMPLATE']['member'] == "FORM_B_1/FORMTEMPLATE.xlsx"
+    assert list(template['KEYNAME']) == ["LISCHE0", "LISCHE1", "LISCHE2"]
+
+
+def test_tampered_member_fails_verification(tmp_path):
+    with ArchiveWriter(str(tmp_path), 'zip', timestamp="ts") as archive:
+        archive.add_form("FORM-A", form_tables("FORM-A", 1))
+
+    tampered = str(tmp_path / "tampered.zip")
+    with zipfile.ZipFile(archive.path) as source, zipfile.ZipFile(tampered, 'w') as target:
+        for name in source.namelist():
+            data = source.read(name)
+            if name == member_name("FORM-A", 'FORMMENU'):
+                data = data[:-1] + bytes([data[-1] ^ 1])
+            target.writestr(name, data)
+        target.writestr("extra.txt", b"not listed")
+
+    assert verify_archive(tampered) == ["FORM-A FORMMENU: SHA-256 mismatch in FORM-A/FORMMENU.xlsx",
+                                        "extra.txt is not listed in the manifest"]
+
+
+def test_failed_run_leaves_no_archive(tmp_path):
+    with pytest.raises(RuntimeError):
+        with ArchiveWriter(str(tmp_path), 'tar') as archive:
+            archive.add_form("FORM-A", form_tables("FORM-A", 1))
+            raise RuntimeError("conversion crashed")
+
+    assert os.listdir(tmp_path) == []
+    assert archive.close() == []
+
+
+def test_archives_started_together_do_not_collide(tmp_path):
+    first = ArchiveWriter(str(tmp_path), 'zip', timestamp="ts")
+    second = ArchiveWriter(str(tmp_path), 'zip', timestamp="ts")
+    assert first.path != second.path
+    first.abort()
+    second.abort()
+
+
+def test_rejects_unknown_format_and_duplicate_forms(tmp_path):
+    with pytest.raises(ValueError):
+        ArchiveWriter(str(tmp_path), 'rar')
+    archive = ArchiveWriter(str(tmp_path), 'zip')
+    archive.add_form("FORM-A", form_tables("FORM-A", 1))
+    with pytest.raises(ValueError):
+        archive.add_form("FORM-A", form_tables("FORM-A", 1))
+    outputs = archive.add_form("FORM-B", form_tables("FORM-B", 1))
+    archive.abort()
+    assert [output['table'] for output in outputs] == list(BUNDLE_TABLES)
+
+
+def test_form_names_mapping_to_one_folder_keep_their_own_members(tmp_path):
+    with ArchiveWriter(str(tmp_path), 'zip', timestamp="ts") as archive:
+        archive.add_form("A_B", form_tables("A_B", 1))
+        archive.add_form("A/B", form_tables("A/B", 2))
+        archive.add_form("A B", form_tables("A B", 3))
+
+    assert [archive.forms[name]['tables']['FORMTEMPLATE']['member'] for name in ("A_B", "A/B", "A B")] == [
+        "A_B/FORMTEMPLATE.xlsx", "A_B~2/FORMTEMPLATE.xlsx", "A_B~3/FORMTEMPLATE.xlsx"]
+    assert verify_archive(archive.path) == []
+    with zipfile.ZipFile(archive.path) as package:
+        template = pd.read_excel(package.open("A_B~2/FORMTEMPLATE.xlsx"))
+    assert list(template['FORMNAME']) == ["A/B", "A/B"]
@@ -0,0 +1,62 @@
+import re
+
+import pytest
+
+from bulk import plan_lov_assignment, plan_text_changes
+from core import convert_sheet
+
+PROCEDURES = [{'text': text} for text in (
+    "Check oil level (2)", "REPLACE AIR FILTER", "inspect belt", "PM: Grease bearings", "Clean  strainer (10)")]
+
+
+def test_regex_replace_returns_only_changed_procedures():
+    changes = plan_text_changes(PROCEDURES, 'replace', pattern=r'\s*\(\d+\)$', replacement='')
+    assert changes == [(0, "Check oil level (2)", "Check oil level"), (4, "Clean  strainer (10)", "Clean strainer")]
+
+
+def test_bad_pattern_raises_before_planning():
+    with pytest.raises(re.error):
+        plan_text_changes(PROCEDURES, 'replace', pattern="(")
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ('sentence', [(1, "REPLACE AIR FILTER", "Replace air filter"), (2, "inspect belt", "Inspect belt")]),
+    ('upper', [(2, "inspect belt", "INSPECT BELT")]),
+])
+def test_case_applies_to_the_selected_positions(mode, expected):
+    assert plan_text_changes(PROCEDURES, 'case', positions=[1, 2], mode=mode) == expected
+
+
+def test_prefixes_and_suffixes_are_not_doubled():
+    assert [index for index, _, _ in plan_text_changes(PROCEDURES, 'add_prefix', text="PM: ")] == [0, 1, 2, 4]
+    # Results are whitespace-normalized, so the double space counts as a change too
+    assert plan_text_changes(PROCEDURES, 'remove_prefix', text="PM: ") == [
+        (3, "PM: Grease bearings", "Grease bearings"), (4, "Clean  strainer (10)", "Clean strainer (10)")]
+    assert plan_text_changes(PROCEDURES, 'add_suffix', positions=[2], text=".") == [
+        (2, "inspect belt", "inspect belt.")]
+
+
+def test_change_emptying_a_procedure_is_dropped():
+    assert plan_text_changes([{'text': "PM:"}], 'remove_prefix', text="PM:") == []
+    assert plan_text_changes([], 'case', mode='upper') == []
+
+
+def test_lov_assignment_skips_procedures_that_already_have_the_values():
+    configs = [{'condition_values': "OK, NG"}, {'condition_values': "Yes/No"}, {}]
+    assert plan_lov_assignment(configs, [0, 1, 2, 5], 'condition', " OK, NG ") == [
+        (1, "Yes/No", "OK, NG"), (2, '', "OK, NG")]
+
+
+def test_applied_bulk_edits_share_one_code_and_undo_as_one_step(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM")
+    configs = converter.collect_lov_configurations()
+    before = [config['condition_lov_code'] for config in configs]
+
+    changes = plan_lov_assignment(configs, [0, 1, 2], 'condition', "Open, Closed")
+    converter.assign_lov_values(changes, 'condition', "assign condition values")
+    after = converter.collect_lov_configurations()
+    codes = {after[index]['condition_lov_code'] for index, _, _ in changes}
+    assert len(codes) == 1 and all(after[index]['condition_values'] == "Open, Closed" for index in range(3))
+
+    assert converter.undo_history.undo(converter) == "assign condition values"
+    assert [config['condition_lov_code'] for config in converter.collect_lov_configurations()] == before
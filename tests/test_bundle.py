@@ -0,0 +1,92 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+from bundle import BUNDLE_TABLES, BundleWriter
+
+
+def form_tables(form_name, procedures):
+    return {
+        'FORMHEAD': [{'FORMNAME': form_name, 'VERSION': 1}],
+        'FORMTEMPLATE': [{'ORG': '2100', 'FORMNAME': form_name, 'KEYNAME': f"LISCHE{i}"} for i in range(procedures)],
+        'FORMLOV': [{'ORG': '2100', 'LOVNAME': 'YKN-YN', 'VALUE': value} for value in ("Yes", "No")],
+        'FORMMENU': [{'FORMNAME': form_name, 'MENU': 'PM'}],
+    }
+
+
+def test_manifest_maps_each_form_to_its_rows(tmp_path):
+    with BundleWriter(str(tmp_path), timestamp="ts") as bundle:
+        bundle.add_form("FORM-A", form_tables("FORM-A", 3), "a.xlsx", "Mech")
+        bundle.add_form("FORM-B", form_tables("FORM-B", 2), "b.xlsx", "Mech")
+
+    with open(bundle.manifest_path, encoding='utf-8') as f:
+        manifest = json.load(f)
+    assert manifest['form_count'] == 2
+    assert manifest['forms']['FORM-A']['tables']['FORMTEMPLATE'] == {'start': 0, 'rows': 3}
+    assert manifest['forms']['FORM-B']['tables']['FORMTEMPLATE'] == {'start': 3, 'rows': 2}
+    # Shared LOV rows are written once
+    assert manifest['forms']['FORM-B']['tables']['FORMLOV'] == {'start': 2, 'rows': 0, 'shared_rows_skipped': 2}
+
+    template = pd.read_excel(bundle.table_path('FORMTEMPLATE'))
+    start, rows = 3, 2
+    assert list(template['FORMNAME'][start:start + rows]) == ["FORM-B", "FORM-B"]
+    assert manifest['row_counts'] == {'FORMHEAD': 2, 'FORMTEMPLATE': 5, 'FORMLOV': 2, 'FORMMENU': 2}
+
+
+def test_duplicate_form_is_rejected(tmp_path):
+    bundle = BundleWriter(str(tmp_path))
+    bundle.add_form("FORM-A", form_tables("FORM-A", 1))
+    with pytest.raises(ValueError):
+        bundle.add_form("FORM-A", form_tables("FORM-A", 1))
+    bundle.abort()
+
+
+def test_bad_table_adds_no_rows_of_the_form(tmp_path):
+    bundle = BundleWriter(str(tmp_path), timestamp="ts")
+    bundle.add_form("FORM-A", form_tables("FORM-A", 2))
+    broken = form_tables("FORM-B", 2)
+    broken['FORMMENU'] = [{'FORMNAME': "FORM-B", 'OTHER': 1}]
+
+    with pytest.raises(ValueError):
+        bundle.add_form("FORM-B", broken)
+    assert "FORM-B" not in bundle.forms
+    assert bundle.row_counts == {'FORMHEAD': 1, 'FORMTEMPLATE': 2, 'FORMLOV': 2, 'FORMMENU': 1}
+
+    bundle.close()
+    assert len(pd.read_excel(bundle.table_path('FORMTEMPLATE'))) == 2
+
+
+def test_failed_batch_publishes_nothing(tmp_path):
+    with pytest.raises(RuntimeError):
+        with BundleWriter(str(tmp_path), timestamp="ts") as bundle:
+            bundle.add_form("FORM-A", form_tables("FORM-A", 2))
+            raise RuntimeError("conversion crashed")
+
+    assert os.listdir(tmp_path) == []
+    assert bundle.close() == []
+
+
+def test_close_writes_every_table_once(tmp_path):
+    bundle = BundleWriter(str(tmp_path), timestamp="ts")
+    bundle.add_form("FORM-A", form_tables("FORM-A", 1))
+
+    outputs = bundle.close()
+    assert [output['table'] for output in outputs] == list(BUNDLE_TABLES)
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [os.path.basename(bundle.table_path(table)) for table in BUNDLE_TABLES] + [f"BUNDLE_ts_{bundle.suffix}.manifest.json"])
+    assert bundle.close() == []
+
+
+def test_bundles_started_together_keep_their_own_files(tmp_path):
+    first = BundleWriter(str(tmp_path), timestamp="ts")
+    second = BundleWriter(str(tmp_path), timestamp="ts")
+    first.add_form("FORM-A", form_tables("FORM-A", 1))
+    second.add_form("FORM-B", form_tables("FORM-B", 2))
+    first.close()
+    second.close()
+
+    assert len(os.listdir(tmp_path)) == 2 * (len(BUNDLE_TABLES) + 1)
+    assert list(pd.read_excel(first.table_path('FORMTEMPLATE'))['FORMNAME']) == ["FORM-A"]
+    assert list(pd.read_excel(second.table_path('FORMTEMPLATE'))['FORMNAME']) == ["FORM-B", "FORM-B"]
@@ -0,0 +1,170 @@
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import pytest
+
+from core import convert_sheet
+from delta import (PARKED_SUFFIX, POSITION_COLUMNS, TABLE_KEYS, build_manifest, compute_delta, delta_size,
+                   delta_sql_statements, load_manifest, manifest_path, row_key, save_manifest, write_delta_workbooks)
+
+
+def converted_tables(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM")
+    return converter, converter.build_output_tables()
+
+
+def test_unchanged_generation_has_an_empty_delta(workbook):
+    _, tables = converted_tables(workbook)
+    manifest = build_manifest("TEST-FORM", tables)
+
+    _, again = converted_tables(workbook)
+    assert delta_size(compute_delta(manifest, again)) == 0
+
+
+def test_text_edit_updates_only_its_rows(workbook):
+    converter, tables = converted_tables(workbook)
+    manifest = build_manifest("TEST-FORM", tables)
+
+    converter.procedures[10]['text'] = "Replace coupling insert"
+    delta = compute_delta(manifest, converter.build_output_tables())
+
+    updated = delta['FORMTEMPLATE']['update']
+    assert updated and all("Replace coupling insert" in str(row.values()) for row in updated)
+    assert not delta['FORMTEMPLATE']['insert'] and not delta['FORMTEMPLATE']['delete']
+
+
+def test_removed_rows_become_deletes(workbook):
+    converter, tables = converted_tables(workbook)
+    manifest = build_manifest("TEST-FORM", tables)
+
+    del converter.procedures[-1]
+    for proc in converter.procedures:
+        proc['number'] = converter.procedures.index(proc) + 1
+    delta = compute_delta(manifest, converter.build_output_tables())
+
+    assert delta['FORMTEMPLATE']['delete']
+    assert not delta['FORMTEMPLATE']['insert']
+
+
+def test_sql_statements_cover_every_change(workbook, tmp_path):
+    converter, tables = converted_tables(workbook)
+    manifest = build_manifest("TEST-FORM", tables)
+    converter.procedures[0]['text'] = "Check oil level O'Ring"
+    delta = compute_delta(manifest, converter.build_output_tables())
+
+    statements = list(delta_sql_statements(delta))
+    assert len(statements) == delta_size(delta)
+    assert all(statement.startswith("UPDATE FORMTEMPLATE") for statement in statements)
+    assert any("O''Ring" in statement for statement in statements)
+    assert [output['table'] for output in write_delta_workbooks(delta, str(tmp_path), "ts")] == ['FORMTEMPLATE']
+
+
+def test_manifest_round_trip(workbook, tmp_path):
+    _, tables = converted_tables(workbook)
+    manifest = build_manifest("TEST/FORM", tables)
+
+    path = save_manifest(str(tmp_path), manifest)
+    assert path == manifest_path(str(tmp_path), "TEST/FORM")
+    assert load_manifest(str(tmp_path), "TEST/FORM")['tables'] == manifest['tables']
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+
+def save_many(output_dir, worker):
+    tables = {'FORMHEAD': [{'FORMNAME': "TEST-FORM", 'STATUS': f"worker {worker}"}]}
+    for _ in range(50):
+        save_manifest(output_dir, build_manifest("TEST-FORM", tables))
+    return worker
+
+
+def test_concurrent_writers_of_one_manifest_do_not_collide(tmp_path):
+    with ProcessPoolExecutor(4) as pool:
+        assert sorted(pool.map(save_many, [str(tmp_path)] * 4, range(4))) == [0, 1, 2, 3]
+
+    assert load_manifest(str(tmp_path), "TEST-FORM") is not None
+    assert os.listdir(tmp_path / ".pm_manifests") == ["TEST-FORM.json"]
+
+
+def apply_sql(tables, statements):
+    """Rows of every table after loading tables into SQLite and running the statements"""
+    connection = sqlite3.connect(":memory:")
+    for table, rows in tables.items():
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        connection.execute(f"CREATE TABLE {table} ({', '.join(columns)}, UNIQUE ({', '.join(TABLE_KEYS[table])}))")
+        connection.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})",
+                               [[row.get(column) for column in columns] for row in rows])
+    for statement in statements:
+        connection.execute(statement)
+    result = {}
+    for table in tables:
+        cursor = connection.execute(f"SELECT * FROM {table}")
+        columns = [description[0] for description in cursor.description]
+        result[table] = sorted((dict(zip(columns, row)) for row in cursor), key=lambda row: row_key(table, row))
+    return result
+
+
+def sorted_tables(tables):
+    return {table: sorted(rows, key=lambda row: row_key(table, row)) for table, rows in tables.items()}
+
+
+def identity_delta(converter, edit):
+    manifest = build_manifest("TEST-FORM", converter.build_output_tables(), converter.output_row_identities())
+    old = converter.build_output_tables()
+    edit(converter)
+    new = converter.build_output_tables()
+    return old, new, compute_delta(manifest, new, converter.output_row_identities())
+
+
+def insert_first(converter):
+    converter.insert_procedure_at(0, {'number': 1, 'text': "Check guard is fitted"})
+
+
+def delete_sixth(converter):
+    converter.remove_procedure_at(5)
+
+
+def swap_first_two(converter):
+    first, first_lov = converter.remove_procedure_at(0)
+    converter.insert_procedure_at(1, first, first_lov)
+
+
+def edit_and_insert(converter):
+    converter.procedures[10]['text'] = "Replace coupling insert"
+    insert_first(converter)
+
+
+@pytest.mark.parametrize("edit", [insert_first, delete_sixth, swap_first_two, edit_and_insert])
+def test_identity_delta_applied_as_sql_gives_the_new_tables(workbook, edit):
+    converter, _ = converted_tables(workbook)
+    old, new, delta = identity_delta(converter, edit)
+
+    assert apply_sql(old, delta_sql_statements(delta)) == sorted_tables(new)
+
+
+def test_inserting_a_procedure_renames_the_rows_after_it(workbook, tmp_path):
+    converter, _ = converted_tables(workbook)
+    old, new, delta = identity_delta(converter, insert_first)
+    template = delta['FORMTEMPLATE']
+    fields = len(new['FORMTEMPLATE']) - len(old['FORMTEMPLATE'])
+
+    assert len(template['insert']) == fields and not template['update'] and not template['delete']
+    # Every procedure row shifts; the two header rows stay. Renames set only the columns that follow the position
+    assert len(template['rename']) == len(old['FORMTEMPLATE']) - 2
+    assert all(set(rename['columns']) <= set(POSITION_COLUMNS['FORMTEMPLATE']) for rename in template['rename'])
+    assert not any("KEYLOV" in statement for statement in delta_sql_statements({'FORMTEMPLATE': template})
+                   if statement.startswith("UPDATE"))
+
+    output = write_delta_workbooks({'FORMTEMPLATE': template}, str(tmp_path), "ts")[0]
+    changes = pd.read_excel(output['file'])
+    assert changes['CHANGE'].value_counts().to_dict() == {'RENAME': len(template['rename']), 'INSERT': fields}
+    assert changes['OLD_KEYNAME'].notna().sum() == len(template['rename'])
+
+
+def test_swapped_procedures_rename_through_a_parked_key(workbook):
+    converter, _ = converted_tables(workbook)
+    _, _, delta = identity_delta(converter, swap_first_two)
+    statements = list(delta_sql_statements(delta))
+
+    parked = [statement for statement in statements if PARKED_SUFFIX + "'" in statement]
+    assert parked and len(statements) == delta_size(delta) + len(parked) // 2
@@ -0,0 +1,51 @@
+import pytest
+
+import extraction
+from core import FormConverter
+from extraction import extract_pooled, extract_sharded, scan_procedures, shard_bounds, shard_workers
+
+
+@pytest.fixture
+def sheet(workbook):
+    converter = FormConverter()
+    converter.load_sheet(workbook, "Mechanical Tasklist")
+    first_row = converter.detect_header_row() + 1
+    return converter.raw_dataframe, first_row, converter.merged_index
+
+
+def serial(df, first_row, merged):
+    return scan_procedures(df.iloc[first_row:].itertuples(index=False, name=None), first_row, merged)
+
+
+def test_shard_bounds_cover_every_row_once():
+    bounds = shard_bounds(3, 20, 4)
+    assert bounds[0][0] == 3 and bounds[-1][1] == 20
+    assert all(stop == start for (_, stop), (start, _) in zip(bounds, bounds[1:]))
+    assert shard_bounds(3, 5, 10) == [(3, 4), (4, 5)]
+
+
+@pytest.mark.parametrize("shards", [2, 7, 23])
+def test_sharded_extraction_equals_serial(sheet, shards):
+    df, first_row, merged = sheet
+    expected = serial(df, first_row, merged)
+    assert len(expected) == 60
+
+    # Many small shards so boundaries fall inside merged procedures
+    assert extract_pooled(df, first_row, merged, workers=2, shards=shards) == expected
+
+
+@pytest.mark.parametrize("cpus, workers, expected", [(1, None, 1), (1, 4, 1), (4, 8, 1), (8, 4, 4), (8, None, 8)])
+def test_shard_workers_fall_back_to_serial(monkeypatch, cpus, workers, expected):
+    monkeypatch.setattr(extraction.os, 'cpu_count', lambda: cpus)
+    assert shard_workers(workers) == expected
+
+
+def test_single_cpu_extracts_without_a_pool(sheet, monkeypatch):
+    df, first_row, merged = sheet
+    monkeypatch.setattr(extraction.os, 'cpu_count', lambda: 1)
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool used on a single CPU")
+    monkeypatch.setattr(extraction, 'extract_pooled', no_pool)
+
+    assert extract_sharded(df, first_row, merged, workers=4) == serial(df, first_row, merged)
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core import convert_sheet, read_registry, registry_path
+from fanout import PANDAS_MAJOR, base_frames, fan_out, org_frames, parse_org_targets
+
+
+def test_parse_org_targets():
+    assert parse_org_targets("2100, 2200;2300:P2- ") == [("2100", ""), ("2200", ""), ("2300", "P2-")]
+    assert parse_org_targets("") == []
+    with pytest.raises(ValueError):
+        parse_org_targets("2100, 2100:X-")
+    with pytest.raises(ValueError):
+        parse_org_targets("21/00")
+
+
+def test_org_frames_share_unchanged_columns():
+    frames = base_frames({'FORMTEMPLATE': [{'ORG': "2100", 'FORMNAME': "F", 'KEYNAME': "K1", 'VERSION': 1},
+                                           {'ORG': "2100", 'FORMNAME': "F", 'KEYNAME': "K2", 'VERSION': None}],
+                          'FORMMENU': [{'FORMNAME': "F", 'MENU': "PM"}]})
+    swapped = org_frames(frames, "2200", "P2-F")
+
+    assert list(swapped['FORMTEMPLATE']['ORG']) == ["2200", "2200"]
+    assert list(swapped['FORMTEMPLATE']['FORMNAME']) == ["P2-F", "P2-F"]
+    assert swapped['FORMTEMPLATE']['VERSION'].tolist() == [1, None]
+    # Copy-on-write (pandas 2 and later) shares the unchanged columns
+    assert np.shares_memory(swapped['FORMTEMPLATE']['KEYNAME'].to_numpy(),
+                            frames['FORMTEMPLATE']['KEYNAME'].to_numpy()) == (PANDAS_MAJOR >= 2)
+    assert list(frames['FORMTEMPLATE']['ORG']) == ["2100", "2100"]
+    assert org_frames(frames, "2200")['FORMMENU'] is frames['FORMMENU']
+
+
+def test_fan_out_names_each_org_form():
+    frames = base_frames({'FORMHEAD': [{'ORG': "2100", 'FORMNAME': "F"}]})
+    results = [(org, name, tables['FORMHEAD'].iloc[0].to_dict())
+               for org, name, tables in fan_out(frames, "F", [("2100", ""), ("2300", "P3-")])]
+    assert results == [("2100", "F", {'ORG': "2100", 'FORMNAME': "F"}),
+                       ("2300", "P3-F", {'ORG': "2300", 'FORMNAME': "P3-F"})]
+
+
+def test_each_org_gets_the_same_form(workbook, tmp_path):
+    converter = convert_sheet(workbook, form_name="TEST-FORM", org_code="2100", output_dir=str(tmp_path))
+    expected = {table: pd.DataFrame(rows, dtype=object) for table, rows in converter.build_output_tables().items()}
+
+    outputs = converter.write_fanout(str(tmp_path), "ts", [("2100", ""), ("2200", "P2-")])
+
+    assert sorted({output['org'] for output in outputs}) == ["2100", "2200"]
+    assert sorted(os.listdir(tmp_path / "2200")) == sorted(f"{table}_ts.xlsx" for table in expected)
+    template = pd.read_excel(tmp_path / "2200" / "FORMTEMPLATE_ts.xlsx", dtype=object)
+    assert len(template) == len(expected['FORMTEMPLATE'])
+    assert set(template['ORG'].astype(str)) == {"2200"}
+    assert set(template['FORMNAME']) == {"P2-TEST-FORM"}
+    assert list(template['KEYNAME']) == list(expected['FORMTEMPLATE']['KEYNAME'])
+    assert sorted(read_registry(registry_path(str(tmp_path)))['form_registry']) == ["P2-TEST-FORM", "TEST-FORM"]
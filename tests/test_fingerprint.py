@@ -0,0 +1,103 @@
+import json
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from core import FormConverter
+from fingerprint import FingerprintIndex, normalize_text, rebind_tables, sheet_fingerprint, workbook_fingerprint
+
+SHEET = "Mechanical Tasklist"
+
+
+def convert(workbook, output_dir, form_name, org_code="ORG1", reuse=True):
+    converter = FormConverter(form_name, f"{form_name} description", output_dir=str(output_dir), org_code=org_code)
+    if reuse:
+        converter.fingerprint_index = FingerprintIndex.for_output_dir(str(output_dir))
+    reused = converter.prepare(workbook, SHEET)
+    tables = converter.build_output_tables()
+    converter.remember_fingerprint(tables)
+    return converter, tables, reused
+
+
+def test_sheet_fingerprint_ignores_case_spacing_and_row_offsets():
+    procedures = [{'col': 'B', 'row': 5, 'text': "Check oil level", 'original_text': "1. Check oil level"}]
+    shifted = [{'col': 'B', 'row': 9, 'text': "CHECK  oil level ", 'original_text': " 1. check oil  level"}]
+
+    assert normalize_text("  Check\n oil  LEVEL ") == "check oil level"
+    assert sheet_fingerprint(procedures) == sheet_fingerprint(shifted)
+    assert sheet_fingerprint(procedures) != sheet_fingerprint(procedures + shifted)
+
+
+def test_identical_workbook_is_reused_before_reading(workbook, tmp_path):
+    output_dir = tmp_path / "out"
+    first, first_tables, reused = convert(workbook, output_dir, "FORM-A")
+    assert reused is None
+
+    copy = str(tmp_path / "renamed.xlsx")
+    shutil.copy(workbook, copy)
+    assert workbook_fingerprint(copy) == workbook_fingerprint(workbook)
+    second, second_tables, reused = convert(copy, output_dir, "FORM-A")
+
+    assert reused == 'workbook'
+    assert second.procedures == first.procedures
+    assert second_tables['FORMTEMPLATE'] == first_tables['FORMTEMPLATE']
+    assert second_tables['FORMLOV'] == first_tables['FORMLOV']
+
+
+def test_reuse_rebinds_form_names(workbook, tmp_path):
+    output_dir = tmp_path / "out"
+    convert(workbook, output_dir, "FORM-A")
+    converter, tables, reused = convert(workbook, output_dir, "FORM-B")
+
+    assert reused == 'workbook'
+    assert {row['FORMNAME'] for row in tables['FORMTEMPLATE']} == {"FORM-B"}
+    key_prefix = converter.template_key_prefix("FORM-B") + '-'
+    assert all(row['KEYNAME'].startswith(key_prefix) for row in tables['FORMTEMPLATE'])
+    assert "FORM-A description" not in {row['KEYLABEL'] for row in tables['FORMTEMPLATE']}
+
+
+def test_reuse_for_another_org_rebinds_org(workbook, tmp_path):
+    output_dir = tmp_path / "out"
+    convert(workbook, output_dir, "FORM-A", org_code="ORG1")
+    _, tables, reused = convert(workbook, output_dir, "FORM-A", org_code="ORG2")
+
+    assert reused == 'workbook'
+    assert {row['ORG'] for row in tables['FORMTEMPLATE']} == {"ORG2"}
+    assert {row['ORG'] for row in tables['FORMLOV']} == {"ORG2"}
+
+
+@pytest.mark.parametrize("org_code", ["ORG1", "ORG2"])
+def test_rebound_rows_match_a_fresh_conversion(workbook, tmp_path, org_code):
+    output_dir = tmp_path / "out"
+    _, stored, _ = convert(workbook, output_dir, "FORM-A", org_code="ORG1")
+    fresh, fresh_tables, _ = convert(workbook, tmp_path / "fresh", "FORM-B", org_code=org_code, reuse=False)
+    entry = FingerprintIndex.for_output_dir(str(output_dir)).load(fresh.sheet_fingerprint)
+
+    rebound = rebind_tables(entry, "FORM-B", "FORM-B description", fresh.template_key_prefix("FORM-B"),
+                            fresh.lov_key_prefix("FORM-B"), org_code)
+
+    # LOV codes are minted per output directory; everything else matches a fresh build
+    def without_codes(rows):
+        return [{column: value for column, value in row.items() if column not in ('KEYLOV', 'LOVNAME')}
+                for row in rows]
+    assert without_codes(rebound['FORMTEMPLATE']) == without_codes(fresh_tables['FORMTEMPLATE'])
+    assert without_codes(rebound['FORMLOV']) == without_codes(fresh_tables['FORMLOV'])
+
+
+def map_workbooks(directory, worker, count):
+    index = FingerprintIndex(directory)
+    for n in range(count):
+        index.map_workbook(f"workbook-{worker}-{n}", SHEET, f"fingerprint-{worker}-{n}")
+
+
+def test_concurrent_workers_keep_every_mapping(tmp_path):
+    directory = str(tmp_path / "fingerprints")
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        for future in [pool.submit(map_workbooks, directory, worker, 25) for worker in range(4)]:
+            future.result()
+
+    with open(FingerprintIndex(directory).index_path, encoding='utf-8') as f:
+        workbooks = json.load(f)['workbooks']
+    assert len(workbooks) == 100
+    assert workbooks["workbook-3-24"] == {SHEET: "fingerprint-3-24"}
@@ -0,0 +1,114 @@
+import copy
+
+import pytest
+
+from core import convert_sheet
+from history import LovValueEdit, ProcedureRemove, ProcedureTextEdit, UndoHistory
+
+
+class TextEditor:
+    """Editor holding only procedure texts"""
+
+    def __init__(self, texts):
+        self.texts = list(texts)
+
+    def set_procedure_text(self, index, text):
+        self.texts[index] = text
+
+
+def test_keystrokes_coalesce_until_sealed():
+    editor = TextEditor(["a", "b"])
+    history = UndoHistory()
+    for old, new in (("a", "ab"), ("ab", "abc")):
+        editor.texts[0] = new
+        history.push(ProcedureTextEdit(0, old, new))
+    history.seal()
+    editor.texts[0] = "abcd"
+    history.push(ProcedureTextEdit(0, "abc", "abcd"))
+
+    assert len(history) == 2
+    assert history.undo(editor) == "edit procedure 1" and editor.texts[0] == "abc"
+    assert history.undo(editor) == "edit procedure 1" and editor.texts[0] == "a"
+    assert history.undo(editor) is None
+    history.redo(editor)
+    assert editor.texts[0] == "abc"
+
+
+def test_new_edit_drops_redo_steps_and_limit_is_kept():
+    editor = TextEditor(["a"] * 5)
+    history = UndoHistory(limit=3)
+    for index in range(5):
+        history.push(ProcedureTextEdit(index, "a", "b"))
+    assert len(history) == 3
+
+    history.undo(editor)
+    assert history.redo_label == "edit procedure 5"
+    history.push(ProcedureTextEdit(0, "a", "c"))
+    assert history.redo_label is None
+
+
+def test_group_is_one_undo_step():
+    editor = TextEditor(["a", "b"])
+    history = UndoHistory()
+    with history.group("bulk"):
+        history.push(ProcedureTextEdit(0, "a", "x"))
+        history.push(ProcedureTextEdit(1, "b", "y"))
+    editor.texts = ["x", "y"]
+
+    assert len(history) == 1 and history.undo_label == "bulk"
+    history.undo(editor)
+    assert editor.texts == ["a", "b"] and len(history) == 0 and history.redo_label == "bulk"
+
+
+@pytest.fixture
+def converter(workbook):
+    return convert_sheet(workbook, form_name="TEST-FORM")
+
+
+def model(converter):
+    return copy.deepcopy((converter.procedures, converter.collect_lov_configurations()))
+
+
+def test_bulk_text_change_undoes_and_redoes(converter):
+    before = model(converter)
+    changes = [(i, converter.procedures[i]['text'], converter.procedures[i]['text'].upper()) for i in (0, 3)]
+    converter.apply_text_changes(changes, "uppercase")
+    after = model(converter)
+
+    assert converter.undo_history.undo(converter) == "uppercase"
+    assert model(converter) == before
+    converter.undo_history.redo(converter)
+    assert model(converter) == after
+
+
+def test_removed_procedure_comes_back_with_its_lov_values(converter):
+    before = model(converter)
+    procedure, configuration = converter.remove_procedure_at(2)
+    converter.undo_history.push(ProcedureRemove(2, procedure, configuration))
+    assert len(converter.procedures) == len(before[0]) - 1
+    assert converter.procedures[2]['number'] == 3
+
+    converter.undo_history.undo(converter)
+    assert model(converter) == before
+
+
+def test_lov_value_edit_restores_the_old_code(converter):
+    before = model(converter)
+    old = before[1][1]
+    converter.set_lov_value(1, 'condition', "Open/Closed", "NEW-CODE")
+    converter.undo_history.push(LovValueEdit(1, 'condition', old['condition_values'], "Open/Closed",
+                                             old['condition_lov_code'], "NEW-CODE"))
+    assert converter.collect_lov_configurations()[1]['condition_lov_code'] == "NEW-CODE"
+
+    converter.undo_history.undo(converter)
+    assert model(converter) == before
+
+
+def test_insert_without_a_mapping_view_marks_it_stale(converter):
+    # A front end that listed the procedures but adds no row for the new one
+    converter.procedure_rows = []
+    procedure, configuration = converter.remove_procedure_at(0)
+    converter.insert_procedure_at(0, procedure, configuration)
+
+    assert 'mapping' in converter.stale_views and not converter.mapping_rows_live()
+    assert converter.procedures[0] is procedure and converter.procedures[1]['number'] == 2
@@ -0,0 +1,78 @@
+import sys
+
+from core import FormConverter, convert_sheet
+from fingerprint import FingerprintIndex
+from snapshot import SessionSnapshot, write_snapshot
+
+SHEET = "Mechanical Tasklist"
+
+
+def copy_of(text):
+    """An equal string that is a different object"""
+    return "".join(list(text))
+
+
+def is_interned(value):
+    return sys.intern(copy_of(value)) is value
+
+
+def assert_model_interned(converter):
+    assert converter.procedures and converter.lov_database
+    for proc in converter.procedures:
+        assert is_interned(proc['text'])
+    for code, values in converter.lov_database.items():
+        assert is_interned(code) and all(is_interned(value) for value in values)
+    for config in converter.collect_lov_configurations():
+        for field in ('condition_values', 'action_values', 'condition_lov_code', 'action_lov_code'):
+            assert not config.get(field) or is_interned(config[field])
+
+
+def assert_lov_rows_share_values(converter, lov_rows):
+    """Generated FORMLOV rows hold the very objects of lov_database"""
+    values = {(code, value): value for code, values in converter.lov_database.items() for value in values}
+    shared = [row for row in lov_rows if (row['LOVNAME'], row['VALUE']) in values]
+    assert shared
+    for row in shared:
+        assert row['VALUE'] is values[(row['LOVNAME'], row['VALUE'])]
+
+
+def test_extracted_model_is_interned(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM")
+
+    assert_model_interned(converter)
+    assert_lov_rows_share_values(converter, converter.build_formlov_rows())
+    labels = [row['KEYLABEL'] for row in converter.build_formtemplate_rows() if row['KEYLABEL'] == "Remarks"]
+    assert len(labels) > 1 and all(label is labels[0] for label in labels)
+
+
+def test_snapshot_load_is_interned(workbook, tmp_path):
+    source = convert_sheet(workbook, form_name="TEST-FORM")
+    path = str(tmp_path / "session.pmfs")
+    write_snapshot(path, workbook, SHEET, {'form_name': "TEST-FORM"}, source.procedures, source.lov_database,
+                   source.collect_lov_configurations())
+
+    snapshot = SessionSnapshot.open(path)
+    converter = FormConverter(output_dir=str(tmp_path))
+    converter.restore_session(snapshot.form_config, snapshot.procedures, snapshot.lov_database,
+                              snapshot.lov_configurations)
+
+    assert_model_interned(converter)
+    # The loaded strings are the ones the extracted model already holds
+    assert converter.procedures[0]['text'] is source.procedures[0]['text']
+
+
+def test_fingerprint_rebind_is_interned(workbook, tmp_path):
+    first = FormConverter("YKN-CPP2-G-603-MECH", "First", output_dir=str(tmp_path))
+    first.fingerprint_index = FingerprintIndex.for_output_dir(str(tmp_path))
+    first.prepare(workbook, SHEET)
+    first.remember_fingerprint(first.build_output_tables())
+
+    second = FormConverter("YKN-CPP2-G-604-MECH", "Second", output_dir=str(tmp_path), org_code="2200")
+    second.fingerprint_index = FingerprintIndex.for_output_dir(str(tmp_path))
+    assert second.prepare(workbook, SHEET)
+    tables = second.build_output_tables()
+
+    assert_model_interned(second)
+    assert_lov_rows_share_values(second, tables['FORMLOV'])
+    for row in tables['FORMTEMPLATE']:
+        assert all(is_interned(value) for value in row.values() if type(value) is str)
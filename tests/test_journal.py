@@ -0,0 +1,130 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import journal
+from journal import EditJournal, apply_edit, empty_state, orphaned_journals
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROCEDURES = [{'number': 1, 'text': "Check oil", 'row': 4, 'col': 0, 'original_text': "1. Check oil"},
+              {'number': 2, 'text': "Inspect belt", 'row': 5, 'col': 0, 'original_text': "2. Inspect belt"}]
+
+
+def record_session(journal_):
+    journal_.open()
+    journal_.record('procedures_set', procedures=[dict(proc) for proc in PROCEDURES])
+    journal_.record('lov_setup', count=2)
+    journal_.record('procedure_text', index=1, text="Inspect drive belt")
+    journal_.record('lov_values', index=0, field='condition_values', value="Good,Bad")
+    journal_.record('lov_code', index=0, field='condition_lov_code', code='YKN-LOV-001', values=["Good", "Bad"])
+
+
+def test_recover_replays_the_journal(tmp_path):
+    session = EditJournal.create(str(tmp_path))
+    record_session(session)
+    session.close(discard=False)
+
+    state = EditJournal(session.directory).recover()
+    assert [proc['text'] for proc in state['procedures']] == ["Check oil", "Inspect drive belt"]
+    assert state['lov_configurations'][0]['condition_lov_code'] == 'YKN-LOV-001'
+    assert state['lov_database'] == {'YKN-LOV-001': ["Good", "Bad"]}
+
+
+def test_recover_after_compaction_skips_folded_entries(tmp_path):
+    session = EditJournal.create(str(tmp_path))
+    record_session(session)
+    state = EditJournal(session.directory).recover()
+    session.compact(state)
+    session.record('procedure_delete', index=0)
+    session.close(discard=False)
+
+    recovered = EditJournal(session.directory).recover()
+    assert [(proc['number'], proc['text']) for proc in recovered['procedures']] == [(1, "Inspect drive belt")]
+    assert recovered['lov_configurations'] == [journal.blank_lov_configuration()]
+
+
+def test_torn_final_line_keeps_the_consistent_prefix(tmp_path):
+    session = EditJournal.create(str(tmp_path))
+    record_session(session)
+    session.close(discard=False)
+    with open(session.journal_path, 'a', encoding='utf-8') as f:
+        f.write('{"seq": 6, "op": "procedure_te')
+
+    state = EditJournal(session.directory).recover()
+    assert state['procedures'][1]['text'] == "Inspect drive belt"
+
+
+def test_procedure_insert_renumbers_and_aligns_lov_rows():
+    state = empty_state()
+    for entry in [{'op': 'procedures_set', 'procedures': [dict(proc) for proc in PROCEDURES]},
+                  {'op': 'lov_setup', 'count': 2},
+                  {'op': 'procedure_insert', 'index': 1,
+                   'procedure': {'number': 0, 'text': "Clean filter", 'row': 9, 'col': 0}}]:
+        apply_edit(state, entry)
+
+    assert [(proc['number'], proc['text']) for proc in state['procedures']] == [
+        (1, "Check oil"), (2, "Clean filter"), (3, "Inspect belt")]
+    assert len(state['lov_configurations']) == 3
+
+
+def test_clean_close_removes_the_session(tmp_path):
+    session = EditJournal.create(str(tmp_path))
+    record_session(session)
+    session.close(discard=True)
+
+    assert not os.path.exists(session.directory)
+    assert orphaned_journals(str(tmp_path)) == []
+
+
+def run_instance(root, exit_code):
+    """Start a process that journals one edit into a new session, then waits on stdin or dies"""
+    script = textwrap.dedent(f"""
+        import os, sys
+        sys.path.insert(0, {REPO_ROOT!r})
+        from journal import EditJournal
+        session = EditJournal.create({root!r})
+        session.open()
+        session.record('procedures_set', procedures=[{{'number': 1, 'text': 'Check oil', 'row': 4, 'col': 0}}])
+        print(session.directory, flush=True)
+        if {exit_code} is None:
+            sys.stdin.readline()
+        os._exit({exit_code or 0})
+    """)
+    return subprocess.Popen([sys.executable, '-c', script], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+
+
+def test_running_instance_is_neither_recovered_nor_discarded(tmp_path):
+    root = str(tmp_path / "autosave")
+    running = run_instance(root, None)
+    try:
+        directory = running.stdout.readline().strip()
+        assert orphaned_journals(root) == []
+        with pytest.raises(RuntimeError):
+            EditJournal(directory).discard()
+        assert os.path.exists(os.path.join(directory, journal.JOURNAL_FILE))
+    finally:
+        running.communicate("\n")
+
+
+def test_crashed_instance_is_offered_for_recovery(tmp_path):
+    root = str(tmp_path / "autosave")
+    crashed = run_instance(root, 1)
+    directory = crashed.stdout.readline().strip()
+    crashed.wait()
+
+    orphans = orphaned_journals(root)
+    assert [orphan.directory for orphan in orphans] == [directory]
+    assert orphans[0].recover()['procedures'][0]['text'] == "Check oil"
+    orphans[0].discard()
+    assert not os.path.exists(directory)
+
+
+def test_new_empty_sessions_are_left_to_their_owner(tmp_path):
+    session = EditJournal.create(str(tmp_path))
+    session.release()
+
+    assert orphaned_journals(str(tmp_path)) == []
+    assert session.claim()
@@ -0,0 +1,133 @@
+import json
+from traceback import FrameSummary
+
+import pytest
+
+import latency
+from latency import EventLoopWatchdog, find_handler, format_stall, is_idle, is_modal
+
+TK = "/usr/lib/python3.11/tkinter/__init__.py"
+APP = "/app/formgenerator.py"
+
+
+def frame(filename, lineno, name):
+    return FrameSummary(filename, lineno, name, lookup_line=False)
+
+
+MAINLOOP = [frame(APP, 10, "<module>"), frame(TK, 1504, "mainloop")]
+HANDLER = [frame(APP, 10, "<module>"), frame(TK, 1504, "mainloop"), frame(TK, 1948, "__call__"),
+           frame(APP, 735, "populate_procedure_mapping"), frame("/app/core.py", 410, "extract_procedures")]
+DIALOG = [frame(APP, 10, "<module>"), frame(TK, 1948, "__call__"), frame(APP, 900, "load_file"),
+          frame("/usr/lib/python3.11/tkinter/filedialog.py", 380, "askopenfilename")]
+
+
+def test_find_handler_is_the_first_frame_called_from_tkinter():
+    assert find_handler(HANDLER) == HANDLER[3]
+    assert find_handler(DIALOG) == DIALOG[2]
+    # Startup code and the idle loop run outside any Tk callback
+    assert find_handler([frame(APP, 10, "<module>"), frame(APP, 20, "build_ui")]) is None
+    assert find_handler(MAINLOOP) is None
+
+
+def test_idle_and_modal_stacks():
+    assert is_idle(MAINLOOP)
+    assert not is_idle(HANDLER) and not is_idle([])
+    assert is_modal(DIALOG)
+    assert not is_modal(HANDLER)
+    # A function of the same name outside tkinter is not a dialog
+    assert not is_modal([frame(APP, 5, "show")])
+
+
+class FakeRoot:
+    """root.after that only fires when the test says so"""
+
+    def __init__(self):
+        self.pending = {}
+        self._ids = 0
+
+    def after(self, ms, callback):
+        self._ids += 1
+        self.pending[self._ids] = callback
+        return self._ids
+
+    def after_cancel(self, after_id):
+        self.pending.pop(after_id, None)
+
+    def fire(self):
+        (after_id, callback), = self.pending.items()
+        del self.pending[after_id]
+        callback()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        return self.now
+
+
+@pytest.fixture
+def watchdog(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(latency, 'time', clock)
+    root = FakeRoot()
+    watchdog = EventLoopWatchdog(root, interval_ms=100, threshold_ms=250, max_stalls=3)
+    # Armed as start() does, without the sampler thread; tests hand it samples instead
+    watchdog.running = True
+    watchdog._last_beat = clock.now
+    root.after(100, watchdog._beat)
+
+    def beat(lag_ms, stacks=(), phase=None):
+        watchdog._samples = [(lag_ms / 1000, stack, phase) for stack in stacks]
+        clock.now += 0.1 + lag_ms / 1000
+        root.fire()
+    watchdog.beat = beat
+    return watchdog
+
+
+def test_stall_records_the_handler_phase_and_hot_frames(watchdog):
+    records = []
+    watchdog.add_listener(records.append)
+    watchdog.beat(600, [HANDLER, HANDLER[:4], HANDLER], phase="extract")
+
+    record, = records
+    assert record['lag_ms'] == 600.0
+    assert record['handler'] == "formgenerator.py:735 populate_procedure_mapping"
+    assert record['phase'] == "extract"
+    assert record['samples'] == 3
+    assert record['hot_frames'] == [{'frame': "core.py:410 extract_procedures", 'samples': 2},
+                                    {'frame': "formgenerator.py:735 populate_procedure_mapping", 'samples': 1}]
+    assert format_stall(record) == "UI stalled 600 ms in formgenerator.py:735 populate_procedure_mapping (extract)"
+    # The next beat starts with no samples left over
+    assert watchdog._samples == [] and len(watchdog.root.pending) == 1
+
+
+def test_idle_modal_and_short_beats_are_not_stalls(watchdog):
+    watchdog.beat(100, [HANDLER])
+    watchdog.beat(800, [MAINLOOP, MAINLOOP])
+    watchdog.beat(800, [HANDLER, DIALOG])
+    assert watchdog.stall_count == 0 and watchdog.worst() == []
+
+    # Without samples the stall is still counted, e.g. when startup code blocked the loop
+    watchdog.beat(300)
+    record, = watchdog.worst()
+    assert record['handler'] is None and record['stack'] == []
+    assert format_stall(record) == "UI stalled 300 ms in startup code"
+
+
+def test_only_the_worst_stalls_are_kept(watchdog, tmp_path):
+    for lag_ms in (300, 900, 500, 400, 1200, 500):
+        watchdog.beat(lag_ms, [HANDLER])
+
+    assert [record['lag_ms'] for record in watchdog.worst()] == [1200.0, 900.0, 500.0]
+    assert watchdog.stall_count == 6
+    assert round(watchdog.max_lag, 3) == 1.2
+
+    path = tmp_path / "stalls.json"
+    watchdog.write_report(str(path))
+    report = json.loads(path.read_text(encoding='utf-8'))
+    assert report['stall_count'] == 6 and len(report['worst']) == 3 and report['threshold_ms'] == 250
+
+    watchdog.clear()
+    assert watchdog.worst() == [] and watchdog.stall_count == 0
@@ -0,0 +1,76 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+from core import FormConverter
+from merged import MergedRangeIndex, column_index, read_merged_ranges
+
+ROWS = [
+    ("Quarterly Service", None, None, None),
+    ("No", "Procedure", "Condition", "Remarks"),
+    ("1", "Check oil level", "OK", None),
+    (None, "and top up if low", None, None),
+    (None, "using grade 46 oil", None, None),
+    ("2", "Inspect drive belt", None, None),
+    ("3", "Grease bearings", None, None),
+]
+
+
+@pytest.fixture
+def merged_workbook(tmp_path):
+    path = str(tmp_path / "merged.xlsx")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Tasks"
+    for row in ROWS:
+        sheet.append(row)
+    sheet.merge_cells("A3:A5")
+    sheet.merge_cells("B7:D7")
+    workbook.save(path)
+    return path
+
+
+def test_column_index():
+    assert [column_index(letters) for letters in ("A", "Z", "AA", "AB")] == [0, 25, 26, 27]
+    assert column_index(b"AB") == 27
+
+
+def test_ranges_are_read_from_the_package(merged_workbook, tmp_path):
+    assert sorted(read_merged_ranges(merged_workbook, "Tasks")) == [(2, 0, 4, 0), (6, 1, 6, 3)]
+    assert read_merged_ranges(merged_workbook, "Missing") == []
+
+    csv = tmp_path / "tasks.csv"
+    csv.write_text("No,Procedure\n1,Check\n", encoding='utf-8')
+    assert read_merged_ranges(str(csv), "Tasks") == []
+
+
+def test_origin_lookup():
+    index = MergedRangeIndex([(2, 0, 4, 0), (6, 1, 6, 3), (8, 0, 8, 0)])
+
+    assert index.origin(2, 0) == (2, 0) and index.origin(4, 0) == (2, 0)
+    assert index.origin(5, 0) is None and index.origin(1, 0) is None
+    assert index.origin(6, 3) == (6, 1)
+    assert index.origin(8, 0) is None  # single-cell ranges are not indexed
+    assert index.continues(3, 0) and not index.continues(2, 0)
+    assert len(MergedRangeIndex([(2, 0, 4, 0), (6, 5, 6, 6)], max_columns=4)) == 1
+
+
+def test_propagate_fills_blocks_with_top_left_value():
+    df = pd.DataFrame([["1", "a"], [None, "b"], [None, None]], dtype=object)
+    filled = MergedRangeIndex([(0, 0, 1, 0), (1, 1, 2, 1)]).propagate(df)
+
+    assert filled[0].tolist()[:2] == ["1", "1"] and pd.isna(filled.iloc[2, 0])
+    assert filled[1].tolist() == ["a", "b", "b"]
+    assert pd.isna(df.iloc[1, 0])
+
+
+def test_continuation_rows_join_the_merged_procedure(merged_workbook):
+    converter = FormConverter()
+    converter.load_sheet(merged_workbook, "Tasks")
+    converter.analyze()
+
+    assert [(proc['number'], proc['text'], proc['row']) for proc in converter.procedures] == [
+        (1, "Check oil level and top up if low using grade 46 oil", 2),
+        (2, "Inspect drive belt", 5),
+        (3, "Grease bearings", 6),
+    ]
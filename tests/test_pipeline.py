@@ -0,0 +1,39 @@
+from benchmarks.synthetic_workbook import generate_workbook
+from core import build_frames, convert_sheet
+from templates import DEFAULT_TEMPLATE, template_row_count
+
+
+def test_synthetic_workbook_converts_every_procedure(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM")
+
+    assert [proc['number'] for proc in converter.procedures] == list(range(1, 61))
+    assert all(proc['text'] for proc in converter.procedures)
+
+
+def test_output_tables_cover_all_procedures(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM", org_code="2200")
+    tables = converter.build_output_tables()
+
+    assert len(tables['FORMHEAD']) == 1
+    assert len(tables['FORMTEMPLATE']) == template_row_count(DEFAULT_TEMPLATE, 60)
+    assert {row['FORMNAME'] for row in tables['FORMTEMPLATE']} == {"TEST-FORM"}
+    assert {row['ORG'] for row in tables['FORMTEMPLATE'] + tables['FORMLOV']} == {"2200"}
+
+
+def test_build_frames_matches_tables(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM")
+    tables = converter.build_output_tables()
+    frames = build_frames(converter)
+
+    assert {table: len(frame) for table, frame in frames.items()} == {table: len(rows) for table, rows in tables.items()}
+
+
+def test_numbering_styles_extract_the_same_texts(tmp_path):
+    texts = {}
+    for numbering in ('dot', 'paren', 'bare'):
+        path = str(tmp_path / f"{numbering}.xlsx")
+        generate_workbook(path, procedures=20, numbering=numbering, merged_cells=False, seed=3)
+        texts[numbering] = [proc['text'] for proc in convert_sheet(path).procedures]
+
+    assert len(texts['dot']) == 20
+    assert texts['dot'] == texts['paren'] == texts['bare']
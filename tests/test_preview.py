@@ -0,0 +1,83 @@
+import pytest
+
+from core import convert_sheet
+
+
+@pytest.fixture
+def converter(workbook):
+    return convert_sheet(workbook, form_name="YKN-CPP2-G-603-MECH")
+
+
+def all_pages(preview, page_size):
+    return [row for number in range(preview.page_count(page_size)) for row in preview.page(number, page_size)]
+
+
+def procedure_rows(rows, procedures, indices, header_count=2):
+    """Rows of the given procedures in a full FORMTEMPLATE table"""
+    per_procedure = (len(rows) - header_count) // len(procedures)
+    return [row for index in indices
+            for row in rows[header_count + index * per_procedure:header_count + (index + 1) * per_procedure]]
+
+
+@pytest.mark.parametrize("page_size", [7, 100, 1000])
+def test_template_pages_are_slices_of_the_full_table(converter, page_size):
+    preview = converter.build_output_previews()['FORMTEMPLATE']
+    rows = converter.build_formtemplate_rows()
+
+    assert len(preview) == len(rows)
+    for number in range(preview.page_count(page_size)):
+        assert preview.page(number, page_size) == rows[number * page_size:(number + 1) * page_size]
+
+
+def test_template_filters_select_the_matching_rows(converter):
+    preview = converter.build_output_previews()['FORMTEMPLATE']
+    rows = converter.build_formtemplate_rows()
+    procedures = converter.procedures
+
+    assert preview.filter(keytype='LIST') == sum(row['KEYTYPE'] == 'LIST' for row in rows)
+    assert all_pages(preview, 50) == [row for row in rows if row['KEYTYPE'] == 'LIST']
+
+    number = procedures[6]['number']
+    preview.filter(procedure_query=str(number))
+    assert all_pages(preview, 4) == procedure_rows(rows, procedures, [6])
+
+    query = procedures[3]['text'].split()[0].upper()
+    matching = [i for i, proc in enumerate(procedures) if query.lower() in proc['text'].lower()]
+    preview.filter(keytype='TEXTBOX', procedure_query=query)
+    assert all_pages(preview, 10) == [row for row in procedure_rows(rows, procedures, matching)
+                                      if row['KEYTYPE'] == 'TEXTBOX']
+
+    preview.filter()
+    assert all_pages(preview, 100) == rows
+
+
+def test_page_count_at_boundaries(converter):
+    preview = converter.build_output_previews()['FORMTEMPLATE']
+    count = len(preview)
+
+    assert preview.page_count(count) == 1
+    assert preview.page_count(count - 1) == 2
+    assert preview.page(1, count - 1) == converter.build_formtemplate_rows()[-1:]
+    assert preview.page_count(1) == count
+
+    assert preview.filter(procedure_query="no such procedure") == 0
+    assert preview.page_count() == 1 and preview.page(0) == []
+
+
+def test_lov_pages_and_procedure_filter(converter):
+    preview = converter.build_output_previews()['FORMLOV']
+    rows = converter.build_formlov_rows()
+    standard_count = len(converter.build_standard_lov_rows())
+
+    assert all_pages(preview, 3) == rows
+    assert preview.page_count(len(rows)) == 1 and preview.page_count(len(rows) - 1) == 2
+
+    config = converter.collect_lov_configurations()[0]
+    codes = {config['condition_lov_code'], config['action_lov_code']} - {''}
+    assert codes
+    preview.filter(procedure_query=str(converter.procedures[0]['number']))
+    assert all_pages(preview, 5) == rows[:standard_count] + [row for row in rows[standard_count:]
+                                                             if row['LOVNAME'] in codes]
+
+    assert preview.filter(procedure_query="no such procedure") == standard_count
+    assert preview.page_count(standard_count) == 1
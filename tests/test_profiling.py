@@ -0,0 +1,45 @@
+import os
+import tracemalloc
+
+from profiling import PhaseProfiler, format_record
+
+
+def test_allocations_are_not_traced_by_default():
+    profiler = PhaseProfiler()
+    with profiler.phase("outer"):
+        with profiler.phase("inner"):
+            assert not tracemalloc.is_tracing()
+
+    inner, outer = profiler.records
+    assert (inner['phase'], inner['depth']) == ("inner", 1)
+    assert (outer['phase'], outer['depth']) == ("outer", 0)
+    assert outer['peak_bytes'] is None
+    assert "peak" not in format_record(outer)
+
+
+def test_capture_traces_allocations_and_writes_profiles(tmp_path):
+    profiler = PhaseProfiler()
+    capture_dir = profiler.enable_capture(str(tmp_path))
+    with profiler.phase("build"):
+        data = [bytes(1024) for _ in range(1000)]
+    del data
+
+    assert profiler.records[-1]['peak_bytes'] >= 1000 * 1024
+    assert not tracemalloc.is_tracing()
+    assert os.listdir(capture_dir) == ["001_build.prof"]
+
+    profiler.disable_capture()
+    with profiler.phase("build"):
+        pass
+    assert profiler.records[-1]['peak_bytes'] is None
+
+
+def test_errors_are_recorded():
+    profiler = PhaseProfiler()
+    try:
+        with profiler.phase("write"):
+            raise OSError("disk full")
+    except OSError:
+        pass
+
+    assert profiler.records[-1]['error'] == "OSError"
@@ -0,0 +1,75 @@
+import openpyxl
+import pandas as pd
+import pytest
+
+import core
+from core import HEADER_PROBE_ROWS, PROCEDURE_COLUMNS, FormConverter
+
+WIDTH = 12
+HEADER = ["No", "Procedure", "Condition", "Action", "Remarks"]
+
+
+def write_sheet(path, lead_rows, procedures=250):
+    """A WIDTH-column sheet with lead_rows note rows above the header"""
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = "Tasks"
+    for n in range(lead_rows):
+        sheet.append([f"Note {n}"])
+    sheet.append(HEADER + [f"Extra {n}" for n in range(WIDTH - len(HEADER))])
+    for n in range(1, procedures + 1):
+        sheet.append([str(n), f"Inspect item {n}", "OK", "None", ""] + [f"x{n}"] * (WIDTH - len(HEADER)))
+    workbook.save(path)
+    return str(path)
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """usecols of every pd.read_excel call the converter makes"""
+    calls = []
+    read_excel = pd.read_excel
+
+    def recording_read_excel(*args, **kwargs):
+        calls.append(kwargs.get('usecols'))
+        return read_excel(*args, **kwargs)
+    monkeypatch.setattr(core.pd, 'read_excel', recording_read_excel)
+    return calls
+
+
+def test_full_read_is_limited_to_the_procedure_columns(tmp_path, reads):
+    path = write_sheet(tmp_path / "wide.xlsx", lead_rows=2)
+    converter = FormConverter()
+    converter.load_sheet(path, "Tasks")
+
+    assert reads == [None, list(range(PROCEDURE_COLUMNS))]
+    assert list(converter.raw_dataframe.columns) == list(range(PROCEDURE_COLUMNS))
+    assert converter.sheet_shape == (2 + 1 + 250, WIDTH)
+    converter.analyze()
+    assert len(converter.procedures) == 250
+
+
+def test_header_below_the_probe_falls_back_to_one_full_read(tmp_path, reads):
+    lead_rows = HEADER_PROBE_ROWS + 50
+    path = write_sheet(tmp_path / "deep.xlsx", lead_rows=lead_rows, procedures=20)
+    converter = FormConverter()
+    converter.load_sheet(path, "Tasks")
+
+    assert reads == [None, None]
+    assert converter.raw_sheet_plan['usecols'] == list(range(PROCEDURE_COLUMNS))
+    assert converter.sheet_shape == (lead_rows + 1 + 20, WIDTH)
+    assert converter.analyze() == lead_rows
+    assert [proc['text'] for proc in converter.procedures[:2]] == ["Inspect item 1", "Inspect item 2"]
+
+
+def test_released_frame_is_read_again_on_demand(tmp_path, reads):
+    path = write_sheet(tmp_path / "wide.xlsx", lead_rows=2)
+    converter = FormConverter()
+    converter.load_sheet(path, "Tasks")
+    loaded = converter.raw_dataframe.astype(object)
+    converter.analyze()
+    assert converter.raw_dataframe is None
+
+    again = converter.get_raw_dataframe()
+    assert reads[-1] == list(range(PROCEDURE_COLUMNS))
+    pd.testing.assert_frame_equal(again.astype(object), loaded)
+    assert converter.get_raw_dataframe() is again
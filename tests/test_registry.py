@@ -0,0 +1,57 @@
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from core import GLOBAL_LOV_REGISTRY_FILE, FormConverter, convert_sheet
+
+
+def registry(output_dir):
+    with open(os.path.join(output_dir, GLOBAL_LOV_REGISTRY_FILE), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_registry_is_written_to_the_output_directory(workbook, tmp_path, work_dir):
+    output_dir = str(tmp_path / "out")
+    os.makedirs(output_dir)
+    converter = convert_sheet(workbook, form_name="FORM-A", output_dir=output_dir)
+    converter.write_output_files(output_dir, "ts")
+
+    assert not os.path.exists(work_dir / GLOBAL_LOV_REGISTRY_FILE)
+    saved = registry(output_dir)
+    assert list(saved['form_registry']) == ["FORM-A"]
+    assert set(converter.lov_database) <= set(saved['used_lov_codes'])
+
+
+def test_later_saves_keep_entries_written_by_others(workbook, tmp_path):
+    output_dir = str(tmp_path / "out")
+    os.makedirs(output_dir)
+    first = convert_sheet(workbook, form_name="FORM-A", output_dir=output_dir)
+    second = convert_sheet(workbook, form_name="FORM-B", output_dir=output_dir)
+
+    # Both loaded the registry before either saved
+    first.write_output_files(output_dir, "a")
+    second.write_output_files(output_dir, "b")
+
+    saved = registry(output_dir)
+    assert sorted(saved['form_registry']) == ["FORM-A", "FORM-B"]
+    assert saved['total_forms'] == 2
+    assert second.global_lov_registry['total_forms'] == 2
+
+
+def register_forms(output_dir, worker):
+    converter = FormConverter(output_dir=output_dir)
+    for index in range(20):
+        converter.register_form(f"FORM-{worker}-{index}")
+        converter.lov_database = {f"LOV-{worker}-{index}": ["Good", "Bad"]}
+        converter.save_global_lov_registry()
+    return worker
+
+
+def test_concurrent_workers_lose_no_entries(tmp_path):
+    output_dir = str(tmp_path)
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(register_forms, [output_dir] * 4, range(4)))
+
+    saved = registry(output_dir)
+    assert saved['total_forms'] == 80
+    assert len(saved['used_lov_codes']) == 80
@@ -0,0 +1,88 @@
+import random
+
+from core import convert_sheet
+from search import ProcedureSearchIndex, tokenize
+
+PROCEDURES = [{'text': text} for text in (
+    "Replace oil filter", "Check oil level", "Inspect drive belt", "Grease bearings", "Replace air filter")]
+CONFIGS = [{'condition_values': "Low/OK", 'condition_lov_code': "LOV-OIL"}, {}, {'action_values': "Adjust"}]
+
+
+def brute_force(procedures, configs, query):
+    words = tokenize(query)
+    positions = []
+    for position, procedure in enumerate(procedures):
+        config = configs[position] if position < len(configs) else {}
+        terms = tokenize(" ".join([procedure['text']] + [str(value) for value in config.values()]))
+        if all(any(term.startswith(word) for term in terms) for word in words):
+            positions.append(position)
+    return positions
+
+
+def test_prefix_words_match_text_values_and_codes():
+    index = ProcedureSearchIndex()
+    index.build(PROCEDURES, CONFIGS)
+
+    assert index.search("repl filt") == [0, 4]
+    assert index.search("OIL") == [0, 1]
+    assert index.search("lov-oil") == [0]
+    assert index.search("adj") == [2]
+    assert index.search("  ") is None
+    assert index.search("gearbox") == []
+
+
+def test_bare_number_also_matches_that_procedure():
+    index = ProcedureSearchIndex()
+    index.build(PROCEDURES, CONFIGS)
+    assert index.search("4") == [3]
+    assert index.search("9") == []
+
+
+def test_incremental_edits_match_a_rebuild():
+    rng = random.Random(7)
+    words = ["oil", "filter", "belt", "check", "replace", "grease", "valve"]
+    procedures = [dict(p) for p in PROCEDURES]
+    configs = [dict(c) for c in CONFIGS] + [{} for _ in range(len(PROCEDURES) - len(CONFIGS))]
+    index = ProcedureSearchIndex()
+    index.build(procedures, configs)
+
+    for _ in range(200):
+        action = rng.choice(['insert', 'remove', 'text', 'values'])
+        if action == 'insert' or not procedures:
+            position = rng.randint(0, len(procedures))
+            procedure, config = {'text': " ".join(rng.sample(words, 2))}, {}
+            procedures.insert(position, procedure)
+            configs.insert(position, config)
+            index.insert(position, procedure, config)
+        elif action == 'remove':
+            position = rng.randrange(len(procedures))
+            procedures.pop(position)
+            configs.pop(position)
+            index.remove(position)
+        elif action == 'text':
+            position = rng.randrange(len(procedures))
+            procedures[position]['text'] = " ".join(rng.sample(words, 3))
+            index.update(position, text=procedures[position]['text'])
+        else:
+            position = rng.randrange(len(procedures))
+            configs[position]['condition_values'] = rng.choice(words)
+            index.update(position, condition_values=configs[position]['condition_values'])
+
+        query = rng.choice(words)[:rng.randint(1, 4)]
+        assert index.search(query) == brute_force(procedures, configs, query), query
+
+    rebuilt = ProcedureSearchIndex()
+    rebuilt.build(procedures, configs)
+    assert {term: len(docs) for term, docs in index.postings.items()} == \
+        {term: len(docs) for term, docs in rebuilt.postings.items()}
+
+
+def test_converter_keeps_the_index_in_step(workbook):
+    converter = convert_sheet(workbook, form_name="TEST-FORM")
+    converter.set_procedure_text(4, "Calibrate torque wrench")
+    assert converter.search_procedures("torq") == [4]
+
+    procedure, configuration = converter.remove_procedure_at(0)
+    assert converter.search_procedures("torq") == [3]
+    converter.insert_procedure_at(0, procedure, configuration)
+    assert converter.search_procedures("torq") == [4]
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from service import ConverterService, HTTPError
+
+
+async def send(service, method, path, body=b'', headers=None):
+    """One HTTP request through the service's connection handler; returns (status, headers, body)"""
+    server = await asyncio.start_server(service.handle_connection, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        if isinstance(body, dict):
+            body = json.dumps(body).encode('utf-8')
+        lines = [f"{method} {path} HTTP/1.1", f"Content-Length: {len(body)}"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1') + body)
+        await writer.drain()
+        # Read by Content-Length: pool workers forked during the request inherit the socket, so EOF may never come
+        head = (await reader.readuntil(b"\r\n\r\n")).decode('latin-1')
+        status_line, *header_lines = head.rstrip("\r\n").split("\r\n")
+        response_headers = dict(line.split(": ", 1) for line in header_lines)
+        payload = await reader.readexactly(int(response_headers['Content-Length']))
+        writer.close()
+
+    payload = json.loads(payload) if response_headers['Content-Type'] == 'application/json' else payload.decode()
+    return int(status_line.split()[1]), response_headers, payload
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = ConverterService(str(tmp_path / "out"), workers=2, queue_size=0)
+    yield service
+    service.jobs.shutdown()
+
+
+def test_routes_and_unknown_paths(service, workbook):
+    status, _, health = asyncio.run(send(service, 'GET', "/health"))
+    assert status == 200 and health['capacity'] == 2 and health['running'] == 0
+
+    assert asyncio.run(send(service, 'GET', "/nowhere"))[0] == 404
+    assert asyncio.run(send(service, 'GET', "/generate"))[0] == 405
+    assert asyncio.run(send(service, 'POST', "/analyze", b"[1]"))[0] == 400
+    assert asyncio.run(send(service, 'POST', "/analyze", {'source_file': "missing.xlsx", 'sheet': "S"}))[0] == 404
+
+    with open(workbook, 'rb') as f:
+        status, _, upload = asyncio.run(send(service, 'POST', "/upload", f.read(), {'X-Filename': "tasklist.xlsx"}))
+    assert status == 200 and upload['source_file'].startswith(service.upload_dir)
+    status, _, sheets = asyncio.run(send(service, 'POST', "/sheets", {'source_file': upload['source_file']}))
+    assert status == 200 and sheets['sheets'] == ["Mechanical Tasklist"]
+    status, _, analysis = asyncio.run(send(service, 'POST', "/analyze",
+                                           {'source_file': upload['source_file'], 'sheet': "Mechanical Tasklist"}))
+    assert status == 200 and len(analysis['procedures']) == 60
+
+    status, _, metrics = asyncio.run(send(service, 'GET', "/metrics"))
+    assert status == 200
+    assert 'pm_form_service_requests_total{endpoint="/analyze",status="200"} 1' in metrics
+    assert 'endpoint="unknown",status="404"' in metrics
+
+
+def test_full_queue_is_rejected_with_retry_after(service):
+    async def saturate():
+        return await asyncio.gather(*(service.run_job(time.sleep, 0.5) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(saturate())
+    rejected = [result for result in results if isinstance(result, Exception)]
+    assert results[:2] == [None, None]
+    assert len(rejected) == 1 and rejected[0].status == 503 and rejected[0].headers == {'Retry-After': '1'}
+    assert 'pm_form_service_rejected_total 1' in service.metrics.render()
+
+
+def generate(service, workbook, sink):
+    return send(service, 'POST', "/generate",
+                {'source_file': workbook, 'sheet': "Mechanical Tasklist", 'form_name': "TEST-FORM", 'sink': sink})
+
+
+def test_json_sink_writes_nothing(service, workbook):
+    status, _, result = asyncio.run(generate(service, workbook, 'json'))
+    assert status == 200 and result['procedures'] == 60
+    assert {output['table']: output['rows'] for output in result['outputs']} == {
+        table: len(rows) for table, rows in result['tables'].items()}
+    assert not os.path.exists(os.path.join(service.output_dir, "TEST-FORM"))
+
+
+def test_concurrent_xlsx_requests_keep_their_own_files(service, workbook):
+    async def together():
+        return await asyncio.gather(generate(service, workbook, 'xlsx'), generate(service, workbook, 'xlsx'))
+
+    results = asyncio.run(together())
+    assert [status for status, _, _ in results] == [200, 200]
+    files = [output['file'] for _, _, result in results for output in result['outputs']]
+    assert len(set(files)) == 8 and all(os.path.exists(path) for path in files)
+    assert {os.path.dirname(path) for path in files} == {os.path.join(service.output_dir, "TEST-FORM")}
+
+
+@pytest.mark.parametrize("sink, tables", [('delta-xlsx', []), ('delta-sql', ['SQL'])])
+def test_delta_sinks_follow_the_previous_generation(service, workbook, sink, tables):
+    assert asyncio.run(generate(service, workbook, 'xlsx'))[0] == 200
+
+    status, _, result = asyncio.run(generate(service, workbook, sink))
+    assert status == 200
+    # Nothing changed since the first generation
+    assert [output['table'] for output in result['outputs']] == tables
+    assert all(output['rows'] == 0 for output in result['outputs'])
+
+
+def test_existing_output_is_a_conflict(service, tmp_path):
+    with pytest.raises(HTTPError) as error:
+        asyncio.run(service.run_job(os.mkdir, str(tmp_path)))
+    assert error.value.status == 409
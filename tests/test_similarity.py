@@ -0,0 +1,62 @@
+import numpy as np
+
+from similarity import MinHasher, ProcedureHistory, cluster_texts, session_clusters, shingle_hashes
+
+
+def jaccard(a, b, size=4):
+    shingles = [{text[i:i + size] for i in range(len(text) - size + 1)} for text in (a, b)]
+    return len(shingles[0] & shingles[1]) / len(shingles[0] | shingles[1])
+
+
+def test_shingles_match_python_slicing():
+    texts = ["check oil", "abc", "grease bearings"]
+    values, offsets = shingle_hashes(texts)
+
+    for i, text in enumerate(texts):
+        data = text.encode('utf-8').ljust(4, b'\0')
+        expected = [int.from_bytes(data[j:j + 4], 'little') for j in range(len(data) - 3)]
+        assert values[offsets[i]:offsets[i + 1]].tolist() == expected
+
+
+def test_signatures_estimate_jaccard_similarity():
+    a, b = "check the oil level of the gearbox", "check oil level of gearbox"
+    signatures = MinHasher(num_perm=256).signatures([a, b, a])
+
+    assert signatures.dtype == np.uint32 and signatures.shape == (3, 256)
+    assert (signatures[0] == signatures[2]).all()
+    assert abs((signatures[0] == signatures[1]).mean() - jaccard(a, b)) < 0.1
+
+
+def test_rewordings_cluster_and_different_steps_stay_apart():
+    texts = [
+        "Check oil level of gearbox",
+        "Inspect drive belt tension",
+        "Check the oil level of the gearbox",
+        "Replace air filter element",
+        "CHECK OIL LEVEL OF GEARBOX",
+        "Inspect the drive belt tension",
+    ]
+    assert cluster_texts(texts) == [[0, 2, 4], [1, 5]]
+
+
+def test_history_clusters_session_with_earlier_forms(tmp_path):
+    history = ProcedureHistory.for_output_dir(str(tmp_path))
+    earlier = [{'number': '1', 'text': "Check the oil level of the gearbox"},
+               {'number': '2', 'text': "Replace air filter element"}]
+    configs = [{'condition_lov_code': "LOV-1", 'condition_values': "Low/OK"}]
+    history.save_form("FORM-A", earlier, configs, {"LOV-1": ["Low", "OK"]})
+    history.load()
+
+    session = [{'number': '1', 'text': "Check oil level of gearbox"},
+               {'number': '2', 'text': "Lubricate the chain"}]
+    clusters = session_clusters(session, history, form_name="FORM-B")
+
+    assert len(clusters) == 1
+    sources = [(member['source'], member.get('index')) for member in clusters[0]]
+    assert sources == [('session', 0), ('history', None)]
+    entry = clusters[0][1]['entry']
+    assert entry['form_name'] == "FORM-A"
+    assert entry['condition_lov_code'] == "LOV-1" and entry['condition_lov_values'] == ["Low", "OK"]
+
+    # An earlier generation of the same form is not its own near-duplicate
+    assert session_clusters(session, history, form_name="FORM-A") == []
@@ -0,0 +1,59 @@
+import pytest
+
+from snapshot import SessionSnapshot, SnapshotError, is_snapshot, write_snapshot
+
+PROCEDURES = [
+    {'number': 1, 'text': "Check engine oil level", 'row': 4, 'col': 0, 'original_text': "1. Check engine oil level"},
+    {'number': 2, 'text': "Inspect drive belt", 'row': 6, 'col': 1, 'original_text': None},
+    {'number': 3, 'text': "Check engine oil level", 'row': 7, 'col': 0, 'original_text': "3. Check engine oil level"},
+]
+LOV_DATABASE = {'YKN-LOV-001': ["Good", "Bad"], 'YKN-LOV-002': ["Repair", "Replace", "Good"], 'YKN-LOV-003': []}
+LOV_CONFIGURATIONS = [
+    {'condition_values': "Good,Bad", 'action_values': "", 'condition_lov_code': 'YKN-LOV-001', 'action_lov_code': ''},
+    {'condition_values': "", 'action_values': "Repair,Replace,Good", 'condition_lov_code': '',
+     'action_lov_code': 'YKN-LOV-002'},
+    {'condition_values': "", 'action_values': "", 'condition_lov_code': '', 'action_lov_code': ''},
+]
+FORM_CONFIG = {'form_name': "YKN-TEST", 'form_description': "TEST TASKLIST", 'user_name': "TESTER"}
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "session.pmfs")
+    write_snapshot(path, "tasklist.xlsx", "Mech", FORM_CONFIG, PROCEDURES, LOV_DATABASE, LOV_CONFIGURATIONS)
+
+    assert is_snapshot(path)
+    snapshot = SessionSnapshot.open(path)
+    assert snapshot.header['source_file'] == "tasklist.xlsx"
+    assert snapshot.header['procedure_count'] == 3
+    assert snapshot.form_config == FORM_CONFIG
+    assert snapshot.procedures == PROCEDURES
+    assert snapshot.lov_database == LOV_DATABASE
+    assert snapshot.lov_configurations == LOV_CONFIGURATIONS
+
+
+def test_header_is_read_without_decoding_the_payload(tmp_path):
+    path = str(tmp_path / "session.pmfs")
+    write_snapshot(path, None, None, FORM_CONFIG, PROCEDURES, LOV_DATABASE)
+
+    snapshot = SessionSnapshot.open(path)
+    assert snapshot.header['lov_code_count'] == 3
+    assert snapshot._payload is None
+    assert snapshot.lov_configurations is None
+
+
+def test_repeated_strings_are_stored_once(tmp_path):
+    path = str(tmp_path / "session.pmfs")
+    write_snapshot(path, None, None, FORM_CONFIG, PROCEDURES, LOV_DATABASE, LOV_CONFIGURATIONS)
+
+    strings = SessionSnapshot.open(path).strings
+    assert strings.count("Check engine oil level") == 1
+    assert strings.count("Good") == 1
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / "session.json"
+    path.write_text('{"procedures": []}')
+
+    assert not is_snapshot(str(path))
+    with pytest.raises(SnapshotError):
+        SessionSnapshot.open(str(path))
@@ -0,0 +1,75 @@
+import json
+
+from telemetry import ConversionTelemetry, MetricsRegistry, TraceWriter
+
+OUTPUTS = [
+    {'table': 'FORMHEAD', 'file': "out/FORMHEAD.xlsx", 'rows': 1, 'bytes': 100},
+    {'table': 'FORMTEMPLATE', 'file': "out/FORMTEMPLATE.xlsx", 'rows': 42, 'bytes': 900, 'org': "2100"},
+]
+
+
+def test_trace_record_fields(tmp_path):
+    path = tmp_path / "traces" / "trace.jsonl"
+    telemetry = ConversionTelemetry(trace_path=str(path), run_id="run-1")
+    telemetry.record_conversion("a.xlsx", "Mech", 'ok', {'read': 0.5, 'write': 0.25}, form_name="FORM-A",
+                                rows_scanned=80, procedures=60, lov_codes=12, outputs=OUTPUTS,
+                                registry_entry={'form_name': "FORM-A"}, reused='sheet')
+    telemetry.record_conversion("b.xlsx", "Mech", 'error', {'read': 0.1}, error="No procedures detected")
+
+    first, second = [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+    assert {key: first[key] for key in ('run_id', 'status', 'source_file', 'sheet', 'form_name', 'rows_scanned',
+                                        'procedures', 'lov_codes', 'template_rows', 'bytes_written',
+                                        'duration_seconds', 'stages', 'form_registry', 'reused')} == {
+        'run_id': "run-1", 'status': 'ok', 'source_file': "a.xlsx", 'sheet': "Mech", 'form_name': "FORM-A",
+        'rows_scanned': 80, 'procedures': 60, 'lov_codes': 12, 'template_rows': 42, 'bytes_written': 1000,
+        'duration_seconds': 0.75, 'stages': {'read': 0.5, 'write': 0.25}, 'form_registry': {'form_name': "FORM-A"},
+        'reused': 'sheet'}
+    # Outputs keep only the documented keys
+    assert first['outputs'][1] == {'table': 'FORMTEMPLATE', 'file': "out/FORMTEMPLATE.xlsx", 'rows': 42, 'bytes': 900}
+    assert 'timestamp' in first and 'host' in first and 'error' not in first
+    assert second['error'] == "No procedures detected" and 'reused' not in second
+
+
+def test_trace_writer_appends(tmp_path):
+    writer = TraceWriter(str(tmp_path / "t.jsonl"))
+    writer.write({'n': 1})
+    writer.write({'n': 2})
+    assert (tmp_path / "t.jsonl").read_text(encoding='utf-8') == '{"n": 1}\n{"n": 2}\n'
+
+
+def test_histogram_exposition_is_cumulative():
+    metrics = MetricsRegistry(namespace="t")
+    for value in (0.05, 0.3, 7):
+        metrics.observe('latency_seconds', value, labels={'stage': "read"}, help_text="Latency",
+                        buckets=(0.1, 0.5, 1))
+
+    lines = metrics.render().splitlines()
+    assert lines == [
+        "# HELP t_latency_seconds Latency",
+        "# TYPE t_latency_seconds histogram",
+        't_latency_seconds_bucket{stage="read",le="0.1"} 1',
+        't_latency_seconds_bucket{stage="read",le="0.5"} 2',
+        't_latency_seconds_bucket{stage="read",le="1"} 2',
+        't_latency_seconds_bucket{stage="read",le="+Inf"} 3',
+        't_latency_seconds_sum{stage="read"} 7.35',
+        't_latency_seconds_count{stage="read"} 3',
+    ]
+
+
+def test_counters_gauges_and_label_escaping(tmp_path):
+    metrics = MetricsRegistry(namespace="t")
+    metrics.inc('conversions_total', labels={'status': "ok"}, help_text="Forms converted")
+    metrics.inc('conversions_total', 2, labels={'status': "ok"})
+    metrics.inc('conversions_total', labels={'status': 'bad "quote"\\path\nline'})
+    metrics.set_gauge('queue_depth', 4.0)
+
+    text = metrics.render()
+    assert '# TYPE t_conversions_total counter\n' in text
+    assert 't_conversions_total{status="ok"} 3\n' in text
+    assert 't_conversions_total{status="bad \\"quote\\"\\\\path\\nline"} 1\n' in text
+    assert '# TYPE t_queue_depth gauge\nt_queue_depth 4\n' in text
+
+    path = tmp_path / "metrics.prom"
+    metrics.write_textfile(str(path))
+    assert path.read_text(encoding='utf-8') == text
+    assert [p.name for p in tmp_path.iterdir()] == ["metrics.prom"]
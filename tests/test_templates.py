@@ -0,0 +1,222 @@
+import json
+
+import pytest
+
+import templates
+from core import FormConverter, convert_sheet
+from templates import (DEFAULT_COLUMN_VALUES, FIELD_COLUMNS, TEMPLATE_SPECS, compile_template,
+                       load_template_specs, template_row_count)
+
+PROCEDURES = [{'number': str(n), 'text': f"Check item {n}"} for n in range(1, 6)]
+LOV_CONFIGS = [{'condition_lov_code': "COND-A"}, {}, {'action_lov_code': "ACT-C"}]
+FORM = dict(org_code="ORG1", form_name="FORM-1", form_description="Form one", key_prefix="F1", lov_prefix="F1L")
+
+
+def render(pattern, values):
+    if pattern.startswith('{') and pattern.endswith('}') and pattern[1:-1] in values:
+        return values[pattern[1:-1]]
+    return pattern.format(**values)
+
+
+def reference_rows(spec, procedures, lov_configs, org_code, form_name, form_description, key_prefix, lov_prefix):
+    """Spec interpreted field by field, without code generation"""
+    counters = dict(spec.get('counters', {}))
+    fallbacks = spec.get('lov_fallbacks', {})
+    values = dict(form_name=form_name, form_description=form_description, key_prefix=key_prefix,
+                  lov_prefix=lov_prefix)
+    rows = []
+    display = 10
+
+    def emit(field):
+        nonlocal display
+        row = dict(DEFAULT_COLUMN_VALUES, ORG=org_code, FORMNAME=form_name, KEYDATATYPE='STRING')
+        scope = dict(values, **counters)
+        for attribute, column in FIELD_COLUMNS.items():
+            value = field.get(attribute)
+            if attribute == 'key':
+                row[column] = key_prefix + render('-' + value, scope)
+            elif attribute in templates.PATTERN_FIELDS and isinstance(value, str):
+                row[column] = render(value, scope)
+            elif value is not None:
+                row[column] = value
+        row.update(field.get('columns', {}))
+        if 'display' in field:
+            row['DISPLAYOPTION'] = field['display']
+        else:
+            row['DISPLAYOPTION'] = display
+            display += 10
+            for counter in field.get('advance', []):
+                counters[counter] += 1
+        rows.append(row)
+
+    for field in spec.get('header', []):
+        emit(field)
+    for i, proc in enumerate(procedures):
+        config = lov_configs[i] if i < len(lov_configs) else {}
+        values.update(number=proc['number'], text=proc['text'])
+        for variable in ('condition_lov', 'action_lov'):
+            fallback = fallbacks.get(variable)
+            values[variable] = config.get(f"{variable}_code") or (render(fallback, values) if fallback else None)
+        for field in spec['fields']:
+            emit(field)
+    return rows
+
+
+@pytest.mark.parametrize("name", sorted(TEMPLATE_SPECS))
+def test_compiled_template_matches_interpreted_spec(name):
+    rows = compile_template(name)(PROCEDURES, LOV_CONFIGS, **FORM)
+
+    assert rows == reference_rows(TEMPLATE_SPECS[name], PROCEDURES, LOV_CONFIGS, **FORM)
+    assert len(rows) == template_row_count(name, len(PROCEDURES))
+
+
+def test_unknown_template_uses_default_layout():
+    assert compile_template("no-such-layout") is compile_template(templates.DEFAULT_TEMPLATE)
+
+
+@pytest.fixture
+def spec_file(tmp_path, monkeypatch):
+    path = tmp_path / "template_specs.json"
+    spec = {"fields": [{"key": "TEXSTR{str}", "type": "TEXTBOX", "label": "{number}. {text}", "advance": ["str"]}],
+            "counters": {"str": 1}}
+    path.write_text(json.dumps({"calibration": spec}), encoding='utf-8')
+    monkeypatch.setattr(templates, 'TEMPLATE_SPECS_FILE', str(path))
+    monkeypatch.setattr(templates, '_loaded_spec_files', {})
+    monkeypatch.setattr(templates, '_compiled', dict(templates._compiled))
+    monkeypatch.setattr(templates, 'TEMPLATE_SPECS', dict(TEMPLATE_SPECS))
+    return path
+
+
+def test_spec_file_is_read_once_per_process(spec_file):
+    assert load_template_specs(str(spec_file)) == ["calibration"]
+    emit = compile_template("calibration")
+    spec_file.write_text(json.dumps({"changed": {"fields": []}}), encoding='utf-8')
+
+    assert load_template_specs(str(spec_file)) == ["calibration"]
+    assert compile_template("calibration") is emit
+
+    assert load_template_specs(str(spec_file), reload=True) == ["changed"]
+
+
+def test_converter_construction_keeps_compiled_templates(spec_file, tmp_path):
+    FormConverter(output_dir=str(tmp_path))
+    emit = compile_template("calibration")
+
+    for _ in range(3):
+        FormConverter(output_dir=str(tmp_path))
+    assert compile_template("calibration") is emit
+
+
+# --- Regression against the hand-written generators replaced by the specs ----------
+# Transcribed from formgenerator.py before the specs (create_formtemplate_file for the
+# standard layout, generate_*_template for the others, build_formlov_rows).
+
+def legacy_row(org_code, form_name, key, keytype, label, display, datatype='STRING', lov=None, parent=None,
+               formula=None, required=None):
+    return {'ORG': org_code, 'FORMNAME': form_name, 'KEYNAME': key, 'PARENTKEY': parent, 'KEYTYPE': keytype,
+            'KEYDATATYPE': datatype, 'KEYLOV': lov, 'KEYLABEL': label, 'KEYFORMULA': formula, 'KEYHELP': None,
+            'KEYHINT': None, 'DISPLAYOPTION': display, 'VERSION': 1, 'ENABLE': 1, 'LASTUPDATEBY': None,
+            'LASTUPDATE': None, 'REQUIRED': required, 'SHOWONVALUE': None, 'EDITABLE': None, 'SHOWONEMPTY': 1,
+            'ADDCLASS': None, 'SHOWONREPORT': 1, 'CUSTOMLOV': None}
+
+
+def legacy_formtemplate_rows(converter, format_type):
+    form_name = converter.form_name_var.get()
+    org_code = converter.form_config['org_code']
+    key_prefix = converter.template_key_prefix(form_name)
+    lov_prefix = converter.lov_key_prefix(form_name)
+    lov_configs = converter.collect_lov_configurations()
+    rows = [legacy_row(org_code, form_name, f"{key_prefix}-TEXSTR0", 'TEXTBOX', 'Email (hanya bisa email pertamina)',
+                       0, formula='user.email', required=1),
+            legacy_row(org_code, form_name, f"{key_prefix}-LABSTR0", 'LABEL', converter.form_desc_var.get(), 10)]
+    display = 20
+    counters = {'str': 1, 'che': 1, 'hid': 0, 'fil': 0}
+
+    def add(counter, kind, keytype, label, advance=True, **columns):
+        nonlocal display
+        rows.append(legacy_row(org_code, form_name, f"{key_prefix}-{kind}{counters[counter]}", keytype, label,
+                               display, **columns))
+        display += 10
+        if advance:
+            counters[counter] += 1
+
+    for i, proc in enumerate(converter.procedures):
+        config = lov_configs[i] if i < len(lov_configs) else None
+        label = f"{proc['number']}. {proc['text']}"
+        if format_type == 'parameter_service':
+            add('str', 'LABSTR', 'LABEL', label, advance=False)
+            add('str', 'TEXSTR', 'TEXTBOX', 'Before Service')
+            add('str', 'TEXSTR', 'TEXTBOX', 'After Service')
+            add('str', 'LISSTR', 'LIST', 'Status', lov=(config or {}).get('condition_lov_code') or f"{lov_prefix}-GFB")
+            add('str', 'TEXSTR', 'TEXTBOX', 'Remarks')
+        elif format_type == 'startup_checks':
+            add('str', 'LABSTR', 'LABEL', label, advance=False)
+            add('che', 'LISCHE', 'LIST', 'Condition', datatype='CHECKBOX',
+                lov=(config or {}).get('condition_lov_code') or f"{lov_prefix}-GFB")
+            add('str', 'TEXSTR', 'TEXTBOX', 'Remarks')
+        else:
+            add('str', 'LABSTR', 'LABEL', label, advance=False)
+            add('str', 'LISSTR', 'LIST', 'Choose', lov=f"{lov_prefix}-YN")
+            add('str', 'TEXSTR', 'TEXTBOX', 'Remarks')
+            add('che', 'LISCHE', 'LIST', 'Condition found', datatype='CHECKBOX',
+                lov=(config or {}).get('condition_lov_code') or f"{key_prefix}-COND{proc['number']}")
+            add('che', 'LISCHE', 'LIST', 'Corrective Action', datatype='CHECKBOX',
+                lov=(config or {}).get('action_lov_code') or f"{key_prefix}-ACT{proc['number']}")
+            add('str', 'LISSTR', 'LIST', 'As Left (Good, Fair, Bad)', lov=f"{lov_prefix}-GFB")
+            add('str', 'TEXSTR', 'TEXTBOX', 'Remarks')
+            add('hid', 'HIDSTR', 'HIDDEN', f"{form_name} UPLOAD FILE", parent=f"{key_prefix}-FILSTR{counters['fil']}")
+            add('fil', 'FILSTR', 'FILE', 'Silahkan Upload file Pendukung Anda')
+    return rows
+
+
+def legacy_formlov_rows(converter):
+    org_code = converter.form_config['org_code']
+    lov_prefix = converter.lov_key_prefix(converter.form_name_var.get())
+    rows = [{'LOVID': None, 'ORG': org_code, 'LOVNAME': f"{lov_prefix}-{suffix}", 'VALUE': value, 'VALLOW': None,
+             'VALHI': None, 'VALDESC': value, 'ENABLE': 1, 'TYPE': 'CONFIG'}
+            for suffix, values in (('YN', ('Yes', 'No')), ('GFB', ('Good', 'Fair', 'Bad'))) for value in values]
+    for lov_code, values in converter.lov_database.items():
+        rows.extend({'LOVID': None, 'LOVNAME': lov_code, 'VALUE': value, 'VALLOW': None, 'VALHI': None,
+                     'VALDESC': value, 'TYPE': 'CONFIG'} for value in values)
+    return rows
+
+
+def documented_changes(converter, rows):
+    """Apply the documented differences: unconfigured checkbox fields use the standard LOVs"""
+    form_name = converter.form_name_var.get()
+    key_prefix = converter.template_key_prefix(form_name)
+    lov_prefix = converter.lov_key_prefix(form_name)
+    fallbacks = {'Condition found': ('COND', 'GFB'), 'Corrective Action': ('ACT', 'YN')}
+    for row in rows:
+        if row['KEYLABEL'] in fallbacks and row['KEYLOV'].startswith(f"{key_prefix}-{fallbacks[row['KEYLABEL']][0]}"):
+            row['KEYLOV'] = f"{lov_prefix}-{fallbacks[row['KEYLABEL']][1]}"
+    return rows
+
+
+@pytest.fixture(params=["YKN-CPP2-G-603-MECH", "SHORT-NAME"])
+def legacy_converter(request, workbook):
+    converter = convert_sheet(workbook, form_name=request.param, form_description="Mechanical PM", org_code="2100")
+    configs = converter.collect_lov_configurations()
+    # Every third procedure unconfigured, so the LOV fallbacks are exercised
+    partial = [{} if i % 3 == 0 else config for i, config in enumerate(configs)]
+    converter.collect_lov_configurations = lambda: partial
+    return converter
+
+
+@pytest.mark.parametrize("name", ['standard_maintenance', 'parameter_service', 'startup_checks'])
+def test_template_rows_match_the_hand_written_generators(legacy_converter, name):
+    rows = legacy_converter.build_formtemplate_rows(name)
+    expected = documented_changes(legacy_converter, legacy_formtemplate_rows(legacy_converter, name))
+
+    assert [list(row) for row in rows] == [list(row) for row in expected]
+    assert rows == expected
+
+
+def test_lov_rows_match_the_hand_written_generator(legacy_converter):
+    expected = legacy_formlov_rows(legacy_converter)
+    # Documented: generated LOV rows carry ORG and ENABLE like the standard ones
+    org_code = legacy_converter.form_config['org_code']
+    expected = [row if 'ORG' in row else {'LOVID': None, 'ORG': org_code, **row, 'ENABLE': 1} for row in expected]
+
+    assert legacy_converter.lov_database
+    assert legacy_converter.build_formlov_rows() == expected
@@ -0,0 +1,63 @@
+import os
+
+import pandas as pd
+import pytest
+
+from core import convert_sheet
+from validation import ValidationError, validate_tables
+
+
+@pytest.fixture
+def tables(workbook):
+    return convert_sheet(workbook, form_name="TEST-FORM").build_output_tables()
+
+
+def checks(report, severity):
+    return {issue['check'] for issue in report.issues if issue['severity'] == severity}
+
+
+def test_generated_tables_have_no_errors(tables):
+    report = validate_tables(tables)
+    assert report.ok, report.summary()
+
+
+def test_dataframes_validate_like_rows(tables):
+    tables['FORMTEMPLATE'][3]['KEYLOV'] = "MISSING-LOV"
+    frames = {table: pd.DataFrame(rows) for table, rows in tables.items()}
+
+    assert validate_tables(frames).issues == validate_tables(tables).issues
+
+
+def test_dangling_keylov_and_duplicate_keyname_are_errors(tables):
+    tables['FORMTEMPLATE'][3]['KEYLOV'] = "MISSING-LOV"
+    tables['FORMTEMPLATE'][5]['KEYNAME'] = tables['FORMTEMPLATE'][4]['KEYNAME']
+
+    report = validate_tables(tables)
+    assert checks(report, 'error') == {'dangling_keylov', 'duplicate_keyname'}
+    dangling = next(issue for issue in report.errors if issue['check'] == 'dangling_keylov')
+    assert dangling['count'] == 1 and dangling['examples'] == ["MISSING-LOV"]
+
+
+def test_oversized_and_empty_values(tables):
+    tables['FORMTEMPLATE'][2]['KEYLABEL'] = "x" * 501
+    tables['FORMLOV'][0]['VALUE'] = "  "
+
+    assert checks(validate_tables(tables), 'error') == {'oversized_value', 'empty_lov_value'}
+
+
+def test_warnings_do_not_block(tables):
+    tables['FORMLOV'].append(dict(tables['FORMLOV'][0]))
+
+    report = validate_tables(tables)
+    assert report.ok
+    assert checks(report, 'warning') == {'duplicate_lov_value'}
+
+
+def test_blocking_mode_writes_nothing(workbook, tmp_path):
+    converter = convert_sheet(workbook, form_name="TEST-FORM", output_dir=str(tmp_path))
+    converter.procedures[0]['text'] = "x" * 600
+
+    with pytest.raises(ValidationError) as raised:
+        converter.write_output_files(str(tmp_path), "ts")
+    assert not raised.value.report.ok
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".xlsx") and name != "tasklist.xlsx"]
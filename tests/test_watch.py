@@ -0,0 +1,71 @@
+import glob
+import os
+
+import pytest
+
+from benchmarks.synthetic_workbook import generate_workbook
+from core import FormConverter
+from watch import FileTracker, InboxWatcher
+
+
+def test_tracker_reports_files_once_they_stop_changing(tmp_path):
+    path = tmp_path / "tasklist.xlsx"
+    path.write_bytes(b"partial")
+    tracker = FileTracker(settle_seconds=2)
+
+    assert tracker.stable_files([str(path)], now=0) == []
+    assert tracker.stable_files([str(path)], now=1) == []
+    assert tracker.stable_files([str(path)], now=2) == [str(path)]
+
+    path.write_bytes(b"partial and more")
+    assert tracker.stable_files([str(path)], now=3) == []
+
+
+def test_tracker_times_out_files_that_never_settle(tmp_path):
+    empty, growing = tmp_path / "empty.xlsx", tmp_path / "growing.xlsx"
+    empty.write_bytes(b"")
+    tracker = FileTracker(settle_seconds=1, timeout_seconds=5)
+
+    for now in range(5):
+        growing.write_bytes(b"x" * (now + 1))
+        assert tracker.stable_files([str(empty), str(growing)], now=now) == []
+        assert tracker.unsettled_files(now) == []
+    growing.write_bytes(b"x" * 10)
+    assert tracker.stable_files([str(empty), str(growing)], now=5) == []
+    assert sorted(tracker.unsettled_files(5)) == [str(empty), str(growing)]
+
+
+def test_once_moves_unsettled_files_to_failed(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "empty.xlsx").write_bytes(b"")
+
+    watcher = InboxWatcher(str(inbox), str(tmp_path / "out"), workers=1, settle_seconds=0, poll_interval=0.05,
+                           settle_timeout=0.2)
+    assert watcher.run(once=True) == {'ok': 0, 'failed': 1}
+    assert sorted(os.listdir(inbox / "failed")) == ["empty.xlsx", "empty.xlsx.error.txt"]
+    assert "did not settle" in (inbox / "failed" / "empty.xlsx.error.txt").read_text(encoding='utf-8')
+
+
+def test_parallel_inputs_with_the_same_sheet_keep_their_outputs(tmp_path):
+    inbox, output_dir = tmp_path / "inbox", tmp_path / "out"
+    inbox.mkdir()
+    for index in range(6):
+        generate_workbook(str(inbox / f"unit_{index}.xlsx"), procedures=20, seed=index)
+
+    watcher = InboxWatcher(str(inbox), str(output_dir), workers=4, settle_seconds=0, poll_interval=0.05)
+    assert watcher.run(once=True) == {'ok': 6, 'failed': 0}
+
+    template_files = glob.glob(str(output_dir / "*" / "*" / "FORMTEMPLATE_*.xlsx"))
+    assert len(template_files) == 6
+    assert len({os.path.dirname(os.path.dirname(path)) for path in template_files}) == 6
+    assert sorted(os.listdir(inbox / "done")) == [f"unit_{index}.xlsx" for index in range(6)]
+
+
+def test_existing_outputs_are_never_overwritten(workbook, tmp_path):
+    converter = FormConverter(form_name="TEST-FORM", output_dir=str(tmp_path))
+    converter.prepare(workbook, "Mechanical Tasklist")
+    converter.write_output_files(str(tmp_path), "ts")
+
+    with pytest.raises(FileExistsError):
+        converter.write_output_files(str(tmp_path), "ts")
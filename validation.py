@@ -0,0 +1,196 @@
+"""Validation of the generated tables before they are written.
+
+All checks run as vectorized pandas operations over the assembled
+FORMTEMPLATE and FORMLOV frames (isin joins, duplicated, group-wise diff,
+string lengths), so a form with 100k template rows validates in a few
+milliseconds instead of a Python loop per row. Frames are built from only
+the columns the checks read, and string checks run once per distinct
+value (labels such as 'Remarks' repeat thousands of times).
+
+Errors make the import fail on the target system and block writing by
+default; warnings are reported but do not block.
+"""
+from operator import itemgetter
+
+import pandas as pd
+
+# Maximum lengths of the target table columns
+FIELD_LIMITS = {
+    'FORMTEMPLATE': {'FORMNAME': 100, 'KEYNAME': 50, 'KEYLOV': 50, 'KEYLABEL': 500, 'KEYFORMULA': 500},
+    'FORMLOV': {'LOVNAME': 50, 'VALUE': 100, 'VALDESC': 250},
+    'FORMHEAD': {'FORMNAME': 100, 'FORMDESC': 250},
+    'FORMMENU': {'FORMNAME': 100},
+}
+
+# Template rows that legitimately carry no label
+UNLABELLED_KEYTYPES = {'HIDDEN'}
+
+VALIDATION_MODES = ('block', 'warn', 'off')
+
+MAX_EXAMPLES = 5
+
+
+class ValidationError(ValueError):
+    """Raised when validation errors block writing the output files"""
+
+    def __init__(self, report):
+        super().__init__(report.summary())
+        self.report = report
+
+
+class ValidationReport:
+    """Issues found in one set of output tables"""
+
+    def __init__(self):
+        self.issues = []
+
+    def add(self, severity, check, table, count, message, examples=()):
+        self.issues.append({
+            'severity': severity,
+            'check': check,
+            'table': table,
+            'count': int(count),
+            'message': message,
+            'examples': [str(example) for example in list(examples)[:MAX_EXAMPLES]],
+        })
+
+    @property
+    def errors(self):
+        return [issue for issue in self.issues if issue['severity'] == 'error']
+
+    @property
+    def warnings(self):
+        return [issue for issue in self.issues if issue['severity'] == 'warning']
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def summary(self):
+        if not self.issues:
+            return "Validation passed"
+        lines = [f"{len(self.errors)} error(s), {len(self.warnings)} warning(s)"]
+        for issue in self.issues:
+            line = f"[{issue['severity'].upper()}] {issue['table']}: {issue['message']} ({issue['count']})"
+            if issue['examples']:
+                line += " e.g. " + ", ".join(issue['examples'])
+            lines.append(line)
+        return "\n".join(lines)
+
+
+# Columns read by the checks, per table
+CHECKED_COLUMNS = {
+    'FORMTEMPLATE': ('FORMNAME', 'KEYNAME', 'KEYTYPE', 'KEYLOV', 'KEYLABEL', 'KEYFORMULA', 'DISPLAYOPTION'),
+    'FORMLOV': ('ORG', 'LOVNAME', 'VALUE', 'VALDESC'),
+    'FORMHEAD': ('FORMNAME', 'FORMDESC'),
+    'FORMMENU': ('FORMNAME',),
+}
+
+
+def _frame(table, rows):
+    """DataFrame of the checked columns of a table given as rows or a DataFrame"""
+    columns = CHECKED_COLUMNS.get(table, ())
+    if isinstance(rows, pd.DataFrame):
+        return rows[[column for column in columns if column in rows.columns]]
+    if not rows:
+        return pd.DataFrame()
+    present = [column for column in columns if column in rows[0]]
+    return pd.DataFrame({column: list(map(itemgetter(column), rows)) for column in present})
+
+
+def _per_value(series, function):
+    """Apply a vectorized string function to the distinct values only; NaN maps to False"""
+    codes, uniques = pd.factorize(series)
+    if len(uniques) == 0:
+        return pd.Series(False, index=series.index)
+    result = function(pd.Series(uniques).astype(str)).to_numpy()
+    return pd.Series((codes >= 0) & result[codes], index=series.index)
+
+
+def _blank(series):
+    """Boolean mask of null or whitespace-only values"""
+    return series.isna() | _per_value(series, lambda values: values.str.strip().eq(''))
+
+
+def check_keylov_references(report, template, lov):
+    """KEYLOV values must name a LOVNAME present in FORMLOV"""
+    if 'KEYLOV' not in template:
+        return
+    known = pd.Index(lov['LOVNAME'].dropna().unique()) if 'LOVNAME' in lov else pd.Index([])
+    keylov = template['KEYLOV']
+    dangling = keylov.notna() & ~keylov.isin(known)
+    if dangling.any():
+        names = keylov[dangling]
+        report.add('error', 'dangling_keylov', 'FORMTEMPLATE', dangling.sum(),
+                   "KEYLOV references a LOV missing from FORMLOV", names.unique())
+
+
+def check_duplicate_keys(report, template, lov):
+    if {'FORMNAME', 'KEYNAME'} <= set(template.columns):
+        duplicated = template.duplicated(['FORMNAME', 'KEYNAME'], keep='first')
+        if duplicated.any():
+            report.add('error', 'duplicate_keyname', 'FORMTEMPLATE', duplicated.sum(),
+                       "KEYNAME used more than once in a form", template.loc[duplicated, 'KEYNAME'].unique())
+    if {'ORG', 'LOVNAME', 'VALUE'} <= set(lov.columns):
+        duplicated = lov.duplicated(['ORG', 'LOVNAME', 'VALUE'], keep='first')
+        if duplicated.any():
+            examples = (lov.loc[duplicated, 'LOVNAME'] + "=" + lov.loc[duplicated, 'VALUE'].astype(str)).unique()
+            report.add('warning', 'duplicate_lov_value', 'FORMLOV', duplicated.sum(),
+                       "Value listed twice in a LOV", examples)
+
+
+def check_display_order(report, template):
+    """DISPLAYOPTION must increase strictly within each form, in row order"""
+    if not {'FORMNAME', 'DISPLAYOPTION', 'KEYNAME'} <= set(template.columns):
+        return
+    display = pd.to_numeric(template['DISPLAYOPTION'], errors='coerce')
+    step = display.groupby(template['FORMNAME'], sort=False).diff()
+    out_of_order = step.le(0)
+    if out_of_order.any():
+        report.add('warning', 'displayoption_order', 'FORMTEMPLATE', out_of_order.sum(),
+                   "DISPLAYOPTION does not increase", template.loc[out_of_order, 'KEYNAME'])
+
+
+def check_empty_labels(report, template, lov):
+    if {'KEYLABEL', 'KEYTYPE'} <= set(template.columns):
+        empty = _blank(template['KEYLABEL']) & ~template['KEYTYPE'].isin(UNLABELLED_KEYTYPES)
+        if empty.any():
+            report.add('warning', 'empty_label', 'FORMTEMPLATE', empty.sum(),
+                       "Field without a KEYLABEL", template.loc[empty, 'KEYNAME'])
+    if 'VALUE' in lov:
+        empty = _blank(lov['VALUE'])
+        if empty.any():
+            report.add('error', 'empty_lov_value', 'FORMLOV', empty.sum(),
+                       "Empty LOV value", lov.loc[empty, 'LOVNAME'].unique())
+
+
+def check_lengths(report, frames):
+    for table, limits in FIELD_LIMITS.items():
+        frame = frames.get(table)
+        if frame is None or frame.empty:
+            continue
+        for column, limit in limits.items():
+            if column not in frame:
+                continue
+            values = frame[column]
+            oversized = _per_value(values, lambda distinct: distinct.str.len().gt(limit))
+            if oversized.any():
+                examples = values[oversized].astype(str).str.slice(0, 40) + "..."
+                report.add('error', 'oversized_value', table, oversized.sum(),
+                           f"{column} longer than {limit} characters", examples)
+
+
+def validate_tables(tables):
+    """Validate {table: rows or DataFrame} as built by build_output_tables"""
+    frames = {table: _frame(table, rows) for table, rows in tables.items()}
+    template = frames.get('FORMTEMPLATE', pd.DataFrame())
+    lov = frames.get('FORMLOV', pd.DataFrame())
+
+    report = ValidationReport()
+    if not template.empty:
+        check_keylov_references(report, template, lov)
+        check_display_order(report, template)
+    check_duplicate_keys(report, template, lov)
+    check_empty_labels(report, template, lov)
+    check_lengths(report, frames)
+    return report
@@ -0,0 +1,261 @@
+"""Watched inbox folder with bounded-concurrency processing.
+
+Polls an inbox directory for tasklist workbooks, waits until each file's
+size and mtime have stopped changing, then converts it (analysis, LOV
+auto-configuration, generation) in a process pool. At most --workers
+conversions run at once and only a small backlog is handed to the pool, so
+a burst of files never starts more pandas processes than configured.
+Processed inputs are moved to done/ or failed/ next to the inbox files.
+A file that never settles (still empty, or still changing, after
+--settle-timeout seconds) is moved to failed/ as well, so --once always
+drains the inbox.
+Each input writes into its own <output-dir>/<file stem>_<random id>/
+folder, so workbooks with the same sheet (and so the same form name)
+converted at the same time never write into each other's files.
+
+Usage:
+    python watch.py inbox --output-dir out --workers 4 --trace trace.jsonl --metrics pm_form.prom
+"""
+import argparse
+import os
+import re
+import shutil
+import sys
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from batch import convert_sheet, select_sheets
+from headless import HeadlessConverter
+from telemetry import ConversionTelemetry
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+
+
+def process_workbook(source_file, output_dir, all_sheets=False, user_name=None):
+    """Convert a workbook in a worker process; returns (status, trace records)"""
+    try:
+        sheets = select_sheets(HeadlessConverter(), source_file, all_sheets)
+    except Exception as e:
+        return 'failed', [{'source_file': source_file, 'sheet': None, 'status': 'failed', 'stages': {},
+                           'error': f"{type(e).__name__}: {e}"}]
+    if not sheets:
+        return 'failed', [{'source_file': source_file, 'sheet': None, 'status': 'failed', 'stages': {},
+                           'error': "No sheets to convert"}]
+
+    # Records go back to the parent, which owns the trace file and metrics
+    telemetry = ConversionTelemetry()
+    stem = re.sub(r'[^\w.-]', '_', os.path.splitext(os.path.basename(source_file))[0])
+    input_dir = os.path.join(output_dir, f"{stem}_{uuid.uuid4().hex[:8]}")
+    # Workbooks already run in parallel, so each sheet is extracted in this process
+    records = [convert_sheet(source_file, sheet, output_dir, telemetry, user_name, extract_workers=1,
+                             form_root=input_dir)
+               for sheet in sheets]
+    status = 'ok' if all(record['status'] == 'ok' for record in records) else 'failed'
+    return status, records
+
+
+class FileTracker:
+    """Tracks (size, mtime) per file and reports files that have settled"""
+
+    def __init__(self, settle_seconds, timeout_seconds=None):
+        self.settle_seconds = settle_seconds
+        self.timeout_seconds = timeout_seconds
+        # path -> (signature, time of the last change, time first seen)
+        self.observed = {}
+
+    def stable_files(self, paths, now):
+        stable = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.observed.pop(path, None)
+                continue
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self.observed.get(path)
+            if previous is None or previous[0] != signature:
+                self.observed[path] = (signature, now, now if previous is None else previous[2])
+            elif stat.st_size > 0 and now - previous[1] >= self.settle_seconds:
+                stable.append(path)
+        for path in set(self.observed) - set(paths):
+            del self.observed[path]
+        return stable
+
+    def unsettled_files(self, now):
+        """Files watched for timeout_seconds or longer; callers skip the ones that just settled"""
+        if self.timeout_seconds is None:
+            return []
+        return [path for path, (_, _, first_seen) in self.observed.items()
+                if now - first_seen >= self.timeout_seconds]
+
+    def forget(self, path):
+        self.observed.pop(path, None)
+
+
+class InboxWatcher:
+    """Moves settled workbooks from the inbox through the conversion pool"""
+
+    def __init__(self, inbox, output_dir, workers=None, settle_seconds=2.0, poll_interval=1.0,
+                 done_dir=None, failed_dir=None, all_sheets=False, user_name=None, telemetry=None,
+                 settle_timeout=300.0):
+        self.inbox = os.path.abspath(inbox)
+        self.output_dir = os.path.abspath(output_dir)
+        self.done_dir = done_dir or os.path.join(self.inbox, "done")
+        self.failed_dir = failed_dir or os.path.join(self.inbox, "failed")
+        self.workers = workers or os.cpu_count() or 1
+        # Hand the pool a small backlog so a worker never idles between polls
+        self.max_in_flight = self.workers * 2
+        self.poll_interval = poll_interval
+        self.all_sheets = all_sheets
+        self.user_name = user_name
+        self.telemetry = telemetry or ConversionTelemetry()
+        self.tracker = FileTracker(settle_seconds, settle_timeout)
+        self.ready = []
+        self.in_flight = {}
+        self.processed = {'ok': 0, 'failed': 0}
+
+        for directory in (self.inbox, self.output_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+
+    def scan(self):
+        """Workbooks currently in the inbox, excluding Office lock and temp files"""
+        paths = []
+        with os.scandir(self.inbox) as entries:
+            for entry in entries:
+                name = entry.name
+                if (entry.is_file() and name.lower().endswith(WORKBOOK_EXTENSIONS)
+                        and not name.startswith(('~$', '.'))):
+                    paths.append(entry.path)
+        return paths
+
+    def poll(self, now=None):
+        """Queue newly settled files; returns how many were queued"""
+        now = time.monotonic() if now is None else now
+        waiting = set(self.ready) | set(self.in_flight.values())
+        candidates = [path for path in self.scan() if path not in waiting]
+        settled = sorted(self.tracker.stable_files(candidates, now), key=lambda p: os.path.getmtime(p))
+        self.ready.extend(settled)
+        for path in self.tracker.unsettled_files(now):
+            if path not in settled:
+                self.fail_unsettled(path)
+        return len(settled)
+
+    def fail_unsettled(self, path):
+        """File a workbook that never stopped changing (or stayed empty) as failed"""
+        error = f"File did not settle within {self.tracker.timeout_seconds:g} seconds"
+        self.finish(path, 'failed', [{'source_file': path, 'sheet': None, 'status': 'failed', 'stages': {},
+                                      'error': error}])
+
+    def dispatch(self, pool):
+        while self.ready and len(self.in_flight) < self.max_in_flight:
+            path = self.ready.pop(0)
+            future = pool.submit(process_workbook, path, self.output_dir, self.all_sheets, self.user_name)
+            self.in_flight[future] = path
+
+    def collect(self, timeout):
+        """Wait up to timeout for running conversions and file their inputs"""
+        if not self.in_flight:
+            time.sleep(timeout)
+            return
+        done, _ = wait(list(self.in_flight), timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            path = self.in_flight.pop(future)
+            try:
+                status, records = future.result()
+            except Exception as e:
+                status = 'failed'
+                records = [{'source_file': path, 'sheet': None, 'status': 'failed', 'stages': {},
+                            'error': f"{type(e).__name__}: {e}"}]
+            self.finish(path, status, records)
+
+    def finish(self, path, status, records):
+        for record in records:
+            self.telemetry.record_conversion(
+                source_file=record['source_file'],
+                sheet_name=record['sheet'],
+                status=record['status'],
+                stages=record['stages'],
+                form_name=record.get('form_name'),
+                rows_scanned=record.get('rows_scanned', 0),
+                procedures=record.get('procedures', 0),
+                lov_codes=record.get('lov_codes', 0),
+                outputs=record.get('outputs'),
+                registry_entry=record.get('form_registry'),
+                error=record.get('error'),
+                reused=record.get('reused'),
+            )
+        self.telemetry.flush()
+
+        target_dir = self.done_dir if status == 'ok' else self.failed_dir
+        target = move_unique(path, target_dir)
+        self.tracker.forget(path)
+        self.processed[status] += 1
+
+        if status == 'ok':
+            forms = ", ".join(record['form_name'] for record in records)
+            print(f"OK     {os.path.basename(path)} -> {forms}")
+        else:
+            errors = "; ".join(record.get('error') or '' for record in records if record['status'] != 'ok')
+            with open(target + ".error.txt", 'w', encoding='utf-8') as f:
+                f.write(errors + "\n")
+            print(f"FAILED {os.path.basename(path)}: {errors}", file=sys.stderr)
+
+    def run(self, once=False):
+        """Watch until interrupted; with once, stop when the inbox is drained"""
+        print(f"Watching {self.inbox} with {self.workers} workers")
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            try:
+                while True:
+                    self.poll()
+                    self.dispatch(pool)
+                    self.collect(self.poll_interval)
+                    if once and not self.ready and not self.in_flight and not self.tracker.observed:
+                        break
+            except KeyboardInterrupt:
+                print("Stopping: waiting for running conversions", file=sys.stderr)
+                self.ready.clear()
+                while self.in_flight:
+                    self.collect(self.poll_interval)
+        return self.processed
+
+
+def move_unique(path, directory):
+    """Move path into directory without overwriting an earlier file of the same name"""
+    target = os.path.join(directory, os.path.basename(path))
+    if os.path.exists(target):
+        stem, extension = os.path.splitext(os.path.basename(path))
+        target = os.path.join(directory, f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{extension}")
+    shutil.move(path, target)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert tasklist workbooks dropped into an inbox folder")
+    parser.add_argument('inbox', help="Directory to watch")
+    parser.add_argument('--output-dir', default=os.getcwd(), help="Directory for generated files")
+    parser.add_argument('--workers', type=int, help="Concurrent conversions (default: CPU count)")
+    parser.add_argument('--settle', type=float, default=2.0, help="Seconds a file's size/mtime must stay unchanged")
+    parser.add_argument('--settle-timeout', type=float, default=300.0,
+                        help="Seconds after which a file that never settled is moved to failed/")
+    parser.add_argument('--poll', type=float, default=1.0, help="Seconds between inbox scans")
+    parser.add_argument('--done-dir', help="Where converted inputs go (default: <inbox>/done)")
+    parser.add_argument('--failed-dir', help="Where failed inputs go (default: <inbox>/failed)")
+    parser.add_argument('--all-sheets', action='store_true', help="Convert every sheet instead of the likely one")
+    parser.add_argument('--user', help="User name written into FORMHEAD")
+    parser.add_argument('--trace', help="Append JSON-lines trace records to this file")
+    parser.add_argument('--metrics', help="Write Prometheus textfile metrics to this file")
+    parser.add_argument('--once', action='store_true', help="Exit once the inbox is empty")
+    args = parser.parse_args()
+
+    watcher = InboxWatcher(args.inbox, args.output_dir, args.workers, args.settle, args.poll,
+                           args.done_dir, args.failed_dir, args.all_sheets, args.user,
+                           ConversionTelemetry(args.trace, args.metrics), args.settle_timeout)
+    processed = watcher.run(once=args.once)
+    print(f"Processed {processed['ok']} ok, {processed['failed']} failed")
+    sys.exit(1 if processed['failed'] and args.once else 0)
+
+
+if __name__ == "__main__":
+    main()